@@ -21,6 +21,10 @@ from werkzeug.exceptions import HTTPException as WerkzeugHTTPException
 from werkzeug.local import LocalProxy
 
 from app.aws.metrics_logger import MetricsLogger
+from app.cache.attachments import template_attachment_cache
+from app.cache.local import local_caches
+from app.cache.schema_validators import schema_validator_registry
+from app.cache.templates import rendered_template_cache
 from app.celery.celery import NotifyCelery
 from app.clients import Clients
 from app.clients.airtable.airtable_client import AirtableClient
@@ -34,6 +38,7 @@ from app.clients.salesforce.salesforce_client import SalesforceClient
 from app.clients.sms.aws_pinpoint import AwsPinpointClient
 from app.clients.sms.aws_sns import AwsSnsClient
 from app.dbsetup import RoutingSQLAlchemy, enable_sqlalchemy_debug_logging
+from app.delivery.bounce_rate_buckets import bounce_rate_buckets
 from app.encryption import CryptoSigner
 from app.json_provider import NotifyJSONProvider
 from app.otel_request_metrics import init_otel_request_metrics
@@ -159,7 +164,13 @@ def create_app(application, config=None):
     flask_cache_ops.init_app(application)
     redis_store.init_app(application)
     bounce_rate_client.init_app(application)
+    bounce_rate_buckets.init_app(application, redis_store)
+    init_local_caches(application)
+    template_attachment_cache.init_app(application, redis_store, statsd_client)
+    rendered_template_cache.init_app(application, statsd_client)
+    schema_validator_registry.init_app(application, statsd_client)
 
+    metrics_logger.init_app(application)
     sms_bulk_publish.init_app(flask_cache_ops, metrics_logger)
     sms_normal_publish.init_app(flask_cache_ops, metrics_logger)
     sms_priority_publish.init_app(flask_cache_ops, metrics_logger)
@@ -201,6 +212,41 @@ def create_app(application, config=None):
     return application
 
 
+def init_local_caches(application):
+    from app.models import (
+        ApiKey,
+        ProviderDetails,
+        Service,
+        ServiceCallbackApi,
+        ServiceEmailReplyTo,
+        ServiceLetterContact,
+        ServicePermission,
+        ServiceSmsSender,
+        Template,
+        TemplateCategory,
+        TemplateRedacted,
+    )
+
+    # Commits that write any of these models clear the DAO local caches on every worker
+    local_caches.init_app(
+        application,
+        redis_store,
+        invalidating_models=(
+            ApiKey,
+            ProviderDetails,
+            Service,
+            ServiceCallbackApi,
+            ServiceEmailReplyTo,
+            ServiceLetterContact,
+            ServicePermission,
+            ServiceSmsSender,
+            Template,
+            TemplateCategory,
+            TemplateRedacted,
+        ),
+    )
+
+
 def register_notify_blueprint(application, blueprint, auth_function, prefix=None):
     if not blueprint._got_registered_once:
         blueprint.before_request(auth_function)
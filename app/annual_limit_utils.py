@@ -1,5 +1,7 @@
+import copy
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
-from typing import Tuple
+from typing import Dict, List, Tuple
 from uuid import UUID
 
 from flask import current_app
@@ -7,15 +9,18 @@ from notifications_utils.clients.redis.annual_limit import (
     TOTAL_EMAIL_FISCAL_YEAR_TO_YESTERDAY,
     TOTAL_SMS_BILLABLE_UNITS_FISCAL_YEAR_TO_YESTERDAY,
     TOTAL_SMS_FISCAL_YEAR_TO_YESTERDAY,
+    RedisAnnualLimit,
     annual_limit_notifications_v2_key,
 )
 from notifications_utils.decorators import requires_feature
 
-from app import annual_limit_client
+from app import annual_limit_client, redis_store, statsd_client
 from app.dao.fact_notification_status_dao import (
     fetch_billable_units_for_service_for_day,
     fetch_billable_units_totals_for_service_by_fiscal_year,
+    fetch_notification_status_by_service_for_day,
     fetch_notification_status_for_service_for_day,
+    fetch_notification_status_totals_by_service_for_fiscal_year,
     fetch_notification_status_totals_for_service_by_fiscal_year,
 )
 from app.models import EMAIL_TYPE, SMS_TYPE
@@ -30,6 +35,8 @@ def seed_data_in_redis(service_id: UUID) -> dict:
     """
     Seed the annual limit notification counts for a service in redis.
     """
+    # Counted against the services seeded by seed-annual-limit-counts to measure its coverage
+    statsd_client.incr("annual-limit.seeding.cold")
     today = datetime.now(timezone.utc)
     annual_data_sms = fetch_notification_status_totals_for_service_by_fiscal_year(
         service_id, get_fiscal_year(today), notification_type=SMS_TYPE
@@ -127,3 +134,68 @@ def get_annual_limit_notifications_v3(service_id: UUID) -> Tuple[dict, bool]:
                 f"New Data in redis: {data}."
             )
             return (data, True)
+
+
+@requires_feature("REDIS_ENABLED")
+def increment_annual_limit_counts(counts_by_service: Dict[UUID, Counter]) -> None:
+    """
+    Adds the counts of each service, keyed by annual limit field such as SMS_DELIVERED_TODAY,
+    to its annual limit notification counts in a single Redis round trip.
+    """
+    pipeline = redis_store.redis_store.pipeline()
+    for service_id, counts in counts_by_service.items():
+        for field, count in counts.items():
+            if count:
+                pipeline.hincrby(annual_limit_notifications_v2_key(service_id), field, count)
+    pipeline.execute()
+
+
+def _pipelined_annual_limit_client(pipeline) -> RedisAnnualLimit:
+    """An annual limit client queuing its commands on pipeline instead of sending them."""
+    redis_client = copy.copy(redis_store)
+    redis_client.redis_store = pipeline
+    return RedisAnnualLimit(redis_client)
+
+
+@requires_feature("REDIS_ENABLED")
+def seed_annual_limit_counts_for_services(service_ids: List[UUID]) -> int:
+    """
+    Seeds the annual limit notification counts of the services in redis as seed_data_in_redis does, with two queries
+    for all the services and a single Redis round trip. Returns the number of services seeded.
+    """
+    today = datetime.now(timezone.utc)
+    use_billable_units = current_app.config.get("FF_USE_BILLABLE_UNITS")
+    annual_totals = {
+        (row.service_id, row.notification_type): row
+        for row in fetch_notification_status_totals_by_service_for_fiscal_year(service_ids, get_fiscal_year(today))
+    }
+    todays_statuses = defaultdict(list)
+    for row in fetch_notification_status_by_service_for_day(today, service_ids):
+        todays_statuses[row.service_id].append(row)
+
+    pipeline = redis_store.redis_store.pipeline()
+    pipelined_client = _pipelined_annual_limit_client(pipeline)
+    for service_id in service_ids:
+        statuses = todays_statuses.get(service_id, [])
+        annual_sms = annual_totals.get((service_id, SMS_TYPE))
+        annual_email = annual_totals.get((service_id, EMAIL_TYPE))
+        data = prepare_notification_counts_for_seeding(
+            [(None, row.notification_type, row.notification_status, row.count) for row in statuses]
+        )
+        data[TOTAL_SMS_FISCAL_YEAR_TO_YESTERDAY] = annual_sms.notification_count if annual_sms else 0
+        data[TOTAL_EMAIL_FISCAL_YEAR_TO_YESTERDAY] = annual_email.notification_count if annual_email else 0
+        # TODO FF_USE_BILLABLE_UNITS removal - Also seed billable units when feature flag is enabled
+        if use_billable_units:
+            data[TOTAL_SMS_BILLABLE_UNITS_FISCAL_YEAR_TO_YESTERDAY] = annual_sms.billable_units if annual_sms else 0
+            data.update(
+                prepare_billable_units_counts_for_seeding(
+                    [(None, row.notification_type, row.notification_status, row.billable_units) for row in statuses]
+                )
+            )
+        pipelined_client.seed_annual_limit_notifications(service_id, data)
+        # seed_annual_limit_notifications skips seeded_at when all the counts are zero, see seed_data_in_redis
+        pipelined_client.set_seeded_at(service_id)
+    pipeline.execute()
+
+    statsd_client.incr("annual-limit.seeding.bulk", count=len(service_ids))
+    return len(service_ids)
@@ -18,6 +18,7 @@ from notifications_utils import request_helper
 from sqlalchemy.exc import DataError
 from sqlalchemy.orm.exc import NoResultFound
 
+from app.cache.local import local_caches
 from app.dao.api_key_dao import get_api_key_by_secret
 from app.dao.services_dao import dao_fetch_service_by_id_with_api_keys
 
@@ -51,6 +52,15 @@ AUTH_TYPES = [
     ),
 ]
 
+# (issuer, token signature) -> id of the API key that verified the token
+verified_token_local_cache = local_caches.cache(
+    "verified_token", feature_flag="FF_JWT_VERIFICATION_CACHE", ttl_config="AUTH_CACHE_TTL_SECONDS"
+)
+# service id -> {API key id: unsigned secret}
+api_key_secrets_local_cache = local_caches.cache(
+    "api_key_secrets", feature_flag="FF_JWT_VERIFICATION_CACHE", ttl_config="AUTH_CACHE_TTL_SECONDS"
+)
+
 
 class AuthError(Exception):
     def __init__(self, message, code, service_id=None, api_key_id=None):
@@ -185,7 +195,7 @@ def requires_auth():
     client = __get_token_issuer(auth_token)
 
     try:
-        service = dao_fetch_service_by_id_with_api_keys(client)
+        service = dao_fetch_service_by_id_with_api_keys(client, use_cache=True)
     except DataError:
         raise AuthError("Invalid token: service id is not the right data type", 403)
     except NoResultFound:
@@ -197,9 +207,13 @@ def requires_auth():
     if not service.active:
         raise AuthError("Invalid token: service is archived", 403, service_id=service.id)
 
-    for api_key in service.api_keys:
+    token_cache_key = (client, auth_token.rsplit(".", 1)[-1])
+    secrets = {}
+    if local_caches.enabled(api_key_secrets_local_cache):
+        secrets = local_caches.get_or_load(api_key_secrets_local_cache, str(service.id), lambda: _api_key_secrets(service))
+    for api_key in _api_keys_in_verification_order(service, local_caches.get(verified_token_local_cache, token_cache_key)):
         try:
-            decode_jwt_token(auth_token, api_key.secret)
+            decode_jwt_token(auth_token, secrets.get(api_key.id) or api_key.secret)
         except TokenAlgorithmError:
             current_app.logger.warning(
                 "Rejected JWT with unsupported algorithm for service %s, client %s",
@@ -235,12 +249,28 @@ def requires_auth():
             raise AuthError(err_msg, 403, service_id=service.id, api_key_id=api_key.id)
 
         _auth_with_api_key(api_key, service)
+        local_caches.set(verified_token_local_cache, token_cache_key, api_key.id)
         return
     else:
         # service has API keys, but none matching the one the user provided
         raise AuthError("Invalid token: signature, api token not found", 403, service_id=service.id)
 
 
+def _api_key_secrets(service):
+    return {api_key.id: api_key.secret for api_key in service.api_keys}
+
+
+def _api_keys_in_verification_order(service, verified_api_key_id):
+    """
+    The service's API keys, starting with the key that verified the same token before, if any.
+    A repeated token is then verified with a single decode, while revoked or removed keys are
+    still caught since the keys come from the service loaded for this request.
+    """
+    if verified_api_key_id is None:
+        return service.api_keys
+    return sorted(service.api_keys, key=lambda api_key: api_key.id != verified_api_key_id)
+
+
 def _auth_by_api_key(auth_token):
     try:
         api_key = get_api_key_by_secret(auth_token)
@@ -101,6 +101,37 @@ def put_batch_saving_expiry_metric(metrics_logger: MetricsLogger, queue: RedisQu
     return
 
 
+def put_batch_saving_drain_metric(metrics_logger: MetricsLogger, queue: RedisQueue, drained: int, seconds: float, remaining: int):
+    """
+    Metrics for one beat-inbox-drain pass over an INBOX: how many items were
+    moved to inflight lists, the drain rate, and the lag left behind.
+
+    Args:
+        queue (RedisQueue): Implementation of queue.RedisQueue for BatchSaving
+        drained (int): Number of items drained from the INBOX
+        seconds (float): Duration of the drain pass
+        remaining (int): Number of items still in the INBOX after the pass
+        metrics (MetricsLogger): Submit metric to cloudwatch
+    """
+    if metrics_logger.metrics_config.disable_metric_extraction:
+        return
+    try:
+        rate = drained / seconds if seconds > 0 else 0
+        metrics_logger.set_namespace("NotificationCanadaCa")
+        metrics_logger.put_metric("batch_saving_drained", drained, "Count")
+        metrics_logger.put_metric("batch_saving_drain_rate", rate, "Count/Second")
+        metrics_logger.put_metric("batch_saving_drain_lag", remaining, "Count")
+        if rate > 0:
+            metrics_logger.put_metric("batch_saving_drain_lag_seconds", remaining / rate, "Seconds")
+        metrics_logger.set_dimensions({"notification_type": queue._suffix, "priority": queue._process_type})
+        # The rate and the lag are gauges, summing them over a flush interval would be meaningless
+        metrics_logger.flush(aggregate=False)
+    except ClientError as e:
+        message = "Error sending CloudWatch Metric: {}".format(e)
+        current_app.logger.warning(message)
+    return
+
+
 def put_batch_saving_bulk_created(
     metrics_logger: MetricsLogger, count: int, notification_type: Optional[str] = None, priority: Optional[str] = None
 ):
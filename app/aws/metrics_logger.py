@@ -1,4 +1,9 @@
+import atexit
+import logging
+import os
+import threading
 from os import environ
+from typing import Dict, List, Optional, Tuple
 
 from aws_embedded_metrics import MetricsLogger as _MetricsLogger  # type: ignore
 from aws_embedded_metrics.config import get_config  # type: ignore
@@ -14,10 +19,32 @@ from aws_embedded_metrics.environment.local_environment import (  # type: ignore
 
 from app.config import Config
 
+_logger = logging.getLogger(__name__)
+
+# The namespace and the dimension sets a metric was flushed with
+BufferKey = Tuple[str, Tuple[Tuple[Tuple[str, str], ...], ...]]
+
 
 class MetricsLogger(_MetricsLogger):
+    """
+    With FF_BUFFERED_CLOUDWATCH_METRICS, flush() adds the metrics to an in-process buffer summing their values per
+    namespace and dimension sets, instead of serialising and writing an EMF document. A background thread writes one
+    document per namespace and dimension sets every CLOUDWATCH_METRICS_FLUSH_INTERVAL_SECONDS, or as soon as
+    CLOUDWATCH_METRICS_BUFFER_SIZE flushes are buffered, so a burst of 10,000 publishes writes a handful of documents.
+    Metrics whose values must not be summed, such as gauges, are written right away with flush(aggregate=False).
+    """
+
     def __init__(self):
         super().__init__(None, None)
+        self.flush_interval_seconds = 0.0
+        self.buffer_size = 1000
+        self._buffer: Dict[BufferKey, Dict[str, List]] = {}
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        self._flush_at_exit = False
         self.metrics_config = get_config()
         self.metrics_config.service_name = "BatchSaving"
         self.metrics_config.service_type = "Redis"
@@ -39,8 +66,71 @@ class MetricsLogger(_MetricsLogger):
         else:
             self.environment = EC2Environment()
 
-    def flush(self) -> None:
-        """Override the default async MetricsLogger.flush method, flushing to stdout immediately"""
+    def init_app(self, app) -> None:
+        if app.config["FF_BUFFERED_CLOUDWATCH_METRICS"]:
+            self.flush_interval_seconds = app.config["CLOUDWATCH_METRICS_FLUSH_INTERVAL_SECONDS"]
+            self.buffer_size = app.config["CLOUDWATCH_METRICS_BUFFER_SIZE"]
+            if not self._flush_at_exit:
+                atexit.register(self.flush_buffer)
+                self._flush_at_exit = True
+        else:
+            self.flush_interval_seconds = 0.0
+
+    @property
+    def buffered(self) -> bool:
+        return self.flush_interval_seconds > 0
+
+    def flush(self, aggregate: bool = True) -> None:
+        """Override the default async MetricsLogger.flush method, flushing to stdout immediately, or to the buffer"""
+        if not (aggregate and self.buffered):
+            sink = self.environment.get_sink()
+            sink.accept(self.context)  # type: ignore
+            self.context = self.context.create_copy_with_context()  # type: ignore
+            return
+
+        context, self.context = self.context, self.context.create_copy_with_context()  # type: ignore
+        key = (context.namespace, tuple(tuple(sorted(dimensions.items())) for dimensions in context.dimensions))
+        self._ensure_flusher()
+        with self._lock:
+            metrics = self._buffer.setdefault(key, {})
+            for name, metric in context.metrics.items():
+                metrics.setdefault(name, [0, metric.unit])[0] += sum(metric.values)
+            self._buffered += 1
+            full = self._buffered >= self.buffer_size
+        if full:
+            self._wake.set()
+
+    def flush_buffer(self) -> int:
+        """Writes an EMF document per namespace and dimension sets buffered since the last call. Returns how many."""
+        with self._lock:
+            buffer, self._buffer, self._buffered = self._buffer, {}, 0
         sink = self.environment.get_sink()
-        sink.accept(self.context)  # type: ignore
-        self.context = self.context.create_copy_with_context()  # type: ignore
+        for (namespace, dimension_sets), metrics in buffer.items():
+            context = self.context.create_copy_with_context()  # type: ignore
+            context.namespace = namespace
+            context.set_dimensions([dict(dimensions) for dimensions in dimension_sets])
+            for name, (value, unit) in metrics.items():
+                context.put_metric(name, value, unit)
+            sink.accept(context)
+        return len(buffer)
+
+    def _ensure_flusher(self) -> None:
+        # A forked worker, such as a celery prefork child, inherits neither the thread nor the buffer of its parent
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._buffer, self._buffered = {}, 0
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._run_flusher, name="metrics-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval_seconds or None)
+            self._wake.clear()
+            try:
+                self.flush_buffer()
+            except Exception as e:
+                _logger.warning("Error sending CloudWatch Metric: {}".format(e))
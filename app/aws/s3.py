@@ -13,6 +13,7 @@ from notifications_utils.s3 import s3upload as utils_s3upload
 from app.models import Job
 
 FILE_LOCATION_STRUCTURE = "service-{}-notify/{}.csv"
+JOB_ROWS_LOCATION_STRUCTURE = "service-{}-notify/{}.rows.jsonl.gz"
 REPORTS_FILE_LOCATION_STRUCTURE = "service-{}/{}.csv"
 THREE_DAYS_IN_SECONDS = 3 * 24 * 60 * 60
 MULTIPART_THRESHOLD = 1024 * 10  # 10MB
@@ -66,25 +67,76 @@ def get_job_from_s3(service_id, job_id):
     return obj.get()["Body"].read().decode("utf-8")
 
 
+def stream_job_from_s3(service_id, job_id, start_byte=0):
+    """Returns the streaming body of the job file from start_byte, to read it without holding it in memory,
+    or None if the file ends before start_byte."""
+    obj = get_s3_object(*get_job_location(service_id, job_id))
+    if not start_byte:
+        return obj.get()["Body"]
+    try:
+        return obj.get(Range=f"bytes={start_byte}-")["Body"]
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] == "InvalidRange":
+            return None
+        raise
+
+
+def get_job_range_from_s3(service_id, job_id, start_byte, end_byte) -> bytes:
+    """Returns the bytes of the job file from start_byte included to end_byte excluded."""
+    obj = get_s3_object(*get_job_location(service_id, job_id))
+    return obj.get(Range=f"bytes={start_byte}-{end_byte - 1}")["Body"].read()
+
+
 def get_job_metadata_from_s3(service_id, job_id):
     obj = get_s3_object(*get_job_location(service_id, job_id))
     return obj.get()["Metadata"]
 
 
+def get_job_rows_location(service_id, job_id):
+    return (
+        current_app.config["CSV_UPLOAD_BUCKET_NAME"],
+        JOB_ROWS_LOCATION_STRUCTURE.format(service_id, job_id),
+    )
+
+
+def upload_job_rows_to_s3(service_id, job_id, file_data: bytes):
+    bucket, location = get_job_rows_location(service_id, job_id)
+    utils_s3upload(
+        filedata=file_data,
+        region=current_app.config["AWS_REGION"],
+        bucket_name=bucket,
+        file_location=location,
+    )
+
+
+def get_job_rows_from_s3(service_id, job_id):
+    """Returns the streaming body of the parsed rows of the job, or None if they were not stored."""
+    try:
+        return get_s3_object(*get_job_rows_location(service_id, job_id)).get()["Body"]
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return None
+        raise
+
+
 def remove_jobs_from_s3(jobs: List[Job], batch_size=1000):
     """
-    Remove the files from S3 for the given jobs.
+    Remove the files from S3 for the given jobs, and the parsed rows stored next to them. The parsed rows are removed
+    whether FF_JOB_ROWS_ARTIFACT is on or not, as they hold the recipients of jobs created while it was on.
 
     Args:
         jobs (List[Job]): The jobs whose files need to be removed from S3.
-        batch_size (int, optional): The number of jobs to process in each boto call. Defaults to the AWS maximum of 1000.
+        batch_size (int, optional): The number of objects to delete in each boto call. Defaults to the AWS maximum of 1000.
     """
 
     bucket = resource("s3").Bucket(current_app.config["CSV_UPLOAD_BUCKET_NAME"])
+    object_keys = []
+    for job in jobs:
+        object_keys.append(FILE_LOCATION_STRUCTURE.format(job.service_id, job.id))
+        object_keys.append(JOB_ROWS_LOCATION_STRUCTURE.format(job.service_id, job.id))
 
-    for start in range(0, len(jobs), batch_size):
-        object_keys = [FILE_LOCATION_STRUCTURE.format(job.service_id, job.id) for job in jobs[start : start + batch_size]]
-        bucket.delete_objects(Delete={"Objects": [{"Key": key} for key in object_keys]})
+    for start in range(0, len(object_keys), batch_size):
+        bucket.delete_objects(Delete={"Objects": [{"Key": key} for key in object_keys[start : start + batch_size]]})
 
 
 def get_s3_bucket_objects(bucket_name, subfolder="", older_than=7, limit_days=2):
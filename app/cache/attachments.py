@@ -0,0 +1,145 @@
+"""
+Per-worker cache of the bytes of template file attachments, keyed by service id and document id.
+
+A document in document-download-api never changes once uploaded, so an entry only leaves the cache
+when the least recently used entries are evicted to stay under ATTACHMENT_CACHE_MAX_BYTES, or when it
+expires. Files of up to ATTACHMENT_CACHE_SHARED_MAX_BYTES are also kept in Redis, so that a file
+attached to every email of a job is downloaded once and not once per worker. The service id is part of the key,
+as a file is only downloaded for the service it belongs to, and a hit must not serve it to another service.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from notifications_utils.clients.statsd.statsd_client import StatsdClient
+
+
+def template_attachment_cache_key(service_id, document_id: str) -> str:
+    return f"template-attachment:{service_id}:{document_id}"
+
+
+# (service id, document id)
+AttachmentKey = Tuple[str, str]
+
+
+class AttachmentCache:
+    def __init__(self, max_bytes: int = 100 * 1024 * 1024, ttl_seconds: float = 3600, shared_max_bytes: int = 0) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shared_max_bytes = shared_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._size = 0
+        self._entries: OrderedDict[AttachmentKey, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_store = None
+        self._statsd_client: Optional[StatsdClient] = None
+
+    def init_app(self, app, redis_store, statsd_client: StatsdClient) -> None:
+        self.max_bytes = app.config["ATTACHMENT_CACHE_MAX_BYTES"]
+        self.ttl_seconds = app.config["ATTACHMENT_CACHE_TTL_SECONDS"]
+        self.shared_max_bytes = app.config["ATTACHMENT_CACHE_SHARED_MAX_BYTES"]
+        self._redis_store = redis_store
+        self._statsd_client = statsd_client
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get_or_download(self, service_id, document_id: str, download: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """Returns the bytes of the document of the service, calling download when neither the local nor the shared
+        tier has them.
+
+        Failed downloads, returned as None, are not cached.
+        """
+        key = (str(service_id), document_id)
+        data = self._get_local(key)
+        tier = "local"
+        if data is None:
+            data = self._get_shared(key)
+            tier = "shared"
+            if data is not None:
+                self._set_local(key, data)
+
+        if data is not None:
+            self.hits += 1
+            self.bytes_saved += len(data)
+            self._incr(f"attachments.template-cache.hit.{tier}")
+            self._incr("attachments.template-cache.bytes-saved", len(data))
+            return data
+
+        self.misses += 1
+        self._incr("attachments.template-cache.miss")
+        data = download()
+        if data is not None:
+            self._set_local(key, data)
+            self._set_shared(key, data)
+        return data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "size": len(self._entries),
+            "bytes": self._size,
+        }
+
+    def _get_local(self, key: AttachmentKey) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def _set_local(self, key: AttachmentKey, data: bytes) -> None:
+        # A file larger than the whole cache would only evict everything else
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: AttachmentKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _get_shared(self, key: AttachmentKey) -> Optional[bytes]:
+        if self._redis_store is None or not self.shared_max_bytes:
+            return None
+        return self._redis_store.get(template_attachment_cache_key(*key))
+
+    def _set_shared(self, key: AttachmentKey, data: bytes) -> None:
+        if self._redis_store is None or not self.shared_max_bytes or len(data) > self.shared_max_bytes:
+            return
+        self._redis_store.set(template_attachment_cache_key(*key), data, ex=int(self.ttl_seconds))
+
+    def _incr(self, stat: str, count: int = 1) -> None:
+        if self._statsd_client is not None:
+            self._statsd_client.incr(stat, count=count)
+
+
+template_attachment_cache = AttachmentCache()
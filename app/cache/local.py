@@ -0,0 +1,213 @@
+"""
+Per-worker caches for the DAO reads on the API hot path.
+
+Each LocalCache is a bounded LRU whose entries also expire after a time to live.
+Entries are dropped on every worker when the cache is cleared through /cache-clear
+or when a write to one of the cached models is committed: LocalCaches.invalidate
+clears the local entries and bumps a generation counter in Redis, which the other
+workers check at most every LOCAL_CACHE_GENERATION_CHECK_SECONDS.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LOCAL_CACHE_GENERATION_KEY = "local-cache-generation"
+IGNORED_BULK_UPDATE_COLUMNS = {"last_used_timestamp"}
+
+_MISSING = object()
+
+
+class LocalCache:
+    """A bounded LRU whose entries expire after ttl_seconds.
+
+    With a ttl_seconds of float("inf"), entries never expire and are only evicted when they are the least recently used.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1000,
+        ttl_seconds: float = 30,
+        feature_flag: str = "FF_LOCAL_DAO_CACHE",
+        ttl_config: str = "LOCAL_CACHE_TTL_SECONDS",
+    ) -> None:
+        self.name = name
+        self.feature_flag = feature_flag
+        self.ttl_config = ttl_config
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the cached value, or None if the key is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Caches value for ttl_seconds, or the time to live of the cache by default."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Returns the cached value for key, calling loader on a miss. None results and exceptions are not cached."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class LocalCaches:
+    """Registry of the LocalCache instances of a worker, configured from the app config."""
+
+    def __init__(self) -> None:
+        self.caches: dict[str, LocalCache] = {}
+        self.invalidating_models: tuple[type, ...] = ()
+        self._redis_store = None
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self._generation_check_seconds = 5.0
+        self._config: dict = {}
+
+    def init_app(self, app, redis_store, invalidating_models: tuple[type, ...]) -> None:
+        self._redis_store = redis_store
+        self._config = app.config
+        self._generation_check_seconds = app.config["LOCAL_CACHE_GENERATION_CHECK_SECONDS"]
+        for cache in self.caches.values():
+            self._configure(cache)
+            cache.clear()
+        self.invalidating_models = invalidating_models
+        if not event.contains(Session, "after_flush", _record_invalidating_writes):
+            event.listen(Session, "after_flush", _record_invalidating_writes)
+            event.listen(Session, "after_bulk_update", _record_invalidating_bulk_writes)
+            event.listen(Session, "after_bulk_delete", _record_invalidating_bulk_writes)
+            event.listen(Session, "after_commit", _invalidate_after_commit)
+            event.listen(Session, "after_rollback", _forget_invalidating_writes)
+
+    def cache(
+        self, name: str, feature_flag: str = "FF_LOCAL_DAO_CACHE", ttl_config: str = "LOCAL_CACHE_TTL_SECONDS"
+    ) -> LocalCache:
+        """Returns the cache registered under name, creating it on first use.
+
+        The cache is only read when the feature_flag config is on, and its entries live
+        for the number of seconds in the ttl_config config.
+        """
+        if name not in self.caches:
+            self.caches[name] = LocalCache(name, feature_flag=feature_flag, ttl_config=ttl_config)
+            self._configure(self.caches[name])
+        return self.caches[name]
+
+    def _configure(self, cache: LocalCache) -> None:
+        if self._config:
+            cache.maxsize = self._config["LOCAL_CACHE_MAXSIZE"]
+            cache.ttl_seconds = self._config[cache.ttl_config]
+
+    def enabled(self, cache: LocalCache) -> bool:
+        return bool(current_app.config[cache.feature_flag])
+
+    def get(self, cache: LocalCache, key: Hashable) -> Any:
+        """Reads cache when its feature flag is on, and returns None otherwise."""
+        if not self.enabled(cache):
+            return None
+        self.check_generation()
+        return cache.get(key)
+
+    def set(self, cache: LocalCache, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if self.enabled(cache):
+            cache.set(key, value, ttl_seconds)
+
+    def get_or_load(self, cache: LocalCache, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Reads through cache when its feature flag is on, and calls loader directly otherwise."""
+        if not self.enabled(cache):
+            return loader()
+        self.check_generation()
+        return cache.get_or_load(key, loader)
+
+    def check_generation(self) -> None:
+        now = time.monotonic()
+        if self._redis_store is None or now - self._generation_checked_at < self._generation_check_seconds:
+            return
+        self._generation_checked_at = now
+        generation = self._redis_store.get(LOCAL_CACHE_GENERATION_KEY)
+        if generation != self._generation:
+            self._generation = generation
+            self.clear()
+
+    def clear(self) -> None:
+        for cache in self.caches.values():
+            cache.clear()
+
+    def invalidate(self) -> None:
+        """Clears the caches of this worker, and of every other worker at their next generation check."""
+        self.clear()
+        if self._redis_store is not None:
+            self._redis_store.incr(LOCAL_CACHE_GENERATION_KEY)
+
+    def stats(self) -> dict:
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+
+local_caches = LocalCaches()
+
+
+def _record_invalidating_writes(session, flush_context):
+    if any(
+        isinstance(instance, local_caches.invalidating_models)
+        for instance in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info["invalidates_local_caches"] = True
+
+
+def _record_invalidating_bulk_writes(context):
+    if not issubclass(context.mapper.class_, local_caches.invalidating_models):
+        return
+    # update_last_used_api_key runs on every authenticated request and does not change what is cached
+    columns = {getattr(column, "key", column) for column in (getattr(context, "values", None) or {})}
+    if columns and columns <= IGNORED_BULK_UPDATE_COLUMNS:
+        return
+    context.session.info["invalidates_local_caches"] = True
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop("invalidates_local_caches", False):
+        local_caches.invalidate()
+
+
+def _forget_invalidating_writes(session):
+    session.info.pop("invalidates_local_caches", None)
@@ -2,6 +2,7 @@ from flask import Blueprint, current_app, jsonify
 from notifications_utils.clients.redis.cache_keys import CACHE_KEYS_ALL
 
 from app import redis_store
+from app.cache.local import local_caches
 from app.errors import register_errors
 from app.schemas import event_schema
 
@@ -13,6 +14,8 @@ register_errors(cache_blueprint)
 def clear():
     try:
         max(redis_store.delete_cache_keys_by_pattern(pattern) for pattern in CACHE_KEYS_ALL)
+        current_app.logger.info(f"Clearing local caches, stats were {local_caches.stats()}")
+        local_caches.invalidate()
         return jsonify(result="ok"), 201
     except Exception as e:
         current_app.logger.error("Unable to clear the cache", exc_info=e)
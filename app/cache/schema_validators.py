@@ -0,0 +1,131 @@
+"""
+Per-worker registry of the jsonschema validators used by app.schema_validation.validate.
+
+Building a Draft7Validator builds a RefResolver for the schema, and validate used to build one for every request. The
+schemas of the API are module level dicts, so the registry keeps one validator per schema object, keyed by its id and
+holding a reference to the schema so that the id is not reused while the entry exists. A schema built for each request
+misses every time, so functions building schemas, such as post_bulk_request, return the same dict for the same
+arguments.
+
+A validator resolving "$ref" or "$id" pushes scopes on its resolver while it runs, so validators of those schemas are
+not shared between requests.
+
+For schemas that are a flat object of string properties, such as post_email_request and post_sms_request, the
+registry also compiles a fast check. It checks the required and allowed keys, the types and the formats of the
+properties directly, and runs a validator on the other properties only, such as personalisation. A request passing the
+fast check is valid. A request failing it is validated again by the full validator, which builds the error messages.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import current_app
+from jsonschema import Draft7Validator, FormatChecker
+from notifications_utils.clients.statsd.statsd_client import StatsdClient
+
+from app.cache.local import LocalCache
+
+FastCheck = Callable[[Any], bool]
+
+# Keywords of a property schema the fast check handles itself, the others only document the property
+_SIMPLE_PROPERTY_KEYWORDS = {"type", "format", "validationMessage", "code", "link", "description"}
+_SIMPLE_TYPES = {"string": str, "null": type(None)}
+_FAST_CHECK_SCHEMA_KEYWORDS = {"$schema", "description", "title", "type", "properties", "required", "additionalProperties"}
+
+
+def _uses_resolver(schema: Any) -> bool:
+    if isinstance(schema, dict):
+        return "$ref" in schema or "$id" in schema or any(_uses_resolver(value) for value in schema.values())
+    if isinstance(schema, list):
+        return any(_uses_resolver(value) for value in schema)
+    return False
+
+
+def _simple_property_check(property_schema: Dict[str, Any], format_checker: FormatChecker) -> Optional[FastCheck]:
+    types = property_schema.get("type")
+    types = [types] if isinstance(types, str) else types
+    if not types or not set(property_schema) <= _SIMPLE_PROPERTY_KEYWORDS or not set(types) <= set(_SIMPLE_TYPES):
+        return None
+    python_types = tuple(_SIMPLE_TYPES[t] for t in types)
+    format_name = property_schema.get("format")
+
+    def check(value: Any) -> bool:
+        if not isinstance(value, python_types):
+            return False
+        return format_name is None or format_checker.conforms(value, format_name)
+
+    return check
+
+
+def compile_fast_check(schema: Dict[str, Any], format_checker: FormatChecker) -> Optional[FastCheck]:
+    """A function telling whether a request is valid against schema without running its validator,
+    or None if schema is not a flat object schema."""
+    if not set(schema) <= _FAST_CHECK_SCHEMA_KEYWORDS or schema.get("type") != "object":
+        return None
+    if schema.get("additionalProperties", True) not in (True, False):
+        return None
+
+    properties = schema.get("properties", {})
+    required = frozenset(schema.get("required", []))
+    allowed = None if schema.get("additionalProperties", True) else frozenset(properties)
+    property_checks: Dict[str, FastCheck] = {}
+    for name, property_schema in properties.items():
+        check = _simple_property_check(property_schema, format_checker)
+        if check is None:
+            check = Draft7Validator(property_schema, format_checker=format_checker).is_valid
+        property_checks[name] = check
+
+    def fast_check(instance: Any) -> bool:
+        if not isinstance(instance, dict) or not required <= instance.keys():
+            return False
+        if allowed is not None and not instance.keys() <= allowed:
+            return False
+        return all(name not in property_checks or property_checks[name](value) for name, value in instance.items())
+
+    return fast_check
+
+
+class SchemaValidatorRegistry:
+    def __init__(self, max_size: int = 256) -> None:
+        self._cache = LocalCache("schema-validators", maxsize=max_size, ttl_seconds=float("inf"))
+        self._statsd_client: Optional[StatsdClient] = None
+
+    def init_app(self, app, statsd_client: StatsdClient) -> None:
+        self._statsd_client = statsd_client
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, schema: dict, format_checker: FormatChecker) -> Tuple[Draft7Validator, Optional[FastCheck]]:
+        """Returns the validator of schema when FF_SCHEMA_VALIDATOR_CACHE is on, and its fast check when
+        FF_SCHEMA_VALIDATION_FAST_PATH is also on."""
+        if not current_app.config["FF_SCHEMA_VALIDATOR_CACHE"]:
+            return Draft7Validator(schema, format_checker=format_checker), None
+
+        # The entry holds a reference to the schema, so its id is not reused by another schema while it is cached
+        key = id(schema)
+        entry = self._cache.get(key)
+        outcome = "hit"
+        if entry is None:
+            outcome = "miss"
+            if _uses_resolver(schema):
+                entry = (schema, None, None)
+            else:
+                entry = (schema, Draft7Validator(schema, format_checker=format_checker), compile_fast_check(schema, format_checker))
+            self._cache.set(key, entry)
+        if self._statsd_client is not None:
+            self._statsd_client.incr(f"schema-validation.validator-registry.{outcome}")
+
+        _, validator, fast_check = entry
+        if validator is None:
+            validator = Draft7Validator(schema, format_checker=format_checker)
+        return validator, fast_check if current_app.config["FF_SCHEMA_VALIDATION_FAST_PATH"] else None
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+schema_validator_registry = SchemaValidatorRegistry()
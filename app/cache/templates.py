@@ -0,0 +1,61 @@
+"""
+Per-worker cache of the notifications_utils template objects built for sending, without personalisation.
+
+Building an HTMLEmailTemplate, PlainTextEmailTemplate or SMSMessageTemplate prepares the template content and
+the branding Jinja template, and depends only on the template version and on the rendering options (branding,
+SMS prefix, allowed HTML). A version of a template never changes, so the object built for (template id, version,
+options) is kept and each notification renders a shallow copy of it holding its own personalisation values.
+"""
+
+import copy
+from typing import Any, Dict, Optional, Type
+
+from notifications_utils.clients.statsd.statsd_client import StatsdClient
+
+from app.cache.local import LocalCache
+
+
+def template_options_key(options: Dict[str, Any]) -> tuple:
+    """A hashable key for the rendering options of a template, such as the branding of the service."""
+    return tuple(sorted(options.items()))
+
+
+class RenderedTemplateCache:
+    def __init__(self, max_size: int = 1000) -> None:
+        self._cache = LocalCache("rendered-templates", maxsize=max_size, ttl_seconds=float("inf"))
+        self._statsd_client: Optional[StatsdClient] = None
+
+    def init_app(self, app, statsd_client: StatsdClient) -> None:
+        self._cache.maxsize = app.config["TEMPLATE_RENDER_CACHE_MAX_SIZE"]
+        self._statsd_client = statsd_client
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, template_class: Type, template_dict: Dict[str, Any], values: Optional[Dict[str, Any]], **options):
+        """Returns a template_class object for template_dict and options, holding values as its personalisation."""
+        key = (template_class.__name__, template_dict["id"], template_dict["version"], template_options_key(options))
+        skeleton = self._cache.get(key)
+        outcome = "hit"
+        if skeleton is None:
+            outcome = "miss"
+            # The template dict of a model holds its SQLAlchemy state, which must not outlive the session
+            template_dict = {k: v for k, v in template_dict.items() if not k.startswith("_")}
+            skeleton = template_class(template_dict, values=None, **options)
+            self._cache.set(key, skeleton)
+        if self._statsd_client is not None:
+            self._statsd_client.incr(f"templates.render-cache.{template_class.__name__}.{outcome}")
+
+        template = copy.copy(skeleton)
+        template.values = values
+        return template
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+rendered_template_cache = RenderedTemplateCache()
@@ -16,6 +16,7 @@ from app.dao.inbound_sms_dao import delete_inbound_sms_older_than_retention
 from app.dao.jobs_dao import dao_archive_jobs, dao_get_jobs_older_than_data_retention
 from app.dao.notifications_dao import (
     dao_timeout_notifications,
+    dao_timeout_notifications_in_chunks,
     delete_notifications_older_than_retention_by_type,
 )
 from app.dao.service_callback_api_dao import (
@@ -27,10 +28,14 @@ from app.models import (
     KEY_TYPE_NORMAL,
     LETTER_TYPE,
     NOTIFICATION_SENDING,
+    NOTIFICATION_TECHNICAL_FAILURE,
     SMS_TYPE,
     Notification,
 )
-from app.notifications.callbacks import create_delivery_status_callback_data
+from app.notifications.callbacks import (
+    _check_and_queue_callback_tasks,
+    create_delivery_status_callback_data,
+)
 from app.performance_platform import processing_time, total_sent_notifications
 from app.utils import get_local_timezone_midnight_in_utc
 
@@ -124,6 +129,10 @@ def delete_letter_notifications_older_than_retention():
 @cronitor("timeout-sending-notifications")
 @statsd(namespace="tasks")
 def timeout_notifications():
+    if current_app.config["FF_CHUNKED_NOTIFICATION_TIMEOUT"]:
+        _timeout_notifications_in_chunks()
+        return
+
     (
         technical_failure_notifications,
         temporary_failure_notifications,
@@ -140,20 +149,46 @@ def timeout_notifications():
                 queue=QueueNames.CALLBACKS,
             )
 
-    current_app.logger.info("Timeout period reached for {} notifications, status has been updated.".format(len(notifications)))
-    if temporary_failure_notifications:
+    _report_timed_out_notifications(
+        [str(x.id) for x in technical_failure_notifications], len(temporary_failure_notifications), len(notifications)
+    )
+
+
+def _timeout_notifications_in_chunks():
+    """Times out notifications a chunk at a time, queueing the callbacks of a chunk once it is committed."""
+    technical_failure_ids: List[str] = []
+    temporary_failure_count = 0
+    for chunk in dao_timeout_notifications_in_chunks(
+        current_app.config.get("SENDING_NOTIFICATIONS_TIMEOUT_PERIOD"),
+        current_app.config["TIMEOUT_NOTIFICATIONS_CHUNK_SIZE"],
+    ):
+        _check_and_queue_callback_tasks(chunk)
+        for notification in chunk:
+            if notification.status == NOTIFICATION_TECHNICAL_FAILURE:
+                technical_failure_ids.append(str(notification.id))
+            else:
+                temporary_failure_count += 1
+
+    _report_timed_out_notifications(
+        technical_failure_ids, temporary_failure_count, len(technical_failure_ids) + temporary_failure_count
+    )
+
+
+def _report_timed_out_notifications(technical_failure_ids: List[str], temporary_failure_count: int, total: int):
+    current_app.logger.info("Timeout period reached for {} notifications, status has been updated.".format(total))
+    if temporary_failure_count:
         current_app.logger.info(
-            f"Timeout: {len(temporary_failure_notifications)} notifications set to temporary-failure (no receipt; billable), "
-            f"{len(technical_failure_notifications)} notifications set to technical-failure (never dispatched)."
+            f"Timeout: {temporary_failure_count} notifications set to temporary-failure (no receipt; billable), "
+            f"{len(technical_failure_ids)} notifications set to technical-failure (never dispatched)."
         )
-        statsd_client.incr("notifications.timeout.temporary_failure", len(temporary_failure_notifications))
+        statsd_client.incr("notifications.timeout.temporary_failure", temporary_failure_count)
 
-    if technical_failure_notifications:
+    if technical_failure_ids:
         message = (
             "{} notifications have been updated to technical-failure because they "
             "have timed out and are still in created.Notification ids: {}".format(
-                len(technical_failure_notifications),
-                [str(x.id) for x in technical_failure_notifications],
+                len(technical_failure_ids),
+                technical_failure_ids,
             )
         )
         raise NotificationTechnicalFailureException(message)
@@ -1,12 +1,23 @@
+from collections import Counter, defaultdict
 from datetime import datetime
-from typing import Union
+from typing import Dict, List, Optional, Union
+from uuid import UUID
 
 from flask import current_app, json
+from notifications_utils.clients.redis.annual_limit import (
+    SMS_BILLABLE_UNITS_DELIVERED_TODAY,
+    SMS_BILLABLE_UNITS_FAILED_TODAY,
+    SMS_DELIVERED_TODAY,
+    SMS_FAILED_TODAY,
+)
 from notifications_utils.statsd_decorators import statsd
 from sqlalchemy.orm.exc import NoResultFound
 
 from app import annual_limit_client, notify_celery, statsd_client
-from app.annual_limit_utils import get_annual_limit_notifications_v3
+from app.annual_limit_utils import (
+    get_annual_limit_notifications_v3,
+    increment_annual_limit_counts,
+)
 from app.config import QueueNames
 from app.dao import notifications_dao
 from app.dao.notifications_dao import dao_update_notification
@@ -17,8 +28,12 @@ from app.models import (
     NOTIFICATION_TECHNICAL_FAILURE,
     NOTIFICATION_TEMPORARY_FAILURE,
     PINPOINT_PROVIDER,
+    Notification,
+)
+from app.notifications.callbacks import (
+    _check_and_queue_callback_task,
+    _check_and_queue_callback_tasks,
 )
-from app.notifications.callbacks import _check_and_queue_callback_task
 from celery.exceptions import Retry
 
 # Pinpoint receipts are of the form:
@@ -43,12 +58,18 @@ from celery.exceptions import Retry
 #         "totalMessagePrice": 0.00581,
 #         "totalCarrierFee": 0.006
 #     }
+#
+# The receipts lambda sends either one JSON encoded receipt as {"Message": "..."} or a batch
+# of decoded receipts as {"Messages": [...]}, which is processed by process_pinpoint_receipts.
 
 
 # flake8: noqa: C901
 @notify_celery.task(bind=True, name="process-pinpoint-result", max_retries=5, default_retry_delay=300)
 @statsd(namespace="tasks")
 def process_pinpoint_results(self, response):
+    if "Messages" in response:
+        return process_pinpoint_receipts(self, response["Messages"])
+
     try:
         receipt = json.loads(response["Message"])
         reference = receipt["messageId"]
@@ -186,6 +207,147 @@ def process_pinpoint_results(self, response):
         self.retry(queue=QueueNames.RETRY)
 
 
+def process_pinpoint_receipts(self, receipts: List[dict]) -> None:
+    """Processes a batch of Pinpoint receipts with one notification lookup, one status update and grouped side effects.
+
+    Receipts whose notification is not in the DB yet are retried together in a new batch.
+    """
+    current_app.logger.info(f"[batch-celery] - Received {len(receipts)} Pinpoint receipts")
+    try:
+        try:
+            notifications = notifications_dao.dao_get_notifications_by_references([receipt["messageId"] for receipt in receipts])
+        except NoResultFound:
+            notifications = []
+        notifications_by_reference = {notification.reference: notification for notification in notifications}
+
+        updated_notifications = []
+        final_notifications: List[Notification] = []
+        receipts_to_retry = []
+        for receipt in receipts:
+            notification = notifications_by_reference.get(receipt["messageId"])
+            if notification is None:
+                receipts_to_retry.append(receipt)
+                continue
+            notification_status = _apply_pinpoint_receipt(notification, receipt)
+            if notification_status is None:
+                continue
+            updated_notifications.append(notification)
+            if notification_status != NOTIFICATION_SENT:
+                final_notifications.append(notification)
+
+        if updated_notifications:
+            notifications_dao.update_notification_statuses(updated_notifications)
+
+        if final_notifications:
+            _increment_annual_limit_counts(final_notifications)
+            for notification in final_notifications:
+                statsd_client.incr(f"callback.pinpoint.{notification.status}")
+                if notification.sent_at:
+                    statsd_client.timing_with_dates("callback.pinpoint.elapsed-time", datetime.utcnow(), notification.sent_at)
+            _check_and_queue_callback_tasks(final_notifications)
+
+        if receipts_to_retry:
+            retry_ids = ", ".join(receipt["messageId"] for receipt in receipts_to_retry)
+            try:
+                current_app.logger.warning(
+                    f"RETRY {self.request.retries}: notifications not found for Pinpoint references {retry_ids}. "
+                    f"Callback may have arrived before notification was persisted to the DB. Adding task to retry queue"
+                )
+                self.retry(queue=QueueNames.RETRY, args=[{"Messages": receipts_to_retry}])
+            except self.MaxRetriesExceededError:
+                current_app.logger.warning(f"notifications not found for Pinpoint references: {retry_ids}. Giving up.")
+
+    except Retry:
+        raise
+
+    except Exception as e:
+        current_app.logger.exception(f"Error processing Pinpoint results for receipt batch: {str(e)}")
+        self.retry(queue=QueueNames.RETRY, args=[{"Messages": receipts}])
+
+
+def _apply_pinpoint_receipt(notification: Notification, receipt: dict) -> Optional[str]:
+    """Applies a receipt to its notification in memory, the same way the single receipt path does.
+
+    Returns the status of the receipt, or None when the notification must not be updated.
+    """
+    provider_response = receipt["messageStatusDescription"]
+    notification_status = determine_pinpoint_status(receipt["messageStatus"], provider_response, receipt["isFinal"])
+    if not notification_status:
+        current_app.logger.warning(
+            f"unhandled provider response for reference {receipt['messageId']}, received '{provider_response}'"
+        )
+        notification_status = NOTIFICATION_PERMANENT_FAILURE  # revert to permanent failure by default
+
+    if notification.sent_by != PINPOINT_PROVIDER:
+        current_app.logger.exception(f"Pinpoint callback handled notification {notification.id} not sent by Pinpoint")
+        return None
+
+    # Also catches a later receipt of the same batch for a notification that an earlier one already updated
+    if notification.status != NOTIFICATION_SENT:
+        notifications_dao._duplicate_update_warning(notification, notification_status)
+        return None
+
+    sms_fields = {
+        "sms_total_message_price": receipt.get("totalMessagePrice"),
+        "sms_total_carrier_fee": receipt.get("totalCarrierFee"),
+        "sms_iso_country_code": receipt.get("isoCountryCode"),
+        "sms_carrier_name": receipt.get("carrierName"),
+        "sms_message_encoding": receipt.get("messageEncoding"),
+        "sms_origination_phone_number": receipt.get("originationPhoneNumber"),
+    }
+    if notification_status == NOTIFICATION_SENT:
+        # Carrier has accepted the message: only capture the pricing/metadata that Pinpoint provides
+        for field, value in sms_fields.items():
+            if value is not None:
+                setattr(notification, field, value)
+    else:
+        notification.status = notifications_dao._decide_permanent_temporary_failure(
+            current_status=notification.status, status=notification_status
+        )
+        if provider_response:
+            notification.provider_response = provider_response
+        for field, value in sms_fields.items():
+            setattr(notification, field, value)
+        if notification_status == NOTIFICATION_DELIVERED:
+            current_app.logger.info(
+                f"Pinpoint callback return status of {notification_status} for notification: {notification.id}"
+            )
+        else:
+            current_app.logger.info(
+                f"Pinpoint delivery failed: notification id {notification.id} and reference {receipt['messageId']} has error found. "
+                f"Provider response: {provider_response}"
+            )
+    notification.updated_at = datetime.utcnow()
+    return notification_status
+
+
+def _increment_annual_limit_counts(notifications: List[Notification]) -> None:
+    """Increments the annual limit counts of the services of a batch, seeding each service at most once."""
+    counts_by_service: Dict[UUID, Counter] = defaultdict(Counter)
+    for notification in notifications:
+        counts = counts_by_service[notification.service_id]
+        if notification.status == NOTIFICATION_DELIVERED:
+            counts[SMS_DELIVERED_TODAY] += 1
+            counts[SMS_BILLABLE_UNITS_DELIVERED_TODAY] += notification.billable_units or 0
+        else:
+            counts[SMS_FAILED_TODAY] += 1
+            counts[SMS_BILLABLE_UNITS_FAILED_TODAY] += notification.billable_units or 0
+
+    for service_id in list(counts_by_service):
+        # The statuses are already committed, so seeding counts the notifications of this batch
+        _, did_we_seed = get_annual_limit_notifications_v3(service_id)
+        if did_we_seed:
+            del counts_by_service[service_id]
+        # TODO: Remove FF_USE_BILLABLE_UNITS
+        elif not current_app.config.get("FF_USE_BILLABLE_UNITS"):
+            counts_by_service[service_id].pop(SMS_BILLABLE_UNITS_DELIVERED_TODAY, None)
+            counts_by_service[service_id].pop(SMS_BILLABLE_UNITS_FAILED_TODAY, None)
+
+    if counts_by_service:
+        increment_annual_limit_counts(counts_by_service)
+        current_app.logger.info(f"Incremented sms annual limit counts in Redis for {len(counts_by_service)} services")
+
+
 def determine_pinpoint_status(status: str, provider_response: str, isFinal: bool) -> Union[str, None]:
     """Determine the notification status based on the SMS status and provider response.
 
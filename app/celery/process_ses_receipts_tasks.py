@@ -1,17 +1,27 @@
 import json
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple, TypedDict, cast
+from uuid import UUID
 
 from flask import current_app
+from notifications_utils.clients.redis.annual_limit import EMAIL_DELIVERED_TODAY, EMAIL_FAILED_TODAY
 from notifications_utils.statsd_decorators import statsd
 from sqlalchemy.orm.exc import NoResultFound
 
 from app import annual_limit_client, bounce_rate_client, notify_celery, statsd_client
-from app.annual_limit_utils import get_annual_limit_notifications_v3
+from app.annual_limit_utils import (
+    get_annual_limit_notifications_v3,
+    increment_annual_limit_counts,
+)
 from app.config import QueueNames
 from app.dao import notifications_dao
+from app.delivery.bounce_rate import count_hard_bounces
 from app.models import NOTIFICATION_DELIVERED, NOTIFICATION_PERMANENT_FAILURE, Notification
-from app.notifications.callbacks import _check_and_queue_callback_task
+from app.notifications.callbacks import (
+    _check_and_queue_callback_task,
+    _check_and_queue_callback_tasks,
+)
 from app.notifications.notifications_ses_callback import (
     _check_and_queue_complaint_callback_task,
     get_aws_responses,
@@ -256,7 +266,10 @@ def update_annual_limit_and_bounce_rate(
     statsd_client.incr("callback.ses.{}".format(new_status))
 
     if new_status == NOTIFICATION_PERMANENT_FAILURE:
-        bounce_rate_client.set_sliding_hard_bounce(notification.service_id, str(notification.id))
+        if current_app.config["FF_BOUNCE_RATE_BUCKETS"]:
+            count_hard_bounces({notification.service_id: 1})
+        else:
+            bounce_rate_client.set_sliding_hard_bounce(notification.service_id, str(notification.id))
         current_app.logger.info(
             f"Setting total hard bounce notifications for service {notification.service_id} with notification {notification.id} in REDIS"
         )
@@ -265,6 +278,50 @@ def update_annual_limit_and_bounce_rate(
         statsd_client.timing_with_dates("callback.ses.elapsed-time", datetime.utcnow(), notification.sent_at)
 
 
+def update_annual_limits_and_bounce_rates(
+    receipts_with_notification_and_aws_response_dict: List[Tuple[SESReceipt, Notification, Dict[str, Any]]],
+) -> None:
+    """Updates the annual limit counts and bounce rates of a batch of receipts, grouped by service.
+
+    Each service is seeded at most once, and the annual limit counts of every service are incremented in one Redis
+    pipeline, so a batch costs O(services) Redis round trips instead of several per receipt.
+    """
+    counts_by_service: Dict[UUID, Counter] = defaultdict(Counter)
+    hard_bounces_by_service: Counter = Counter()
+    for _, notification, aws_response_dict in receipts_with_notification_and_aws_response_dict:
+        new_status = aws_response_dict["notification_status"]
+        if aws_response_dict["success"]:
+            counts_by_service[notification.service_id][EMAIL_DELIVERED_TODAY] += 1
+        else:
+            counts_by_service[notification.service_id][EMAIL_FAILED_TODAY] += 1
+            current_app.logger.info(
+                f"SES callback for notification {notification.id} reference {notification.reference} for service "
+                f"{notification.service_id}: Delivery failed with error: {aws_response_dict['message']}"
+            )
+
+        statsd_client.incr("callback.ses.{}".format(new_status))
+        if new_status == NOTIFICATION_PERMANENT_FAILURE:
+            if current_app.config["FF_BOUNCE_RATE_BUCKETS"]:
+                hard_bounces_by_service[notification.service_id] += 1
+            else:
+                bounce_rate_client.set_sliding_hard_bounce(notification.service_id, str(notification.id))
+        if notification.sent_at:
+            statsd_client.timing_with_dates("callback.ses.elapsed-time", datetime.utcnow(), notification.sent_at)
+
+    if hard_bounces_by_service:
+        count_hard_bounces(hard_bounces_by_service)
+
+    for service_id in list(counts_by_service):
+        # The statuses are already committed, so seeding counts the notifications of this batch
+        _, did_we_seed = get_annual_limit_notifications_v3(service_id)
+        if did_we_seed:
+            del counts_by_service[service_id]
+
+    if counts_by_service:
+        increment_annual_limit_counts(counts_by_service)
+        current_app.logger.info(f"Incremented email annual limit counts in Redis for {len(counts_by_service)} services")
+
+
 def handle_retries(self, receipts_with_no_notification: List[SESReceipt]) -> None:
     """Handle retries for receipts without notifications."""
     retry_ids = ", ".join([msg["mail"]["messageId"] for msg in receipts_with_no_notification])
@@ -333,9 +390,15 @@ def process_ses_results(self, response: Dict[str, Any]) -> Optional[bool]:
             )
 
             # Update annual limits, bounce rates, and enqueue API callback tasks for successfully updated notifications
-            for message, notification, aws_response_dict in receipts_with_notification_and_aws_response_dict:
-                update_annual_limit_and_bounce_rate(message, notification, aws_response_dict)
-                _check_and_queue_callback_task(notification)
+            if current_app.config["FF_SES_RECEIPTS_BY_SERVICE"]:
+                update_annual_limits_and_bounce_rates(receipts_with_notification_and_aws_response_dict)
+                _check_and_queue_callback_tasks(
+                    [notification for _, notification, _ in receipts_with_notification_and_aws_response_dict]
+                )
+            else:
+                for message, notification, aws_response_dict in receipts_with_notification_and_aws_response_dict:
+                    update_annual_limit_and_bounce_rate(message, notification, aws_response_dict)
+                    _check_and_queue_callback_task(notification)
 
         # Enqueue retry tasks for receipts that did not yet have a notification in the DB
         receipts_to_retry = receipts_with_no_notification + complaints_to_retry
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from flask import current_app
 from notifications_utils.recipients import InvalidEmailError
@@ -134,6 +134,74 @@ def deliver_email(self, notification_id):
         _handle_error_with_email_retry(self, e, notification_id, notification)
 
 
+@notify_celery.task(bind=True, name="deliver_email_batch", max_retries=48, default_retry_delay=300)
+@statsd(namespace="tasks")
+def deliver_email_batch(self, notification_ids: List[str]):
+    """
+    Sends the emails of several notifications with one query, one bulk status update and concurrent provider requests,
+    see send_to_providers.send_emails_to_provider.
+
+    Notifications that are missing or fail with an error worth retrying are handed over to deliver_email one by one,
+    so that each is retried on its own schedule. When the batch itself fails, it is retried as a whole: the emails
+    already set to sending are not sent again.
+    """
+    current_app.logger.debug(f"Start sending {len(notification_ids)} emails in a batch")
+    notifications = notifications_dao.get_notifications_by_ids(notification_ids)
+    found_ids = {str(notification.id) for notification in notifications}
+    for notification_id in notification_ids:
+        if str(notification_id) not in found_ids:
+            current_app.logger.warning(
+                f"Email notification {notification_id} of a batch not found, handing it over to deliver_email"
+            )
+            deliver_email.apply_async([str(notification_id)], **CeleryParams.retry())
+
+    try:
+        errors = send_to_providers.send_emails_to_provider(notifications)
+    except Exception as e:
+        _handle_error_with_email_batch_retry(self, e, notification_ids)
+        return
+    for notification in notifications:
+        if notification.id in errors:
+            _handle_email_batch_error(errors[notification.id], notification)
+
+
+def _handle_error_with_email_batch_retry(task: Task, e: Exception, notification_ids: List[str]):
+    try:
+        current_app.logger.warning(f"RETRY {task.request.retries}: Batch of {len(notification_ids)} emails failed: {e}")
+        task.retry(**CeleryParams.retry())
+    except task.MaxRetriesExceededError:
+        current_app.logger.exception(
+            f"RETRY FAILED: Max retries reached for a batch of {len(notification_ids)} emails, handing them over to deliver_email",
+            exc_info=e,
+        )
+        for notification_id in notification_ids:
+            deliver_email.apply_async([str(notification_id)], **CeleryParams.retry())
+
+
+def _handle_email_batch_error(e: Exception, notification: Notification):
+    """Handles the error of one email of deliver_email_batch the way deliver_email would, retrying with deliver_email."""
+    notification_id = notification.id
+    if isinstance(e, InvalidEmailError):
+        current_app.logger.info(f"Cannot send notification {notification_id}, got an invalid email address: {str(e)}.")
+        update_notification_status_by_id(notification_id, NOTIFICATION_TECHNICAL_FAILURE)
+        _check_and_queue_callback_task(notification)
+    elif isinstance(e, InvalidUrlException):
+        current_app.logger.error(f"Cannot send notification {notification_id}, got an invalid direct file url.")
+        update_notification_status_by_id(notification_id, NOTIFICATION_TECHNICAL_FAILURE)
+        _check_and_queue_callback_task(notification)
+    elif isinstance(e, MalwareDetectedException):
+        _check_and_queue_callback_task(notification)
+    elif isinstance(e, NotificationTechnicalFailureException):
+        # The service is inactive and the notification was set to technical-failure
+        current_app.logger.warning(str(e))
+    else:
+        current_app.logger.warning(f"Email notification {notification_id} of a batch failed, retrying with deliver_email: {e}")
+        countdown = SCAN_RETRY_BACKOFF if isinstance(e, MalwareScanInProgressException) else None
+        deliver_email.apply_async(
+            [str(notification_id)], **CeleryParams.retry(notification.template.process_type, countdown=countdown)
+        )
+
+
 def _deliver_sms(self, notification_id):
     try:
         current_app.logger.info("Start sending SMS for notification id: {}".format(notification_id))
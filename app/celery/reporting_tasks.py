@@ -8,6 +8,7 @@ from sqlalchemy import func
 from sqlalchemy.dialects.postgresql import insert
 
 from app import annual_limit_client, db, notify_celery
+from app.annual_limit_utils import seed_annual_limit_counts_for_services
 from app.config import QueueNames
 from app.cronitor import cronitor
 from app.dao.annual_limits_data_dao import (
@@ -16,12 +17,14 @@ from app.dao.annual_limits_data_dao import (
     get_previous_quarter,
     insert_quarter_data,
 )
-from app.dao.fact_billing_dao import fetch_billing_data_for_day, update_fact_billing
+from app.dao.fact_billing_dao import fetch_billing_data_for_day, update_fact_billing_for_day
 from app.dao.fact_notification_status_dao import (
     fetch_notification_status_for_day,
     fetch_quarter_data,
     update_fact_notification_status,
+    upsert_fact_notification_status_for_day,
 )
+from app.dao.services_dao import refresh_live_services_billing_totals
 from app.dao.users_dao import get_services_for_all_users
 from app.models import FactNotificationStatus, MonthlyNotificationStatsSummary, Service
 from app.user.rest import send_annual_usage_data
@@ -55,13 +58,18 @@ def create_nightly_billing_for_day(process_day):
 
     current_app.logger.info("create-nightly-billing-for-day {} fetched in {} seconds".format(process_day, (end - start).seconds))
 
-    for data in transit_data:
-        update_fact_billing(data, process_day)
+    rows_updated = update_fact_billing_for_day(transit_data, process_day)
 
     current_app.logger.info(
-        "create-nightly-billing-for-day task complete. {} rows updated for day: {}".format(len(transit_data), process_day)
+        "create-nightly-billing-for-day task complete. {} rows updated for day: {} in {} seconds".format(
+            rows_updated, process_day, (datetime.utcnow() - end).seconds
+        )
     )
 
+    # The day's rows replace the previous ones, so the live services report totals are recomputed rather than added to
+    if current_app.config["FF_LIVE_SERVICES_REPORT"]:
+        refresh_live_services_billing_totals()
+
 
 @notify_celery.task(name="create-nightly-notification-status")
 @cronitor("create-nightly-notification-status")
@@ -97,7 +105,8 @@ def create_nightly_notification_status_for_day(process_day):
     """
     process_day = datetime.strptime(process_day, "%Y-%m-%d").date()
     service_ids = [x.id for x in Service.query.all()]
-    chunk_size = 10
+    set_based = current_app.config["FF_SET_BASED_NIGHTLY_NOTIFICATION_STATUS"]
+    chunk_size = current_app.config["NIGHTLY_NOTIFICATION_STATUS_CHUNK_SIZE"] if set_based else 10
     iter_service_ids = iter(service_ids)
     current_app.logger.info("create-nightly-notification-status-for-day STARTED for day {} ".format(process_day))
 
@@ -114,19 +123,27 @@ def create_nightly_notification_status_for_day(process_day):
 
         try:
             start = datetime.now(timezone.utc)
-            transit_data = fetch_notification_status_for_day(process_day=process_day, service_ids=chunk)
+            if set_based:
+                rows_updated = upsert_fact_notification_status_for_day(process_day, service_ids=chunk)
+            else:
+                transit_data = fetch_notification_status_for_day(process_day=process_day, service_ids=chunk)
+                current_app.logger.info(
+                    "create-nightly-notification-status-for-day {} fetched in {} seconds".format(
+                        process_day, (datetime.now(timezone.utc) - start).seconds
+                    )
+                )
+                update_fact_notification_status(transit_data, process_day, service_ids=chunk)
+                rows_updated = len(transit_data)
             end = datetime.now(timezone.utc)
-            current_app.logger.info(
-                "create-nightly-notification-status-for-day {} fetched in {} seconds".format(process_day, (end - start).seconds)
-            )
-            update_fact_notification_status(transit_data, process_day, service_ids=chunk)
 
             current_app.logger.info(
-                "create-nightly-notification-status-for-day task complete: {} rows updated for day: {}, for service_ids: {}".format(
-                    len(transit_data), process_day, chunk
+                "create-nightly-notification-status-for-day task complete: {} rows updated for day: {} in {} seconds, for service_ids: {}".format(
+                    rows_updated, process_day, (end - start).seconds, chunk
                 )
             )
             annual_limit_client.reset_all_notification_counts(chunk)
+            if current_app.config["FF_ANNUAL_LIMIT_BULK_SEED"]:
+                seed_annual_limit_counts_for_services(chunk)
 
         except Exception as e:
             current_app.logger.error(
@@ -136,6 +153,35 @@ def create_nightly_notification_status_for_day(process_day):
             )
 
 
+@notify_celery.task(name="seed-annual-limit-counts")
+@statsd(namespace="tasks")
+def seed_annual_limit_counts():
+    """
+    Seeds the annual limit notification counts of all the active services in redis, in chunks of
+    ANNUAL_LIMIT_SEED_CHUNK_SIZE services, so that the first API call of the day of a service does not seed them.
+    """
+    service_ids = [row.id for row in db.session.query(Service.id).filter(Service.active).all()]
+    chunk_size = current_app.config["ANNUAL_LIMIT_SEED_CHUNK_SIZE"]
+    iter_service_ids = iter(service_ids)
+    start = datetime.now(timezone.utc)
+    seeded = 0
+
+    while True:
+        chunk = list(islice(iter_service_ids, chunk_size))
+        if not chunk:
+            break
+        try:
+            seeded += seed_annual_limit_counts_for_services(chunk) or 0
+        except Exception as e:
+            current_app.logger.error("seed-annual-limit-counts failed for service_ids: {}. Error: {}".format(chunk, e))
+
+    current_app.logger.info(
+        "seed-annual-limit-counts seeded {} of {} active services in {} seconds".format(
+            seeded, len(service_ids), (datetime.now(timezone.utc) - start).seconds
+        )
+    )
+
+
 @notify_celery.task(name="create-monthly-notification-stats-summary")
 @statsd(namespace="tasks")
 def create_monthly_notification_stats_summary():
@@ -48,6 +48,7 @@ from app.models import (
     Job,
 )
 from app.notifications.process_notifications import send_notification_to_queue
+from app.queue import InboxDrainer, InboxLane
 from app.v2.errors import JobIncompleteError
 from celery import Task
 
@@ -385,3 +386,36 @@ def beat_inbox_sms_priority():
         save_smss.apply_async((None, list_of_sms_notifications, receipt_id_sms), queue=QueueNames.PRIORITY_DATABASE)
         current_app.logger.info(f"Batch saving with Priority: SMS receipt {receipt_id_sms} sent to in-flight.")
         receipt_id_sms, list_of_sms_notifications = sms_priority.poll()
+
+
+def _inbox_lane(queue, weight, save_task, database_queue, label, notification_label):
+    def dispatch(receipt, notifications):
+        save_task.apply_async((None, notifications, receipt), queue=database_queue)
+        current_app.logger.info(f"Batch saving with {label}: {notification_label} receipt {receipt} sent to in-flight.")
+
+    return InboxLane(queue, weight, dispatch)
+
+
+@notify_celery.task(name="beat-inbox-drain")
+@statsd(namespace="tasks")
+def beat_inbox_drain():
+    """
+    Replaces the six beat-inbox-* tasks when FF_BATCH_SAVING_DRAIN is on.
+    All the email and SMS inboxes are drained in one pass with pipelined polls,
+    batch sizes that follow the inbox depth, and priority inboxes polled more
+    often than normal ones, and normal more often than bulk.
+    """
+    lanes = [
+        _inbox_lane(email_priority, 4, save_emails, QueueNames.PRIORITY_DATABASE, "Priority", "email"),
+        _inbox_lane(sms_priority, 4, save_smss, QueueNames.PRIORITY_DATABASE, "Priority", "SMS"),
+        _inbox_lane(email_normal, 2, save_emails, QueueNames.NORMAL_DATABASE, "Normal Priority", "email"),
+        _inbox_lane(sms_normal, 2, save_smss, QueueNames.NORMAL_DATABASE, "Normal Priority", "SMS"),
+        _inbox_lane(email_bulk, 1, save_emails, QueueNames.BULK_DATABASE, "Bulk Priority", "email"),
+        _inbox_lane(sms_bulk, 1, save_smss, QueueNames.BULK_DATABASE, "Bulk Priority", "SMS"),
+    ]
+    InboxDrainer(
+        lanes,
+        min_batch_size=current_app.config["BATCH_SAVING_DRAIN_MIN_BATCH_SIZE"],
+        max_batch_size=current_app.config["BATCH_SAVING_DRAIN_MAX_BATCH_SIZE"],
+        max_seconds=current_app.config["BATCH_SAVING_DRAIN_MAX_SECONDS"],
+    ).drain()
@@ -1,19 +1,112 @@
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from time import monotonic
+from typing import List, Optional
 
 from flask import current_app
 from notifications_utils.statsd_decorators import statsd
-from requests import HTTPError, RequestException, request
+from requests import HTTPError, RequestException, Response, Session
+from requests.adapters import HTTPAdapter
 
-from app import notify_celery, signer_complaint, signer_delivery_status
+from app import notify_celery, signer_complaint, signer_delivery_status, statsd_client
 from app.config import QueueNames
 
+_callback_session: Optional[Session] = None
+_callback_session_pid: Optional[int] = None
+
+
+def get_callback_session() -> Session:
+    """Returns the HTTP session of this worker process, which keeps connections to each callback host alive.
+
+    The session is created again in forked worker processes, which must not share the sockets of their parent.
+    It rejects every cookie, so that a cookie set by the callback api of a service is never sent to another service.
+    """
+    global _callback_session, _callback_session_pid
+    if _callback_session is None or _callback_session_pid != os.getpid():
+        session = Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=current_app.config["SERVICE_CALLBACK_POOL_HOSTS"],
+            pool_maxsize=current_app.config["SERVICE_CALLBACK_POOL_MAXSIZE"],
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _callback_session, _callback_session_pid = session, os.getpid()
+    return _callback_session
+
 
 @notify_celery.task(bind=True, name="send-delivery-status", max_retries=5, default_retry_delay=300)
 @statsd(namespace="tasks")
 def send_delivery_status_to_service(self, notification_id, signed_status_update, service_id):
     status_update = signer_delivery_status.verify(signed_status_update)
 
-    data = {
+    _send_data_to_service_callback_api(
+        self,
+        service_id,
+        _delivery_status_data(notification_id, status_update),
+        status_update["service_callback_api_url"],
+        status_update["service_callback_api_bearer_token"],
+        "send_delivery_status_to_service",
+    )
+
+
+@notify_celery.task(bind=True, name="send-delivery-statuses", max_retries=5, default_retry_delay=300)
+@statsd(namespace="tasks")
+def send_delivery_statuses_to_service(self, signed_status_updates: List[str], service_id):
+    """Sends a batch of delivery status updates of a service concurrently, and retries the updates that failed.
+
+    At most SERVICE_CALLBACK_MAX_CONCURRENCY requests are in flight to the callback api of the service.
+    """
+    if not signed_status_updates:
+        return
+    status_updates = [signer_delivery_status.verify(signed_status_update) for signed_status_update in signed_status_updates]
+    session = get_callback_session()
+
+    def post_status_update(status_update) -> Optional[RequestException]:
+        try:
+            _post_to_service_callback_api(
+                session,
+                service_id,
+                _delivery_status_data(status_update["notification_id"], status_update),
+                status_update["service_callback_api_url"],
+                status_update["service_callback_api_bearer_token"],
+            )
+        except RequestException as e:
+            return e
+        return None
+
+    max_workers = min(len(status_updates), current_app.config["SERVICE_CALLBACK_MAX_CONCURRENCY"])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        errors = list(executor.map(post_status_update, status_updates))
+
+    updates_to_retry = []
+    for signed_status_update, status_update, error in zip(signed_status_updates, status_updates, errors):
+        notification_id = status_update["notification_id"]
+        service_callback_url = status_update["service_callback_api_url"]
+        if error is None:
+            current_app.logger.info(
+                f"send_delivery_statuses_to_service sent {notification_id} to {service_callback_url} service: {service_id}"
+            )
+            continue
+        current_app.logger.warning(
+            f"send_delivery_statuses_to_service request failed for notification_id: {notification_id} to url: {service_callback_url} service: {service_id} exc: {error}"
+        )
+        if _should_retry(error):
+            updates_to_retry.append(signed_status_update)
+
+    if updates_to_retry:
+        try:
+            self.retry(queue=QueueNames.CALLBACKS_RETRY, args=[updates_to_retry, service_id])
+        except self.MaxRetriesExceededError:
+            current_app.logger.warning(
+                f"Retry: send_delivery_statuses_to_service has retried the max num of times for {len(updates_to_retry)} status updates of service: {service_id}"
+            )
+
+
+def _delivery_status_data(notification_id, status_update) -> dict:
+    return {
         "id": str(notification_id),
         "reference": status_update["notification_client_reference"],
         "to": status_update["notification_to"],
@@ -25,14 +118,6 @@ def send_delivery_status_to_service(self, notification_id, signed_status_update,
         "sent_at": status_update["notification_sent_at"],
         "notification_type": status_update["notification_type"],
     }
-    _send_data_to_service_callback_api(
-        self,
-        service_id,
-        data,
-        status_update["service_callback_api_url"],
-        status_update["service_callback_api_bearer_token"],
-        "send_delivery_status_to_service",
-    )
 
 
 @notify_celery.task(bind=True, name="send-complaint", max_retries=5, default_retry_delay=300)
@@ -64,31 +149,52 @@ def _send_data_to_service_callback_api(self, service_id, data, service_callback_
         current_app.logger.info(
             "{} sending {} to {} service: {}".format(function_name, notification_id, service_callback_url, service_id)
         )
-        response = request(
-            method="POST",
-            url=service_callback_url,
-            data=json.dumps(data),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {token}",
-            },
-            timeout=5,
-        )
+        response = _post_to_service_callback_api(get_callback_session(), service_id, data, service_callback_url, token)
 
         current_app.logger.info(
             f"{function_name} sent {notification_id} to {service_callback_url} service: {service_id}, response {response.status_code}"
         )
-
-        response.raise_for_status()
     except RequestException as e:
         current_app.logger.warning(
             f"{function_name} request failed for notification_id: {notification_id} to url: {service_callback_url} service: {service_id} exc: {e}"
         )
-        # Retry if the response status code is server-side or 429 (too many requests).
-        if not isinstance(e, HTTPError) or e.response.status_code >= 500 or e.response.status_code == 429:
+        if _should_retry(e):
             try:
                 self.retry(queue=QueueNames.CALLBACKS_RETRY)
             except self.MaxRetriesExceededError:
                 current_app.logger.warning(
                     "Retry: {function_name} has retried the max num of times for callback url {service_callback_url} notification_id: {notification_id} service: {service_id}"
                 )
+
+
+def _post_to_service_callback_api(session: Session, service_id, data, service_callback_url, token) -> Response:
+    """Posts data to the callback api of a service and records the request time and outcome, logging them per service.
+
+    Raises a RequestException if the request fails or the service responds with an error status code.
+    """
+    start_time = monotonic()
+    outcome = "error"
+    try:
+        response = session.post(
+            url=service_callback_url,
+            data=json.dumps(data),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+            },
+            timeout=5,
+        )
+        response.raise_for_status()
+        outcome = "success"
+        return response
+    finally:
+        # The metric names are fixed, a name per service would add metrics with every service
+        request_time = monotonic() - start_time
+        statsd_client.incr(f"callback.service.{outcome}")
+        statsd_client.timing("callback.service.request-time", request_time)
+        current_app.logger.info(f"Callback request to service {service_id}: {outcome} in {request_time:.3f}s")
+
+
+def _should_retry(e: RequestException) -> bool:
+    # Retry if the response status code is server-side or 429 (too many requests).
+    return not isinstance(e, HTTPError) or e.response.status_code >= 500 or e.response.status_code == 429
@@ -1,5 +1,5 @@
 import json
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
 from itertools import islice
 from typing import Any, Dict, List, Optional
@@ -49,6 +49,7 @@ from app.dao.inbound_sms_dao import dao_get_inbound_sms_by_id
 from app.dao.jobs_dao import dao_get_in_progress_jobs, dao_get_job_by_id, dao_update_job
 from app.dao.notifications_dao import (
     dao_get_last_notification_added_for_job_id,
+    dao_get_last_row_numbers_by_job_shard,
     dao_get_notification_history_by_reference,
     get_latest_sent_notification_for_job,
     get_notification_by_id,
@@ -61,9 +62,12 @@ from app.dao.service_inbound_api_dao import get_service_inbound_api_for_service
 from app.dao.service_sms_sender_dao import dao_get_service_sms_senders_by_id
 from app.dao.services_dao import dao_fetch_service_by_id
 from app.dao.templates_dao import dao_get_template_by_id
+from app.delivery.bounce_rate_buckets import bounce_rate_buckets
 from app.email_limit_utils import fetch_todays_email_count
 from app.encryption import SignedNotification
 from app.exceptions import DVLAException
+from app.job.rows_artifact import JobRow, get_job_rows
+from app.job.shards import JobFileShards, JobShard, get_job_shards, save_job_shards
 from app.models import (
     BULK,
     EMAIL_TYPE,
@@ -85,6 +89,7 @@ from app.models import (
 )
 from app.notifications.process_notifications import (
     persist_notifications,
+    send_emails_to_queue_in_batches,
     send_notification_to_queue,
 )
 from app.report.utils import generate_csv_from_notifications, send_requested_report_ready
@@ -183,16 +188,22 @@ def process_job(job_id):
     if db_template.template_type == EMAIL_TYPE:
         _cache_template_files_for_job(job_id, job.template_id)
 
-    csv = get_recipient_csv(job, template)
-
-    rows = csv.get_rows()
-
     # Update the api_key last_used, we will only update this once per job
     api_key_id = job.api_key_id
     if api_key_id:
         api_key_last_used = datetime.utcnow()
         update_last_used_api_key(api_key_id, api_key_last_used)
 
+    if current_app.config["FF_SHARDED_JOBS"] and job.notification_count > current_app.config["JOB_SHARD_SIZE"]:
+        queue_job_shards(job)
+        return
+
+    # Rows parsed when the job was created are streamed as they are, without downloading and validating the file again
+    rows = get_job_rows(job.service_id, job.id)
+    if rows is None:
+        csv = get_recipient_csv(job, template)
+        rows = csv.get_rows()
+
     for result in chunked(rows, Config.BATCH_INSERTION_CHUNK_SIZE):
         process_rows(result, template, job, service)
         put_batch_saving_bulk_created(
@@ -200,6 +211,58 @@ def process_job(job_id):
         )
 
 
+def queue_job_shards(job: Job, header: str = "", shard_size: Optional[int] = None, shards: Optional[List[JobShard]] = None):
+    """
+    Streams the job file from S3 and queues a process-job-shard task for every JOB_SHARD_SIZE rows, see app/job/shards.py.
+    The shards are saved before being queued, so that process_incomplete_job can resume them, and saved as complete
+    once the whole file is read. Given the shards already saved, carries on reading the file after the last of them.
+    """
+    shard_size = shard_size or current_app.config["JOB_SHARD_SIZE"]
+    shards = list(shards or [])
+    after = shards[-1] if shards else None
+    body = s3.stream_job_from_s3(str(job.service_id), str(job.id), after.end_byte if after else 0)
+    job_file = JobFileShards(body.iter_chunks() if body else [], shard_size, after=after, header=header)
+    for shard in job_file:
+        shards.append(shard)
+        save_job_shards(job.id, job_file.header, shard_size, shards)
+        process_job_shard.apply_async([str(job.id), job_file.header, list(shard)], queue=QueueNames.JOBS)
+    save_job_shards(job.id, job_file.header, shard_size, shards, complete=True)
+    current_app.logger.info(f"Job {job.id} split in {len(shards)} shards of up to {shard_size} rows")
+
+
+@notify_celery.task(name="process-job-shard")
+@statsd(namespace="tasks")
+def process_job_shard(job_id, header: str, shard: List[int], resume_from_row: Optional[int] = None):
+    """Processes the rows of a shard of a job, downloading only the bytes of the job file that hold them."""
+    job = dao_get_job_by_id(job_id)
+    if job.job_status == JOB_STATUS_CANCELLED:
+        return
+    job_shard = JobShard(*shard)
+
+    db_template = dao_get_template_by_id(job.template_id, job.template_version)
+
+    TemplateClass = get_template_class(db_template.template_type)
+    template = TemplateClass(db_template.__dict__)
+    template.process_type = db_template.process_type
+
+    file_data = s3.get_job_range_from_s3(str(job.service_id), str(job.id), job_shard.start_byte, job_shard.end_byte)
+    csv = RecipientCSV(
+        header + file_data.decode("utf-8"),
+        template_type=template.template_type,
+        placeholders=template.placeholders,
+        max_rows=get_csv_max_rows(job.service_id),
+    )
+    rows = (JobRow.from_row(row, job_shard.start_row) for row in csv.get_rows())
+    if resume_from_row is not None:
+        rows = islice(rows, resume_from_row - job_shard.start_row, None)
+
+    for result in chunked(rows, Config.BATCH_INSERTION_CHUNK_SIZE):
+        process_rows(result, template, job, job.service)
+        put_batch_saving_bulk_created(
+            metrics_logger, 1, notification_type=db_template.template_type, priority=db_template.process_type
+        )
+
+
 def job_complete(job: Job, resumed=False, start=None):
     job.job_status = JOB_STATUS_FINISHED
 
@@ -515,6 +578,24 @@ def try_to_send_notifications_to_queue(notification_id_queue, service, saved_not
     # at this point in the code we have a list of notifications (saved_notifications)
     # which could be from multiple services
     research_mode = service.research_mode  # type: ignore
+    if current_app.config["FF_DELIVER_EMAIL_BATCH"]:
+        notifications_by_queue = defaultdict(list)
+        for notification_obj in saved_notifications:
+            try:
+                queue = notification_id_queue.get(notification_obj.id) or get_delivery_queue_for_template(template)
+            except (LiveServiceTooManyRequestsError, TrialServiceTooManyRequestsError) as e:
+                current_app.logger.info(f"{e.message}: Email {notification_obj.id} not created")
+                continue
+            notifications_by_queue[queue].append(notification_obj)
+        for queue, notifications in notifications_by_queue.items():
+            # A rate limited queue is handled like a rate limited email of the loop below, the other queues are still sent to
+            try:
+                send_emails_to_queue_in_batches(notifications, research_mode, queue)
+            except (LiveServiceTooManyRequestsError, TrialServiceTooManyRequestsError) as e:
+                for notification_obj in notifications:
+                    current_app.logger.info(f"{e.message}: Email {notification_obj.id} not created")
+        return
+
     for notification_obj in saved_notifications:
         try:
             queue = notification_id_queue.get(notification_obj.id) or get_delivery_queue_for_template(template)
@@ -713,6 +794,11 @@ def process_incomplete_jobs(job_ids):
 def process_incomplete_job(job_id):
     job = dao_get_job_by_id(job_id)
 
+    job_shards = get_job_shards(job_id) if current_app.config["FF_SHARDED_JOBS"] else None
+    if job_shards is not None:
+        resume_job_shards(job_id, *job_shards)
+        return
+
     last_notification_added = dao_get_last_notification_added_for_job_id(job_id)
 
     if last_notification_added:
@@ -737,6 +823,22 @@ def process_incomplete_job(job_id):
         )
 
 
+def resume_job_shards(job_id, header: str, shard_size: int, shards: List[JobShard], complete: bool):
+    """Queues the shards of a job that were not fully processed, each from the row after its last saved row,
+    then the shards of the rest of the file if it was not fully read."""
+    last_row_numbers = dao_get_last_row_numbers_by_job_shard(job_id, shard_size)
+    for shard in shards:
+        last_row_number = last_row_numbers.get(shard.index)
+        resume_from_row = shard.start_row if last_row_number is None else last_row_number + 1
+        if resume_from_row >= shard.end_row:
+            continue
+        current_app.logger.info(f"Resuming shard {shard.index} of job {job_id} from row {resume_from_row}")
+        process_job_shard.apply_async([str(job_id), header, list(shard), resume_from_row], queue=QueueNames.JOBS)
+    if not complete:
+        current_app.logger.info(f"Resuming the split of job {job_id} after {len(shards)} shards")
+        queue_job_shards(dao_get_job_by_id(job_id), header, shard_size, shards)
+
+
 def choose_database_queue(process_type: str, research_mode: bool, notifications_count: int) -> str:
     # Research mode is a special case, it always goes to the research mode queue.
     if research_mode:
@@ -902,6 +1004,15 @@ def seed_bounce_rate_in_redis(service_id: str, interval: int = 24):
     total_seeded_notifications = total_notifications_grouped_by_hour(service_id, interval=interval)
     total_seeded_hard_bounces = total_hard_bounces_grouped_by_hour(service_id, interval=interval)
 
+    if current_app.config["FF_BOUNCE_RATE_BUCKETS"]:
+        # One counter per hour instead of one sorted set member per notification
+        hard_bounces_by_hour = dict(total_seeded_hard_bounces)
+        bounce_rate_buckets.seed(
+            {service_id: [(hour, total, hard_bounces_by_hour.get(hour, 0)) for hour, total in total_seeded_notifications]}
+        )
+        current_app.logger.info(f"Seeded bounce rate buckets for service {service_id} in Redis")
+        return
+
     for hour, total_notifications in total_seeded_notifications:
         # set the timestamp to the start of the hour + 1 second to ensure the notification
         # will be counted in the correct hour
@@ -355,7 +355,7 @@ def rebuild_ft_billing_utc(start_date, end_date, task_delay):
 
     Each task performs a narrow date-range query against notification_history
     (filtered by created_at and service_id, both indexed) so no single long-running
-    SQL query is issued.  The upsert in update_fact_billing overwrites existing rows.
+    SQL query is issued.  The upsert in update_fact_billing_for_day overwrites existing rows.
     """
 
     # Resolve date range from ft_billing if not supplied
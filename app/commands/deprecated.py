@@ -19,10 +19,11 @@ from app.celery.nightly_tasks import (
 )
 from app.config import QueueNames
 from app.dao.fact_billing_dao import (
+    BillingRates,
     delete_billing_data_for_service_for_day,
     fetch_billing_data_for_day,
     get_service_ids_that_need_billing_populated,
-    update_fact_billing,
+    update_fact_billing_for_day,
 )
 from app.dao.services_dao import dao_fetch_service_by_id, dao_update_service
 from app.dao.templates_dao import dao_get_template_by_id
@@ -338,15 +339,15 @@ def rebuild_ft_billing_for_day(service_id, day):
     Rebuild the data in ft_billing for the given service_id and date
     """
 
+    rates = BillingRates.load()
+
     def rebuild_ft_data(process_day, service):
         deleted_rows = delete_billing_data_for_service_for_day(process_day, service)
         current_app.logger.info("deleted {} existing billing rows for {} on {}".format(deleted_rows, service, process_day))
         transit_data = fetch_billing_data_for_day(process_day=process_day, service_id=service)
-        # transit_data = every row that should exist
-        for data in transit_data:
-            # upsert existing rows
-            update_fact_billing(data, process_day)
-        current_app.logger.info("added/updated {} billing rows for {} on {}".format(len(transit_data), service, process_day))
+        # transit_data = every row that should exist, upsert existing rows
+        rows_updated = update_fact_billing_for_day(transit_data, process_day, rates=rates)
+        current_app.logger.info("added/updated {} billing rows for {} on {}".format(rows_updated, service, process_day))
 
     if service_id:
         # confirm the service exists
@@ -1,4 +1,7 @@
 import functools
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
 from uuid import UUID
 
 import click
@@ -6,9 +9,23 @@ from flask import cli as flask_cli
 from flask import current_app
 from sqlalchemy.orm.exc import NoResultFound
 
-from app import DATETIME_FORMAT, db, signer_delivery_status
+from app import (
+    DATETIME_FORMAT,
+    bounce_rate_client,
+    db,
+    email_bulk,
+    email_normal,
+    email_priority,
+    signer_delivery_status,
+    sms_bulk,
+    sms_normal,
+    sms_priority,
+)
 from app.celery.service_callback_tasks import send_delivery_status_to_service
 from app.config import QueueNames
+from app.dao.notifications_dao import (
+    fetch_email_totals_and_hard_bounces_by_service_and_hour,
+)
 from app.dao.service_callback_api_dao import (
     get_service_delivery_status_callback_api_for_service,
 )
@@ -19,6 +36,7 @@ from app.dao.users_dao import (
     get_user_by_id,
     user_can_be_archived,
 )
+from app.delivery.bounce_rate_buckets import SeedRow, bounce_rate_buckets
 from app.models import Notification, User
 
 
@@ -134,6 +152,49 @@ def replay_service_callbacks(file_name, service_id):
     )
 
 
+@support_command(name="index-legacy-inflights")
+def index_legacy_inflights():
+    """
+    Add the batch saving in-flight lists created before the in-flight index to the index,
+    so that in-flight-to-inbox can expire them. Safe to run more than once.
+    """
+    for queue in [sms_bulk, sms_normal, sms_priority, email_bulk, email_normal, email_priority]:
+        print(f"Indexed {queue.index_legacy_inflights()} legacy inflights for {queue._inbox}")
+
+
+@support_command(name="seed-bounce-rate-buckets")
+@click.option("--batch-size", default=500, show_default=True, help="Services seeded per Redis transaction")
+@click.option(
+    "--clear-sorted-sets/--keep-sorted-sets",
+    default=False,
+    show_default=True,
+    help="Delete the sorted sets of the bounce rate client of the seeded services",
+)
+def seed_bounce_rate_buckets(batch_size, clear_sorted_sets):
+    """
+    Seed the bounce rate buckets of every service that sent emails in the bounce rate window, from one query
+    grouping the emails and hard bounces by service and hour, before turning FF_BOUNCE_RATE_BUCKETS on.
+    Safe to run more than once.
+    """
+    end = datetime.utcnow()
+    start = end - timedelta(seconds=current_app.config["BR_WINDOW_SECONDS"])
+    rows = fetch_email_totals_and_hard_bounces_by_service_and_hour(start, end)
+
+    rows_by_service: Dict[UUID, List[SeedRow]] = defaultdict(list)
+    for service_id, hour, total_notifications, hard_bounces in rows:
+        rows_by_service[service_id].append((hour, total_notifications, hard_bounces))
+
+    service_ids = list(rows_by_service)
+    for i in range(0, len(service_ids), batch_size):
+        bounce_rate_buckets.seed({service_id: rows_by_service[service_id] for service_id in service_ids[i : i + batch_size]})
+    print(f"Seeded the bounce rate buckets of {len(service_ids)} services")
+
+    if clear_sorted_sets:
+        for service_id in service_ids:
+            bounce_rate_client.clear_bounce_rate_data(str(service_id))
+        print(f"Deleted the bounce rate sorted sets of {len(service_ids)} services")
+
+
 @support_command(name="archive-user")
 @click.option("--user-email", required=False, help="User email address to archive")
 @click.option("--user-id", required=False, help="User ID to archive")
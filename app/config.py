@@ -172,18 +172,63 @@ class Config(object):
     # Feature flags #
     #################
     # Feature flags are defined first so these can be reused in configuration sections below.
+    # Seed the annual limit counts of all active services from seed-annual-limit-counts and the nightly notification status
+    # instead of on the first API call of each service of the day.
+    FF_ANNUAL_LIMIT_BULK_SEED = env.bool("FF_ANNUAL_LIMIT_BULK_SEED", False)
+    # Drain all the batch saving inboxes from a single beat-inbox-drain task instead of the six beat-inbox-* tasks.
+    FF_BATCH_SAVING_DRAIN = env.bool("FF_BATCH_SAVING_DRAIN", False)
+    # Send the delivery status callbacks of a batch of notifications with one task per service, see SERVICE_CALLBACK_BATCH_SIZE.
+    FF_BATCH_SERVICE_CALLBACKS = env.bool("FF_BATCH_SERVICE_CALLBACKS", False)
     FF_BENCHMARK_ENDPOINT = env.bool("FF_BENCHMARK_ENDPOINT", False)
+    # Sum the batch saving metrics in process and write them to CloudWatch from a background thread, see app/aws/metrics_logger.py.
+    FF_BUFFERED_CLOUDWATCH_METRICS = env.bool("FF_BUFFERED_CLOUDWATCH_METRICS", False)
+    # Persist batches of notifications with one INSERT ... SELECT FROM unnest(...) and one Redis pipeline per batch.
+    FF_BULK_NOTIFICATION_INSERT = env.bool("FF_BULK_NOTIFICATION_INSERT", False)
+    # Count the emails sent and hard bounces of services in time buckets, see app/delivery/bounce_rate_buckets.py.
+    FF_BOUNCE_RATE_BUCKETS = env.bool("FF_BOUNCE_RATE_BUCKETS", False)
     # Timestamp in epoch milliseconds to seed the bounce rate. We will seed data for (24, the below config) included.
     FF_BOUNCE_RATE_SEED_EPOCH_MS = os.getenv("FF_BOUNCE_RATE_SEED_EPOCH_MS", False)
     # Feature flag to enable custom retry policies such as lowering retry period for certain priority lanes.
     FF_CELERY_CUSTOM_TASK_PARAMS = env.bool("FF_CELERY_CUSTOM_TASK_PARAMS", True)
+    # Time out notifications in chunks of TIMEOUT_NOTIFICATIONS_CHUNK_SIZE, each updated and committed on its own.
+    FF_CHUNKED_NOTIFICATION_TIMEOUT = env.bool("FF_CHUNKED_NOTIFICATION_TIMEOUT", False)
     FF_CLOUDWATCH_METRICS_ENABLED = env.bool("FF_CLOUDWATCH_METRICS_ENABLED", False)
+    # Send the emails saved by save_emails with deliver_email_batch tasks of up to EMAIL_BATCH_SIZE emails of a service.
+    FF_DELIVER_EMAIL_BATCH = env.bool("FF_DELIVER_EMAIL_BATCH", False)
+    # Check the rate, daily and annual email limits of API requests and count the email in a single Redis script.
+    FF_EMAIL_LIMITS_SCRIPT = env.bool("FF_EMAIL_LIMITS_SCRIPT", False)
     FF_IMPROVE_CELERY_WORKER_ISOLATION = env.bool("FF_IMPROVE_CELERY_WORKER_ISOLATION", False)
+    # Store the rows of job files parsed by create_job and post_bulk in S3 for process_job, see app/job/rows_artifact.py.
+    FF_JOB_ROWS_ARTIFACT = env.bool("FF_JOB_ROWS_ARTIFACT", False)
+    # Remember which API key verified a JWT, and the unsigned API key secrets, in per-worker caches.
+    FF_JWT_VERIFICATION_CACHE = env.bool("FF_JWT_VERIFICATION_CACHE", False)
+    # Report the notifications sent by live services in the current financial year from a pivot cached after the nightly billing.
+    FF_LIVE_SERVICES_REPORT = env.bool("FF_LIVE_SERVICES_REPORT", False)
+    # Serve services, templates and API keys on the API hot path from per-worker caches, see app/cache/local.py.
+    FF_LOCAL_DAO_CACHE = env.bool("FF_LOCAL_DAO_CACHE", False)
+    # Choose providers from a per-worker routing table and memoised recipient countries, see provider_to_use.
+    FF_PROVIDER_ROUTING_CACHE = env.bool("FF_PROVIDER_ROUTING_CACHE", False)
     FF_PT_SERVICE_SKIP_FRESHDESK = env.bool("FF_PT_SERVICE_SKIP_FRESHDESK", False)
     # Enables the /v2/reports API endpoints. Off by default so the feature stays hidden in production until launch.
     FF_REPORT_API = env.bool("FF_REPORT_API", False)
     FF_SALESFORCE_CONTACT = env.bool("FF_SALESFORCE_CONTACT", False)
+    # Compile the validator of each JSON schema once per worker, see app/cache/schema_validators.py.
+    FF_SCHEMA_VALIDATOR_CACHE = env.bool("FF_SCHEMA_VALIDATOR_CACHE", False)
+    # Check requests against flat schemas such as post_email_request without jsonschema when FF_SCHEMA_VALIDATOR_CACHE is on.
+    FF_SCHEMA_VALIDATION_FAST_PATH = env.bool("FF_SCHEMA_VALIDATION_FAST_PATH", False)
+    # Update annual limit counts, bounce rates and callbacks of SES receipt batches once per service, not per receipt.
+    FF_SES_RECEIPTS_BY_SERVICE = env.bool("FF_SES_RECEIPTS_BY_SERVICE", False)
+    # Rebuild ft_notification_status with set-based INSERT ... SELECT statements instead of per-service queries.
+    FF_SET_BASED_NIGHTLY_NOTIFICATION_STATUS = env.bool("FF_SET_BASED_NIGHTLY_NOTIFICATION_STATUS", False)
+    # Purge notifications past their retention in created_at ordered batches for all services at once, not per service.
+    FF_SET_BASED_RETENTION_PURGE = env.bool("FF_SET_BASED_RETENTION_PURGE", False)
+    # Split jobs of more than JOB_SHARD_SIZE rows into shards processed in parallel, see app/job/shards.py.
+    FF_SHARDED_JOBS = env.bool("FF_SHARDED_JOBS", False)
     FF_SMS_RATELIMIT = env.bool("FF_SMS_RATELIMIT", False)
+    # Keep the bytes of template file attachments in the per-worker attachment cache, see app/cache/attachments.py.
+    FF_TEMPLATE_ATTACHMENT_CACHE = env.bool("FF_TEMPLATE_ATTACHMENT_CACHE", False)
+    # Render notifications from template objects cached per template version and branding, see app/cache/templates.py.
+    FF_TEMPLATE_RENDER_CACHE = env.bool("FF_TEMPLATE_RENDER_CACHE", False)
     FF_USE_BILLABLE_UNITS = env.bool("FF_USE_BILLABLE_UNITS", False)
 
     # URL of admin app
@@ -413,6 +458,36 @@ class Config(object):
     ALLOW_HTML_SERVICE_IDS: List[str] = [id.strip() for id in os.getenv("ALLOW_HTML_SERVICE_IDS", "").split(",")]
 
     BATCH_INSERTION_CHUNK_SIZE = int(os.getenv("BATCH_INSERTION_CHUNK_SIZE", 500))
+    # Number of services rebuilt per INSERT ... SELECT when FF_SET_BASED_NIGHTLY_NOTIFICATION_STATUS is on
+    NIGHTLY_NOTIFICATION_STATUS_CHUNK_SIZE = env.int("NIGHTLY_NOTIFICATION_STATUS_CHUNK_SIZE", 500)
+    # Seconds the live services report pivot stays cached when the nightly billing does not refresh it, with FF_LIVE_SERVICES_REPORT
+    LIVE_SERVICES_REPORT_CACHE_SECONDS = env.int("LIVE_SERVICES_REPORT_CACHE_SECONDS", 26 * 60 * 60)
+    # Services seeded per pair of queries and Redis pipeline when FF_ANNUAL_LIMIT_BULK_SEED is on
+    ANNUAL_LIMIT_SEED_CHUNK_SIZE = env.int("ANNUAL_LIMIT_SEED_CHUNK_SIZE", 1000)
+    # Notifications updated per UPDATE ... RETURNING by timeout-sending-notifications when FF_CHUNKED_NOTIFICATION_TIMEOUT is on
+    TIMEOUT_NOTIFICATIONS_CHUNK_SIZE = env.int("TIMEOUT_NOTIFICATIONS_CHUNK_SIZE", 5000)
+    # Bounds on the notifications moved per poll by beat-inbox-drain, and the time it may spend per beat tick
+    BATCH_SAVING_DRAIN_MIN_BATCH_SIZE = env.int("BATCH_SAVING_DRAIN_MIN_BATCH_SIZE", 10)
+    BATCH_SAVING_DRAIN_MAX_BATCH_SIZE = env.int("BATCH_SAVING_DRAIN_MAX_BATCH_SIZE", 250)
+    BATCH_SAVING_DRAIN_MAX_SECONDS = env.float("BATCH_SAVING_DRAIN_MAX_SECONDS", 8.0)
+    # Emails per deliver_email_batch task, and the SES requests a task keeps in flight
+    EMAIL_BATCH_SIZE = env.int("EMAIL_BATCH_SIZE", 50)
+    EMAIL_BATCH_MAX_CONCURRENCY = env.int("EMAIL_BATCH_MAX_CONCURRENCY", 10)
+
+    # Per-worker DAO caches: entries per cache, seconds an entry is served for, and how often
+    # a worker checks whether another worker invalidated the caches
+    LOCAL_CACHE_MAXSIZE = env.int("LOCAL_CACHE_MAXSIZE", 2000)
+    LOCAL_CACHE_TTL_SECONDS = env.float("LOCAL_CACHE_TTL_SECONDS", 30.0)
+    LOCAL_CACHE_GENERATION_CHECK_SECONDS = env.float("LOCAL_CACHE_GENERATION_CHECK_SECONDS", 2.0)
+    # Seconds a verified JWT and the API key secrets of a service are cached for when FF_JWT_VERIFICATION_CACHE is on
+    AUTH_CACHE_TTL_SECONDS = env.float("AUTH_CACHE_TTL_SECONDS", 30.0)
+
+    # Service callbacks: hosts and keep-alive connections per host pooled by each worker process, delivery status
+    # updates per send-delivery-statuses task, and concurrent requests per task to the callback api of a service
+    SERVICE_CALLBACK_POOL_HOSTS = env.int("SERVICE_CALLBACK_POOL_HOSTS", 100)
+    SERVICE_CALLBACK_POOL_MAXSIZE = env.int("SERVICE_CALLBACK_POOL_MAXSIZE", 10)
+    SERVICE_CALLBACK_BATCH_SIZE = env.int("SERVICE_CALLBACK_BATCH_SIZE", 25)
+    SERVICE_CALLBACK_MAX_CONCURRENCY = env.int("SERVICE_CALLBACK_MAX_CONCURRENCY", 5)
 
     BROKER_URL = "sqs://"
     BROKER_TRANSPORT_OPTIONS = {
@@ -608,6 +683,19 @@ class Config(object):
             "options": {"queue": QueueNames.PERIODIC},
         },
     }
+    if FF_ANNUAL_LIMIT_BULK_SEED:
+        CELERYBEAT_SCHEDULE["seed-annual-limit-counts"] = {
+            "task": "seed-annual-limit-counts",
+            "schedule": crontab(hour=0, minute=1),  # 19:01 EST in UTC, the annual limit counts are seeded per UTC day
+            "options": {"queue": QueueNames.PERIODIC},
+        }
+    if FF_BATCH_SAVING_DRAIN:
+        CELERYBEAT_SCHEDULE = {name: task for name, task in CELERYBEAT_SCHEDULE.items() if not name.startswith("beat-inbox-")}
+        CELERYBEAT_SCHEDULE["beat-inbox-drain"] = {
+            "task": "beat-inbox-drain",
+            "schedule": 10,
+            "options": {"queue": QueueNames.PERIODIC},
+        }
     CELERY_QUEUES: List[Any] = []
     CELERY_DELIVER_SMS_RATE_LIMIT = os.getenv("CELERY_DELIVER_SMS_RATE_LIMIT", "1/s")
     CELERY_DELIVER_SMS_RATE_LIMIT_PER_MINUTE = env.int("CELERY_DELIVER_SMS_RATE_LIMIT_PER_MINUTE", 6_000)
@@ -664,6 +752,17 @@ class Config(object):
 
     DOCUMENT_DOWNLOAD_API_HOST = os.getenv("DOCUMENT_DOWNLOAD_API_HOST", "http://localhost:7000")
     DOCUMENT_DOWNLOAD_API_KEY = os.getenv("DOCUMENT_DOWNLOAD_API_KEY", "auth-token")
+    # Keep-alive connections per worker process to document-download-api for template file attachments
+    DOCUMENT_DOWNLOAD_POOL_MAXSIZE = env.int("DOCUMENT_DOWNLOAD_POOL_MAXSIZE", 10)
+    # Template attachment cache: bytes held per worker process, seconds a file is kept for, and the largest
+    # file also shared with the other workers through Redis (0 keeps the files in the worker only)
+    ATTACHMENT_CACHE_MAX_BYTES = env.int("ATTACHMENT_CACHE_MAX_BYTES", 100 * 1024 * 1024)
+    ATTACHMENT_CACHE_TTL_SECONDS = env.int("ATTACHMENT_CACHE_TTL_SECONDS", 3600)
+    ATTACHMENT_CACHE_SHARED_MAX_BYTES = env.int("ATTACHMENT_CACHE_SHARED_MAX_BYTES", 0)
+    # Rows of a job file processed by one process-job-shard task
+    JOB_SHARD_SIZE = env.int("JOB_SHARD_SIZE", 5000)
+    # Template objects kept per worker process by the template render cache
+    TEMPLATE_RENDER_CACHE_MAX_SIZE = env.int("TEMPLATE_RENDER_CACHE_MAX_SIZE", 1000)
 
     AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
     NOTIFY_LOG_PATH = ""
@@ -680,11 +779,19 @@ class Config(object):
     # Endpoint of Cloudwatch agent running as a side car in EKS listening for embedded metrics
     CLOUDWATCH_AGENT_EMF_PORT = 25888
     CLOUDWATCH_AGENT_ENDPOINT = os.getenv("CLOUDWATCH_AGENT_ENDPOINT", f"tcp://{STATSD_HOST}:{CLOUDWATCH_AGENT_EMF_PORT}")
+    # Seconds between writes of the buffered metrics, and buffered flushes triggering an early write, with FF_BUFFERED_CLOUDWATCH_METRICS
+    CLOUDWATCH_METRICS_FLUSH_INTERVAL_SECONDS = env.float("CLOUDWATCH_METRICS_FLUSH_INTERVAL_SECONDS", 10.0)
+    CLOUDWATCH_METRICS_BUFFER_SIZE = env.int("CLOUDWATCH_METRICS_BUFFER_SIZE", 1000)
 
     # Bounce Rate parameters
     BR_VOLUME_MINIMUM = int(os.getenv("BR_VOLUME_MINIMUM", 1000))
     BR_WARNING_PERCENTAGE = 0.05
     BR_CRITICAL_PERCENTAGE = 0.1
+    # Seconds per bucket and per window of the bounce rate counters, and between two evaluations of the bounce rate of
+    # a service by a worker, when FF_BOUNCE_RATE_BUCKETS is on
+    BR_BUCKET_SECONDS = env.int("BR_BUCKET_SECONDS", 300)
+    BR_WINDOW_SECONDS = env.int("BR_WINDOW_SECONDS", 24 * 60 * 60)
+    BR_CHECK_INTERVAL_SECONDS = env.float("BR_CHECK_INTERVAL_SECONDS", 60.0)
 
     WAF_SECRET = os.getenv("WAF_SECRET")
 
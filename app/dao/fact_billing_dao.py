@@ -1,8 +1,11 @@
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from typing import Any
 
 from flask import current_app
+from more_itertools import chunked
 from sqlalchemy import Date, Integer, and_, case, desc, func
 from sqlalchemy.dialects.postgresql import insert
 
@@ -28,6 +31,20 @@ from app.models import (
 )
 from app.utils import get_local_timezone_midnight_in_utc
 
+FACT_BILLING_PRIMARY_KEY = (
+    "bst_date",
+    "template_id",
+    "service_id",
+    "notification_type",
+    "provider",
+    "rate_multiplier",
+    "international",
+    "rate",
+    "postage",
+    "sms_sending_vehicle",
+)
+FACT_BILLING_UPSERT_CHUNK_SIZE = 1000
+
 
 def dao_fetch_sms_cost_for_service_in_range(service_id, start_date, end_date):
     """Return the total SMS cost and fragment count for a service in the given date range (inclusive).
@@ -364,10 +381,10 @@ def fetch_monthly_billing_for_year(service_id, year):
     # if year end date is less than today, we are calculating for data in the past and have no need for deltas.
     if year_end_date.date() >= today_utc:
         yesterday_utc = today_utc - timedelta(days=1)
+        rates = BillingRates.load()
         for day in [yesterday_utc, today_utc]:
             data = fetch_billing_data_for_day(process_day=day, service_id=service_id)
-            for d in data:
-                update_fact_billing(data=d, process_day=day)
+            update_fact_billing_for_day(data, day, rates=rates)
 
     email_and_letters = (
         db.session.query(
@@ -615,17 +632,63 @@ def get_rate(
         if rate is not None:
             return rate
 
-        # No matching rate — log an error; this indicates a problem with the rates table setup
-        error_msg = (
-            f"[error-sms-rates]: No SMS rate found for vehicle={sms_sending_vehicle!r} on {date!r}. "
-            "Please ensure rates are populated in the rates table."
-        )
-        current_app.logger.error(error_msg)
-        raise ValueError(error_msg)
+        _raise_missing_sms_rate(sms_sending_vehicle, date)
     else:
         return 0
 
 
+def _raise_missing_sms_rate(sms_sending_vehicle, date):
+    # No matching rate — log an error; this indicates a problem with the rates table setup
+    error_msg = (
+        f"[error-sms-rates]: No SMS rate found for vehicle={sms_sending_vehicle!r} on {date!r}. "
+        "Please ensure rates are populated in the rates table."
+    )
+    current_app.logger.error(error_msg)
+    raise ValueError(error_msg)
+
+
+class BillingRates:
+    """
+    The rates and letter rates loaded once for a billing run and indexed by (notification_type, sms_sending_vehicle),
+    with each index sorted by valid_from. get_rate gives the same answers as the module-level get_rate, but with a
+    dictionary lookup and a bisect instead of a scan of every rate for every row.
+    """
+
+    def __init__(self, non_letter_rates, letter_rates):
+        self.letter_rates = letter_rates
+        self._valid_from = defaultdict(list)
+        self._rates = defaultdict(list)
+        for r in sorted(non_letter_rates, key=lambda r: r.valid_from):
+            self._valid_from[(r.notification_type, r.sms_sending_vehicle)].append(r.valid_from)
+            self._rates[(r.notification_type, r.sms_sending_vehicle)].append(r.rate)
+        self._start_of_day = {}
+
+    @classmethod
+    def load(cls):
+        return cls(*get_rates_for_billing())
+
+    def get_rate(
+        self,
+        notification_type,
+        date,
+        crown=None,
+        letter_page_count=None,
+        post_class="second",
+        sms_sending_vehicle="long_code",
+    ):
+        if notification_type != SMS_TYPE:
+            return get_rate([], self.letter_rates, notification_type, date, crown, letter_page_count, post_class)
+
+        if date not in self._start_of_day:
+            self._start_of_day[date] = get_local_timezone_midnight_in_utc(date)
+
+        key = (notification_type, sms_sending_vehicle)
+        index = bisect_right(self._valid_from.get(key, []), self._start_of_day[date])
+        if index == 0:
+            _raise_missing_sms_rate(sms_sending_vehicle, date)
+        return self._rates[key][index - 1]
+
+
 def update_fact_billing(data, process_day):
     non_letter_rates, letter_rates = get_rates_for_billing()
     rate = get_rate(
@@ -641,30 +704,80 @@ def update_fact_billing(data, process_day):
 
     billing_record = create_billing_record(data, rate, process_day)
 
-    table = FactBilling.__table__
+    db.session.connection().execute(_upsert_fact_billing_statement([_billing_record_values(billing_record)]))
+    db.session.commit()
+
+
+def update_fact_billing_for_day(transit_data, process_day, rates=None):
     """
-       This uses the Postgres upsert to avoid race conditions when two threads try to insert
-       at the same row. The excluded object refers to values that we tried to insert but were
-       rejected.
-       http://docs.sqlalchemy.org/en/latest/dialects/postgresql.html#insert-on-conflict-upsert
+    Batched equivalent of calling update_fact_billing for every row of fetch_billing_data_for_day.
+
+    Rates are resolved in memory through a BillingRates table (pass one in to share it across several days),
+    and every row for the day is upserted with multi-row INSERT ... ON CONFLICT statements in a single transaction.
+    Rows that land on the same ft_billing primary key are added together rather than overwriting each other.
+
+    Returns the number of ft_billing rows written.
     """
-    stmt = insert(table).values(
-        bst_date=billing_record.bst_date,
-        template_id=billing_record.template_id,
-        service_id=billing_record.service_id,
-        provider=billing_record.provider,
-        rate_multiplier=billing_record.rate_multiplier,
-        notification_type=billing_record.notification_type,
-        international=billing_record.international,
-        billable_units=billing_record.billable_units,
-        notifications_sent=billing_record.notifications_sent,
-        rate=billing_record.rate,
-        postage=billing_record.postage,
-        sms_sending_vehicle=billing_record.sms_sending_vehicle,
-        billing_total=billing_record.billing_total,
-    )
+    rates = rates or BillingRates.load()
+
+    rows: dict[tuple, dict] = {}
+    for data in transit_data:
+        rate = rates.get_rate(
+            data.notification_type,
+            process_day,
+            data.crown,
+            data.letter_page_count,
+            data.postage,
+            data.sms_sending_vehicle,
+        )
+        values = _billing_record_values(create_billing_record(data, rate, process_day))
+        key = tuple(values[column] for column in FACT_BILLING_PRIMARY_KEY)
+        if key in rows:
+            for column in ("billable_units", "notifications_sent", "billing_total"):
+                if values[column] is not None:
+                    rows[key][column] = (rows[key][column] or 0) + values[column]
+        else:
+            rows[key] = values
+
+    try:
+        for chunk in chunked(rows.values(), FACT_BILLING_UPSERT_CHUNK_SIZE):
+            db.session.connection().execute(_upsert_fact_billing_statement(chunk))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
+
+
+def _billing_record_values(billing_record):
+    return {
+        "bst_date": billing_record.bst_date,
+        "template_id": billing_record.template_id,
+        "service_id": billing_record.service_id,
+        "provider": billing_record.provider,
+        "rate_multiplier": billing_record.rate_multiplier,
+        "notification_type": billing_record.notification_type,
+        "international": billing_record.international,
+        "billable_units": billing_record.billable_units,
+        "notifications_sent": billing_record.notifications_sent,
+        "rate": billing_record.rate,
+        "postage": billing_record.postage,
+        "sms_sending_vehicle": billing_record.sms_sending_vehicle,
+        "billing_total": billing_record.billing_total,
+    }
+
 
-    stmt = stmt.on_conflict_do_update(
+def _upsert_fact_billing_statement(rows):
+    """
+    This uses the Postgres upsert to avoid race conditions when two threads try to insert
+    at the same row. The excluded object refers to values that we tried to insert but were
+    rejected.
+    http://docs.sqlalchemy.org/en/latest/dialects/postgresql.html#insert-on-conflict-upsert
+    """
+    stmt = insert(FactBilling.__table__).values(list(rows))
+
+    return stmt.on_conflict_do_update(
         constraint="ft_billing_pkey",
         set_={
             "notifications_sent": stmt.excluded.notifications_sent,
@@ -673,8 +786,6 @@ def update_fact_billing(data, process_day):
             "updated_at": datetime.utcnow(),
         },
     )
-    db.session.connection().execute(stmt)
-    db.session.commit()
 
 
 def create_billing_record(data, rate, process_day):
@@ -705,3 +816,30 @@ def create_billing_record(data, rate, process_day):
             rate_multiplier = data.rate_multiplier or 1
             billing_record.billing_total = Decimal(billable_units) * Decimal(rate_multiplier) * rate_decimal
     return billing_record
+
+
+def fetch_notifications_sent_by_service_for_year(year):
+    """The notifications sent by each service in a financial year, pivoted by notification type,
+    as rows of (service_id, email_totals, sms_totals, letter_totals)."""
+    year_start_date, year_end_date = get_financial_year(year)
+
+    def notifications_sent(notification_type):
+        return func.coalesce(
+            func.sum(FactBilling.notifications_sent).filter(FactBilling.notification_type == notification_type), 0
+        )
+
+    return (
+        db.session.query(
+            FactBilling.service_id,
+            notifications_sent(EMAIL_TYPE).label("email_totals"),
+            notifications_sent(SMS_TYPE).label("sms_totals"),
+            notifications_sent(LETTER_TYPE).label("letter_totals"),
+        )
+        .filter(
+            FactBilling.bst_date >= year_start_date.strftime("%Y-%m-%d"),
+            # This works only for timezones to the west of GMT
+            FactBilling.bst_date < year_end_date.strftime("%Y-%m-%d"),
+        )
+        .group_by(FactBilling.service_id)
+        .all()
+    )
@@ -2,6 +2,7 @@ from datetime import datetime, time, timedelta, timezone
 
 from flask import current_app
 from sqlalchemy import Date, case, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.expression import extract, literal
 from sqlalchemy.types import DateTime, Integer
@@ -144,6 +145,117 @@ def update_fact_notification_status(data, process_day, service_ids=None):
         raise
 
 
+def _query_for_fact_status_rows(table, process_day, start_date, end_date, service_ids=None):
+    """
+    Set-based equivalent of query_for_fact_status_data: aggregates every service and notification type
+    for the day in a single grouped query, shaped like a ft_notification_status row.
+    """
+    query = db.session.query(
+        literal(process_day, type_=Date).label("bst_date"),
+        table.template_id.label("template_id"),
+        table.service_id.label("service_id"),
+        func.coalesce(table.job_id, "00000000-0000-0000-0000-000000000000").label("job_id"),
+        table.notification_type.label("notification_type"),
+        table.key_type.label("key_type"),
+        table.status.label("notification_status"),
+        func.count().label("notification_count"),
+        func.sum(table.billable_units).label("billable_units"),
+        literal(datetime.utcnow(), type_=DateTime).label("created_at"),
+    ).filter(
+        table.created_at >= start_date,
+        table.created_at < end_date,
+        table.notification_type.in_([EMAIL_TYPE, SMS_TYPE, LETTER_TYPE]),
+        table.key_type != KEY_TYPE_TEST,
+    )
+    if service_ids:
+        query = query.filter(table.service_id.in_(service_ids))
+
+    return query.group_by(
+        table.template_id,
+        table.service_id,
+        "job_id",
+        table.notification_type,
+        table.key_type,
+        table.status,
+    )
+
+
+def upsert_fact_notification_status_for_day(process_day, service_ids=None):
+    """
+    Rebuild ft_notification_status for process_day with a single INSERT ... SELECT rather than one
+    query per service and notification type (see fetch_notification_status_for_day).
+
+    As with the per-service path, rows are read from notifications and, for any (service, notification type)
+    pair that has nothing left in notifications for the day, from notification_history instead.
+
+    Args:
+        process_day (date): the day to rebuild
+        service_ids (list, optional): restrict the rebuild to these services. Defaults to every service.
+
+    Returns:
+        int: the number of ft_notification_status rows written
+    """
+    start_date = datetime.combine(process_day, time.min)
+    end_date = datetime.combine(process_day + timedelta(days=1), time.min)
+    current_app.logger.info("Upsert ft_notification_status for {} to {}".format(start_date, end_date))
+
+    day_has_notifications = (
+        db.session.query(Notification.id)
+        .filter(
+            Notification.service_id == NotificationHistory.service_id,
+            Notification.notification_type == NotificationHistory.notification_type,
+            Notification.created_at >= start_date,
+            Notification.created_at < end_date,
+            Notification.key_type != KEY_TYPE_TEST,
+        )
+        .exists()
+    )
+    notifications_rows = _query_for_fact_status_rows(Notification, process_day, start_date, end_date, service_ids)
+    history_rows = _query_for_fact_status_rows(NotificationHistory, process_day, start_date, end_date, service_ids).filter(
+        ~day_has_notifications
+    )
+
+    table = FactNotificationStatus.__table__
+    stmt = insert(table).from_select(
+        [
+            "bst_date",
+            "template_id",
+            "service_id",
+            "job_id",
+            "notification_type",
+            "key_type",
+            "notification_status",
+            "notification_count",
+            "billable_units",
+            "created_at",
+        ],
+        notifications_rows.union_all(history_rows),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={
+            "notification_count": stmt.excluded.notification_count,
+            "billable_units": stmt.excluded.billable_units,
+            "updated_at": datetime.utcnow(),
+        },
+    )
+
+    try:
+        delete_query = FactNotificationStatus.query.filter(FactNotificationStatus.bst_date == process_day)
+        if service_ids:
+            delete_query = delete_query.filter(FactNotificationStatus.service_id.in_(service_ids))
+        delete_query.delete(synchronize_session=False)
+
+        result = db.session.execute(stmt)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.info(f"Unexpected error in upsert_fact_notification_status_for_day: {e}")
+        raise
+
+    return result.rowcount
+
+
 def fetch_notification_status_for_service_by_month(start_date, end_date, service_id):
     filters = [
         FactNotificationStatus.service_id == service_id,
@@ -1330,3 +1442,47 @@ def fetch_billable_units_totals_for_service_by_fiscal_year(service_id, fiscal_ye
         .scalar()
     )
     return query or 0
+
+
+def fetch_notification_status_totals_by_service_for_fiscal_year(service_ids, fiscal_year):
+    """The notifications and billable units of each service and notification type for a fiscal year, as rows of
+    (service_id, notification_type, notification_count, billable_units)."""
+    start_date, end_date = get_fiscal_dates(year=fiscal_year)
+    return (
+        db.session.query(
+            FactNotificationStatus.service_id,
+            FactNotificationStatus.notification_type,
+            func.sum(FactNotificationStatus.notification_count).label("notification_count"),
+            func.coalesce(func.sum(FactNotificationStatus.billable_units), 0).label("billable_units"),
+        )
+        .filter(
+            FactNotificationStatus.service_id.in_(service_ids),
+            FactNotificationStatus.bst_date >= start_date,
+            FactNotificationStatus.bst_date <= end_date,
+        )
+        .group_by(FactNotificationStatus.service_id, FactNotificationStatus.notification_type)
+        .all()
+    )
+
+
+def fetch_notification_status_by_service_for_day(bst_day, service_ids):
+    """fetch_notification_status_for_service_for_day and fetch_billable_units_for_service_for_day for many services, as
+    rows of (service_id, notification_type, notification_status, count, billable_units)."""
+    bst_day = bst_day.replace(hour=0, minute=0, second=0)
+    return (
+        db.session.query(
+            Notification.service_id,
+            Notification.notification_type,
+            Notification.status.label("notification_status"),
+            func.count().label("count"),
+            func.coalesce(func.sum(Notification.billable_units), 0).label("billable_units"),
+        )
+        .filter(
+            Notification.created_at >= bst_day,
+            Notification.created_at < bst_day + timedelta(days=1),
+            Notification.service_id.in_(service_ids),
+            Notification.key_type != KEY_TYPE_TEST,
+        )
+        .group_by(Notification.service_id, Notification.notification_type, Notification.status)
+        .all()
+    )
@@ -1,52 +1,32 @@
 from flask import current_app
-from itsdangerous import BadSignature
 from notifications_utils.statsd_decorators import statsd
 from sqlalchemy import and_, desc
 from sqlalchemy.orm import aliased
 
 from app import db, signer_inbound_sms
 from app.dao.dao_utils import transactional
+from app.dao.resign_dao import resign_column
 from app.models import SMS_TYPE, InboundSms, Service, ServiceDataRetention
 from app.utils import midnight_n_days_ago
 
 
-@transactional
-def resign_inbound_sms(resign: bool, unsafe: bool = False):
+def resign_inbound_sms(resign: bool, unsafe: bool = False, chunk_size: int = 10000, workers: int = 1) -> int:
     """Resign the _content column of the inbound_sms table with (potentially) a new key.
 
     Args:
         resign (bool): whether to resign the inbound sms
         unsafe (bool, optional): resign regardless of whether the unsign step fails with a BadSignature.
         Defaults to False.
+        chunk_size (int, optional): number of rows to update at once. Defaults to 10000.
+        workers (int, optional): number of processes resigning chunks in parallel. Defaults to 1.
+
+    Returns:
+        int: number of inbound sms that were resigned or need to be resigned.
 
     Raises:
         e: BadSignature if the unsign step fails and unsafe is False.
     """
-    rows = InboundSms.query.all()  # noqa
-    current_app.logger.info(f"Total of {len(rows)} inbound sms")
-    rows_to_update = []
-
-    for row in rows:
-        try:
-            old_signature = row._content
-            unsigned_content = getattr(row, "content")  # unsign the content
-        except BadSignature as e:
-            if unsafe:
-                unsigned_content = signer_inbound_sms.verify_unsafe(row._content)
-            else:
-                current_app.logger.error(f"BadSignature for inbound_sms {row.id}")
-                raise e
-        setattr(row, "content", unsigned_content)  # resigns the content with (potentially) a new signing secret
-        if old_signature != row._content:
-            rows_to_update.append(row)
-        if not resign:
-            row._content = old_signature  # reset the signature to the old value
-
-    if resign:
-        current_app.logger.info(f"Resigning {len(rows_to_update)} inbound sms")
-        db.session.bulk_save_objects(rows)
-    elif not resign:
-        current_app.logger.info(f"{len(rows_to_update)} inbound sms need resigning")
+    return resign_column(InboundSms._content, signer_inbound_sms, chunk_size, resign, unsafe, workers=workers).resigned
 
 
 @transactional
@@ -1,9 +1,11 @@
 import functools
 import string
+import time
 from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from uuid import UUID
 
 from flask import current_app
-from itsdangerous import BadSignature
 from notifications_utils.international_billing_rates import INTERNATIONAL_BILLING_RATES
 from notifications_utils.recipients import (
     InvalidEmailError,
@@ -15,8 +17,8 @@ from notifications_utils.timezones import (
     convert_local_timezone_to_utc,
     convert_utc_to_local_timezone,
 )
-from sqlalchemy import asc, desc, func
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import and_, asc, bindparam, cast, desc, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import defer, joinedload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql import functions, literal_column
@@ -26,6 +28,7 @@ from werkzeug.datastructures import MultiDict
 from app import create_uuid, db, signer_personalisation
 from app.dao.dao_utils import transactional
 from app.dao.date_util import get_query_date_based_on_retention_period
+from app.dao.resign_dao import Checkpoint, resign_column
 from app.errors import InvalidRequest
 from app.models import (
     EMAIL_TYPE,
@@ -48,66 +51,28 @@ from app.models import (
     ScheduledNotification,
     Service,
     ServiceDataRetention,
+    format_notification_status,
 )
 from app.utils import escape_special_characters
 
 
-@transactional
-def _resign_notifications_chunk(chunk_offset: int, chunk_size: int, resign: bool, unsafe: bool) -> int:
-    """Resign the _personalisation column of the notifications in a chunk of notifications with (potentially) a new key.
-
-    Args:
-        chunk_offset (int): start index of the chunk
-        chunk_size (int): size of the chunk
-        resign (bool): resign the personalisation
-        unsafe (bool): ignore bad signatures
-
-    Raises:
-        e: BadSignature if the unsign step fails and unsafe is False.
-
-    Returns:
-        int: number of notifications resigned or needing to be resigned
-    """
-    rows = Notification.query.order_by(Notification.created_at).slice(chunk_offset, chunk_offset + chunk_size).all()
-    current_app.logger.info(f"Processing chunk {chunk_offset} to {chunk_offset + len(rows) - 1}")
-
-    rows_to_update = []
-    for row in rows:
-        old_signature = row._personalisation
-        if old_signature:
-            try:
-                unsigned_personalisation = getattr(row, "personalisation")  # unsign the personalisation
-            except BadSignature as e:
-                if unsafe:
-                    unsigned_personalisation = signer_personalisation.verify_unsafe(row._personalisation)
-                else:
-                    current_app.logger.warning(f"BadSignature for notification {row.id}: {e}")
-                    raise e
-        setattr(
-            row, "personalisation", unsigned_personalisation
-        )  # resigns the personalisation with (potentially) a new signing secret
-        if old_signature != row._personalisation:
-            rows_to_update.append(row)
-        if not resign:
-            row._personalisation = old_signature  # reset the signature to the old value
-
-    if resign and len(rows_to_update) > 0:
-        current_app.logger.info(f"Resigning {len(rows_to_update)} notifications")
-        db.session.bulk_save_objects(rows)
-    elif len(rows_to_update) > 0:
-        current_app.logger.info(f"{len(rows_to_update)} notifications need resigning")
-
-    return len(rows_to_update)
-
-
-def resign_notifications(chunk_size: int, resign: bool, unsafe: bool = False) -> int:
+def resign_notifications(
+    chunk_size: int,
+    resign: bool,
+    unsafe: bool = False,
+    workers: int = 1,
+    checkpoint: Optional[Checkpoint] = None,
+    on_checkpoint: Optional[Callable[[Checkpoint], None]] = None,
+) -> int:
     """Resign the _personalisation column of the notifications table with (potentially) a new key.
 
     Args:
         chunk_size (int): number of rows to update at once.
         resign (bool): resign the notifications.
         unsafe (bool, optional): resign regardless of whether the unsign step fails with a BadSignature. Defaults to False.
-        max_update_size(int, -1): max number of rows to update at once, -1 for no limit. Defautls to -1.
+        workers (int, optional): number of processes resigning chunks in parallel. Defaults to 1.
+        checkpoint (Checkpoint, optional): resume after this (created_at, id). Defaults to None.
+        on_checkpoint (Callable, optional): called with the checkpoint of each chunk once it is resigned and committed.
 
     Returns:
         int: number of notifications that were resigned or need to be resigned.
@@ -115,20 +80,16 @@ def resign_notifications(chunk_size: int, resign: bool, unsafe: bool = False) ->
     Raises:
         e: BadSignature if the unsign step fails and unsafe is False.
     """
-
-    total_notifications = Notification.query.count()
-    current_app.logger.info(f"Total of {total_notifications} notifications")
-    num_old_signatures = 0
-
-    for chunk_offset in range(0, total_notifications, chunk_size):
-        num_old_signatures_in_chunk = _resign_notifications_chunk(chunk_offset, chunk_size, resign, unsafe)
-        num_old_signatures += num_old_signatures_in_chunk
-
-    if resign:
-        current_app.logger.info(f"Overall, {num_old_signatures} notifications were resigned")
-    else:
-        current_app.logger.info(f"Overall, {num_old_signatures} notifications need resigning")
-    return num_old_signatures
+    return resign_column(
+        Notification._personalisation,
+        signer_personalisation,
+        chunk_size,
+        resign,
+        unsafe,
+        workers=workers,
+        checkpoint=checkpoint,
+        on_checkpoint=on_checkpoint,
+    ).resigned
 
 
 @statsd(namespace="dao")
@@ -185,6 +146,70 @@ def bulk_insert_notifications(notifications):
     return db.session.bulk_save_objects(notifications)
 
 
+# Columns written by bulk_insert_notification_rows, in the order of the tuples built by notification_insert_row
+NOTIFICATION_INSERT_COLUMNS = (
+    "id",
+    "to",
+    "normalised_to",
+    "job_id",
+    "job_row_number",
+    "service_id",
+    "template_id",
+    "template_version",
+    "api_key_id",
+    "key_type",
+    "billable_units",
+    "notification_type",
+    "created_at",
+    "status",
+    "reference",
+    "client_reference",
+    "_personalisation",
+    "international",
+    "phone_prefix",
+    "rate_multiplier",
+    "created_by_id",
+    "reply_to_text",
+    "postage",
+    "queue_name",
+)
+
+
+def notification_insert_row(notification: Notification) -> tuple:
+    """
+    Returns the values of NOTIFICATION_INSERT_COLUMNS for a transient notification,
+    filling in the id, status, billable units and international defaults.
+    """
+    if not notification.id:
+        notification.id = create_uuid()
+    if not notification.status:
+        notification.status = NOTIFICATION_CREATED
+    if notification.billable_units is None:
+        notification.billable_units = 0
+    if notification.international is None:
+        notification.international = False
+    return tuple(getattr(notification, column) for column in NOTIFICATION_INSERT_COLUMNS)
+
+
+@statsd(namespace="dao")
+@transactional
+def bulk_insert_notification_rows(rows: List[tuple]) -> None:
+    """
+    Inserts rows built by notification_insert_row with a single INSERT ... SELECT FROM unnest(...).
+    Each column is bound as one array parameter, so a batch is one statement and one round trip
+    to the database whatever its size, without the ORM unit of work of bulk_save_objects.
+    """
+    if not rows:
+        return
+    table = Notification.__table__
+    columns = [table.c[column] for column in NOTIFICATION_INSERT_COLUMNS]
+    unnested = [
+        func.unnest(cast(bindparam(f"{column.key}_values", list(values), type_=ARRAY(column.type)), ARRAY(column.type)))
+        for column, values in zip(columns, zip(*rows))
+    ]
+    db.session.execute(table.insert().from_select(columns, select(*unnested)))
+
+
 def _decide_permanent_temporary_failure(current_status, status):
     # Firetext will send pending, then send either succes or fail.
     # If we go from pending to delivered we need to set failure type as temporary-failure
@@ -354,6 +379,10 @@ def get_notification_by_id(notification_id, service_id=None, _raise=False) -> No
     return query.one() if _raise else query.first()
 
 
+def get_notifications_by_ids(notification_ids) -> List[Notification]:
+    return db.on_reader().query(Notification).filter(Notification.id.in_(notification_ids)).all()
+
+
 def get_notifications(filter_dict=None):
     return _filter_query(Notification.query, filter_dict=filter_dict)
 
@@ -441,8 +470,14 @@ def _filter_query(query, filter_dict=None):
     return query
 
 
+DEFAULT_DAYS_OF_RETENTION = 7
+
+
 @statsd(namespace="dao")
 def delete_notifications_older_than_retention_by_type(notification_type, qry_limit=10000):
+    if current_app.config["FF_SET_BASED_RETENTION_PURGE"]:
+        return purge_notifications_older_than_retention_by_type(notification_type, qry_limit)
+
     current_app.logger.info("Deleting {} notifications for services with flexible data retention".format(notification_type))
 
     flexible_data_retention = ServiceDataRetention.query.filter(ServiceDataRetention.notification_type == notification_type).all()
@@ -461,7 +496,7 @@ def delete_notifications_older_than_retention_by_type(notification_type, qry_lim
 
     current_app.logger.info("Deleting {} notifications for services without flexible data retention".format(notification_type))
 
-    seven_days_ago = get_query_date_based_on_retention_period(7)
+    seven_days_ago = get_query_date_based_on_retention_period(DEFAULT_DAYS_OF_RETENTION)
     services_with_data_retention = [x.service_id for x in flexible_data_retention]
     service_ids_to_purge = db.session.query(Service.id).filter(Service.id.notin_(services_with_data_retention)).all()
 
@@ -547,6 +582,104 @@ def insert_update_notification_history(notification_type, date_to_delete_from, s
     db.session.commit()
 
 
+def _purge_notifications_batch(
+    notification_type, cutoffs: Dict[int, datetime], batch_size
+) -> Tuple[int, int, Optional[datetime]]:
+    """Moves the oldest batch_size notifications past the retention of their service to notification_history in one
+    statement, and returns the number of notifications deleted, the number moved and the created_at reached."""
+    notifications = Notification.__table__
+    history = NotificationHistory.__table__
+    retention = ServiceDataRetention.__table__
+    days_of_retention = func.coalesce(retention.c.days_of_retention, DEFAULT_DAYS_OF_RETENTION)
+
+    batch = (
+        select(notifications.c.id)
+        .select_from(
+            notifications.outerjoin(
+                retention,
+                and_(retention.c.service_id == notifications.c.service_id, retention.c.notification_type == notification_type),
+            )
+        )
+        .where(
+            notifications.c.notification_type == notification_type,
+            # The latest cutoff bounds the scan of the created_at index, the cutoff of the service filters within it
+            notifications.c.created_at < max(cutoffs.values()),
+            notifications.c.created_at < case(cutoffs, value=days_of_retention),
+        )
+        .order_by(notifications.c.created_at)
+        .limit(batch_size)
+        .with_for_update(of=notifications, skip_locked=True)
+        .cte("batch")
+    )
+    deleted = notifications.delete().where(notifications.c.id.in_(select(batch.c.id))).returning(*notifications.c).cte("deleted")
+    moved_rows = (
+        # Selecting the columns of the CTE, rather than literal names, quotes reserved names such as "to"
+        select(*[deleted.c[x.key] for x in history.c]).where(deleted.c.key_type != KEY_TYPE_TEST)
+    )
+    insert_stmt = insert(NotificationHistory).from_select(history.c, moved_rows)
+    moved = (
+        insert_stmt.on_conflict_do_update(
+            constraint="notification_history_pkey",
+            set_={
+                "notification_status": insert_stmt.excluded.status,
+                "reference": insert_stmt.excluded.reference,
+                "billable_units": insert_stmt.excluded.billable_units,
+                "updated_at": insert_stmt.excluded.updated_at,
+                "sent_at": insert_stmt.excluded.sent_at,
+                "sent_by": insert_stmt.excluded.sent_by,
+            },
+        )
+        .returning(history.c.id)
+        .cte("moved")
+    )
+    stmt = select(
+        select(func.count()).select_from(deleted).scalar_subquery(),
+        select(func.count()).select_from(moved).scalar_subquery(),
+        select(func.max(deleted.c.created_at)).scalar_subquery(),
+    )
+    number_deleted, number_moved, reached = db.session.execute(stmt).one()
+    db.session.commit()
+    return number_deleted, number_moved, reached
+
+
+@statsd(namespace="dao")
+def purge_notifications_older_than_retention_by_type(notification_type, batch_size=10000) -> int:
+    """
+    Deletes the notifications of notification_type older than the data retention of their service, moving the
+    notifications not sent with a test key to notification_history.
+
+    Unlike the loop over every service of delete_notifications_older_than_retention_by_type, the cutoff of each service
+    is applied in the statement, and the whole table is purged in created_at order, batch_size notifications and one
+    commit at a time.
+    """
+    retention_days = {
+        days
+        for (days,) in db.session.query(ServiceDataRetention.days_of_retention)
+        .filter(ServiceDataRetention.notification_type == notification_type)
+        .distinct()
+    }
+    cutoffs = {days: get_query_date_based_on_retention_period(days) for days in retention_days | {DEFAULT_DAYS_OF_RETENTION}}
+
+    current_app.logger.info(f"Purging {notification_type} notifications older than retention, in batches of {batch_size}")
+    start = time.monotonic()
+    deleted = moved = 0
+    while True:
+        batch_deleted, batch_moved, reached = _purge_notifications_batch(notification_type, cutoffs, batch_size)
+        deleted += batch_deleted
+        moved += batch_moved
+        if batch_deleted:
+            elapsed = time.monotonic() - start
+            current_app.logger.info(
+                f"Purged {deleted} {notification_type} notifications ({moved} moved to history) created up to {reached}, "
+                f"{deleted / elapsed if elapsed else 0:.0f} notifications/s"
+            )
+        if batch_deleted < batch_size:
+            break
+
+    current_app.logger.info(f"Finished purging {deleted} {notification_type} notifications in {time.monotonic() - start:.1f}s")
+    return deleted
+
+
 @statsd(namespace="dao")
 @transactional
 def dao_delete_notifications_by_id(notification_id):
@@ -595,6 +728,73 @@ def dao_timeout_notifications(timeout_period_in_seconds):
     return technical_failure_notifications, temporary_failure_notifications
 
 
+class TimedOutNotification(NamedTuple):
+    """The columns of a timed out notification returned by its UPDATE, enough for its delivery status callback."""
+
+    id: UUID
+    service_id: UUID
+    notification_type: str
+    status: str
+    to: str
+    client_reference: Optional[str]
+    provider_response: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    sent_at: Optional[datetime]
+
+    @property
+    def formatted_status(self) -> str:
+        # Timed out notifications are never in a bounce or provider failure status, the feedback fields are not needed
+        return format_notification_status(self.notification_type, self.status)
+
+
+def _timeout_notifications_chunk(
+    current_statuses, new_status, timeout_start, updated_at, chunk_size
+) -> List[TimedOutNotification]:
+    notifications = Notification.__table__
+    chunk_ids = (
+        select(notifications.c.id)
+        .where(
+            notifications.c.created_at < timeout_start,
+            notifications.c.status.in_(current_statuses),
+            notifications.c.notification_type != LETTER_TYPE,
+        )
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        notifications.update()
+        .where(notifications.c.id.in_(chunk_ids))
+        .values(status=new_status, updated_at=updated_at)
+        .returning(*(notifications.c[field] for field in TimedOutNotification._fields))
+    )
+    timed_out = [TimedOutNotification(*row) for row in db.session.execute(stmt)]
+    db.session.commit()
+    return timed_out
+
+
+def dao_timeout_notifications_in_chunks(timeout_period_in_seconds, chunk_size) -> Iterator[List[TimedOutNotification]]:
+    """
+    Timeout SMS and email notifications by the rules of dao_timeout_notifications, chunk_size notifications at a time.
+
+    Each chunk is updated by one UPDATE ... RETURNING and committed before it is yielded, so the notifications are never
+    all held in memory or in one transaction. Notifications locked by another transaction are skipped until the next run.
+    """
+    timeout_start = datetime.utcnow() - timedelta(seconds=timeout_period_in_seconds)
+    updated_at = datetime.utcnow()
+    for current_statuses, new_status in [
+        ([NOTIFICATION_CREATED], NOTIFICATION_TECHNICAL_FAILURE),
+        ([NOTIFICATION_SENDING, NOTIFICATION_PENDING], NOTIFICATION_TEMPORARY_FAILURE),
+    ]:
+        while True:
+            chunk = _timeout_notifications_chunk(current_statuses, new_status, timeout_start, updated_at, chunk_size)
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                break
+
+
 def is_delivery_slow_for_provider(
     created_at,
     provider,
@@ -795,6 +995,18 @@ def dao_get_last_notification_added_for_job_id(job_id):
     return last_notification_added
 
 
+def dao_get_last_row_numbers_by_job_shard(job_id, shard_size) -> Dict[int, int]:
+    """Returns the last row number saved for each shard of shard_size rows of the job, by shard index."""
+    shard_index = (Notification.job_row_number / shard_size).label("shard_index")
+    rows = (
+        db.session.query(shard_index, func.max(Notification.job_row_number))
+        .filter(Notification.job_id == job_id)
+        .group_by(shard_index)
+        .all()
+    )
+    return {int(index): last_row_number for index, last_row_number in rows}
+
+
 def notifications_not_yet_sent(should_be_sending_after_seconds, notification_type):
     older_than_date = datetime.utcnow() - timedelta(seconds=should_be_sending_after_seconds)
 
@@ -983,3 +1195,23 @@ def total_hard_bounces_grouped_by_hour(service_id, default_time=datetime.utcnow(
         .order_by(func.date_trunc("hour", Notification.created_at))
     )
     return query.all()
+
+
+@statsd(namespace="dao")
+def fetch_email_totals_and_hard_bounces_by_service_and_hour(start: datetime, end: datetime):
+    """The emails and the hard bounces of each service created between start and end, grouped by hour, as rows of
+    (service_id, hour, total_notifications, hard_bounces) ordered by service."""
+    hour = func.date_trunc("hour", Notification.created_at)
+    query = (
+        db.session.query(
+            Notification.service_id,
+            hour.label("hour"),
+            func.count().label("total_notifications"),
+            func.count().filter(Notification.feedback_type == NOTIFICATION_HARD_BOUNCE).label("hard_bounces"),
+        )
+        .filter(Notification.created_at.between(start, end))
+        .filter(Notification.notification_type == EMAIL_TYPE)
+        .group_by(Notification.service_id, hour)
+        .order_by(Notification.service_id, hour)
+    )
+    return query.all()
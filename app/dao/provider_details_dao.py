@@ -1,9 +1,11 @@
 from datetime import datetime
+from typing import Tuple
 
 from notifications_utils.timezones import convert_utc_to_local_timezone
 from sqlalchemy import asc, desc, func
 
 from app import db
+from app.cache.local import local_caches
 from app.dao.dao_utils import transactional
 from app.models import (
     SMS_TYPE,
@@ -84,6 +86,27 @@ def get_provider_details_by_notification_type(notification_type, supports_intern
     return ProviderDetails.query.filter(*filters).order_by(asc(ProviderDetails.priority)).all()
 
 
+provider_routing_local_cache = local_caches.cache("provider_routing", feature_flag="FF_PROVIDER_ROUTING_CACHE")
+
+
+def get_active_provider_identifiers(notification_type, supports_international=False) -> Tuple[str, ...]:
+    """
+    Returns the identifiers of the active providers for the notification type, in order of priority.
+
+    The routing table is kept in a local cache when FF_PROVIDER_ROUTING_CACHE is on. Committing a change to
+    ProviderDetails, as dao_toggle_sms_provider and the provider details endpoints do, clears it on every worker.
+    """
+    return local_caches.get_or_load(
+        provider_routing_local_cache,
+        (notification_type, supports_international),
+        lambda: tuple(
+            provider.identifier
+            for provider in get_provider_details_by_notification_type(notification_type, supports_international)
+            if provider.active
+        ),
+    )
+
+
 @transactional
 def dao_update_provider_details(provider_details):
     provider_details.version += 1
@@ -0,0 +1,168 @@
+"""
+Re-signing of a signed column with the current keys of its signer, such as after a key rotation.
+
+The rows are read in chunks by keyset on (created_at, id), so reading a chunk costs the same at the end of a table as
+at its start. The signatures of a chunk are verified and re-signed by a pool of worker processes, outside the database
+session, while the next chunk is read. Only the rows whose signature changed are updated, with one
+UPDATE ... FROM (VALUES ...) per chunk that skips the rows whose signature changed since they were read. Chunks are
+committed in order, so the (created_at, id) of the last row of a committed chunk is a checkpoint to resume from.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import String, cast, column, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app import db
+from app.encryption import CryptoSigner
+
+# (created_at, id) of the last row of a committed chunk
+Checkpoint = Tuple[datetime, UUID]
+
+
+class ResignResult(NamedTuple):
+    rows: int  # rows with a signature read
+    resigned: int  # rows resigned, or needing to be resigned when previewing
+    checkpoint: Optional[Checkpoint]
+
+
+def _resign_signatures(
+    secret_keys: List[str], salt: str, signatures: List[Tuple[UUID, str]], unsafe: bool
+) -> Tuple[List[Tuple[UUID, str, str]], List[UUID]]:
+    """Runs in the worker processes. Returns the (id, old signature, new signature) of the signatures that change,
+    and the ids of the signatures that cannot be verified, which are resigned anyway when unsafe."""
+    serializer = URLSafeSerializer(secret_keys)
+    changed, bad = [], []
+    for id, signature in signatures:
+        try:
+            value = serializer.loads(signature, salt=salt)
+        except BadSignature:
+            if not unsafe:
+                bad.append(id)
+                continue
+            value = serializer.loads_unsafe(signature, salt=salt)[1]
+        new_signature = serializer.dumps(value, salt=salt)
+        if new_signature != signature:
+            changed.append((id, signature, new_signature))
+    return changed, bad
+
+
+def _read_chunk(signed_column, after: Optional[Checkpoint], chunk_size: int) -> list:
+    model = signed_column.class_
+    query = db.session.query(model.created_at, model.id, signed_column.label("signature")).filter(signed_column.isnot(None))
+    if after:
+        query = query.filter(tuple_(model.created_at, model.id) > after)
+    return query.order_by(model.created_at, model.id).limit(chunk_size).all()
+
+
+def _update_signatures(signed_column, changed: List[Tuple[UUID, str, str]]) -> int:
+    model = signed_column.class_
+    # Bound parameters in VALUES are typed as text by PostgreSQL, hence the ids are cast back to uuid
+    resigned = values(column("id", String), column("old", String), column("new", String), name="resigned").data(
+        [(str(id), old, new) for id, old, new in changed]
+    )
+    result = db.session.execute(
+        update(model)
+        .where(model.id == cast(resigned.c.id, PG_UUID(as_uuid=True)), signed_column == resigned.c.old)
+        .values({signed_column: resigned.c.new})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def resign_column(
+    signed_column,
+    signer: CryptoSigner,
+    chunk_size: int,
+    resign: bool,
+    unsafe: bool = False,
+    workers: int = 1,
+    checkpoint: Optional[Checkpoint] = None,
+    on_checkpoint: Optional[Callable[[Checkpoint], None]] = None,
+) -> ResignResult:
+    """Resign a signed column, such as Notification._personalisation, with the current keys of its signer.
+
+    Args:
+        signed_column: mapped column holding the signatures, its model needs id and created_at columns.
+        signer (CryptoSigner): signer of the column.
+        chunk_size (int): number of rows read, resigned and updated at once.
+        resign (bool): resign the column, or only count the rows needing to be resigned.
+        unsafe (bool, optional): resign regardless of whether the unsign step fails with a BadSignature. Defaults to False.
+        workers (int, optional): number of processes resigning chunks in parallel. Defaults to 1.
+        checkpoint (Checkpoint, optional): resume after this (created_at, id). Defaults to None.
+        on_checkpoint (Callable, optional): called with the checkpoint of each chunk once it is resigned and committed.
+            It is not called when previewing, whose checkpoints must not be resumed by a run that resigns.
+
+    Returns:
+        ResignResult: rows read, rows resigned or needing to be resigned, and the last checkpoint.
+
+    Raises:
+        e: BadSignature if the unsign step fails and unsafe is False. The chunks before it are committed.
+    """
+    label = signed_column.class_.__tablename__
+    start = time.monotonic()
+    rows = resigned = 0
+
+    def chunks(after: Optional[Checkpoint]) -> Iterator[Tuple[Checkpoint, List[Tuple[UUID, str]]]]:
+        while True:
+            chunk = _read_chunk(signed_column, after, chunk_size)
+            if not chunk:
+                return
+            after = (chunk[-1].created_at, chunk[-1].id)
+            yield after, [(row.id, row.signature) for row in chunk]
+
+    pending: deque = deque()
+
+    def commit_oldest() -> None:
+        nonlocal rows, resigned, checkpoint
+        chunk_checkpoint, chunk_rows, future = pending.popleft()
+        resigned += _finish_chunk(signed_column, label, future.result(), resign)
+        rows += chunk_rows
+        checkpoint = chunk_checkpoint
+        _log_progress(label, rows, resigned, resign, checkpoint, start)
+        if on_checkpoint and resign:
+            on_checkpoint(checkpoint)
+
+    executor: Executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+    with executor:
+        for chunk_checkpoint, signatures in chunks(checkpoint):
+            future = executor.submit(_resign_signatures, signer.secret_key, signer.salt, signatures, unsafe)
+            pending.append((chunk_checkpoint, len(signatures), future))
+            # Keeps every worker busy while the oldest chunk is committed
+            if len(pending) > workers:
+                commit_oldest()
+        while pending:
+            commit_oldest()
+
+    if resign:
+        current_app.logger.info(f"Overall, {resigned} {label} were resigned")
+    else:
+        current_app.logger.info(f"Overall, {resigned} {label} need resigning")
+    return ResignResult(rows, resigned, checkpoint)
+
+
+def _finish_chunk(signed_column, label: str, result: Tuple[List[Tuple[UUID, str, str]], List[UUID]], resign: bool) -> int:
+    changed, bad = result
+    if bad:
+        db.session.rollback()
+        current_app.logger.warning(f"BadSignature for {label} {bad[0]}")
+        raise BadSignature(f"BadSignature for {label} {bad[0]}")
+    resigned = _update_signatures(signed_column, changed) if resign and changed else len(changed)
+    db.session.commit()
+    return resigned
+
+
+def _log_progress(label: str, rows: int, resigned: int, resign: bool, checkpoint: Checkpoint, start: float) -> None:
+    elapsed = time.monotonic() - start
+    rate = rows / elapsed if elapsed > 0 else 0
+    current_app.logger.info(
+        f"{resigned} of {rows} {label} {'resigned' if resign else 'need resigning'}, "
+        f"up to {checkpoint[0].isoformat()} {checkpoint[1]}, {rate:.0f} rows per second"
+    )
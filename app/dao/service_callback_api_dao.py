@@ -1,10 +1,9 @@
 from datetime import datetime, timezone
 
-from flask import current_app
-from itsdangerous import BadSignature
-
 from app import create_uuid, db, signer_bearer_token
+from app.cache.local import local_caches
 from app.dao.dao_utils import transactional, version_class
+from app.dao.resign_dao import resign_column
 from app.models import (
     COMPLAINT_CALLBACK_TYPE,
     DELIVERY_STATUS_CALLBACK_TYPE,
@@ -12,44 +11,25 @@ from app.models import (
 )
 
 
-@transactional
-def resign_service_callbacks(resign: bool, unsafe: bool = False):
+def resign_service_callbacks(resign: bool, unsafe: bool = False, chunk_size: int = 10000, workers: int = 1) -> int:
     """Resign the _bearer_token column of the service_callbacks table with (potentially) a new key.
 
     Args:
         resign (bool): whether to resign the service_callbacks
         unsafe (bool, optional): resign regardless of whether the unsign step fails with a BadSignature.
         Defaults to False.
+        chunk_size (int, optional): number of rows to update at once. Defaults to 10000.
+        workers (int, optional): number of processes resigning chunks in parallel. Defaults to 1.
+
+    Returns:
+        int: number of service callbacks that were resigned or need to be resigned.
 
     Raises:
         e: BadSignature if the unsign step fails and unsafe is False.
     """
-    rows = ServiceCallbackApi.query.all()  # noqa
-    current_app.logger.info(f"Total of {len(rows)} service callbacks")
-    rows_to_update = []
-
-    for row in rows:
-        if row._bearer_token:
-            try:
-                old_signature = row._bearer_token
-                unsigned_token = getattr(row, "bearer_token")  # unsign the token
-            except BadSignature as e:
-                if unsafe:
-                    unsigned_token = signer_bearer_token.verify_unsafe(row._bearer_token)
-                else:
-                    current_app.logger.error(f"BadSignature for service_callback {row.id}")
-                    raise e
-            setattr(row, "bearer_token", unsigned_token)  # resigns the token with (potentially) a new signing secret
-            if old_signature != row._bearer_token:
-                rows_to_update.append(row)
-            if not resign:
-                row._bearer_token = old_signature  # reset the signature to the old value
-
-    if resign:
-        current_app.logger.info(f"Resigning {len(rows_to_update)} service callbacks")
-        db.session.bulk_save_objects(rows)
-    elif not resign:
-        current_app.logger.info(f"{len(rows_to_update)} service callbacks need resigning")
+    return resign_column(
+        ServiceCallbackApi._bearer_token, signer_bearer_token, chunk_size, resign, unsafe, workers=workers
+    ).resigned
 
 
 @transactional
@@ -82,10 +62,32 @@ def get_service_callback_api(service_callback_api_id, service_id) -> ServiceCall
     return ServiceCallbackApi.query.filter_by(id=service_callback_api_id, service_id=service_id).first()
 
 
-def get_service_delivery_status_callback_api_for_service(service_id) -> ServiceCallbackApi:
+delivery_status_callback_api_local_cache = local_caches.cache("delivery_status_callback_api")
+
+
+def get_service_delivery_status_callback_api_for_service(service_id, use_cache=False) -> ServiceCallbackApi:
+    if use_cache and local_caches.enabled(delivery_status_callback_api_local_cache):
+        # Services without a callback api are cached as False, as the local caches do not store None
+        return (
+            local_caches.get_or_load(
+                delivery_status_callback_api_local_cache,
+                str(service_id),
+                lambda: _fetch_detached_delivery_status_callback_api(service_id) or False,
+            )
+            or None
+        )
     return ServiceCallbackApi.query.filter_by(service_id=service_id, callback_type=DELIVERY_STATUS_CALLBACK_TYPE).first()
 
 
+def _fetch_detached_delivery_status_callback_api(service_id):
+    with db.detached_reader() as session:
+        return (
+            session.query(ServiceCallbackApi)
+            .filter_by(service_id=service_id, callback_type=DELIVERY_STATUS_CALLBACK_TYPE)
+            .first()
+        )
+
+
 def get_service_complaint_callback_api_for_service(service_id) -> ServiceCallbackApi:
     return ServiceCallbackApi.query.filter_by(service_id=service_id, callback_type=COMPLAINT_CALLBACK_TYPE).first()
 
@@ -7,13 +7,15 @@ from flask import current_app
 from notifications_utils.clients.redis import service_cache_key
 from notifications_utils.statsd_decorators import statsd
 from notifications_utils.timezones import convert_utc_to_local_timezone
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.sql.expression import and_, asc, case, func
 
 from app import db, redis_store
+from app.cache.local import local_caches
 from app.dao.dao_utils import VersionOptions, transactional, version_class
-from app.dao.date_util import get_current_financial_year, get_midnight
+from app.dao.date_util import get_current_financial_year, get_current_financial_year_start_year, get_midnight
 from app.dao.email_branding_dao import dao_get_email_branding_by_name
+from app.dao.fact_billing_dao import fetch_notifications_sent_by_service_for_year
 from app.dao.letter_branding_dao import dao_get_letter_branding_by_name
 from app.dao.organisation_dao import dao_get_organisation_by_email_address
 from app.dao.permissions_dao import permission_dao
@@ -88,10 +90,29 @@ def dao_count_live_services():
     ).count()
 
 
-def dao_fetch_live_services_data(filter_heartbeats=None):
-    year_start_date, year_end_date = get_current_financial_year()
+def live_services_billing_totals_key(year):
+    return f"live-services-billing-totals:{year}"
+
+
+def _live_service_columns():
+    return (
+        Service.id.label("service_id"),
+        Service.name.label("service_name"),
+        Organisation.name.label("organisation_name"),
+        Organisation.organisation_type.label("organisation_type"),
+        Service.consent_to_research.label("consent_to_research"),
+        User.name.label("contact_name"),
+        User.email_address.label("contact_email"),
+        User.mobile_number.label("contact_mobile"),
+        Service.go_live_at.label("live_date"),
+        Service.volume_sms.label("sms_volume_intent"),
+        Service.volume_email.label("email_volume_intent"),
+        Service.volume_letter.label("letter_volume_intent"),
+    )
+
 
-    most_recent_annual_billing = (
+def _most_recent_annual_billing():
+    return (
         db.session.query(
             AnnualBilling.service_id,
             func.max(AnnualBilling.financial_year_start).label("year"),
@@ -100,22 +121,85 @@ def dao_fetch_live_services_data(filter_heartbeats=None):
         .subquery()
     )
 
+
+def refresh_live_services_billing_totals():
+    """Cache the notifications sent by each service in the current financial year, as
+    {service_id: [email_totals, sms_totals, letter_totals]}, and return them."""
+    year = get_current_financial_year_start_year()
+    totals = {
+        str(row.service_id): [int(row.email_totals), int(row.sms_totals), int(row.letter_totals)]
+        for row in fetch_notifications_sent_by_service_for_year(year)
+    }
+    redis_store.set(
+        live_services_billing_totals_key(year),
+        json.dumps(totals),
+        ex=current_app.config["LIVE_SERVICES_REPORT_CACHE_SECONDS"],
+    )
+    return totals
+
+
+def _get_live_services_billing_totals():
+    cached = redis_store.get(live_services_billing_totals_key(get_current_financial_year_start_year()))
+    if cached:
+        return json.loads(cached)
+    return refresh_live_services_billing_totals()
+
+
+def _fetch_live_services_report(filter_heartbeats):
+    """One row per live service with the notifications it sent in the current financial year. The totals come from
+    a pivot of ft_billing cached after the nightly billing, so the report itself only reads the services."""
+    most_recent_annual_billing = _most_recent_annual_billing()
+    query = (
+        db.session.query(*_live_service_columns(), AnnualBilling.free_sms_fragment_limit)
+        .join(Service.annual_billing)
+        .join(
+            most_recent_annual_billing,
+            and_(
+                Service.id == most_recent_annual_billing.c.service_id,
+                AnnualBilling.financial_year_start == most_recent_annual_billing.c.year,
+            ),
+        )
+        .outerjoin(Service.organisation)
+        .outerjoin(User, Service.go_live_user_id == User.id)
+        .filter(
+            Service.count_as_live.is_(True),
+            Service.active.is_(True),
+            Service.restricted.is_(False),
+        )
+        .order_by(asc(Service.go_live_at))
+    )
+    if filter_heartbeats:
+        query = query.filter(Service.id != current_app.config["NOTIFY_SERVICE_ID"])
+
+    totals = _get_live_services_billing_totals()
+    results = []
+    for row in query.all():
+        service = row._asdict()
+        free_sms_fragment_limit = service.pop("free_sms_fragment_limit")
+        email_totals, sms_totals, letter_totals = totals.get(str(row.service_id), (0, 0, 0))
+        service.update(
+            email_totals=email_totals,
+            sms_totals=sms_totals,
+            letter_totals=letter_totals,
+            free_sms_fragment_limit=free_sms_fragment_limit,
+        )
+        results.append(service)
+    return results
+
+
+def dao_fetch_live_services_data(filter_heartbeats=None):
+    if current_app.config["FF_LIVE_SERVICES_REPORT"]:
+        return _fetch_live_services_report(filter_heartbeats)
+
+    year_start_date, year_end_date = get_current_financial_year()
+
+    most_recent_annual_billing = _most_recent_annual_billing()
+
     this_year_ft_billing = FactBilling.query.subquery()
 
     data = (
         db.session.query(
-            Service.id.label("service_id"),
-            Service.name.label("service_name"),
-            Organisation.name.label("organisation_name"),
-            Organisation.organisation_type.label("organisation_type"),
-            Service.consent_to_research.label("consent_to_research"),
-            User.name.label("contact_name"),
-            User.email_address.label("contact_email"),
-            User.mobile_number.label("contact_mobile"),
-            Service.go_live_at.label("live_date"),
-            Service.volume_sms.label("sms_volume_intent"),
-            Service.volume_email.label("email_volume_intent"),
-            Service.volume_letter.label("letter_volume_intent"),
+            *_live_service_columns(),
             case(
                 [
                     (
@@ -198,12 +282,23 @@ def dao_fetch_live_services_data(filter_heartbeats=None):
     return results
 
 
+service_local_cache = local_caches.cache("service")
+service_with_api_keys_local_cache = local_caches.cache("service_with_api_keys")
+
+
+def _get_cached_service(service_id):
+    service_cache = redis_store.get(service_cache_key(service_id))
+    if service_cache:
+        service_cache_decoded = json.loads(service_cache.decode("utf-8"))["data"]
+        return Service.from_json(service_cache_decoded)
+    return None
+
+
 def dao_fetch_service_by_id(service_id, only_active=False, use_cache=False) -> Service:
     if use_cache:
-        service_cache = redis_store.get(service_cache_key(service_id))
-        if service_cache:
-            service_cache_decoded = json.loads(service_cache.decode("utf-8"))["data"]
-            return Service.from_json(service_cache_decoded)
+        service = local_caches.get_or_load(service_local_cache, str(service_id), lambda: _get_cached_service(service_id))
+        if service:
+            return service
 
     query = Service.query.filter_by(id=service_id).options(joinedload("users"))
     if only_active:
@@ -220,7 +315,12 @@ def dao_fetch_service_by_inbound_number(number):
     return Service.query.filter(Service.id == inbound_number.service_id).first()
 
 
-def dao_fetch_service_by_id_with_api_keys(service_id, only_active=False):
+def dao_fetch_service_by_id_with_api_keys(service_id, only_active=False, use_cache=False):
+    if use_cache and not only_active and local_caches.enabled(service_with_api_keys_local_cache):
+        return local_caches.get_or_load(
+            service_with_api_keys_local_cache, str(service_id), lambda: _fetch_detached_service_with_api_keys(service_id)
+        )
+
     query = db.on_reader().query(Service).filter_by(id=service_id).options(joinedload("api_keys"))
 
     if only_active:
@@ -229,6 +329,27 @@ def dao_fetch_service_by_id_with_api_keys(service_id, only_active=False):
     return query.one()
 
 
+def _fetch_detached_service_with_api_keys(service_id):
+    # Everything the API reads from the authenticated service when sending a notification is loaded
+    # up front, as the detached service cannot lazy load relationships. selectinload avoids joining
+    # the collections into one cartesian product.
+    with db.detached_reader() as session:
+        return (
+            session.query(Service)
+            .filter_by(id=service_id)
+            .options(
+                selectinload("api_keys"),
+                selectinload("permissions"),
+                selectinload("reply_to_email_addresses"),
+                selectinload("service_sms_senders"),
+                selectinload("letter_contacts"),
+                selectinload("users"),
+                selectinload("safelist"),
+            )
+            .one()
+        )
+
+
 def dao_fetch_all_services_by_user(user_id, only_active=False):
     query = Service.query.filter(Service.users.any(id=user_id)).order_by(asc(Service.created_at)).options(joinedload("users"))
 
@@ -9,6 +9,7 @@ from sqlalchemy import asc, desc
 from sqlalchemy.orm import joinedload
 
 from app import db, redis_store
+from app.cache.local import local_caches
 from app.dao.dao_utils import VersionOptions, transactional, version_class
 from app.dao.users_dao import get_user_by_id
 from app.models import (
@@ -159,12 +160,51 @@ def dao_redact_template(template, user_id):
     db.session.add(template.template_redacted)
 
 
-def dao_get_template_by_id_and_service_id(template_id, service_id, version=None):
+template_local_cache = local_caches.cache("template")
+template_for_service_local_cache = local_caches.cache("template_for_service")
+
+
+def dao_get_template_by_id_and_service_id(template_id, service_id, version=None, use_cache=False):
     if version is not None:
         return TemplateHistory.query.filter_by(id=template_id, hidden=False, service_id=service_id, version=version).one()
+    if use_cache and local_caches.enabled(template_for_service_local_cache):
+        return local_caches.get_or_load(
+            template_for_service_local_cache,
+            (str(template_id), str(service_id)),
+            lambda: _fetch_detached_template_for_service(template_id, service_id),
+        )
     return db.on_reader().query(Template).filter_by(id=template_id, hidden=False, service_id=service_id).one()
 
 
+def _fetch_detached_template_for_service(template_id, service_id):
+    # The detached template cannot lazy load relationships, so load what sending and
+    # reply_to_text need up front.
+    with db.detached_reader() as session:
+        return (
+            session.query(Template)
+            .filter_by(id=template_id, hidden=False, service_id=service_id)
+            .options(
+                joinedload("template_category"),
+                joinedload("template_redacted"),
+                joinedload("service_letter_contact"),
+                joinedload("service").selectinload("reply_to_email_addresses"),
+                joinedload("service").selectinload("service_sms_senders"),
+            )
+            .one()
+        )
+
+
+def _get_cached_template(template_id, version):
+    template_cache = redis_store.get(template_version_cache_key(template_id, version))
+    if template_cache:
+        template_cache_decoded = json.loads(template_cache.decode("utf-8"))["data"]
+        if version:
+            return TemplateHistory.from_json(template_cache_decoded)
+        else:
+            return Template.from_json(template_cache_decoded)
+    return None
+
+
 def dao_get_template_by_id(template_id, version=None, use_cache=False) -> Union[Template, TemplateHistory]:
     if use_cache:
         # When loading a SQLAlchemy object from cache it is in the transient state.
@@ -173,13 +213,11 @@ def dao_get_template_by_id(template_id, version=None, use_cache=False) -> Union[
         # to retrieve the latest data for that row. Since we do not want to add the object
         # to the session it means some fields such as reply_to_text would be missing
         # so we also return the cached data.
-        template_cache = redis_store.get(template_version_cache_key(template_id, version))
-        if template_cache:
-            template_cache_decoded = json.loads(template_cache.decode("utf-8"))["data"]
-            if version:
-                return TemplateHistory.from_json(template_cache_decoded)
-            else:
-                return Template.from_json(template_cache_decoded)
+        template = local_caches.get_or_load(
+            template_local_cache, (str(template_id), version), lambda: _get_cached_template(template_id, version)
+        )
+        if template:
+            return template
     if version is not None:
         return TemplateHistory.query.filter_by(id=template_id, version=version).one()
     return Template.query.filter_by(id=template_id).one()
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from functools import cached_property, partial
 from time import perf_counter
 from typing import Any, Optional
@@ -75,6 +76,24 @@ class RoutingSQLAlchemy(SQLAlchemy):
     def on_reader(self):
         return self.session().using_bind("reader")
 
+    @contextmanager
+    def detached_reader(self):
+        """
+        Yields a short-lived session on the reader bind. Objects loaded through it are detached
+        when it closes, without being expired, so they can be kept past the current request.
+        Relationships that were not loaded eagerly cannot be accessed on them afterwards.
+
+        The whole session is bound to the reader, as using_bind only routes the next query there and
+        the follow-up queries of selectinload would go to the writer.
+        """
+        app = self.get_app()
+        binds = app.config["SQLALCHEMY_BINDS"] or {}
+        session = orm.Session(bind=self.get_engine(app, bind="reader" if "reader" in binds else None), query_cls=BaseQuery)
+        try:
+            yield session
+        finally:
+            session.close()
+
     def create_scoped_session(self, options=None):
         options = options or {}
         options.setdefault("query_cls", BaseQuery)
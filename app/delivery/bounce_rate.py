@@ -1,3 +1,7 @@
+from collections import Counter
+from typing import Dict
+from uuid import UUID
+
 from flask import current_app
 from notifications_utils.clients.redis import service_cache_key
 from notifications_utils.clients.redis.bounce_rate import (
@@ -8,17 +12,24 @@ from notifications_utils.clients.redis.bounce_rate import (
 from app import bounce_rate_client, notify_celery, redis_store
 from app.config import QueueNames
 from app.dao.service_permissions_dao import dao_remove_service_permission
+from app.delivery.bounce_rate_buckets import HARD_BOUNCE, SENT, bounce_rate_buckets
 from app.models import EMAIL_TYPE
 
 
 def check_service_over_bounce_rate(service_id: str):
-    bounce_rate = bounce_rate_client.get_bounce_rate(service_id)
-    bounce_rate_status = bounce_rate_client.check_bounce_rate_status(service_id)
-    total_notifications = bounce_rate_client.get_total_notifications(service_id)
-    current_app.logger.info(
-        f"Service id: {service_id} Bounce Rate: {bounce_rate} Bounce Status: {bounce_rate_status}, "
-        f"Total Notifications: {total_notifications}"
-    )
+    if current_app.config["FF_BOUNCE_RATE_BUCKETS"]:
+        bounce_rate, total_notifications = bounce_rate_buckets.get_bounce_rate(service_id)
+        current_app.logger.info(
+            f"Service id: {service_id} Bounce Rate: {bounce_rate}, Total Notifications: {total_notifications}"
+        )
+    else:
+        bounce_rate = bounce_rate_client.get_bounce_rate(service_id)
+        bounce_rate_status = bounce_rate_client.check_bounce_rate_status(service_id)
+        total_notifications = bounce_rate_client.get_total_notifications(service_id)
+        current_app.logger.info(
+            f"Service id: {service_id} Bounce Rate: {bounce_rate} Bounce Status: {bounce_rate_status}, "
+            f"Total Notifications: {total_notifications}"
+        )
 
     critical_threshold = current_app.config["BR_CRITICAL_PERCENTAGE"]
     warning_threshold = current_app.config["BR_WARNING_PERCENTAGE"]
@@ -70,3 +81,22 @@ def check_service_over_bounce_rate(service_id: str):
                         f"Failed to send warning email for service {service_id}, clearing cache key to allow retry"
                     )
                     redis_store.delete(cache_key)
+
+
+def count_sent_email(service_id) -> None:
+    """Counts an email sent to the provider in the bounce rate buckets, and evaluates the bounce rate of the service
+    if this worker has not done it in the last BR_CHECK_INTERVAL_SECONDS."""
+    bounce_rate_buckets.increment({service_id: Counter({SENT: 1})})
+    if bounce_rate_buckets.should_check(service_id):
+        check_service_over_bounce_rate(service_id)
+
+
+def count_hard_bounces(hard_bounces_by_service: Dict[UUID, int]) -> None:
+    """Counts the hard bounces of each service in the bounce rate buckets in one Redis round trip, then evaluates the
+    bounce rate of the services this worker has not evaluated in the last BR_CHECK_INTERVAL_SECONDS."""
+    bounce_rate_buckets.increment(
+        {service_id: Counter({HARD_BOUNCE: count}) for service_id, count in hard_bounces_by_service.items()}
+    )
+    for service_id in hard_bounces_by_service:
+        if bounce_rate_buckets.should_check(service_id):
+            check_service_over_bounce_rate(service_id)
@@ -0,0 +1,143 @@
+"""
+Bounce rate counters of services kept as time buckets in a Redis hash.
+
+The bounce rate client of notifications_utils adds a sorted set member per email sent and per hard bounce, so its
+memory, and the cost of seeding it, grow with the volume of the service. Here each service has one hash,
+bounce-rate-buckets:{service_id}, holding the count of emails sent and of hard bounces of each bucket of
+BR_BUCKET_SECONDS, in fields such as "sent:5712345". A service keeps at most one field per counter and bucket of the
+window, so its memory and its seeding cost do not depend on its volume:
+
+- incrementing a counter also deletes the field of the bucket leaving the window, in the same round trip, which
+  makes the hash a ring of BR_WINDOW_SECONDS / BR_BUCKET_SECONDS buckets;
+- reading the counts sums the buckets of the window, and deletes the fields a quiet service left behind;
+- the key expires one window after its last increment.
+
+The window moves by whole buckets, so the counts cover between the window minus one bucket and the window.
+
+The bounce rate only goes up with a hard bounce, and only reaches the volume minimum with an email sent, so it is
+evaluated when either is counted. should_check limits the evaluations of a service to one every
+BR_CHECK_INTERVAL_SECONDS per worker.
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+SENT = "sent"
+HARD_BOUNCE = "hard_bounce"
+COUNTERS = (SENT, HARD_BOUNCE)
+
+# Rows of (start of the bucket, emails sent, hard bounces) to seed the counters of a service with
+SeedRow = Tuple[datetime, int, int]
+
+
+def bounce_rate_buckets_key(service_id) -> str:
+    return f"bounce-rate-buckets:{service_id}"
+
+
+class BucketedBounceRate:
+    def __init__(self, redis_client=None, bucket_seconds: int = 300, window_seconds: int = 24 * 60 * 60) -> None:
+        self.redis_client = redis_client
+        self.bucket_seconds = bucket_seconds
+        self.window_seconds = window_seconds
+        self.check_interval_seconds = 60.0
+        self._last_checks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, redis_store) -> None:
+        self.redis_client = redis_store.redis_store
+        self.bucket_seconds = app.config["BR_BUCKET_SECONDS"]
+        self.window_seconds = app.config["BR_WINDOW_SECONDS"]
+        self.check_interval_seconds = app.config["BR_CHECK_INTERVAL_SECONDS"]
+        self.clear_checks()
+
+    @property
+    def ring_size(self) -> int:
+        return max(1, self.window_seconds // self.bucket_seconds)
+
+    def bucket(self, timestamp: Optional[float] = None) -> int:
+        return int((time.time() if timestamp is None else timestamp) // self.bucket_seconds)
+
+    def increment(self, counts_by_service: Dict[UUID, Counter], timestamp: Optional[float] = None) -> None:
+        """
+        Adds the counts of each service, keyed by SENT or HARD_BOUNCE, to its current bucket in a single Redis round
+        trip.
+        """
+        bucket = self.bucket(timestamp)
+        expired = bucket - self.ring_size
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for service_id, counts in counts_by_service.items():
+            key = bounce_rate_buckets_key(service_id)
+            for counter, count in counts.items():
+                if count:
+                    pipeline.hincrby(key, f"{counter}:{bucket}", count)
+            pipeline.hdel(key, *(f"{counter}:{expired}" for counter in COUNTERS))
+            pipeline.expire(key, self.window_seconds + self.bucket_seconds)
+        pipeline.execute()
+
+    def get_counts(self, service_id, timestamp: Optional[float] = None) -> Tuple[int, int]:
+        """Returns the emails sent and the hard bounces of the service in the window."""
+        key = bounce_rate_buckets_key(service_id)
+        current = self.bucket(timestamp)
+        oldest = current - self.ring_size + 1
+        totals: Counter = Counter()
+        stale = []
+        for field, value in self.redis_client.hgetall(key).items():
+            field = field.decode("utf-8") if isinstance(field, bytes) else field
+            counter, _, bucket = field.partition(":")
+            if oldest <= int(bucket) <= current:
+                totals[counter] += int(value)
+            elif int(bucket) < oldest:
+                stale.append(field)
+        if stale:
+            self.redis_client.hdel(key, *stale)
+        return totals[SENT], totals[HARD_BOUNCE]
+
+    def get_bounce_rate(self, service_id, timestamp: Optional[float] = None) -> Tuple[float, int]:
+        """Returns the bounce rate of the service in the window, and the emails sent it is computed on."""
+        total_notifications, hard_bounces = self.get_counts(service_id, timestamp)
+        return (hard_bounces / total_notifications if total_notifications else 0.0), total_notifications
+
+    def seed(self, rows_by_service: Dict[UUID, Iterable[SeedRow]]) -> None:
+        """
+        Replaces the counters of each service with the counts of its rows, such as the hourly totals of its
+        notifications, in a single Redis transaction. Rows older than the window are ignored.
+        """
+        oldest = self.bucket() - self.ring_size + 1
+        pipeline = self.redis_client.pipeline()
+        for service_id, rows in rows_by_service.items():
+            key = bounce_rate_buckets_key(service_id)
+            fields: Counter = Counter()
+            for start, sent, hard_bounces in rows:
+                # The notifications are stored in naive UTC datetimes
+                bucket = self.bucket((start if start.tzinfo else start.replace(tzinfo=timezone.utc)).timestamp())
+                if bucket >= oldest:
+                    fields[f"{SENT}:{bucket}"] += sent
+                    fields[f"{HARD_BOUNCE}:{bucket}"] += hard_bounces
+            pipeline.delete(key)
+            fields = +fields
+            if fields:
+                pipeline.hset(key, mapping=fields)
+                pipeline.expire(key, self.window_seconds + self.bucket_seconds)
+        pipeline.execute()
+
+    def should_check(self, service_id) -> bool:
+        """True if this worker has not evaluated the bounce rate of the service in the last BR_CHECK_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        key = str(service_id)
+        with self._lock:
+            last_check = self._last_checks.get(key)
+            if last_check is not None and now - last_check < self.check_interval_seconds:
+                return False
+            self._last_checks[key] = now
+            return True
+
+    def clear_checks(self) -> None:
+        with self._lock:
+            self._last_checks.clear()
+
+
+bounce_rate_buckets = BucketedBounceRate()
@@ -2,8 +2,11 @@ import base64
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 from uuid import UUID
 
@@ -30,18 +33,20 @@ from app import (
     redis_store,
     statsd_client,
 )
+from app.cache.attachments import template_attachment_cache
+from app.cache.templates import rendered_template_cache
 from app.celery.research_mode_tasks import send_email_response, send_sms_response
 from app.clients.sms import SmsSendingVehicles
 from app.config import Config
 from app.dao.files_dao import dao_get_ready_files_by_template_id
-from app.dao.notifications_dao import dao_update_notification
+from app.dao.notifications_dao import dao_update_notification, update_notification_statuses
 from app.dao.provider_details_dao import (
     dao_toggle_sms_provider,
-    get_provider_details_by_notification_type,
+    get_active_provider_identifiers,
 )
 from app.dao.template_categories_dao import dao_get_template_category_by_id
 from app.dao.templates_dao import dao_get_template_by_id
-from app.delivery.bounce_rate import check_service_over_bounce_rate
+from app.delivery.bounce_rate import check_service_over_bounce_rate, count_sent_email
 from app.exceptions import (
     DocumentDownloadException,
     InvalidUrlException,
@@ -121,6 +126,24 @@ def _get_template_files_from_cache_or_db(job_id: Optional[UUID], template_id: UU
     return file_metadata
 
 
+_document_download_http: Optional[PoolManager] = None
+_document_download_http_pid: Optional[int] = None
+
+
+def _get_document_download_http() -> PoolManager:
+    """
+    Returns the connection pool of this worker process for document-download-api, which keeps connections alive
+    between downloads. It is created again in forked worker processes, which must not share the sockets of their parent.
+    """
+    global _document_download_http, _document_download_http_pid
+    if _document_download_http is None or _document_download_http_pid != os.getpid():
+        _document_download_http = PoolManager(
+            retries=Retry(total=5), maxsize=current_app.config["DOCUMENT_DOWNLOAD_POOL_MAXSIZE"]
+        )
+        _document_download_http_pid = os.getpid()
+    return _document_download_http
+
+
 def _download_template_file(
     service_id: UUID, document_id: str, filename: str, mime_type: Optional[str]
 ) -> Optional[Dict[str, Any]]:
@@ -130,28 +153,25 @@ def _download_template_file(
     Files are only included if they have status='uploaded', meaning they have already
     passed the malware scan, so no additional scan check is needed.
 
+    When FF_TEMPLATE_ATTACHMENT_CACHE is on, the file is read from the template attachment cache
+    and only downloaded on a miss.
+
     Returns: {"name": str, "data": bytes, "mime_type": str} or None if download fails
     """
     try:
-        current_app.logger.info(f"Downloading template file: document_id={document_id}, service_id={service_id}")
-        # Construct download URL with query parameter
-        url = f"{current_app.config.get('DOCUMENT_DOWNLOAD_API_HOST')}/services/{service_id}/documents/{document_id}?sending_method=template_attach"
-        auth_header = f"Bearer {current_app.config.get('DOCUMENT_DOWNLOAD_API_KEY')}"
-        retries = Retry(total=5)
-        http = PoolManager(retries=retries)
-        response = http.request(
-            "GET",
-            url=url,
-            headers={"Authorization": auth_header},
-        )
+        if current_app.config["FF_TEMPLATE_ATTACHMENT_CACHE"]:
+            data = template_attachment_cache.get_or_download(
+                service_id, document_id, lambda: _fetch_template_file_data(service_id, document_id)
+            )
+        else:
+            data = _fetch_template_file_data(service_id, document_id)
 
-        if response.status != 200:
-            current_app.logger.error(f"Failed to download template file {document_id}: HTTP {response.status}")
+        if data is None:
             return None
 
         return {
             "name": filename,
-            "data": response.data,
+            "data": data,
             "mime_type": mime_type or "application/octet-stream",
         }
 
@@ -160,7 +180,25 @@ def _download_template_file(
         return None
 
 
-def _get_template_attachments(notification: Notification) -> List[Dict[str, Any]]:
+def _fetch_template_file_data(service_id: UUID, document_id: str) -> Optional[bytes]:
+    current_app.logger.info(f"Downloading template file: document_id={document_id}, service_id={service_id}")
+    # Construct download URL with query parameter
+    url = f"{current_app.config.get('DOCUMENT_DOWNLOAD_API_HOST')}/services/{service_id}/documents/{document_id}?sending_method=template_attach"
+    auth_header = f"Bearer {current_app.config.get('DOCUMENT_DOWNLOAD_API_KEY')}"
+    response = _get_document_download_http().request(
+        "GET",
+        url=url,
+        headers={"Authorization": auth_header},
+    )
+
+    if response.status != 200:
+        current_app.logger.error(f"Failed to download template file {document_id}: HTTP {response.status}")
+        return None
+
+    return response.data
+
+
+def _get_template_attachments(notification: Notification, lookups: Optional["EmailBatchLookups"] = None) -> List[Dict[str, Any]]:
     """
     Fetch and download template file attachments for a notification.
 
@@ -175,7 +213,10 @@ def _get_template_attachments(notification: Notification) -> List[Dict[str, Any]
     template_attachments = []
 
     # Get file metadata from cache or DB
-    file_metadata = _get_template_files_from_cache_or_db(notification.job_id, notification.template_id)
+    if lookups is None:
+        file_metadata = _get_template_files_from_cache_or_db(notification.job_id, notification.template_id)
+    else:
+        file_metadata = lookups.template_files(notification.job_id, notification.template_id)
 
     if not file_metadata:
         return []
@@ -245,9 +286,10 @@ def send_sms_to_provider(notification):
     template_dict = template_obj.__dict__
     template_dict["process_type"] = template_obj.process_type
 
-    template = SMSMessageTemplate(
+    template = _build_template(
+        SMSMessageTemplate,
         template_dict,
-        values=notification.personalisation,
+        notification.personalisation,
         prefix=service.name,
         show_prefix=service.prefix_sms,
     )
@@ -301,6 +343,13 @@ def send_sms_to_provider(notification):
     statsd_client.incr(statsd_key)
 
 
+def _build_template(template_class, template_dict: Dict[str, Any], values: Optional[Dict[str, Any]], **options):
+    """Builds the template object to render, from the render cache when FF_TEMPLATE_RENDER_CACHE is on."""
+    if current_app.config["FF_TEMPLATE_RENDER_CACHE"]:
+        return rendered_template_cache.get(template_class, template_dict, values, **options)
+    return template_class(template_dict, values=values, **options)
+
+
 def is_service_allowed_html(service: Service) -> bool:
     """
     If a service id is present in ALLOW_HTML_SERVICE_IDS, then they are allowed to put html
@@ -440,20 +489,141 @@ def _normalise_file_personalisation(personalisation_data: Optional[Dict[str, Any
     return normalised_personalisation
 
 
+@dataclass
+class PreparedEmail:
+    """An email rendered by _prepare_email. send_args is None when the email is not sent to the provider."""
+
+    notification: Notification
+    provider: Any
+    process_type: str
+    has_attachments: bool
+    send_args: Optional[tuple] = None
+    send_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+class EmailBatchLookups:
+    """Memoises the lookups shared by the emails of one send_emails_to_provider call."""
+
+    def __init__(self) -> None:
+        self.provider = None
+        self._templates: Dict[tuple, Any] = {}
+        self._html_email_options: Dict[UUID, dict] = {}
+        self._template_files: Dict[tuple, List[Dict[str, Any]]] = {}
+        self.bounce_rate_checked_services: set = set()
+
+    def template(self, template_id: UUID, version: int):
+        if (template_id, version) not in self._templates:
+            self._templates[(template_id, version)] = dao_get_template_by_id(template_id, version)
+        return self._templates[(template_id, version)]
+
+    def html_email_options(self, service: Service) -> dict:
+        if service.id not in self._html_email_options:
+            self._html_email_options[service.id] = get_html_email_options(service)
+        return self._html_email_options[service.id]
+
+    def template_files(self, job_id: Optional[UUID], template_id: UUID) -> List[Dict[str, Any]]:
+        if (job_id, template_id) not in self._template_files:
+            self._template_files[(job_id, template_id)] = _get_template_files_from_cache_or_db(job_id, template_id)
+        return self._template_files[(job_id, template_id)]
+
+
 def send_email_to_provider(notification: Notification):
+    prepared_email = _prepare_email(notification)
+    if prepared_email is None:
+        return
+    _finish_email(prepared_email, _send_prepared_email(prepared_email))
+    update_notification_to_sending(notification, prepared_email.provider)
+    _record_email_stats(prepared_email)
+
+
+def send_emails_to_provider(notifications: List[Notification]) -> Dict[UUID, Exception]:
+    """
+    Sends a batch of emails: the emails are rendered with shared templates and branding, sent to the provider
+    with at most EMAIL_BATCH_MAX_CONCURRENCY requests in flight, and set to sending with one bulk update.
+
+    Returns the exceptions raised for the notifications that could not be sent, by notification id.
+    """
+    lookups = EmailBatchLookups()
+    errors: Dict[UUID, Exception] = {}
+    prepared_emails: List[PreparedEmail] = []
+    for notification in notifications:
+        try:
+            prepared_email = _prepare_email(notification, lookups)
+        except Exception as e:
+            errors[notification.id] = e
+            continue
+        if prepared_email is not None:
+            prepared_emails.append(prepared_email)
+
+    app = current_app._get_current_object()  # type: ignore
+
+    def send(prepared_email: PreparedEmail):
+        with app.app_context():
+            return _send_prepared_email(prepared_email)
+
+    provider_emails = [prepared_email for prepared_email in prepared_emails if prepared_email.send_args is not None]
+    references: Dict[UUID, Any] = {}
+    if provider_emails:
+        max_workers = min(len(provider_emails), current_app.config["EMAIL_BATCH_MAX_CONCURRENCY"])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                prepared_email.notification.id: executor.submit(send, prepared_email) for prepared_email in provider_emails
+            }
+        for notification_id, future in futures.items():
+            try:
+                references[notification_id] = future.result()
+            except Exception as e:
+                errors[notification_id] = e
+
+    sent_emails = []
+    try:
+        for prepared_email in prepared_emails:
+            notification = prepared_email.notification
+            if notification.id in errors:
+                continue
+            if prepared_email.send_args is None:
+                # research mode and test emails only queue a fake receipt, so they are not worth a thread
+                try:
+                    references[notification.id] = _send_prepared_email(prepared_email)
+                except Exception as e:
+                    errors[notification.id] = e
+                    continue
+            # The email is sent, so it is set to sending whatever happens next, or a replay would send it again
+            _set_notification_to_sending(notification, prepared_email.provider)
+            sent_emails.append(prepared_email)
+            try:
+                _finish_email(prepared_email, references[notification.id], lookups)
+            except Exception as e:
+                current_app.logger.exception(f"Notification id {notification.id} was sent but could not be finished")
+                errors[notification.id] = e
+    finally:
+        if sent_emails:
+            update_notification_statuses([prepared_email.notification for prepared_email in sent_emails])
+    for prepared_email in sent_emails:
+        _record_email_stats(prepared_email)
+    return errors
+
+
+def _prepare_email(notification: Notification, lookups: Optional[EmailBatchLookups] = None) -> Optional[PreparedEmail]:
+    """Renders the email of a notification, or returns None when the notification must not be sent."""
     current_app.logger.info(f"Sending email to provider for notification id {notification.id}")
     service = notification.service
     if not service.active:
         inactive_service_failure(notification=notification)
-        return
+        return None
 
     # Only process notifications with status 'created' to guarantee idempotency of this
     # function. If the status is not 'created', it means the notification has already
     # been processed and sent to a provider, so we should not attempt to send it again.
     if notification.status != "created":
-        return
+        return None
 
-    provider = provider_to_use(EMAIL_TYPE, notification.id)
+    if lookups is None:
+        provider = provider_to_use(EMAIL_TYPE, notification.id)
+    else:
+        # The email provider does not depend on the notification, so a batch looks it up once
+        lookups.provider = lookups.provider or provider_to_use(EMAIL_TYPE, notification.id)
+        provider = lookups.provider
 
     attachments = []
     personalisation_data = (notification.personalisation or {}).copy()
@@ -504,11 +674,14 @@ def send_email_to_provider(notification: Notification):
                 personalisation_data[key] = personalisation_data[key]["document"]["url"]
 
     # Fetch and merge template file attachments
-    template_attachments = _get_template_attachments(notification)
+    template_attachments = _get_template_attachments(notification, lookups)
     attachments = attachments + template_attachments
     personalisation_data = _normalise_file_personalisation(personalisation_data)
 
-    template_obj = dao_get_template_by_id(notification.template_id, notification.template_version)
+    if lookups is None:
+        template_obj = dao_get_template_by_id(notification.template_id, notification.template_version)
+    else:
+        template_obj = lookups.template(notification.template_id, notification.template_version)
     template_dict = template_obj.__dict__
     template_dict["process_type"] = template_obj.process_type
 
@@ -520,15 +693,16 @@ def send_email_to_provider(notification: Notification):
         if os.environ.get("USE_LOCAL_JINJA_TEMPLATES") == "True"
         else None
     )
-    html_email = HTMLEmailTemplate(
+    html_email = _build_template(
+        HTMLEmailTemplate,
         template_dict,
-        values=personalisation_data,
+        personalisation_data,
         jinja_path=debug_template_path,
         allow_html=is_service_allowed_html(service),
-        **get_html_email_options(service),
+        **(get_html_email_options(service) if lookups is None else lookups.html_email_options(service)),
     )
 
-    plain_text_email = PlainTextEmailTemplate(template_dict, values=personalisation_data)
+    plain_text_email = _build_template(PlainTextEmailTemplate, template_dict, personalisation_data)
 
     if current_app.config["SCAN_FOR_PII"]:
         contains_pii(notification, str(plain_text_email))
@@ -545,58 +719,92 @@ def send_email_to_provider(notification: Notification):
         )
         unsubscribe_link_for_header = _validate_unsubscribe_url(raw_url, notification.id)
 
+    prepared_email = PreparedEmail(
+        notification=notification,
+        provider=provider,
+        process_type=template_dict["process_type"],
+        has_attachments=bool(attachments),
+    )
     current_app.logger.info(
         f"Trying to update notification id {notification.id} with service research {service.research_mode} or key type {notification.key_type}"
     )
     if service.research_mode or notification.key_type == KEY_TYPE_TEST:
-        notification.reference = send_email_response(notification.to)
-        update_notification_to_sending(notification, provider)
+        return prepared_email
     elif notification.to == Config.INTERNAL_TEST_EMAIL_ADDRESS:
         current_app.logger.info(f"notification {notification.id} sending to internal test email address. Not sending to AWS")
-        notification.reference = send_email_response(notification.to)
-        update_notification_to_sending(notification, provider)
+        return prepared_email
+
+    if service.sending_domain is None or service.sending_domain.strip() == "":
+        sending_domain = current_app.config["NOTIFY_EMAIL_DOMAIN"]
     else:
-        if service.sending_domain is None or service.sending_domain.strip() == "":
-            sending_domain = current_app.config["NOTIFY_EMAIL_DOMAIN"]
-        else:
-            sending_domain = service.sending_domain
-
-        from_address = get_from_address(friendly_from=service.name, email_from=service.email_from, sending_domain=sending_domain)
-        email_reply_to = notification.reply_to_text
-
-        reference = provider.send_email(
-            from_address,
-            validate_and_format_email_address(notification.to),
-            plain_text_email.subject,
-            body=str(plain_text_email),
-            html_body=str(html_email),
-            reply_to_address=validate_and_format_email_address(email_reply_to) if email_reply_to else None,
-            attachments=attachments,
-            extra_headers=_get_unsubscribe_headers(unsubscribe_link_for_header),
-        )
-        check_service_over_bounce_rate_old(service.id) if current_app.config[
-            "TEST_OLD_BOUNCE_RATE"
-        ] else check_service_over_bounce_rate(service.id)
+        sending_domain = service.sending_domain
+
+    from_address = get_from_address(friendly_from=service.name, email_from=service.email_from, sending_domain=sending_domain)
+    email_reply_to = notification.reply_to_text
+
+    prepared_email.send_args = (
+        from_address,
+        validate_and_format_email_address(notification.to),
+        plain_text_email.subject,
+    )
+    prepared_email.send_kwargs = dict(
+        body=str(plain_text_email),
+        html_body=str(html_email),
+        reply_to_address=validate_and_format_email_address(email_reply_to) if email_reply_to else None,
+        attachments=attachments,
+        extra_headers=_get_unsubscribe_headers(unsubscribe_link_for_header),
+    )
+    return prepared_email
+
+
+def _send_prepared_email(prepared_email: PreparedEmail):
+    """Sends the email to the provider and returns its reference, or fakes a receipt for emails not sent to the provider."""
+    if prepared_email.send_args is None:
+        return send_email_response(prepared_email.notification.to)
+    return prepared_email.provider.send_email(*prepared_email.send_args, **prepared_email.send_kwargs)
+
+
+def _finish_email(prepared_email: PreparedEmail, reference, lookups: Optional[EmailBatchLookups] = None):
+    notification = prepared_email.notification
+    notification.reference = reference
+    service = notification.service
+    if prepared_email.send_args is not None and current_app.config["FF_BOUNCE_RATE_BUCKETS"]:
+        count_sent_email(service.id)
+        current_app.logger.info(f"Notification id {notification.id} HAS BEEN SENT")
+    elif prepared_email.send_args is not None:
+        if lookups is None or service.id not in lookups.bounce_rate_checked_services:
+            check_service_over_bounce_rate_old(service.id) if current_app.config[
+                "TEST_OLD_BOUNCE_RATE"
+            ] else check_service_over_bounce_rate(service.id)
+            if lookups is not None:
+                lookups.bounce_rate_checked_services.add(service.id)
         bounce_rate_client.set_sliding_notifications(service.id, str(notification.id))
         current_app.logger.info(f"Setting total notifications for service {service.id} in REDIS")
         current_app.logger.info(f"Notification id {notification.id} HAS BEEN SENT")
-        notification.reference = reference
-        update_notification_to_sending(notification, provider)
+
+
+def _record_email_stats(prepared_email: PreparedEmail):
+    notification = prepared_email.notification
     current_app.logger.info(f"Notification id {notification.id} status in sending")
 
     # Record StatsD stats to compute SLOs
     statsd_client.timing_with_dates("email.total-time", notification.sent_at, notification.created_at)
-    attachments_category = "with-attachments" if attachments else "no-attachments"
-    statsd_key = f"email.{attachments_category}.process_type-{template_dict['process_type']}"
+    attachments_category = "with-attachments" if prepared_email.has_attachments else "no-attachments"
+    statsd_key = f"email.{attachments_category}.process_type-{prepared_email.process_type}"
     statsd_client.timing_with_dates(statsd_key, notification.sent_at, notification.created_at)
     statsd_client.incr(statsd_key)
 
 
 def update_notification_to_sending(notification, provider):
+    _set_notification_to_sending(notification, provider)
+    dao_update_notification(notification)
+
+
+def _set_notification_to_sending(notification, provider):
     notification.sent_at = datetime.utcnow()
     notification.sent_by = provider.get_name()
     notification.status = NOTIFICATION_SENT if notification.notification_type == "sms" else NOTIFICATION_SENDING
-    dao_update_notification(notification)
+    notification.updated_at = notification.sent_at
 
 
 def update_notification_to_opted_out(notification, provider):
@@ -636,11 +844,10 @@ def provider_to_use(
     cannot_determine_recipient_country = False
     recipient_outside_canada = False
     if to is not None:
-        match = next(iter(phonenumbers.PhoneNumberMatcher(to, "US")), None)
-        if match is None:
-            cannot_determine_recipient_country = True
-        elif phonenumbers.region_code_for_number(match.number) not in ["CA", "US"]:
-            recipient_outside_canada = True
+        if current_app.config["FF_PROVIDER_ROUTING_CACHE"]:
+            cannot_determine_recipient_country, recipient_outside_canada = _classify_recipient_country_memoised(to)
+        else:
+            cannot_determine_recipient_country, recipient_outside_canada = _classify_recipient_country(to)
     using_sc_pool_template = template_id is not None and str(template_id) in current_app.config["AWS_PINPOINT_SC_TEMPLATE_IDS"]
     zone_1_outside_canada = recipient_outside_canada and not international
     do_not_use_pinpoint = (
@@ -649,24 +856,30 @@ def provider_to_use(
         or not current_app.config["AWS_PINPOINT_SC_POOL_ID"]
         or ((not current_app.config["AWS_PINPOINT_DEFAULT_POOL_ID"]) and not using_sc_pool_template)
     )
-    if do_not_use_pinpoint:
-        active_providers_in_order = [
-            p
-            for p in get_provider_details_by_notification_type(notification_type, international)
-            if p.active and p.identifier != PINPOINT_PROVIDER
-        ]
-    else:
-        active_providers_in_order = [
-            p
-            for p in get_provider_details_by_notification_type(notification_type, international)
-            if p.active and p.identifier != SNS_PROVIDER
-        ]
+    excluded_provider = PINPOINT_PROVIDER if do_not_use_pinpoint else SNS_PROVIDER
+    active_providers_in_order = [
+        identifier
+        for identifier in get_active_provider_identifiers(notification_type, international)
+        if identifier != excluded_provider
+    ]
 
     if not active_providers_in_order:
         current_app.logger.error("{} {} failed as no active providers".format(notification_type, notification_id))
         raise Exception("No active {} providers".format(notification_type))
 
-    return clients.get_client_by_name_and_type(active_providers_in_order[0].identifier, notification_type)
+    return clients.get_client_by_name_and_type(active_providers_in_order[0], notification_type)
+
+
+def _classify_recipient_country(to: str) -> Tuple[bool, bool]:
+    """Returns whether the country of the recipient cannot be determined, and whether it is outside Canada and the US."""
+    match = next(iter(phonenumbers.PhoneNumberMatcher(to, "US")), None)
+    if match is None:
+        return True, False
+    return False, phonenumbers.region_code_for_number(match.number) not in ["CA", "US"]
+
+
+# Services often send to the same numbers, for example for 2FA codes, and retries send to the same number again
+_classify_recipient_country_memoised = lru_cache(maxsize=10000)(_classify_recipient_country)
 
 
 def get_html_email_options(service: Service):
@@ -29,6 +29,7 @@ from app.dao.services_dao import dao_fetch_service_by_id
 from app.dao.templates_dao import dao_get_template_by_id
 from app.email_limit_utils import decrement_todays_email_count
 from app.errors import InvalidRequest, register_errors
+from app.job.rows_artifact import store_job_rows
 from app.models import (
     EMAIL_TYPE,
     JOB_STATUS_CANCELLED,
@@ -242,6 +243,7 @@ def create_job(service_id):
     data.update({"template_version": template.version})
 
     job = job_schema.load(data)
+    store_job_rows(service_id, job.id, recipient_csv)
 
     if job.scheduled_for:
         job.job_status = JOB_STATUS_SCHEDULED
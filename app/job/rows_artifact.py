@@ -0,0 +1,82 @@
+"""
+The rows of a job file, parsed once when the job is created and stored in S3 next to the file.
+
+create_job and post_bulk already parse the whole file with RecipientCSV to check the limits of the service, so they
+store the rows process_job needs as gzipped JSON lines: a header with the format version, then one
+[index, recipient, personalisation, reference] array per row. process_job streams the rows back instead of
+downloading and validating the file again, and falls back to the file for jobs created without the rows.
+"""
+
+import gzip
+import io
+import json
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+from flask import current_app
+from notifications_utils.recipients import RecipientCSV
+
+from app.aws import s3
+
+JOB_ROWS_FORMAT_VERSION = 1
+
+
+class JobRowCell(NamedTuple):
+    data: Optional[str]
+
+
+class JobRow(NamedTuple):
+    """The fields of a notifications_utils Row read by process_rows."""
+
+    index: int
+    recipient: str
+    personalisation: Dict[str, Any]
+    reference: Optional[str]
+
+    @classmethod
+    def from_row(cls, row, first_row: int = 0) -> "JobRow":
+        """The JobRow of a RecipientCSV row, for a file whose first row is row first_row of the job."""
+        reference = row.get("reference", None)
+        return cls(first_row + row.index, row.recipient, dict(row.personalisation), getattr(reference, "data", None))
+
+    def get(self, key: str, default=None):
+        if key == "reference":
+            return JobRowCell(self.reference)
+        return default
+
+
+def encode_job_rows(recipient_csv: RecipientCSV) -> bytes:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+        gz.write(json.dumps({"version": JOB_ROWS_FORMAT_VERSION}).encode("utf-8") + b"\n")
+        for row in recipient_csv.get_rows():
+            gz.write(json.dumps(list(JobRow.from_row(row)), separators=(",", ":")).encode("utf-8") + b"\n")
+    return buffer.getvalue()
+
+
+def decode_job_rows(file_obj) -> Iterator[JobRow]:
+    lines = io.TextIOWrapper(gzip.GzipFile(fileobj=file_obj, mode="rb"), encoding="utf-8")
+    header = json.loads(next(lines))
+    if header["version"] != JOB_ROWS_FORMAT_VERSION:
+        raise ValueError(f"Unsupported job rows version {header['version']}")
+    for line in lines:
+        yield JobRow(*json.loads(line))
+
+
+def store_job_rows(service_id, job_id, recipient_csv: RecipientCSV) -> None:
+    """Stores the parsed rows of the job when FF_JOB_ROWS_ARTIFACT is on. A failure only costs process_job a parse."""
+    if not current_app.config["FF_JOB_ROWS_ARTIFACT"]:
+        return
+    try:
+        s3.upload_job_rows_to_s3(service_id, job_id, encode_job_rows(recipient_csv))
+    except Exception:
+        current_app.logger.exception(f"Could not store the parsed rows of job {job_id}, process_job will parse the file")
+
+
+def get_job_rows(service_id, job_id) -> Optional[Iterator[JobRow]]:
+    """Returns the stored rows of the job, or None if the job has none or FF_JOB_ROWS_ARTIFACT is off."""
+    if not current_app.config["FF_JOB_ROWS_ARTIFACT"]:
+        return None
+    body = s3.get_job_rows_from_s3(service_id, job_id)
+    if body is None:
+        return None
+    return decode_job_rows(body)
@@ -0,0 +1,125 @@
+"""
+Row-range shards of large job files.
+
+process_job streams the job file from S3 and cuts it into shards of JOB_SHARD_SIZE rows, recording the byte range of
+each. A shard is queued as soon as its last row is read, so the first notifications of a job are sent after reading
+JOB_SHARD_SIZE rows whatever the size of the file, and the shards are processed by as many workers as are free. A
+shard task downloads its byte range only and parses it with the header row of the file.
+
+The shards of a job are kept in Redis, so that process_incomplete_job resumes each shard after its last saved row, and
+carries on cutting the file after the last saved shard if the job stopped before the whole file was read.
+"""
+
+import csv
+import json
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app import redis_store
+
+JOB_SHARDS_EXPIRY_SECONDS = 24 * 60 * 60
+
+
+class JobShard(NamedTuple):
+    index: int
+    start_row: int
+    end_row: int  # excluded
+    start_byte: int
+    end_byte: int  # excluded
+
+
+def job_shards_cache_key(job_id) -> str:
+    return f"job-shards:{job_id}"
+
+
+def _lines_with_endings(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if pending:
+        yield pending
+
+
+class _CountingLines:
+    """Decodes lines for csv.reader, counting the bytes it has consumed and keeping the text until told to stop."""
+
+    def __init__(self, lines: Iterator[bytes]) -> None:
+        self._lines = lines
+        self.bytes_read = 0
+        self.text_read: Optional[List[str]] = []
+
+    def __iter__(self) -> "_CountingLines":
+        return self
+
+    def __next__(self) -> str:
+        line = next(self._lines)
+        self.bytes_read += len(line)
+        # A line split on b"\n" always holds whole UTF-8 characters
+        text = line.decode("utf-8")
+        if self.text_read is not None:
+            self.text_read.append(text)
+        return text
+
+
+class JobFileShards:
+    """Cuts a job file, read as a stream of byte chunks, into shards of shard_size rows.
+
+    Iterating yields each shard as soon as its last row is read. header holds the header row of the file,
+    with its line ending, once the first shard is yielded.
+
+    To carry on after a shard, chunks start at its end_byte and the header row of the file is given.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], shard_size: int, after: Optional[JobShard] = None, header: str = "") -> None:
+        self.shard_size = shard_size
+        self.header = header
+        self._after = after
+        self._lines = _CountingLines(_lines_with_endings(chunks))
+
+    def __iter__(self) -> Iterator[JobShard]:
+        # csv.reader pulls one record at a time, so a row quoting line breaks never straddles two shards
+        reader = csv.reader(self._lines)
+        if self._after is None:
+            if next(reader, None) is None:
+                return
+            self.header = "".join(self._lines.text_read or [])
+            index, start_row, start_byte = 0, 0, self._lines.bytes_read
+        else:
+            index, start_row, start_byte = self._after.index + 1, self._after.end_row, self._after.end_byte
+            self._lines.bytes_read = start_byte
+        self._lines.text_read = None
+
+        row_count = start_row
+        for row_count, _ in enumerate(reader, start=start_row + 1):
+            if row_count % self.shard_size == 0:
+                yield JobShard(index, start_row, row_count, start_byte, self._lines.bytes_read)
+                index, start_row, start_byte = index + 1, row_count, self._lines.bytes_read
+        if row_count > start_row:
+            yield JobShard(index, start_row, row_count, start_byte, self._lines.bytes_read)
+
+
+def save_job_shards(job_id, header: str, shard_size: int, shards: List[JobShard], complete: bool = False) -> None:
+    """Saves the shards of a job, complete once the whole file is cut."""
+    redis_store.set(
+        job_shards_cache_key(job_id),
+        json.dumps({"header": header, "shard_size": shard_size, "shards": shards, "complete": complete}),
+        ex=JOB_SHARDS_EXPIRY_SECONDS,
+    )
+
+
+def get_job_shards(job_id) -> Optional[Tuple[str, int, List[JobShard], bool]]:
+    """Returns the header, shard size, shards and whether the whole file was cut of a sharded job,
+    or None if the job was not sharded."""
+    data = redis_store.get(job_shards_cache_key(job_id))
+    if not data:
+        return None
+    job_shards = json.loads(data)
+    return (
+        job_shards["header"],
+        job_shards["shard_size"],
+        [JobShard(*shard) for shard in job_shards["shards"]],
+        # Shards saved before their completion was recorded are resumed as they were
+        job_shards.get("complete", True),
+    )
@@ -119,6 +119,48 @@ SMS_STATUS_FORMATTED = {
 }
 
 
+def format_notification_status(template_type, status, feedback_subtype=None, feedback_reason=None):
+    def _getStatusByBounceSubtype():
+        """Return the status of a notification based on the bounce sub type"""
+        # note: if this function changes, update the report query in app/report/utils.py::build_notifications_query
+        if feedback_subtype:
+            return {
+                "suppressed": "Blocked",
+                "on-account-suppression-list": "Blocked",
+            }.get(feedback_subtype, "No such address")
+        else:
+            return "No such address"
+
+    def _get_sms_status_by_feedback_reason():
+        """Return the status of a notification based on the feedback reason"""
+        # note: if this function changes, update the report query in app/report/utils.py::build_notifications_query
+        if feedback_reason:
+            return {
+                "NO_ORIGINATION_IDENTITIES_FOUND": "Can't send to this international number",
+                "DESTINATION_COUNTRY_BLOCKED": "Can't send to this international number",
+            }.get(feedback_reason, "No such number")
+        else:
+            return "No such number"
+
+    return {
+        "email": {
+            **EMAIL_STATUS_FORMATTED,
+            "permanent-failure": _getStatusByBounceSubtype(),
+        },
+        "sms": {
+            **SMS_STATUS_FORMATTED,
+            "provider-failure": _get_sms_status_by_feedback_reason(),
+        },
+        "letter": {
+            "technical-failure": "Technical failure",
+            "sending": "Accepted",
+            "created": "Accepted",
+            "delivered": "Received",
+            "returned-letter": "Returned",
+        },
+    }[template_type].get(status, status)
+
+
 def filter_null_value_fields(obj):
     return dict(filter(lambda x: x[1] is not None, obj.items()))
 
@@ -2010,45 +2052,7 @@ class Notification(BaseModel):
 
     @property
     def formatted_status(self):
-        def _getStatusByBounceSubtype():
-            """Return the status of a notification based on the bounce sub type"""
-            # note: if this function changes, update the report query in app/report/utils.py::build_notifications_query
-            if self.feedback_subtype:
-                return {
-                    "suppressed": "Blocked",
-                    "on-account-suppression-list": "Blocked",
-                }.get(self.feedback_subtype, "No such address")
-            else:
-                return "No such address"
-
-        def _get_sms_status_by_feedback_reason():
-            """Return the status of a notification based on the feedback reason"""
-            # note: if this function changes, update the report query in app/report/utils.py::build_notifications_query
-            if self.feedback_reason:
-                return {
-                    "NO_ORIGINATION_IDENTITIES_FOUND": "Can't send to this international number",
-                    "DESTINATION_COUNTRY_BLOCKED": "Can't send to this international number",
-                }.get(self.feedback_reason, "No such number")
-            else:
-                return "No such number"
-
-        return {
-            "email": {
-                **EMAIL_STATUS_FORMATTED,
-                "permanent-failure": _getStatusByBounceSubtype(),
-            },
-            "sms": {
-                **SMS_STATUS_FORMATTED,
-                "provider-failure": _get_sms_status_by_feedback_reason(),
-            },
-            "letter": {
-                "technical-failure": "Technical failure",
-                "sending": "Accepted",
-                "created": "Accepted",
-                "delivered": "Received",
-                "returned-letter": "Returned",
-            },
-        }[self.template.template_type].get(self.status, self.status)
+        return format_notification_status(self.template.template_type, self.status, self.feedback_subtype, self.feedback_reason)
 
     def get_letter_status(self):
         """
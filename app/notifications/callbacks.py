@@ -1,6 +1,12 @@
+from collections import defaultdict
+
 from flask import current_app
+from more_itertools import chunked
 
-from app.celery.service_callback_tasks import send_delivery_status_to_service
+from app.celery.service_callback_tasks import (
+    send_delivery_status_to_service,
+    send_delivery_statuses_to_service,
+)
 from app.config import QueueNames
 from app.dao.service_callback_api_dao import (
     get_service_delivery_status_callback_api_for_service,
@@ -12,20 +18,56 @@ def _check_and_queue_callback_task(notification):
         current_app.logger.warning("No notification provided, cannot queue callback task")
         return
 
-    service_callback_api = get_service_delivery_status_callback_api_for_service(service_id=notification.service_id)
+    service_callback_api = get_service_delivery_status_callback_api_for_service(
+        service_id=notification.service_id, use_cache=True
+    )
+    if _can_queue_callback_task(notification, service_callback_api):
+        notification_data = create_delivery_status_callback_data(notification, service_callback_api)
+        send_delivery_status_to_service.apply_async(
+            [str(notification.id), notification_data, notification.service_id], queue=QueueNames.CALLBACKS
+        )
+
 
-    # queue callback task only if the service_callback_api exists and it is not in a suspended state
-    if service_callback_api:
-        if service_callback_api.is_suspended:
-            current_app.logger.warning(
-                f"Service callback API: {service_callback_api.id} for service: {notification.service_id} is suspended. Cannot queue callback task for notification: {notification.id}"
+def _check_and_queue_callback_tasks(notifications):
+    """Queues the delivery status callbacks of a batch of notifications, looking up each service's callback api once.
+
+    When FF_BATCH_SERVICE_CALLBACKS is on, the callbacks of a service are sent by one task per SERVICE_CALLBACK_BATCH_SIZE
+    notifications instead of one task per notification.
+    """
+    service_callback_apis = {}
+    signed_status_updates_by_service = defaultdict(list)
+    for notification in notifications:
+        if notification.service_id not in service_callback_apis:
+            service_callback_apis[notification.service_id] = get_service_delivery_status_callback_api_for_service(
+                service_id=notification.service_id, use_cache=True
             )
-            return
+        service_callback_api = service_callback_apis[notification.service_id]
+        if not _can_queue_callback_task(notification, service_callback_api):
+            continue
 
         notification_data = create_delivery_status_callback_data(notification, service_callback_api)
-        send_delivery_status_to_service.apply_async(
-            [str(notification.id), notification_data, notification.service_id], queue=QueueNames.CALLBACKS
+        if current_app.config["FF_BATCH_SERVICE_CALLBACKS"]:
+            signed_status_updates_by_service[notification.service_id].append(notification_data)
+        else:
+            send_delivery_status_to_service.apply_async(
+                [str(notification.id), notification_data, notification.service_id], queue=QueueNames.CALLBACKS
+            )
+
+    for service_id, signed_status_updates in signed_status_updates_by_service.items():
+        for batch in chunked(signed_status_updates, current_app.config["SERVICE_CALLBACK_BATCH_SIZE"]):
+            send_delivery_statuses_to_service.apply_async([batch, service_id], queue=QueueNames.CALLBACKS)
+
+
+def _can_queue_callback_task(notification, service_callback_api) -> bool:
+    # queue callback task only if the service_callback_api exists and it is not in a suspended state
+    if not service_callback_api:
+        return False
+    if service_callback_api.is_suspended:
+        current_app.logger.warning(
+            f"Service callback API: {service_callback_api.id} for service: {notification.service_id} is suspended. Cannot queue callback task for notification: {notification.id}"
         )
+        return False
+    return True
 
 
 def create_delivery_status_callback_data(notification, service_callback_api):
@@ -1,9 +1,11 @@
 import uuid
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import List, Optional
 
 from flask import current_app
 from iso8601 import parse_date
+from more_itertools import chunked
 from notifications_utils.clients import redis
 from notifications_utils.decorators import parallel_process_iterable
 from notifications_utils.recipients import (
@@ -18,10 +20,12 @@ from app.celery.letters_pdf_tasks import create_letters_pdf
 from app.config import QueueNames
 from app.dao.api_key_dao import update_last_used_api_key
 from app.dao.notifications_dao import (
+    bulk_insert_notification_rows,
     bulk_insert_notifications,
     dao_create_notification,
     dao_created_scheduled_notification,
     dao_delete_notifications_by_id,
+    notification_insert_row,
 )
 from app.dao.services_dao import dao_fetch_service_by_id
 from app.dao.templates_dao import dao_get_template_by_id
@@ -41,6 +45,14 @@ from app.types import VerifiedNotification
 from app.utils import get_delivery_queue_for_template, get_template_instance
 from app.v2.errors import BadRequestError
 
+# Increments a counter only if it already exists, like the redis_store.get + redis_store.incr of persist_notifications
+INCRBY_IF_EXISTS = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return redis.call("INCRBY", KEYS[1], ARGV[1])
+end
+return nil
+"""
+
 
 def create_content_for_notification(template, personalisation):
     template_object = get_template_instance(template.__dict__, personalisation)
@@ -354,67 +366,49 @@ def send_notification_to_queue(notification, research_mode, queue=None):
         )
 
 
+def send_emails_to_queue_in_batches(notifications: List[Notification], research_mode: bool, queue: Optional[str] = None) -> None:
+    """
+    Queues the emails with deliver_email_batch tasks of up to EMAIL_BATCH_SIZE emails of a service,
+    instead of one deliver_email task per email. The queues are chosen as in send_notification_to_queue.
+    """
+    notifications_by_queue = defaultdict(list)
+    for notification in notifications:
+        if research_mode or notification.key_type == KEY_TYPE_TEST:
+            notification_queue = QueueNames.RESEARCH_MODE
+        elif not queue or queue == QueueNames.NORMAL:
+            notification_queue = QueueNames.SEND_EMAIL_MEDIUM
+        else:
+            notification_queue = queue
+        notifications_by_queue[(notification_queue, str(notification.service_id))].append(notification)
+
+    for (notification_queue, service_id), queue_notifications in notifications_by_queue.items():
+        for batch in chunked(queue_notifications, current_app.config["EMAIL_BATCH_SIZE"]):
+            try:
+                provider_tasks.deliver_email_batch.apply_async(
+                    [[str(notification.id) for notification in batch]], queue=notification_queue, MessageGroupId=service_id
+                )
+            except Exception:
+                for notification in batch:
+                    dao_delete_notifications_by_id(notification.id)
+                raise
+            current_app.logger.info(f"{len(batch)} emails sent to the {notification_queue} queue for delivery in a batch")
+
+
 def persist_notifications(notifications: List[VerifiedNotification]) -> List[Notification]:
     """
     Persist Notifications takes a list of json objects and creates a list of Notifications
     that gets bulk inserted into the DB.
     """
+    if current_app.config["FF_BULK_NOTIFICATION_INSERT"]:
+        return _bulk_persist_notifications(notifications)
 
     lofnotifications = []
 
     for notification in notifications:
-        notification_created_at = notification.get("created_at") or datetime.utcnow()
-        notification_id = notification.get("notification_id", uuid.uuid4())
-        notification_recipient = notification.get("recipient") or notification.get("to")
         service_id = notification.get("service").id if notification.get("service") else None  # type: ignore
-        # todo: potential bug. notification_obj is being created using some keys that don't exist on notification
-        # reference, created_by_id, status, billable_units aren't keys on notification at this point
-        notification_obj = Notification(
-            id=notification_id,
-            template_id=notification.get("template_id"),
-            template_version=notification.get("template_version"),
-            to=notification_recipient,
-            service_id=service_id,
-            personalisation=notification.get("personalisation"),
-            notification_type=notification.get("notification_type"),
-            api_key_id=notification.get("api_key_id"),
-            key_type=notification.get("key_type"),
-            created_at=notification_created_at,
-            job_id=notification.get("job_id"),
-            job_row_number=notification.get("job_row_number"),
-            client_reference=notification.get("client_reference"),
-            reference=notification.get("reference"),  # type: ignore
-            created_by_id=notification.get("created_by_id"),  # type: ignore
-            status=notification.get("status"),  # type: ignore
-            reply_to_text=notification.get("reply_to_text"),
-            billable_units=notification.get("billable_units"),  # type: ignore
-        )
-        template = dao_get_template_by_id(notification_obj.template_id, notification_obj.template_version, use_cache=True)
-        notification_obj.template = template  # Store the template in the object for downstream consumers
-        if (
-            current_app.config.get("FF_USE_BILLABLE_UNITS")
-            and not notification_obj.billable_units
-            and notification.get("notification_type") == SMS_TYPE
-        ):
-            notification_obj.billable_units = number_of_sms_fragments(template, notification.get("personalisation"))
+        template = dao_get_template_by_id(notification.get("template_id"), notification.get("template_version"), use_cache=True)
         service = dao_fetch_service_by_id(service_id, use_cache=True)
-        notification_obj.queue_name = choose_queue(
-            notification=notification_obj,
-            research_mode=service.research_mode,
-            priority_queue=get_delivery_queue_for_template(template),
-        )
-
-        if notification.get("notification_type") == SMS_TYPE:
-            formatted_recipient = validate_and_format_phone_number(notification_recipient, international=True)
-            recipient_info = get_international_phone_info(formatted_recipient)
-            notification_obj.normalised_to = formatted_recipient
-            notification_obj.international = recipient_info.international
-            notification_obj.phone_prefix = recipient_info.country_prefix
-            notification_obj.rate_multiplier = recipient_info.billable_units
-        elif notification.get("notification_type") == EMAIL_TYPE:
-            notification_obj.normalised_to = format_email_address(notification_recipient)
-        elif notification.get("notification_type") == LETTER_TYPE:
-            notification_obj.postage = notification.get("postage") or notification.get("template_postage")  # type: ignore
+        notification_obj = _build_notification(notification, template, service)
 
         lofnotifications.append(notification_obj)
         if notification.get("key_type") != KEY_TYPE_TEST:
@@ -422,18 +416,126 @@ def persist_notifications(notifications: List[VerifiedNotification]) -> List[Not
             if redis_store.get(redis.daily_limit_cache_key(service_id)):
                 redis_store.incr(redis.daily_limit_cache_key(service_id))
 
-        current_app.logger.info(
-            "{} {} created at {}".format(
-                notification.get("notification_type"),
-                notification.get("notification_id"),
-                notification.get("notification_created_at"),  # type: ignore
-            )
-        )
+        _log_persisted_notification(notification)
     bulk_insert_notifications(lofnotifications)
 
     return lofnotifications
 
 
+def _bulk_persist_notifications(notifications: List[VerifiedNotification]) -> List[Notification]:
+    """
+    Same as persist_notifications, but templates and services are fetched once per distinct id,
+    the rows are written with a single INSERT statement and the daily limit counters of the
+    services are incremented in one Redis pipeline.
+    """
+    templates: dict = {}
+    services: dict = {}
+    daily_counts: Counter = Counter()
+    lofnotifications = []
+    rows = []
+
+    for notification in notifications:
+        service_id = notification.get("service").id if notification.get("service") else None  # type: ignore
+        template_key = (notification.get("template_id"), notification.get("template_version"))
+        if template_key not in templates:
+            templates[template_key] = dao_get_template_by_id(*template_key, use_cache=True)
+        if service_id not in services:
+            services[service_id] = dao_fetch_service_by_id(service_id, use_cache=True)
+        notification_obj = _build_notification(notification, templates[template_key], services[service_id])
+
+        lofnotifications.append(notification_obj)
+        rows.append(notification_insert_row(notification_obj))
+        if notification.get("key_type") != KEY_TYPE_TEST:
+            daily_counts[service_id] += 1
+
+        _log_persisted_notification(notification)
+    bulk_insert_notification_rows(rows)
+    _increment_daily_limit_counters(daily_counts)
+
+    return lofnotifications
+
+
+def _build_notification(notification: VerifiedNotification, template, service: Service) -> Notification:
+    notification_created_at = notification.get("created_at") or datetime.utcnow()
+    notification_id = notification.get("notification_id", uuid.uuid4())
+    notification_recipient = notification.get("recipient") or notification.get("to")
+    service_id = notification.get("service").id if notification.get("service") else None  # type: ignore
+    # todo: potential bug. notification_obj is being created using some keys that don't exist on notification
+    # reference, created_by_id, status, billable_units aren't keys on notification at this point
+    notification_obj = Notification(
+        id=notification_id,
+        template_id=notification.get("template_id"),
+        template_version=notification.get("template_version"),
+        to=notification_recipient,
+        service_id=service_id,
+        personalisation=notification.get("personalisation"),
+        notification_type=notification.get("notification_type"),
+        api_key_id=notification.get("api_key_id"),
+        key_type=notification.get("key_type"),
+        created_at=notification_created_at,
+        job_id=notification.get("job_id"),
+        job_row_number=notification.get("job_row_number"),
+        client_reference=notification.get("client_reference"),
+        reference=notification.get("reference"),  # type: ignore
+        created_by_id=notification.get("created_by_id"),  # type: ignore
+        status=notification.get("status"),  # type: ignore
+        reply_to_text=notification.get("reply_to_text"),
+        billable_units=notification.get("billable_units"),  # type: ignore
+    )
+    notification_obj.template = template  # Store the template in the object for downstream consumers
+    if (
+        current_app.config.get("FF_USE_BILLABLE_UNITS")
+        and not notification_obj.billable_units
+        and notification.get("notification_type") == SMS_TYPE
+    ):
+        notification_obj.billable_units = number_of_sms_fragments(template, notification.get("personalisation"))
+    notification_obj.queue_name = choose_queue(
+        notification=notification_obj,
+        research_mode=service.research_mode,
+        priority_queue=get_delivery_queue_for_template(template),
+    )
+
+    if notification.get("notification_type") == SMS_TYPE:
+        formatted_recipient = validate_and_format_phone_number(notification_recipient, international=True)
+        recipient_info = get_international_phone_info(formatted_recipient)
+        notification_obj.normalised_to = formatted_recipient
+        notification_obj.international = recipient_info.international
+        notification_obj.phone_prefix = recipient_info.country_prefix
+        notification_obj.rate_multiplier = recipient_info.billable_units
+    elif notification.get("notification_type") == EMAIL_TYPE:
+        notification_obj.normalised_to = format_email_address(notification_recipient)
+    elif notification.get("notification_type") == LETTER_TYPE:
+        notification_obj.postage = notification.get("postage") or notification.get("template_postage")  # type: ignore
+    return notification_obj
+
+
+def _log_persisted_notification(notification: VerifiedNotification) -> None:
+    current_app.logger.info(
+        "{} {} created at {}".format(
+            notification.get("notification_type"),
+            notification.get("notification_id"),
+            notification.get("notification_created_at"),  # type: ignore
+        )
+    )
+
+
+def _increment_daily_limit_counters(daily_counts: Counter) -> None:
+    """
+    Adds the number of notifications persisted for each service to its daily limit counter,
+    for the counters that already exist, in a single Redis round trip.
+    """
+    if not daily_counts or not redis_store.active:
+        return
+    try:
+        pipeline = redis_store.redis_store.pipeline(transaction=False)
+        incrby_if_exists = redis_store.redis_store.register_script(INCRBY_IF_EXISTS)
+        for service_id, count in daily_counts.items():
+            incrby_if_exists(keys=[redis.daily_limit_cache_key(service_id)], args=[count], client=pipeline)
+        pipeline.execute()
+    except Exception as e:
+        current_app.logger.exception(f"Could not increment the daily limit counters of services {list(daily_counts)}: {e}")
+
+
 def csv_has_simulated_and_non_simulated_recipients(
     to_addresses: set, notification_type: NotificationType, chunk_size=5000
 ) -> tuple[bool, bool]:
@@ -1,10 +1,13 @@
 import base64
 import functools
-from datetime import datetime, time, timedelta
+import uuid
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional
 
 from flask import current_app
 from notifications_utils import SMS_CHAR_COUNT_LIMIT
 from notifications_utils.clients.redis import (
+    email_daily_count_cache_key,
     near_billable_units_sms_daily_limit_cache_key,
     near_email_daily_limit_cache_key,
     near_sms_daily_limit_cache_key,
@@ -14,9 +17,13 @@ from notifications_utils.clients.redis import (
     rate_limit_cache_key,
 )
 from notifications_utils.clients.redis.annual_limit import (
+    NEAR_EMAIL_LIMIT,
+    OVER_EMAIL_LIMIT,
     TOTAL_EMAIL_FISCAL_YEAR_TO_YESTERDAY,
     TOTAL_SMS_BILLABLE_UNITS_FISCAL_YEAR_TO_YESTERDAY,
     TOTAL_SMS_FISCAL_YEAR_TO_YESTERDAY,
+    annual_limit_notifications_v2_key,
+    annual_limit_status_key,
 )
 from notifications_utils.recipients import (
     get_international_phone_info,
@@ -28,6 +35,7 @@ from sqlalchemy.orm.exc import NoResultFound
 
 from app import annual_limit_client, redis_store
 from app.annual_limit_utils import get_annual_limit_notifications_v2
+from app.cache.local import local_caches
 from app.dao import templates_dao
 from app.dao.service_email_reply_to_dao import dao_get_reply_to_by_id
 from app.dao.service_letter_contact_dao import dao_get_letter_contact_by_id
@@ -79,6 +87,76 @@ from app.v2.errors import (
 NEAR_DAILY_LIMIT_PERCENTAGE = 80 / 100
 NEAR_ANNUAL_LIMIT_PERCENTAGE = 80 / 100
 
+API_RATE_LIMIT_INTERVAL = 60
+
+reply_to_local_cache = local_caches.cache("reply_to")
+# (service id, date) -> True once the annual limit totals of the service were seeded that day, kept until the end of the day
+annual_limit_seeded_local_cache = local_caches.cache("annual_limit_seeded", feature_flag="FF_EMAIL_LIMITS_SCRIPT")
+
+# The checks of check_rate_limiting, check_email_annual_limit and check_email_daily_limit, then the
+# increment and warning flags of increment_email_daily_count_send_warnings_if_needed, atomically.
+# The rate limit key is shared with redis_store.exceeded_rate_limit, so its scores are in seconds too.
+# Returns {"seed"} when the daily count or the annual totals are not in Redis yet, {"rate_limit"},
+# {"annual_limit", total} or {"daily_limit", sent today} when a limit is exceeded, and otherwise
+# {"ok", sent today, total this fiscal year, then 1 or 0 for each warning flag newly set}.
+EMAIL_LIMITS_SCRIPT = """
+local rate_key, daily_key, annual_key, status_key, near_daily_key, over_daily_key = unpack(KEYS)
+local now             = tonumber(ARGV[1])
+local request_member  = ARGV[2]
+local rate_limit      = tonumber(ARGV[3])
+local interval        = tonumber(ARGV[4])
+local requested       = tonumber(ARGV[5])
+local daily_limit     = tonumber(ARGV[6])
+local annual_limit    = tonumber(ARGV[7])
+local near_daily_pct  = tonumber(ARGV[8])
+local near_annual_pct = tonumber(ARGV[9])
+local fiscal_field    = ARGV[10]
+local today           = ARGV[11]
+local until_midnight  = tonumber(ARGV[12])
+local over_field      = ARGV[13]
+local near_field      = ARGV[14]
+
+local sent_today = redis.call("GET", daily_key)
+local fiscal_to_yesterday = redis.call("HGET", annual_key, fiscal_field)
+if not sent_today or not fiscal_to_yesterday then
+    return {"seed"}
+end
+sent_today = tonumber(sent_today)
+
+if rate_limit >= 0 then
+    redis.call("ZADD", rate_key, ARGV[1], request_member)
+    redis.call("ZREMRANGEBYSCORE", rate_key, "-inf", now - interval)
+    local requests = redis.call("ZCARD", rate_key)
+    redis.call("EXPIRE", rate_key, interval)
+    if requests > rate_limit then
+        return {"rate_limit"}
+    end
+end
+
+local fiscal_total = sent_today + tonumber(fiscal_to_yesterday) + requested
+if fiscal_total > annual_limit then
+    return {"annual_limit", fiscal_total - requested}
+end
+if sent_today + requested > daily_limit then
+    return {"daily_limit", sent_today}
+end
+
+sent_today = redis.call("INCRBY", daily_key, requested)
+
+local function flag(set)
+    if set then return 1 else return 0 end
+end
+local annual_reached = fiscal_total == annual_limit and redis.call("HSETNX", status_key, over_field, today) == 1
+local near_annual = fiscal_total > annual_limit * near_annual_pct and fiscal_total ~= annual_limit
+    and redis.call("HSETNX", status_key, near_field, today) == 1
+local near_daily = sent_today >= daily_limit * near_daily_pct
+    and redis.call("SET", near_daily_key, today, "EX", until_midnight, "NX") ~= false
+local daily_reached = sent_today >= daily_limit
+    and redis.call("SET", over_daily_key, today, "EX", until_midnight, "NX") ~= false
+
+return {"ok", sent_today, fiscal_total, flag(annual_reached), flag(near_annual), flag(near_daily), flag(daily_reached)}
+"""
+
 
 def check_service_over_api_rate_limit_and_update_rate(service: Service, api_key: ApiKey):
     """This function:
@@ -90,7 +168,7 @@ def check_service_over_api_rate_limit_and_update_rate(service: Service, api_key:
     if current_app.config["API_RATE_LIMIT_ENABLED"] and current_app.config["REDIS_ENABLED"]:
         cache_key = rate_limit_cache_key(service.id, api_key.key_type)
         rate_limit = service.rate_limit
-        interval = 60
+        interval = API_RATE_LIMIT_INTERVAL
         if redis_store.exceeded_rate_limit(cache_key, rate_limit, interval):
             current_app.logger.info("service {} has been rate limited for throughput".format(service.id))
             raise RateLimitError(rate_limit, interval, api_key.key_type)
@@ -360,6 +438,199 @@ def check_rate_limiting(service: Service, api_key: ApiKey):
     check_service_over_api_rate_limit_and_update_rate(service, api_key)
 
 
+class EmailLimitsReservation:
+    """
+    Emails counted against the daily limit of a service by reserve_email_limits, with the
+    warning flags that the reservation set. The warning emails are sent once the notification
+    is created, and the reservation is released if it could not be created.
+    """
+
+    def __init__(self, service: Service, requested: int, result: list) -> None:
+        self.service = service
+        self.requested = requested
+        (
+            self.sent_today,
+            self.sent_this_fiscal,
+            self.annual_limit_reached,
+            self.near_annual_limit,
+            self.near_daily_limit,
+            self.daily_limit_reached,
+        ) = (int(value) for value in result[1:7])
+
+    def release(self) -> None:
+        """Gives back the reserved emails, and clears the warning flags so they are sent by a later request."""
+        try:
+            redis_store.decrby(email_daily_count_cache_key(self.service.id), self.requested)
+            status_fields = [
+                field
+                for field, was_set in (
+                    (OVER_EMAIL_LIMIT, self.annual_limit_reached),
+                    (NEAR_EMAIL_LIMIT, self.near_annual_limit),
+                )
+                if was_set
+            ]
+            if status_fields:
+                redis_store.delete_hash_fields(annual_limit_status_key(self.service.id), status_fields)
+            daily_keys = [
+                key
+                for key, was_set in (
+                    (near_email_daily_limit_cache_key(self.service.id), self.near_daily_limit),
+                    (over_email_daily_limit_cache_key(self.service.id), self.daily_limit_reached),
+                )
+                if was_set
+            ]
+            if daily_keys:
+                redis_store.delete(*daily_keys)
+        except Exception as e:
+            current_app.logger.exception(f"Could not release the email limits reservation of service {self.service.id}: {e}")
+
+    def send_warning_emails(self) -> None:
+        fiscal_end = get_fiscal_year(datetime.utcnow()) + 1
+        if self.annual_limit_reached:
+            current_app.logger.info(
+                f"Service {self.service.id} reached their annual email limit of {self.service.email_annual_limit} when sending {self.requested} messages. Sending reached annual limit email."
+            )
+            send_annual_limit_reached_email(self.service, "email", fiscal_end)
+        if self.near_annual_limit:
+            current_app.logger.info(
+                f"Service {self.service.id} reached 80% of their annual email limit of {self.service.email_annual_limit} messages. Sending annual limit usage warning email."
+            )
+            send_near_annual_limit_warning_email(self.service, "email", self.sent_this_fiscal, fiscal_end)
+        if self.near_daily_limit:
+            send_near_email_limit_email(self.service, self.sent_today)
+        if self.daily_limit_reached:
+            send_email_limit_reached_email(self.service)
+
+
+@statsd_catch(
+    namespace="validators",
+    counter_name="rate_limit.trial_service_annual_email",
+    exception=TrialServiceRequestExceedsEmailAnnualLimitError,
+)
+@statsd_catch(
+    namespace="validators",
+    counter_name="rate_limit.live_service_annual_email",
+    exception=LiveServiceRequestExceedsEmailAnnualLimitError,
+)
+@statsd_catch(
+    namespace="validators",
+    counter_name="rate_limit.trial_service_daily_email",
+    exception=TrialServiceTooManyEmailRequestsError,
+)
+@statsd_catch(
+    namespace="validators",
+    counter_name="rate_limit.live_service_daily_email",
+    exception=LiveServiceTooManyEmailRequestsError,
+)
+def reserve_email_limits(service: Service, api_key: ApiKey, requested_emails=1) -> Optional[EmailLimitsReservation]:
+    """
+    Does check_rate_limiting, check_email_annual_limit, check_email_daily_limit and the counter
+    increment and warning flags of increment_email_daily_count_send_warnings_if_needed in one
+    Lua script, so the checks and the increment are one atomic Redis round trip.
+
+    Falls back to the separate checks and returns None when Redis is disabled or failing, in
+    which case the caller increments the count with increment_email_daily_count_send_warnings_if_needed.
+    """
+    if not current_app.config["REDIS_ENABLED"]:
+        _check_email_limits_separately(service, api_key, requested_emails)
+        return None
+    try:
+        now = datetime.utcnow()
+        seeded_key = (service.id, now.date())
+        if not local_caches.get(annual_limit_seeded_local_cache, seeded_key):
+            _seed_email_limit_counters(service)
+            until_end_of_day = datetime.combine(now.date() + timedelta(days=1), time.min) - now
+            local_caches.set(annual_limit_seeded_local_cache, seeded_key, True, until_end_of_day.total_seconds())
+        result = _run_email_limits_script(service, api_key, requested_emails)
+        if _script_status(result) == "seed":
+            _seed_email_limit_counters(service)
+            result = _run_email_limits_script(service, api_key, requested_emails)
+        status = _script_status(result)
+        if status == "seed":
+            raise ValueError("email limit counters are still missing after seeding")
+    except Exception as e:
+        current_app.logger.exception(f"Could not check the email limits of service {service.id} in one script: {e}")
+        _check_email_limits_separately(service, api_key, requested_emails)
+        return None
+
+    if status == "rate_limit":
+        current_app.logger.info("service {} has been rate limited for throughput".format(service.id))
+        raise RateLimitError(service.rate_limit, API_RATE_LIMIT_INTERVAL, api_key.key_type)
+    if status == "annual_limit":
+        current_app.logger.info(
+            f"{'Trial service' if service.restricted else 'Service'} {service.id} is exceeding their annual email limit [total sent this fiscal: {int(result[1])} limit: {service.email_annual_limit}, attempted send: {requested_emails}"
+        )
+        if service.restricted:
+            raise TrialServiceRequestExceedsEmailAnnualLimitError(service.email_annual_limit)
+        raise LiveServiceRequestExceedsEmailAnnualLimitError(service.email_annual_limit)
+    if status == "daily_limit":
+        current_app.logger.info(
+            f"service {service.id} is exceeding their daily email limit [total sent today: {int(result[1])} limit: {service.message_limit}, attempted send: {requested_emails}"
+        )
+        if service.restricted:
+            raise TrialServiceTooManyEmailRequestsError(service.message_limit)
+        raise LiveServiceTooManyEmailRequestsError(service.message_limit)
+    return EmailLimitsReservation(service, requested_emails, result)
+
+
+def _run_email_limits_script(service: Service, api_key: ApiKey, requested_emails: int) -> list:
+    rate_limited = current_app.config["API_RATE_LIMIT_ENABLED"]
+    now = datetime.now(timezone.utc).timestamp()
+    script = redis_store.redis_store.register_script(EMAIL_LIMITS_SCRIPT)
+    return script(
+        keys=[
+            rate_limit_cache_key(service.id, api_key.key_type),
+            email_daily_count_cache_key(service.id),
+            annual_limit_notifications_v2_key(service.id),
+            annual_limit_status_key(service.id),
+            near_email_daily_limit_cache_key(service.id),
+            over_email_daily_limit_cache_key(service.id),
+        ],
+        args=[
+            now,
+            # Unique, so that requests sent at the same time are all counted
+            f"{now}:{uuid.uuid4()}",
+            service.rate_limit if rate_limited else -1,
+            API_RATE_LIMIT_INTERVAL,
+            requested_emails,
+            service.message_limit,
+            service.email_annual_limit,
+            NEAR_DAILY_LIMIT_PERCENTAGE,
+            NEAR_ANNUAL_LIMIT_PERCENTAGE,
+            TOTAL_EMAIL_FISCAL_YEAR_TO_YESTERDAY,
+            datetime.utcnow().strftime("%Y-%m-%d"),
+            int(time_until_end_of_day().total_seconds()),
+            # Hash fields read by annual_limit_client.check_has_over_limit_been_sent and check_has_warning_been_sent
+            OVER_EMAIL_LIMIT,
+            NEAR_EMAIL_LIMIT,
+        ],
+    )
+
+
+def _script_status(result: list) -> str:
+    return result[0].decode("utf-8") if isinstance(result[0], bytes) else result[0]
+
+
+def _seed_email_limit_counters(service: Service) -> None:
+    """
+    Seeds the daily email count and, if not done today, the annual totals of the service.
+    The annual total is written even when it is 0, which seed_annual_limit_notifications skips.
+    """
+    fetch_todays_email_count(service.id)
+    annual_data = get_annual_limit_notifications_v2(service.id)
+    redis_store.redis_store.hsetnx(
+        annual_limit_notifications_v2_key(service.id),
+        TOTAL_EMAIL_FISCAL_YEAR_TO_YESTERDAY,
+        annual_data.get(TOTAL_EMAIL_FISCAL_YEAR_TO_YESTERDAY, 0),
+    )
+
+
+def _check_email_limits_separately(service: Service, api_key: ApiKey, requested_emails: int) -> None:
+    check_rate_limiting(service, api_key)
+    check_email_annual_limit(service, requested_emails)
+    check_email_daily_limit(service, requested_emails)
+
+
 def send_near_sms_limit_email(service: Service, sms_sent):
     limit_reset_time_et = get_limit_reset_time_et()
     sms_remaining = service.sms_daily_limit - sms_sent
@@ -602,7 +873,7 @@ def validate_template_exists(template_id, service: Service):
 
 
 def validate_template(template_id, personalisation, service: Service, notification_type: NotificationType):
-    template = check_template_exists_by_id_and_service(template_id, service)
+    template = check_template_exists_by_id_and_service(template_id, service, use_cache=True)
     check_template_is_for_notification_type(notification_type, template.template_type)
     check_template_is_active(template)
 
@@ -615,9 +886,11 @@ def validate_template(template_id, personalisation, service: Service, notificati
     return template, template_with_content
 
 
-def check_template_exists_by_id_and_service(template_id, service: Service) -> Template:
+def check_template_exists_by_id_and_service(template_id, service: Service, use_cache=False) -> Template:
     try:
-        return templates_dao.dao_get_template_by_id_and_service_id(template_id=template_id, service_id=service.id)
+        return templates_dao.dao_get_template_by_id_and_service_id(
+            template_id=template_id, service_id=service.id, use_cache=use_cache
+        )
     except NoResultFound:
         message = "Template not found"
         raise BadRequestError(message=message, fields=[{"template": message}])
@@ -635,7 +908,11 @@ def check_reply_to(service_id, reply_to_id, type_):
 def check_service_email_reply_to_id(service_id, reply_to_id, notification_type: NotificationType):
     if reply_to_id:
         try:
-            return dao_get_reply_to_by_id(service_id, reply_to_id).email_address
+            return local_caches.get_or_load(
+                reply_to_local_cache,
+                (EMAIL_TYPE, str(service_id), str(reply_to_id)),
+                lambda: dao_get_reply_to_by_id(service_id, reply_to_id).email_address,
+            )
         except NoResultFound:
             message = "email_reply_to_id {} does not exist in database for service id {}".format(reply_to_id, service_id)
             raise BadRequestError(message=message)
@@ -644,7 +921,11 @@ def check_service_email_reply_to_id(service_id, reply_to_id, notification_type:
 def check_service_sms_sender_id(service_id, sms_sender_id, notification_type: NotificationType):
     if sms_sender_id:
         try:
-            return dao_get_service_sms_senders_by_id(service_id, sms_sender_id).sms_sender
+            return local_caches.get_or_load(
+                reply_to_local_cache,
+                (SMS_TYPE, str(service_id), str(sms_sender_id)),
+                lambda: dao_get_service_sms_senders_by_id(service_id, sms_sender_id).sms_sender,
+            )
         except NoResultFound:
             message = "sms_sender_id {} does not exist in database for service id {}".format(sms_sender_id, service_id)
             raise BadRequestError(message=message)
@@ -1,14 +1,18 @@
+import math
 import random
 import string
+import time
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 from uuid import UUID, uuid4
 
 from flask import current_app
 from redis import Redis
+from redis.client import Pipeline
 
 from app.aws.metrics import (
+    put_batch_saving_drain_metric,
     put_batch_saving_expiry_metric,
     put_batch_saving_inflight_metric,
     put_batch_saving_inflight_processed,
@@ -29,6 +33,7 @@ def generate_elements(count=10) -> list[str]:
 class Buffer(Enum):
     INBOX = "inbox"
     IN_FLIGHT = "in-flight"
+    IN_FLIGHT_INDEX = "in-flight-index"
 
     def inbox_name(self, suffix=None, process_type=None):
         if process_type and suffix:
@@ -138,6 +143,7 @@ class RedisQueue(Queue):
 
         """
         self._inbox = Buffer.INBOX.inbox_name(suffix, process_type)
+        self._inflight_index = Buffer.IN_FLIGHT_INDEX.inbox_name(suffix, process_type)
         self._suffix = suffix
         self._process_type = process_type
         self._expire_inflight_after_seconds = expire_inflight_after_seconds
@@ -151,29 +157,71 @@ class RedisQueue(Queue):
         receipt = uuid4()
         in_flight_key = Buffer.IN_FLIGHT.inflight_name(receipt, self._suffix, self._process_type)
         results = self.__move_to_inflight(in_flight_key, count)
+        return self.__polled(receipt, results)
+
+    def pipeline(self) -> Pipeline:
+        """Pipeline on the queue's Redis client, to batch depth and poll_pipelined calls into one round trip."""
+        return self._redis_client.pipeline(transaction=False)
+
+    def depth(self, pipeline: Optional[Pipeline] = None) -> int:
+        """Number of messages waiting in the inbox. With a pipeline, the LLEN is queued on it instead."""
+        return (pipeline or self._redis_client).llen(self._inbox)
+
+    def poll_pipelined(self, pipeline: Pipeline, count=10) -> UUID:
+        """Queues a poll on the pipeline. Once the pipeline is executed, pass the receipt
+        and the matching result to `poll_result` to get what `poll` would have returned.
+        """
+        receipt = uuid4()
+        in_flight_key = Buffer.IN_FLIGHT.inflight_name(receipt, self._suffix, self._process_type)
+        self.scripts[self.LUA_MOVE_TO_INFLIGHT](
+            args=[self._inbox, in_flight_key, count, self._inflight_index, time.time()], client=pipeline
+        )
+        return receipt
+
+    def poll_result(self, receipt: UUID, results: list[bytes]) -> tuple[UUID, list[str]]:
+        return self.__polled(receipt, [result.decode("utf-8") for result in results])
+
+    def __polled(self, receipt: UUID, results: list[str]) -> tuple[UUID, list[str]]:
         if results:
+            in_flight_key = Buffer.IN_FLIGHT.inflight_name(receipt, self._suffix, self._process_type)
             current_app.logger.info(f"Inflight created: {in_flight_key}")
             put_batch_saving_inflight_metric(self.__metrics_logger, self, 1)
         return (receipt, results)
 
     def expire_inflights(self):
-        if self._process_type:
-            args = [
-                f"{Buffer.IN_FLIGHT.inflight_prefix()}:{self._suffix}:{self._process_type}*",
-                self._inbox,
-                self._expire_inflight_after_seconds,
-            ]
-        else:
-            args = [
-                f"{Buffer.IN_FLIGHT.inflight_prefix()}:{self._suffix}*",
-                self._inbox,
-                self._expire_inflight_after_seconds,
-            ]
-        expired = self.scripts[self.LUA_EXPIRE_INFLIGHTS](args=args)
+        """Moves the in-flight lists created more than expire_inflight_after_seconds ago back to the inbox.
+
+        Only the in-flight index is read, so the cost depends on the number of expired lists and
+        not on the number of keys in Redis.
+        """
+        cutoff = time.time() - self._expire_inflight_after_seconds
+        expired = self.scripts[self.LUA_EXPIRE_INFLIGHTS](args=[self._inflight_index, self._inbox, cutoff])
         if expired:
             put_batch_saving_expiry_metric(self.__metrics_logger, self, len(expired))
             current_app.logger.warning(f"Moved inflights {expired} back to inbox {self._inbox}")
 
+    def index_legacy_inflights(self) -> int:
+        """Adds the in-flight lists created before the in-flight index existed to the index.
+
+        These lists are found with SCAN, and are scored from their idle time as the previous
+        expiry did, so they expire on the same schedule. Returns the number of lists indexed.
+        """
+        prefix = Buffer.IN_FLIGHT.inflight_prefix(self._suffix, self._process_type)
+        now = time.time()
+        indexed = 0
+        for key in self._redis_client.scan_iter(match=f"{prefix}:*", count=1000):
+            name = key.decode("utf-8")
+            if ":" in name[len(prefix) + 1 :]:
+                # in-flight list of another queue sharing this prefix, e.g. a process type of this suffix
+                continue
+            idle = self._redis_client.object("idletime", name)
+            if idle is None:
+                continue
+            indexed += self._redis_client.zadd(self._inflight_index, {name: now - idle}, nx=True)
+        if indexed:
+            current_app.logger.info(f"Indexed {indexed} legacy inflights in {self._inflight_index}")
+        return indexed
+
     def acknowledge(self, receipt: UUID) -> bool:
         """
         Remove the in-flight list from Redis
@@ -185,10 +233,13 @@ class RedisQueue(Queue):
         Returns: True if the inflight was found in that queue and removed, False otherwise
         """
         inflight_name = Buffer.IN_FLIGHT.inflight_name(receipt, self._suffix, self._process_type)
-        if not self._redis_client.exists(inflight_name):
+        pipeline = self._redis_client.pipeline()
+        pipeline.delete(inflight_name)
+        pipeline.zrem(self._inflight_index, inflight_name)
+        deleted, _ = pipeline.execute()
+        if not deleted:
             current_app.logger.warning(f"Inflight to delete not found: {inflight_name}")
             return False
-        self._redis_client.delete(inflight_name)
         current_app.logger.info(f"Acknowledged inflight: {inflight_name}")
         put_batch_saving_inflight_processed(self.__metrics_logger, self, 1)
         return True
@@ -197,8 +248,13 @@ class RedisQueue(Queue):
         self._redis_client.rpush(self._inbox, message)
         put_batch_saving_metric(self.__metrics_logger, self, 1)
 
+    def put_drain_metric(self, drained: int, seconds: float, remaining: int):
+        put_batch_saving_drain_metric(self.__metrics_logger, self, drained, seconds, remaining)
+
     def __move_to_inflight(self, in_flight_key: str, count: int) -> list[str]:
-        results = self.scripts[self.LUA_MOVE_TO_INFLIGHT](args=[self._inbox, in_flight_key, count])
+        results = self.scripts[self.LUA_MOVE_TO_INFLIGHT](
+            args=[self._inbox, in_flight_key, count, self._inflight_index, time.time()]
+        )
         decoded = [result.decode("utf-8") for result in results]
         return decoded
 
@@ -211,6 +267,8 @@ class RedisQueue(Queue):
             local destination   = ARGV[2]
             local source_size   = tonumber(redis.call("LLEN", source))
             local count         = math.min(source_size, tonumber(ARGV[3]))
+            local index         = ARGV[4]
+            local created_at    = ARGV[5]
 
             local chunk_size    = math.min(math.max(0, count-1), DEFAULT_CHUNK)
             local current       = 0
@@ -226,6 +284,10 @@ class RedisQueue(Queue):
                 chunk_size = math.min((count-1) - current, DEFAULT_CHUNK)
             end
 
+            if count > 0 then
+                redis.call("ZADD", index, created_at, destination)
+            end
+
             return all
             """
         )
@@ -233,40 +295,102 @@ class RedisQueue(Queue):
         self.scripts[self.LUA_EXPIRE_INFLIGHTS] = self._redis_client.register_script(
             """
             local DEFAULT_CHUNK   = 99
-            local inflight_prefix = ARGV[1]
+            local index           = ARGV[1]
             local destination     = ARGV[2]
-            local expire_after    = tonumber(ARGV[3])
+            local cutoff          = ARGV[3]
 
-            local cursor = "0";
             local expired_inflights = {}
-            repeat
-                local scan_result = redis.call("SCAN", cursor, "MATCH", inflight_prefix, "COUNT", 100);
-                cursor = scan_result[1]
-                for i, inflight in pairs(scan_result[2]) do
-                    local idle = redis.call("object", "idletime", inflight)
-                    if ( idle > expire_after) then
-                        local count         = tonumber(redis.call("LLEN", inflight))
-                        local chunk_size    = math.min(math.max(0, count-1), DEFAULT_CHUNK)
-                        local current       = 0
-
-                        while current < count do
-                            local elements = redis.call("LRANGE", inflight, 0, chunk_size)
-                            redis.call("LPUSH", destination, unpack(elements))
-                            redis.call("LTRIM", inflight, chunk_size+1, -1)
-                            current    = current + chunk_size+1
-                            chunk_size = math.min((count-1) - current, DEFAULT_CHUNK)
-                        end
-
-                        expired_inflights[#expired_inflights+1] = inflight
-                        redis.call("del", inflight)
-                    end
+            for i, inflight in ipairs(redis.call("ZRANGEBYSCORE", index, "-inf", "(" .. cutoff)) do
+                local count         = tonumber(redis.call("LLEN", inflight))
+                local chunk_size    = math.min(math.max(0, count-1), DEFAULT_CHUNK)
+                local current       = 0
+
+                while current < count do
+                    local elements = redis.call("LRANGE", inflight, 0, chunk_size)
+                    redis.call("LPUSH", destination, unpack(elements))
+                    redis.call("LTRIM", inflight, chunk_size+1, -1)
+                    current    = current + chunk_size+1
+                    chunk_size = math.min((count-1) - current, DEFAULT_CHUNK)
+                end
+
+                if count > 0 then
+                    expired_inflights[#expired_inflights+1] = inflight
                 end
-            until cursor == "0";
+                redis.call("DEL", inflight)
+                redis.call("ZREM", index, inflight)
+            end
             return expired_inflights
             """
         )
 
 
+class InboxLane:
+    """A RedisQueue drained by an InboxDrainer.
+
+    The weight is the number of polls the lane gets per round relative to the
+    other lanes, and dispatch is called with each polled (receipt, notifications)
+    batch to hand it over to the saving task.
+    """
+
+    def __init__(self, queue: RedisQueue, weight: int, dispatch: Callable[[UUID, list[str]], None]) -> None:
+        self.queue = queue
+        self.weight = weight
+        self.dispatch = dispatch
+
+
+class InboxDrainer:
+    """Drains several RedisQueue inboxes in one pass.
+
+    Each round polls every non-empty lane `weight` times, with a batch size that
+    grows with the inbox depth, between min_batch_size and max_batch_size. All of
+    a round's polls and the LLENs that size the next round are sent in a single
+    Redis pipeline. Rounds continue until every inbox is empty or max_seconds
+    have passed, so that a beat tick stays shorter than the beat interval.
+    """
+
+    def __init__(self, lanes: list[InboxLane], min_batch_size=10, max_batch_size=250, max_seconds=8.0) -> None:
+        self.lanes = lanes
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_seconds = max_seconds
+
+    def batch_size(self, depth: int) -> int:
+        return min(self.max_batch_size, max(self.min_batch_size, depth))
+
+    def drain(self) -> dict[RedisQueue, int]:
+        """Drains the lanes and returns how many notifications were dispatched per queue."""
+        start = time.monotonic()
+        drained = {lane.queue: 0 for lane in self.lanes}
+
+        pipeline = self.lanes[0].queue.pipeline()
+        for lane in self.lanes:
+            lane.queue.depth(pipeline)
+        depths = pipeline.execute()
+
+        while any(depths) and time.monotonic() - start < self.max_seconds:
+            polls = []
+            for lane, depth in zip(self.lanes, depths):
+                if depth:
+                    batch_size = self.batch_size(depth)
+                    for _ in range(min(lane.weight, math.ceil(depth / batch_size))):
+                        polls.append((lane, lane.queue.poll_pipelined(pipeline, batch_size)))
+            for lane in self.lanes:
+                lane.queue.depth(pipeline)
+            results = pipeline.execute()
+
+            for (lane, receipt), polled in zip(polls, results):
+                receipt, notifications = lane.queue.poll_result(receipt, polled)
+                if notifications:
+                    lane.dispatch(receipt, notifications)
+                    drained[lane.queue] += len(notifications)
+            depths = results[len(polls) :]
+
+        elapsed = time.monotonic() - start
+        for lane, depth in zip(self.lanes, depths):
+            lane.queue.put_drain_metric(drained[lane.queue], elapsed, depth)
+        return drained
+
+
 class MockQueue(Queue):
     """Implementation of a queue that spits out randomly generated elements.
 
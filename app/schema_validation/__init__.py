@@ -4,7 +4,7 @@ from uuid import UUID
 
 from flask import current_app
 from iso8601 import ParseError, iso8601
-from jsonschema import Draft7Validator, FormatChecker, ValidationError
+from jsonschema import FormatChecker, ValidationError
 from notifications_utils.recipients import (
     InvalidEmailError,
     InvalidPhoneError,
@@ -12,6 +12,7 @@ from notifications_utils.recipients import (
     validate_phone_number,
 )
 
+from app.cache.schema_validators import schema_validator_registry
 from app.notifications.validators import validate_personalisation_and_decode_files
 
 format_checker = FormatChecker()
@@ -65,10 +66,11 @@ def validate_schema_date_for_job(instance):
 
 
 def validate(json_to_validate, schema):
-    validator = Draft7Validator(schema, format_checker=format_checker)
-    errors = list(validator.iter_errors(json_to_validate))
-    if errors.__len__() > 0:
-        raise ValidationError(build_error_message(errors))
+    validator, fast_check = schema_validator_registry.get(schema, format_checker)
+    if fast_check is None or not fast_check(json_to_validate):
+        errors = list(validator.iter_errors(json_to_validate))
+        if errors.__len__() > 0:
+            raise ValidationError(build_error_message(errors))
     if json_to_validate.get("personalisation", None):
         json_to_validate["personalisation"], errors = validate_personalisation_and_decode_files(
             json_to_validate.get("personalisation", {})
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from app.models import (
     NOTIFICATION_STATUS_LETTER_ACCEPTED,
     NOTIFICATION_STATUS_LETTER_RECEIVED,
@@ -275,7 +277,9 @@ post_letter_response = {
 }
 
 
+@lru_cache(maxsize=None)
 def post_bulk_request(limit):
+    # The same dict for the same limit, so that its validator is compiled once by the schema validator registry
     return {
         "$schema": "http://json-schema.org/draft-04/schema#",
         "description": "POST email notification schema",
@@ -40,6 +40,7 @@ from app.dao.notifications_dao import update_notification_status_by_reference
 from app.dao.templates_dao import get_precompiled_letter_template
 from app.email_limit_utils import fetch_todays_email_count
 from app.encryption import NotificationDictToSign
+from app.job.rows_artifact import store_job_rows
 from app.models import (
     BULK,
     EMAIL_TYPE,
@@ -82,6 +83,7 @@ from app.notifications.validators import (
     check_sms_daily_limit,
     increment_email_daily_count_send_warnings_if_needed,
     increment_sms_daily_count_send_warnings_if_needed,
+    reserve_email_limits,
     validate_and_format_recipient,
     validate_template,
     validate_template_exists,
@@ -307,7 +309,12 @@ def post_notification(notification_type: NotificationType):
 
     scheduled_for = form.get("scheduled_for", None)
 
-    check_rate_limiting(authenticated_service, api_user)
+    # The rate limit of live emails is checked by reserve_email_limits, together with the daily and annual limits
+    use_email_limits_script = (
+        current_app.config["FF_EMAIL_LIMITS_SCRIPT"] and notification_type == EMAIL_TYPE and api_user.key_type != KEY_TYPE_TEST
+    )
+    if not use_email_limits_script:
+        check_rate_limiting(authenticated_service, api_user)
 
     personalisation = strip_keys_from_personalisation_if_send_attach(form.get("personalisation", {}))
     template, template_with_content = validate_template(
@@ -317,7 +324,10 @@ def post_notification(notification_type: NotificationType):
         notification_type,
     )
 
-    if template.template_type == EMAIL_TYPE and api_user.key_type != KEY_TYPE_TEST:
+    email_limits = None
+    if use_email_limits_script:
+        email_limits = reserve_email_limits(authenticated_service, api_user, 1)  # 1 email
+    elif template.template_type == EMAIL_TYPE and api_user.key_type != KEY_TYPE_TEST:
         check_email_annual_limit(authenticated_service, 1)
         check_email_daily_limit(authenticated_service, 1)  # 1 email
 
@@ -335,28 +345,35 @@ def post_notification(notification_type: NotificationType):
 
     current_app.logger.info(f"Trying to send notification for Template ID: {template.id}")
 
-    reply_to = get_reply_to_text(notification_type, form, template)
-
-    if notification_type == LETTER_TYPE:
-        notification = process_letter_notification(
-            letter_data=form,
-            api_key=api_user,
-            template=template,
-            reply_to_text=reply_to,
-        )
-    else:
-        notification = process_sms_or_email_notification(
-            form=form,
-            notification_type=notification_type,
-            api_key=api_user,
-            template=template,
-            service=authenticated_service,
-            reply_to_text=reply_to,
-        )
+    try:
+        reply_to = get_reply_to_text(notification_type, form, template)
+
+        if notification_type == LETTER_TYPE:
+            notification = process_letter_notification(
+                letter_data=form,
+                api_key=api_user,
+                template=template,
+                reply_to_text=reply_to,
+            )
+        else:
+            notification = process_sms_or_email_notification(
+                form=form,
+                notification_type=notification_type,
+                api_key=api_user,
+                template=template,
+                service=authenticated_service,
+                reply_to_text=reply_to,
+            )
 
-        template_with_content.values = notification.personalisation
+            template_with_content.values = notification.personalisation
+    except Exception:
+        if email_limits:
+            email_limits.release()
+        raise
 
-    if template.template_type == EMAIL_TYPE and api_user.key_type != KEY_TYPE_TEST:
+    if email_limits:
+        email_limits.send_warning_emails()
+    elif template.template_type == EMAIL_TYPE and api_user.key_type != KEY_TYPE_TEST:
         increment_email_daily_count_send_warnings_if_needed(authenticated_service, 1)  # 1 email
 
     if template.template_type == SMS_TYPE:
@@ -766,6 +783,7 @@ def create_bulk_job(service, api_key, template, form, recipient_csv):
         data["scheduled_for"] = form.get("scheduled_for")
 
     job = job_schema.load(data)
+    store_job_rows(service.id, job.id, recipient_csv)
     dao_create_job(job)
 
     if job.job_status == JOB_STATUS_PENDING:
@@ -0,0 +1,98 @@
+import argparse
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from flask import Flask
+
+sys.path.append("../..")
+from app import bounce_rate_client, create_app, redis_store  # noqa: E402
+from app.delivery.bounce_rate_buckets import SENT, bounce_rate_buckets, bounce_rate_buckets_key  # noqa: E402
+
+HOURS = 24
+
+
+def used_memory() -> int:
+    return redis_store.redis_store.info("memory")["used_memory"]
+
+
+def hourly_totals(emails: int, hard_bounce_rate: float):
+    """Rows of (hour, emails, hard bounces) spreading the emails over the last 24 hours, as the seeding queries return."""
+    current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    per_hour = emails // HOURS
+    return [(current_hour - timedelta(hours=hour), per_hour, int(per_hour * hard_bounce_rate)) for hour in range(HOURS)]
+
+
+def seed_sorted_sets(service_id: str, rows) -> None:
+    # What seed_bounce_rate_in_redis does without FF_BOUNCE_RATE_BUCKETS
+    for hour, total_notifications, hard_bounces in rows:
+        hour_timestamp_s = int(hour.timestamp()) + 1
+        bounce_rate_client.set_notifications_seeded(
+            service_id, {str(uuid4()): hour_timestamp_s for _ in range(total_notifications)}
+        )
+        bounce_rate_client.set_hard_bounce_seeded(service_id, {str(uuid4()): hour_timestamp_s for _ in range(hard_bounces)})
+
+
+def send_sorted_sets(service_id: str) -> None:
+    # What _finish_email does for each email without FF_BOUNCE_RATE_BUCKETS
+    bounce_rate_client.get_bounce_rate(service_id)
+    bounce_rate_client.check_bounce_rate_status(service_id)
+    bounce_rate_client.get_total_notifications(service_id)
+    bounce_rate_client.set_sliding_notifications(service_id, str(uuid4()))
+
+
+def send_buckets(service_id: str) -> None:
+    # The bounce rate is evaluated for every email here, count_sent_email evaluates it once per BR_CHECK_INTERVAL_SECONDS
+    bounce_rate_buckets.increment({service_id: Counter({SENT: 1})})
+    bounce_rate_buckets.get_bounce_rate(service_id)
+
+
+def measure(seed, send, service_id: str, sends: int):
+    memory_before = used_memory()
+    start = time.perf_counter()
+    seed()
+    seed_seconds = time.perf_counter() - start
+    memory = used_memory() - memory_before
+
+    start = time.perf_counter()
+    for _ in range(sends):
+        send(service_id)
+    send_seconds = (time.perf_counter() - start) / sends
+    return seed_seconds, memory, send_seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", default=[10_000, 100_000, 1_000_000], type=int, nargs="+", help="emails sent in 24 hours")
+    parser.add_argument("--hard-bounce-rate", default=0.02, type=float, help="share of the emails that hard bounced")
+    parser.add_argument("--sends", default=1000, type=int, help="emails sent per measurement of the cost of sending")
+    args = parser.parse_args()
+
+    app = Flask("benchmark_bounce_rate")
+    create_app(app)
+
+    print(
+        f"{'emails':>10} {'representation':>15} {'seed (s)':>10} {'memory (KiB)':>13} {'per send (us)':>14} {'bounce rate':>12}"
+    )
+    with app.app_context():
+        for emails in args.emails:
+            rows = hourly_totals(emails, args.hard_bounce_rate)
+            service_id = str(uuid4())
+            try:
+                results = {
+                    "sorted sets": measure(lambda: seed_sorted_sets(service_id, rows), send_sorted_sets, service_id, args.sends)
+                    + (bounce_rate_client.get_bounce_rate(service_id),),
+                    "buckets": measure(lambda: bounce_rate_buckets.seed({service_id: rows}), send_buckets, service_id, args.sends)
+                    + (bounce_rate_buckets.get_bounce_rate(service_id)[0],),
+                }
+            finally:
+                bounce_rate_client.clear_bounce_rate_data(service_id)
+                redis_store.redis_store.delete(bounce_rate_buckets_key(service_id))
+
+            for name, (seed_seconds, memory, send_seconds, bounce_rate) in results.items():
+                print(
+                    f"{emails:>10} {name:>15} {seed_seconds:>10.3f} {memory / 1024:>13.1f} "
+                    f"{send_seconds * 1e6:>14.1f} {bounce_rate:>12.4f}"
+                )
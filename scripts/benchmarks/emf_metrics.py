@@ -0,0 +1,49 @@
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+from aws_embedded_metrics.config import get_config  # type: ignore
+from flask import Flask
+
+sys.path.append("../..")
+from app import create_app  # noqa: E402
+from app.aws.metrics import put_batch_saving_metric  # noqa: E402
+from app.aws.metrics_logger import MetricsLogger  # noqa: E402
+from app.queue import RedisQueue  # noqa: E402
+
+
+def publish_metrics(metrics_logger: MetricsLogger, queue: RedisQueue, publishes: int):
+    """Times the put_batch_saving_metric calls of publishes RedisQueue.publish, and counts the EMF documents written."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        for _ in range(publishes):
+            put_batch_saving_metric(metrics_logger, queue, 1)
+        seconds = time.perf_counter() - start
+        if metrics_logger.buffered:
+            metrics_logger.flush_buffer()
+    return seconds, len(output.getvalue().splitlines())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--publishes", default=10_000, type=int, help="notifications published")
+    args = parser.parse_args()
+
+    app = Flask("benchmark_emf_metrics")
+    create_app(app)
+    # Write the documents to stdout instead of the CloudWatch agent
+    get_config().environment = "local"
+    metrics_logger = MetricsLogger()
+    metrics_logger.metrics_config.disable_metric_extraction = False
+    queue = RedisQueue("email", process_type="normal")
+
+    print(f"{'metrics':>10} {'per publish (us)':>17} {'documents':>10}")
+    with app.app_context():
+        for name, buffered in [("immediate", False), ("buffered", True)]:
+            app.config["FF_BUFFERED_CLOUDWATCH_METRICS"] = buffered
+            metrics_logger.init_app(app)
+            seconds, documents = publish_metrics(metrics_logger, queue, args.publishes)
+            print(f"{name:>10} {seconds / args.publishes * 1e6:>17.1f} {documents:>10}")
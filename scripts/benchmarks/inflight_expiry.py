@@ -0,0 +1,145 @@
+import argparse
+import sys
+import time
+from uuid import uuid4
+
+from flask import Flask
+
+sys.path.append("../..")
+from app import create_app, flask_redis, metrics_logger  # noqa: E402
+from app.queue import Buffer, RedisQueue  # noqa: E402
+
+BENCHMARK_SUFFIX = "benchmark"
+UNRELATED_PREFIX = "benchmark-unrelated"
+PIPELINE_SIZE = 10000
+
+# The SCAN + OBJECT IDLETIME expiry that the in-flight index replaced.
+LEGACY_EXPIRE_INFLIGHTS = """
+local DEFAULT_CHUNK   = 99
+local inflight_prefix = ARGV[1]
+local destination     = ARGV[2]
+local expire_after    = tonumber(ARGV[3])
+
+local cursor = "0";
+local expired_inflights = {}
+repeat
+    local scan_result = redis.call("SCAN", cursor, "MATCH", inflight_prefix, "COUNT", 100);
+    cursor = scan_result[1]
+    for i, inflight in pairs(scan_result[2]) do
+        local idle = redis.call("object", "idletime", inflight)
+        if ( idle > expire_after) then
+            local count         = tonumber(redis.call("LLEN", inflight))
+            local chunk_size    = math.min(math.max(0, count-1), DEFAULT_CHUNK)
+            local current       = 0
+
+            while current < count do
+                local elements = redis.call("LRANGE", inflight, 0, chunk_size)
+                redis.call("LPUSH", destination, unpack(elements))
+                redis.call("LTRIM", inflight, chunk_size+1, -1)
+                current    = current + chunk_size+1
+                chunk_size = math.min((count-1) - current, DEFAULT_CHUNK)
+            end
+
+            expired_inflights[#expired_inflights+1] = inflight
+            redis.call("del", inflight)
+        end
+    end
+until cursor == "0";
+return expired_inflights
+"""
+
+
+def seed_unrelated_keys(n: int) -> None:
+    pipeline = flask_redis.pipeline(transaction=False)
+    for i in range(n):
+        pipeline.set(f"{UNRELATED_PREFIX}:{i}", "x")
+        if (i + 1) % PIPELINE_SIZE == 0:
+            pipeline.execute()
+            print(f"Seeded {i + 1} / {n} unrelated keys")
+    pipeline.execute()
+
+
+def seed_inflights(queue: RedisQueue, n: int, batch_size: int) -> None:
+    for i in range(n * batch_size):
+        queue.publish(str(i))
+    for _ in range(n):
+        queue.poll(batch_size)
+
+
+def seed_legacy_inflights(n: int, batch_size: int) -> None:
+    pipeline = flask_redis.pipeline(transaction=False)
+    for _ in range(n):
+        pipeline.rpush(Buffer.IN_FLIGHT.inflight_name(uuid4(), BENCHMARK_SUFFIX), *[str(i) for i in range(batch_size)])
+    pipeline.execute()
+
+
+def run_legacy(queue: RedisQueue) -> float:
+    script = flask_redis.register_script(LEGACY_EXPIRE_INFLIGHTS)
+    start = time.perf_counter()
+    script(args=[f"{Buffer.IN_FLIGHT.inflight_prefix(BENCHMARK_SUFFIX)}*", queue._inbox, 0])
+    return time.perf_counter() - start
+
+
+def run_indexed(queue: RedisQueue) -> float:
+    start = time.perf_counter()
+    queue.expire_inflights()
+    return time.perf_counter() - start
+
+
+def delete_keys(pattern: str) -> None:
+    pipeline = flask_redis.pipeline(transaction=False)
+    for i, key in enumerate(flask_redis.scan_iter(match=pattern, count=PIPELINE_SIZE)):
+        pipeline.delete(key)
+        if (i + 1) % PIPELINE_SIZE == 0:
+            pipeline.execute()
+    pipeline.execute()
+
+
+def cleanup(queue: RedisQueue, keep_unrelated: bool) -> None:
+    flask_redis.delete(queue._inbox, queue._inflight_index)
+    delete_keys(f"{Buffer.IN_FLIGHT.inflight_prefix(BENCHMARK_SUFFIX)}:*")
+    if not keep_unrelated:
+        delete_keys(f"{UNRELATED_PREFIX}:*")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-u", "--unrelated", default=2_000_000, type=int, help="number of unrelated keys to seed (default 2M)")
+    parser.add_argument("-i", "--inflights", default=100, type=int, help="number of in-flight lists to expire (default 100)")
+    parser.add_argument("-b", "--batch-size", default=10, type=int, help="notifications per in-flight list (default 10)")
+    parser.add_argument("--keep-unrelated", action="store_true", help="keep the unrelated keys for another run")
+    args = parser.parse_args()
+
+    app = Flask("benchmark_inflight_expiry")
+    create_app(app)
+
+    with app.app_context():
+        # expire_inflight_after_seconds=0 so that every seeded in-flight list is expired by both paths
+        queue = RedisQueue(BENCHMARK_SUFFIX, expire_inflight_after_seconds=0)
+        queue.init_app(flask_redis, metrics_logger)
+
+        try:
+            if flask_redis.exists(f"{UNRELATED_PREFIX}:{args.unrelated - 1}"):
+                print(f"Reusing {args.unrelated} unrelated keys")
+            else:
+                seed_unrelated_keys(args.unrelated)
+            print(f"Redis holds {flask_redis.dbsize()} keys")
+
+            seed_legacy_inflights(args.inflights, args.batch_size)
+            legacy_seconds = run_legacy(queue)
+            legacy_expired = flask_redis.llen(queue._inbox)
+            flask_redis.delete(queue._inbox)
+
+            seed_inflights(queue, args.inflights, args.batch_size)
+            time.sleep(0.01)
+            indexed_seconds = run_indexed(queue)
+            indexed_expired = flask_redis.llen(queue._inbox)
+        finally:
+            cleanup(queue, args.keep_unrelated)
+
+        print(f"SCAN + OBJECT IDLETIME: {legacy_seconds * 1000:.1f}ms, {legacy_expired} notifications back in the inbox")
+        print(f"in-flight index:        {indexed_seconds * 1000:.1f}ms, {indexed_expired} notifications back in the inbox")
+        print(f"speedup: {legacy_seconds / indexed_seconds:.1f}x")
+        if legacy_expired != indexed_expired:
+            print("WARNING: the two paths expired a different number of notifications")
+            sys.exit(1)
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+import uuid
+from unittest import mock
+
+from flask import Flask
+from notifications_python_client.authentication import create_jwt_token
+
+sys.path.append("../..")
+from app import create_app  # noqa: E402
+from app.authentication import auth  # noqa: E402
+from app.cache.local import local_caches  # noqa: E402
+from app.models import KEY_TYPE_NORMAL, ApiKey, Service  # noqa: E402
+
+KEY_COUNTS = [1, 10, 50]
+
+
+def build_service(n_keys: int) -> Service:
+    """A transient service with n_keys API keys, so that requires_auth runs without a database."""
+    service = Service(id=uuid.uuid4(), name="benchmark", active=True, restricted=False, research_mode=False)
+    for i in range(n_keys):
+        api_key = ApiKey(id=uuid.uuid4(), name=f"key {i}", key_type=KEY_TYPE_NORMAL, service_id=service.id)
+        api_key.secret = uuid.uuid4()
+        service.api_keys.append(api_key)
+    return service
+
+
+def time_requests(app: Flask, service: Service, token: str, iterations: int) -> float:
+    with mock.patch.object(auth, "dao_fetch_service_by_id_with_api_keys", return_value=service):
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            auth.requires_auth()  # warm up, and fill the caches when they are on
+            start = time.perf_counter()
+            for _ in range(iterations):
+                auth.requires_auth()
+            return (time.perf_counter() - start) / iterations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--iterations", default=2000, type=int, help="requests to authenticate per measurement")
+    args = parser.parse_args()
+
+    app = Flask("benchmark_jwt_verification")
+    create_app(app)
+    app.logger.disabled = True
+
+    print(f"{'keys':>5} {'no cache (us)':>14} {'cache (us)':>11} {'speedup':>8}")
+    for n_keys in KEY_COUNTS:
+        service = build_service(n_keys)
+        # Signed with the last key, the worst case for the per-key decode loop
+        token = create_jwt_token(secret=service.api_keys[-1].secret, client_id=str(service.id))
+
+        app.config["FF_JWT_VERIFICATION_CACHE"] = False
+        uncached = time_requests(app, service, token, args.iterations)
+        app.config["FF_JWT_VERIFICATION_CACHE"] = True
+        local_caches.clear()
+        cached = time_requests(app, service, token, args.iterations)
+
+        print(f"{n_keys:>5} {uncached * 1e6:>14.1f} {cached * 1e6:>11.1f} {uncached / cached:>7.1f}x")
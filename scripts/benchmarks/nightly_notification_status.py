@@ -0,0 +1,123 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+from flask import Flask
+
+sys.path.append("../..")
+from app import create_app, create_uuid, db  # noqa: E402
+from app.dao.fact_notification_status_dao import (  # noqa: E402
+    fetch_notification_status_for_day,
+    update_fact_notification_status,
+    upsert_fact_notification_status_for_day,
+)
+from app.models import FactNotificationStatus, NotificationHistory, Service, Template  # noqa: E402
+
+BENCHMARK_REFERENCE = "benchmark"
+DEFAULT_CHUNK_SIZE = 10000
+STATUSES = ["delivered", "delivered", "delivered", "sending", "permanent-failure", "temporary-failure"]
+
+
+def seed_notifications(n: int, n_services: int, process_day: date, chunk_size: int) -> None:
+    templates: List[Template] = []
+    seen_services = set()
+    for template in Template.query.filter(Template.template_type.in_(["email", "sms"])).yield_per(1000):
+        if template.service_id not in seen_services:
+            seen_services.add(template.service_id)
+            templates.append(template)
+        if len(templates) >= n_services:
+            break
+    if not templates:
+        print("No email or sms templates found to seed notifications against")
+        sys.exit(1)
+
+    day_start = datetime.combine(process_day, datetime.min.time())
+    for done in range(0, n, chunk_size):
+        notifications = []
+        for _ in range(min(chunk_size, n - done)):
+            template = random.choice(templates)
+            notifications.append(
+                NotificationHistory(
+                    id=create_uuid(),
+                    created_at=day_start + timedelta(seconds=random.randrange(86400)),
+                    template_id=template.id,
+                    template_version=template.version,
+                    service_id=template.service_id,
+                    notification_type=template.template_type,
+                    key_type="normal",
+                    status=random.choice(STATUSES),
+                    billable_units=1,
+                    client_reference=BENCHMARK_REFERENCE,
+                )
+            )
+        db.session.bulk_save_objects(notifications)
+        db.session.commit()
+        print(f"Seeded {done + len(notifications)} / {n} notifications across {len(templates)} services")
+
+
+def fact_rows(process_day: date):
+    return sorted(
+        (str(row.service_id), str(row.template_id), row.notification_type, row.notification_status, row.notification_count)
+        for row in FactNotificationStatus.query.filter(FactNotificationStatus.bst_date == process_day)
+    )
+
+
+def run_per_service(process_day: date, service_chunk_size: int) -> float:
+    service_ids = [x.id for x in Service.query.all()]
+    start = time.perf_counter()
+    for i in range(0, len(service_ids), service_chunk_size):
+        chunk = service_ids[i : i + service_chunk_size]
+        data = fetch_notification_status_for_day(process_day=process_day, service_ids=chunk)
+        update_fact_notification_status(data, process_day, service_ids=chunk)
+    return time.perf_counter() - start
+
+
+def run_set_based(process_day: date) -> float:
+    start = time.perf_counter()
+    upsert_fact_notification_status_for_day(process_day)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--seed", default=0, type=int, help="number of notifications to seed for the day (default 0)")
+    parser.add_argument("--services", default=500, type=int, help="maximum number of services to spread seeded rows over")
+    parser.add_argument(
+        "-d",
+        "--day",
+        default=(date.today() - timedelta(days=1)).isoformat(),
+        type=str,
+        help="day to rebuild, YYYY-MM-DD (default yesterday)",
+    )
+    parser.add_argument("--service-chunk-size", default=10, type=int, help="services per chunk for the per-service path")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded notifications afterwards")
+    args = parser.parse_args()
+
+    app = Flask("benchmark_nightly_notification_status")
+    create_app(app)
+    process_day = datetime.strptime(args.day, "%Y-%m-%d").date()
+
+    with app.app_context():
+        if args.seed:
+            seed_notifications(args.seed, args.services, process_day, DEFAULT_CHUNK_SIZE)
+
+        try:
+            per_service_seconds = run_per_service(process_day, args.service_chunk_size)
+            per_service_rows = fact_rows(process_day)
+            set_based_seconds = run_set_based(process_day)
+            set_based_rows = fact_rows(process_day)
+        finally:
+            if args.seed and not args.keep:
+                NotificationHistory.query.filter(NotificationHistory.client_reference == BENCHMARK_REFERENCE).delete()
+                db.session.commit()
+                upsert_fact_notification_status_for_day(process_day)
+
+        print(f"per-service path: {per_service_seconds:.2f}s, {len(per_service_rows)} rows")
+        print(f"set-based path:   {set_based_seconds:.2f}s, {len(set_based_rows)} rows")
+        print(f"speedup: {per_service_seconds / set_based_seconds:.1f}x")
+        if per_service_rows != set_based_rows:
+            print("WARNING: the two paths produced different ft_notification_status rows")
+            sys.exit(1)
@@ -0,0 +1,70 @@
+import argparse
+import sys
+import time
+import uuid
+
+from flask import Flask
+
+sys.path.append("../..")
+from app import create_app  # noqa: E402
+from app.cache.schema_validators import schema_validator_registry  # noqa: E402
+from app.schema_validation import validate  # noqa: E402
+from app.v2.notifications.notification_schemas import (  # noqa: E402
+    post_bulk_request,
+    post_email_request,
+    post_sms_request,
+)
+
+TEMPLATE_ID = str(uuid.uuid4())
+
+REQUESTS = {
+    "email": (
+        post_email_request,
+        {
+            "email_address": "someone@example.com",
+            "template_id": TEMPLATE_ID,
+            "reference": "benchmark",
+            "personalisation": {"name": "Jo", "reference": "REF-000001", "date": "2024-04-01"},
+        },
+    ),
+    "sms": (
+        post_sms_request,
+        {"phone_number": "+16502532222", "template_id": TEMPLATE_ID, "personalisation": {"name": "Jo"}},
+    ),
+    "bulk": (
+        None,
+        {"template_id": TEMPLATE_ID, "name": "benchmark", "rows": [["email address"], ["someone@example.com"]]},
+    ),
+}
+
+MODES = [("per call", False, False), ("registry", True, False), ("fast path", True, True)]
+
+
+def time_validations(schema_of, request_json: dict, iterations: int) -> float:
+    validate(dict(request_json), schema_of())  # warm up, and fill the registry when it is on
+    start = time.perf_counter()
+    for _ in range(iterations):
+        validate(dict(request_json), schema_of())
+    return (time.perf_counter() - start) / iterations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--iterations", default=10000, type=int, help="requests to validate per measurement")
+    parser.add_argument("--max-rows", default=50000, type=int, help="row limit of the bulk schema")
+    args = parser.parse_args()
+
+    app = Flask("benchmark_schema_validation")
+    create_app(app)
+
+    print(f"{'request':>8} " + " ".join(f"{name + ' (us)':>15}" for name, _, _ in MODES) + f" {'speedup':>8}")
+    with app.app_context():
+        for name, (schema, request_json) in REQUESTS.items():
+            schema_of = (lambda: post_bulk_request(args.max_rows)) if schema is None else (lambda schema=schema: schema)
+            timings = []
+            for _, enabled, fast_path_enabled in MODES:
+                app.config["FF_SCHEMA_VALIDATOR_CACHE"] = enabled
+                app.config["FF_SCHEMA_VALIDATION_FAST_PATH"] = fast_path_enabled
+                schema_validator_registry.clear()
+                timings.append(time_validations(schema_of, request_json, args.iterations))
+            print(f"{name:>8} " + " ".join(f"{t * 1e6:>15.1f}" for t in timings) + f" {timings[0] / timings[-1]:>7.1f}x")
@@ -0,0 +1,80 @@
+import argparse
+import sys
+import time
+import uuid
+
+from notifications_utils.template import HTMLEmailTemplate, PlainTextEmailTemplate
+
+sys.path.append("../..")
+from app.cache.templates import RenderedTemplateCache  # noqa: E402
+
+CONTENT = """
+Hello ((name)),
+
+Your application **((reference))** was received on ((date)).
+
+# What happens next
+
+* We review your application
+* We contact you at ((email address)) if we need more information
+* You get a decision within 30 days
+
+^ Keep this email for your records.
+
+Contact us at https://www.canada.ca/en/contact.html
+"""
+
+TEMPLATE = {
+    "id": uuid.uuid4(),
+    "version": 1,
+    "subject": "Application ((reference)) received",
+    "content": CONTENT,
+    "template_type": "email",
+}
+
+OPTIONS = {
+    "fip_banner_english": True,
+    "fip_banner_french": False,
+    "logo_with_background_colour": False,
+    "alt_text_en": None,
+    "alt_text_fr": None,
+}
+
+
+def personalisation(i: int) -> dict:
+    return {"name": f"Person {i}", "reference": f"REF-{i:06}", "date": "2024-04-01", "email address": f"person{i}@example.com"}
+
+
+def render(template_class, values: dict, cache=None, **options) -> str:
+    if cache is None:
+        template = template_class(TEMPLATE, values=values, **options)
+    else:
+        template = cache.get(template_class, TEMPLATE, values, **options)
+    return str(template)
+
+
+def time_emails(n: int, cache=None) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        values = personalisation(i)
+        render(HTMLEmailTemplate, values, cache, jinja_path=None, allow_html=False, **OPTIONS)
+        render(PlainTextEmailTemplate, values, cache)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--emails", default=10000, type=int, help="emails to render from the template")
+    args = parser.parse_args()
+
+    cache = RenderedTemplateCache()
+    assert render(HTMLEmailTemplate, personalisation(0), None, **OPTIONS) == render(
+        HTMLEmailTemplate, personalisation(0), cache, **OPTIONS
+    ), "the cached template must render the same email"
+
+    uncached = time_emails(args.emails)
+    cached = time_emails(args.emails, cache)
+
+    print(f"{'emails':>7} {'no cache (s)':>13} {'cache (s)':>10} {'speedup':>8}")
+    print(f"{args.emails:>7} {uncached:>13.2f} {cached:>10.2f} {uncached / cached:>7.1f}x")
+    print(f"cache: {cache.stats()}")
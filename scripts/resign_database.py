@@ -9,10 +9,17 @@ Needs Notify config variables and access to the database. In AWS run on an api p
 Usage (run from the scripts/ folder):
     python resign_database.py [unsafe]
     - unsafe: unsign regardless of whether the current secret key can verify the signature
+
+With --checkpoint-file and --resign, the (created_at, id) of the last notification resigned is saved after every chunk,
+and an interrupted run resumes from it. The file is removed once every notification is resigned.
 """
 
 import argparse
+import json
+import os
 import sys
+from datetime import datetime
+from uuid import UUID
 
 from dotenv import load_dotenv
 from flask import Flask
@@ -28,12 +35,42 @@ from app.dao.notifications_dao import resign_notifications  # noqa: E402
 from app.dao.service_callback_api_dao import resign_service_callbacks  # noqa: E402
 
 
-def resign_all(chunk: int, resign: bool, unsafe: bool, notifications: bool):
+def read_checkpoint(checkpoint_file: str):
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file) as f:
+        created_at, id = json.load(f)
+    current_app.logger.info(f"Resuming notifications after {created_at} {id}")
+    return datetime.fromisoformat(created_at), UUID(id)
+
+
+def write_checkpoint(checkpoint_file: str, checkpoint) -> None:
+    with open(checkpoint_file, "w") as f:
+        json.dump([checkpoint[0].isoformat(), str(checkpoint[1])], f)
+
+
+def remove_checkpoint(checkpoint_file: str) -> None:
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+        current_app.logger.info(f"All notifications resigned, removed {checkpoint_file}")
+
+
+def resign_all(chunk: int, resign: bool, unsafe: bool, notifications: bool, workers: int, checkpoint_file: str):
     resign_api_keys(resign, unsafe)
-    resign_inbound_sms(resign, unsafe)
-    resign_service_callbacks(resign, unsafe)
+    resign_inbound_sms(resign, unsafe, workers=workers)
+    resign_service_callbacks(resign, unsafe, workers=workers)
     if notifications:
-        resign_notifications(chunk, resign, unsafe)
+        resign_notifications(
+            chunk,
+            resign,
+            unsafe,
+            workers=workers,
+            checkpoint=read_checkpoint(checkpoint_file),
+            on_checkpoint=(lambda checkpoint: write_checkpoint(checkpoint_file, checkpoint)) if checkpoint_file else None,
+        )
+        # A finished run leaves nothing to resume, a later run starts from the first notification again
+        if resign:
+            remove_checkpoint(checkpoint_file)
     if not resign:
         current_app.logger.info("NOTE: this is a preview, fields have not been changed. To resign fields, run with --resign flag")
 
@@ -46,6 +83,8 @@ if __name__ == "__main__":
     )
     parser.add_argument("-r", "--resign", default=False, action="store_true", help="resign columns (default false)")
     parser.add_argument("-u", "--unsafe", default=False, action="store_true", help="ignore bad signatures (default false)")
+    parser.add_argument("-w", "--workers", default=1, type=int, help="processes resigning chunks in parallel (default 1)")
+    parser.add_argument("--checkpoint-file", default="", help="file to save and resume the progress of notifications from")
 
     args = parser.parse_args()
 
@@ -54,4 +93,4 @@ if __name__ == "__main__":
     create_app(application)
     application.app_context().push()
 
-    resign_all(args.chunk, args.resign, args.unsafe, args.notifications)
+    resign_all(args.chunk, args.resign, args.unsafe, args.notifications, args.workers, args.checkpoint_file)
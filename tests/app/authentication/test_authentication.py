@@ -6,7 +6,7 @@ import jwt
 import pytest
 from flask import current_app, g, json, request
 from freezegun import freeze_time
-from notifications_python_client.authentication import create_jwt_token
+from notifications_python_client.authentication import create_jwt_token, decode_jwt_token
 
 from app.authentication.auth import (
     AUTH_TYPES,
@@ -15,7 +15,9 @@ from app.authentication.auth import (
     requires_auth,
     requires_cache_clear_auth,
     requires_scan_verdict_auth,
+    verified_token_local_cache,
 )
+from app.cache.local import local_caches
 from app.dao.api_key_dao import (
     expire_api_key,
     get_unsigned_secret,
@@ -564,3 +566,56 @@ class TestScanVerdictAuth:
                 requires_scan_verdict_auth()
             # Should fail with invalid token, not expose timing information
             assert exc.value.code == 403
+
+
+class TestVerifiedTokenCache:
+    @pytest.fixture(autouse=True)
+    def jwt_verification_cache(self, notify_api):
+        local_caches.clear()
+        with set_config(notify_api, "FF_JWT_VERIFICATION_CACHE", True):
+            yield
+        local_caches.clear()
+
+    def create_keys(self, sample_api_key, count):
+        keys = []
+        for i in range(count):
+            api_key = ApiKey(
+                service=sample_api_key.service,
+                name=f"key {i}",
+                created_by=sample_api_key.created_by,
+                key_type=KEY_TYPE_NORMAL,
+            )
+            save_model_api_key(api_key)
+            keys.append(api_key)
+        return keys
+
+    def test_repeated_token_is_verified_with_one_decode(self, client, sample_api_key, mocker):
+        api_key = self.create_keys(sample_api_key, 3)[-1]
+        token = create_jwt_token(secret=get_unsigned_secret(api_key.id), client_id=str(sample_api_key.service_id))
+        decode = mocker.patch("app.authentication.auth.decode_jwt_token", wraps=decode_jwt_token)
+
+        response = client.get("/notifications", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+        decode.reset_mock()
+        response = client.get("/notifications", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        decode.assert_called_once_with(token, get_unsigned_secret(api_key.id))
+
+    def test_revoked_key_is_rejected_for_cached_token(self, client, sample_api_key):
+        api_key = self.create_keys(sample_api_key, 1)[0]
+        token = create_jwt_token(secret=get_unsigned_secret(api_key.id), client_id=str(sample_api_key.service_id))
+        response = client.get("/notifications", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+        expire_api_key(sample_api_key.service_id, api_key.id)
+
+        response = client.get("/notifications", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+        assert json.loads(response.get_data())["message"] == {"token": ["Invalid token: API key revoked"]}
+
+    def test_invalid_signature_is_not_cached(self, client, sample_api_key):
+        token = create_jwt_token(secret="not-so-secret", client_id=str(sample_api_key.service_id))
+        response = client.get("/notifications", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+        assert len(verified_token_local_cache) == 0
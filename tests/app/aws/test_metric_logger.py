@@ -1,4 +1,7 @@
+import json
+import time
 from os import environ
+from types import SimpleNamespace
 from unittest.mock import patch
 from uuid import uuid4
 
@@ -40,3 +43,64 @@ class TestMetricsLogger:
         metrics_logger.flush()
         captured = capsys.readouterr()
         assert metric_name in str(captured.out)
+
+
+def _buffered_metrics_logger(buffer_size=1000):
+    metrics_config = get_config()
+    metrics_config.environment = "local"
+    metrics_logger = MetricsLogger()
+    metrics_logger.init_app(
+        SimpleNamespace(
+            config={
+                "FF_BUFFERED_CLOUDWATCH_METRICS": True,
+                "CLOUDWATCH_METRICS_FLUSH_INTERVAL_SECONDS": 3600.0,
+                "CLOUDWATCH_METRICS_BUFFER_SIZE": buffer_size,
+            }
+        )
+    )
+    return metrics_logger
+
+
+def _written_metrics(output, metric_name):
+    documents = [json.loads(line) for line in output.splitlines() if metric_name in line]
+    return sorted((document["list_name"], document[metric_name]) for document in documents)
+
+
+class TestBufferedMetricsLogger:
+    def test_flush_sums_the_metrics_per_dimensions_until_the_buffer_is_written(self, capsys):
+        metrics_logger = _buffered_metrics_logger()
+        metric_name = f"foo_bar_baz_{str(uuid4())}"
+        for list_name, count in [("inbox", 1), ("inbox", 2), ("other", 1), ("inbox", 4)]:
+            metrics_logger.set_namespace("NotificationCanadaCa")
+            metrics_logger.put_metric(metric_name, count, "Count")
+            metrics_logger.set_dimensions({"list_name": list_name})
+            metrics_logger.flush()
+
+        assert metric_name not in capsys.readouterr().out
+        assert metrics_logger.flush_buffer() == 2
+        assert _written_metrics(capsys.readouterr().out, metric_name) == [("inbox", 7), ("other", 1)]
+        assert metrics_logger.flush_buffer() == 0
+
+    def test_flush_without_aggregate_writes_immediately(self, capsys):
+        metrics_logger = _buffered_metrics_logger()
+        metric_name = f"foo_bar_baz_{str(uuid4())}"
+        metrics_logger.put_metric(metric_name, 5, "Count")
+        metrics_logger.set_dimensions({"list_name": "inbox"})
+        metrics_logger.flush(aggregate=False)
+
+        assert _written_metrics(capsys.readouterr().out, metric_name) == [("inbox", 5)]
+
+    def test_a_full_buffer_is_written_by_the_background_thread(self, capsys):
+        metrics_logger = _buffered_metrics_logger(buffer_size=2)
+        metric_name = f"foo_bar_baz_{str(uuid4())}"
+        for _ in range(2):
+            metrics_logger.put_metric(metric_name, 1, "Count")
+            metrics_logger.set_dimensions({"list_name": "inbox"})
+            metrics_logger.flush()
+
+        output = ""
+        deadline = time.monotonic() + 5
+        while metric_name not in output and time.monotonic() < deadline:
+            time.sleep(0.01)
+            output += capsys.readouterr().out
+        assert _written_metrics(output, metric_name) == [("inbox", 2)]
@@ -8,6 +8,7 @@ from app import create_app
 from app.aws.metrics import (
     put_batch_saving_bulk_created,
     put_batch_saving_bulk_processed,
+    put_batch_saving_drain_metric,
     put_batch_saving_expiry_metric,
     put_batch_saving_inflight_metric,
     put_batch_saving_inflight_processed,
@@ -103,6 +104,21 @@ class TestBatchSavingMetricsFunctions:
             {"acknowledged": "True", "notification_type": "foo", "priority": "bar"}
         )
 
+    def test_put_batch_saving_drain_metric_is_not_aggregated(self, mocker, metrics_logger_mock):
+        redis_queue = mocker.MagicMock()
+        redis_queue._suffix = "foo"
+        redis_queue._process_type = "bar"
+        put_batch_saving_drain_metric(metrics_logger_mock, redis_queue, 100, 2.0, 50)
+        metrics_logger_mock.put_metric.assert_has_calls(
+            [
+                call("batch_saving_drained", 100, "Count"),
+                call("batch_saving_drain_rate", 50.0, "Count/Second"),
+                call("batch_saving_drain_lag", 50, "Count"),
+                call("batch_saving_drain_lag_seconds", 1.0, "Seconds"),
+            ]
+        )
+        metrics_logger_mock.flush.assert_called_once_with(aggregate=False)
+
     def test_put_batch_metric_unknown_error(self, mocker, metrics_logger_mock):
         redis_queue = mocker.MagicMock()
         mock_logger = mocker.patch("app.aws.metrics.current_app.logger.warning")
@@ -8,6 +8,7 @@ from botocore.exceptions import ClientError
 from flask import current_app
 from freezegun import freeze_time
 from tests.app.conftest import datetime_in_past
+from tests.conftest import set_config
 
 from app.aws.s3 import (
     filter_s3_bucket_objects_within_date_range,
@@ -229,26 +230,43 @@ def test_remove_jobs_from_s3(notify_api, mocker):
         type("Job", (object,), {"service_id": "foo", "id": "j1"}),
         type("Job", (object,), {"service_id": "foo", "id": "j2"}),
         type("Job", (object,), {"service_id": "foo", "id": "j3"}),
-        type("Job", (object,), {"service_id": "foo", "id": "j4"}),
-        type("Job", (object,), {"service_id": "foo", "id": "j5"}),
     ]
 
-    remove_jobs_from_s3(jobs, batch_size=2)
+    remove_jobs_from_s3(jobs, batch_size=4)
 
     mock.assert_has_calls(
         [
             call.Bucket(current_app.config["CSV_UPLOAD_BUCKET_NAME"]),
             call.Bucket().delete_objects(
-                Delete={"Objects": [{"Key": "service-foo-notify/j1.csv"}, {"Key": "service-foo-notify/j2.csv"}]}
+                Delete={
+                    "Objects": [
+                        {"Key": "service-foo-notify/j1.csv"},
+                        {"Key": "service-foo-notify/j1.rows.jsonl.gz"},
+                        {"Key": "service-foo-notify/j2.csv"},
+                        {"Key": "service-foo-notify/j2.rows.jsonl.gz"},
+                    ]
+                }
             ),
             call.Bucket().delete_objects(
-                Delete={"Objects": [{"Key": "service-foo-notify/j3.csv"}, {"Key": "service-foo-notify/j4.csv"}]}
+                Delete={"Objects": [{"Key": "service-foo-notify/j3.csv"}, {"Key": "service-foo-notify/j3.rows.jsonl.gz"}]}
             ),
-            call.Bucket().delete_objects(Delete={"Objects": [{"Key": "service-foo-notify/j5.csv"}]}),
         ]
     )
 
 
+@pytest.mark.parametrize("ff_job_rows_artifact", [True, False])
+def test_remove_jobs_from_s3_removes_the_parsed_rows_whatever_the_flag(notify_api, mocker, ff_job_rows_artifact):
+    mock = Mock()
+    mocker.patch("app.aws.s3.resource", return_value=mock)
+
+    with set_config(notify_api, "FF_JOB_ROWS_ARTIFACT", ff_job_rows_artifact):
+        remove_jobs_from_s3([type("Job", (object,), {"service_id": "foo", "id": "j1"})])
+
+    mock.Bucket().delete_objects.assert_called_once_with(
+        Delete={"Objects": [{"Key": "service-foo-notify/j1.csv"}, {"Key": "service-foo-notify/j1.rows.jsonl.gz"}]}
+    )
+
+
 def test_upload_report_to_s3(notify_api, mocker):
     utils_mock = mocker.patch("app.aws.s3.utils_s3upload")
     presigned_url_mock = mocker.patch("app.aws.s3.generate_presigned_url")
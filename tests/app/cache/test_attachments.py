@@ -0,0 +1,88 @@
+from unittest.mock import Mock
+
+from app.cache.attachments import AttachmentCache, template_attachment_cache_key
+
+
+class TestAttachmentCache:
+    def test_downloads_once_and_counts_bytes_saved(self):
+        cache = AttachmentCache()
+        download = Mock(return_value=b"12345")
+
+        assert cache.get_or_download("service-1", "doc-1", download) == b"12345"
+        assert cache.get_or_download("service-1", "doc-1", download) == b"12345"
+
+        download.assert_called_once_with()
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "bytes_saved": 5, "size": 1, "bytes": 5}
+
+    def test_does_not_serve_the_document_of_another_service(self):
+        cache = AttachmentCache()
+        download = Mock(return_value=b"12345")
+
+        cache.get_or_download("service-1", "doc-1", download)
+        cache.get_or_download("service-2", "doc-1", download)
+
+        assert download.call_count == 2
+
+    def test_evicts_least_recently_used_files_to_stay_under_max_bytes(self):
+        cache = AttachmentCache(max_bytes=10)
+        cache.get_or_download("service-1", "a", lambda: b"aaaa")
+        cache.get_or_download("service-1", "b", lambda: b"bbbb")
+        cache.get_or_download("service-1", "a", Mock())
+        cache.get_or_download("service-1", "c", lambda: b"cccc")
+
+        assert list(cache._entries) == [("service-1", "a"), ("service-1", "c")]
+        assert cache.size == 8
+
+    def test_does_not_keep_files_larger_than_the_cache(self):
+        cache = AttachmentCache(max_bytes=4)
+
+        assert cache.get_or_download("service-1", "big", lambda: b"too big") == b"too big"
+        assert len(cache) == 0
+
+    def test_does_not_cache_failed_downloads(self):
+        cache = AttachmentCache()
+        download = Mock(return_value=None)
+
+        cache.get_or_download("service-1", "doc-1", download)
+        cache.get_or_download("service-1", "doc-1", download)
+
+        assert download.call_count == 2
+
+    def test_expired_files_are_downloaded_again(self):
+        cache = AttachmentCache(ttl_seconds=0)
+        download = Mock(return_value=b"data")
+
+        cache.get_or_download("service-1", "doc-1", download)
+        cache.get_or_download("service-1", "doc-1", download)
+
+        assert download.call_count == 2
+
+    def test_shares_small_files_through_redis(self, notify_api):
+        redis_store = Mock(get=Mock(return_value=None))
+        statsd_client = Mock()
+        cache = AttachmentCache()
+        cache.init_app(notify_api, redis_store, statsd_client)
+        cache.shared_max_bytes = 4
+
+        cache.get_or_download("service-1", "small", lambda: b"data")
+        cache.get_or_download("service-1", "large", lambda: b"large data")
+
+        redis_store.set.assert_called_once_with(template_attachment_cache_key("service-1", "small"), b"data", ex=int(cache.ttl_seconds))
+        statsd_client.incr.assert_any_call("attachments.template-cache.miss", count=1)
+
+    def test_reads_files_downloaded_by_other_workers_from_redis(self, notify_api):
+        redis_store = Mock(get=Mock(return_value=b"data"))
+        statsd_client = Mock()
+        cache = AttachmentCache()
+        cache.init_app(notify_api, redis_store, statsd_client)
+        cache.shared_max_bytes = 4
+        download = Mock()
+
+        assert cache.get_or_download("service-1", "doc-1", download) == b"data"
+        assert cache.get_or_download("service-1", "doc-1", download) == b"data"
+
+        download.assert_not_called()
+        redis_store.get.assert_called_once_with(template_attachment_cache_key("service-1", "doc-1"))
+        statsd_client.incr.assert_any_call("attachments.template-cache.hit.shared", count=1)
+        statsd_client.incr.assert_any_call("attachments.template-cache.hit.local", count=1)
+        statsd_client.incr.assert_any_call("attachments.template-cache.bytes-saved", count=4)
@@ -18,6 +18,19 @@ class TestCacheClear:
             assert response.json == {"result": "ok"}
             assert mock_delete.call_count == len(CACHE_KEYS_ALL)
 
+    def test_clear_cache_invalidates_local_caches(self, client):
+        with (
+            patch("app.redis_store.delete_cache_keys_by_pattern", return_value=1),
+            patch("app.cache.rest.local_caches.invalidate") as mock_invalidate,
+        ):
+            auth_header = create_cache_clear_authorization_header()
+            response = client.post(
+                url_for("cache.clear"),
+                headers=[("Content-Type", "application/json"), auth_header],
+            )
+            assert response.status_code == 201
+            mock_invalidate.assert_called_once_with()
+
     def test_clear_cache_failure(self, client):
         with patch("app.redis_store.delete_cache_keys_by_pattern", side_effect=Exception("Redis error")) as mock_delete:
             auth_header = create_cache_clear_authorization_header()
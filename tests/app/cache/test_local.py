@@ -0,0 +1,152 @@
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy.orm.exc import NoResultFound
+
+from app import db
+from app.cache.local import LOCAL_CACHE_GENERATION_KEY, LocalCache, LocalCaches, local_caches
+from app.dao.services_dao import (
+    dao_fetch_service_by_id_with_api_keys,
+    dao_update_service,
+    service_with_api_keys_local_cache,
+)
+from app.dao.templates_dao import (
+    dao_get_template_by_id_and_service_id,
+    template_for_service_local_cache,
+)
+from tests.conftest import set_config
+
+
+class TestLocalCache:
+    def test_get_or_load_counts_hits_and_misses(self):
+        cache = LocalCache("test")
+        loader = Mock(return_value="value")
+
+        assert cache.get_or_load("key", loader) == "value"
+        assert cache.get_or_load("key", loader) == "value"
+
+        loader.assert_called_once_with()
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_evicts_least_recently_used(self):
+        cache = LocalCache("test", maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_entries_expire_after_ttl(self):
+        cache = LocalCache("test", ttl_seconds=0)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_entries_can_outlive_the_ttl_of_the_cache(self):
+        cache = LocalCache("test", ttl_seconds=0)
+        cache.set("a", 1, ttl_seconds=60)
+
+        assert cache.get("a") == 1
+
+    def test_does_not_cache_none_or_exceptions(self):
+        cache = LocalCache("test")
+
+        assert cache.get_or_load("missing", lambda: None) is None
+        with pytest.raises(NoResultFound):
+            cache.get_or_load("error", Mock(side_effect=NoResultFound()))
+
+        assert len(cache) == 0
+
+
+class TestLocalCaches:
+    @pytest.fixture
+    def caches(self, notify_api):
+        caches = LocalCaches()
+        caches.init_app(notify_api, Mock(get=Mock(return_value=None)), invalidating_models=())
+        return caches
+
+    def test_get_or_load_bypasses_cache_when_flag_off(self, notify_api, caches):
+        cache = caches.cache("test")
+        with set_config(notify_api, "FF_LOCAL_DAO_CACHE", False):
+            caches.get_or_load(cache, "key", lambda: "value")
+
+        assert len(cache) == 0
+
+    def test_invalidate_clears_caches_and_bumps_generation(self, notify_api, caches):
+        cache = caches.cache("test")
+        cache.set("key", "value")
+
+        caches.invalidate()
+
+        assert len(cache) == 0
+        caches._redis_store.incr.assert_called_once_with(LOCAL_CACHE_GENERATION_KEY)
+
+    def test_new_generation_clears_caches(self, notify_api, caches):
+        cache = caches.cache("test")
+        caches._generation_check_seconds = 0
+        with set_config(notify_api, "FF_LOCAL_DAO_CACHE", True):
+            caches.get_or_load(cache, "key", lambda: "value")
+            assert len(cache) == 1
+
+            caches._redis_store.get.return_value = b"1"
+            caches.get_or_load(cache, "other", lambda: "value")
+
+        assert list(cache._entries) == ["other"]
+
+
+class TestDaoLocalCaches:
+    @pytest.fixture(autouse=True)
+    def local_dao_cache(self, notify_api):
+        local_caches.clear()
+        with set_config(notify_api, "FF_LOCAL_DAO_CACHE", True):
+            yield
+        local_caches.clear()
+
+    def test_service_with_api_keys_is_cached_detached(self, sample_api_key):
+        service = dao_fetch_service_by_id_with_api_keys(sample_api_key.service_id, use_cache=True)
+
+        assert dao_fetch_service_by_id_with_api_keys(sample_api_key.service_id, use_cache=True) is service
+        assert [api_key.id for api_key in service.api_keys] == [sample_api_key.id]
+        assert {p.permission for p in service.permissions}
+        assert service_with_api_keys_local_cache.hits == 1
+
+    def test_template_for_service_is_cached_with_reply_to(self, sample_email_template):
+        template = dao_get_template_by_id_and_service_id(
+            sample_email_template.id, sample_email_template.service_id, use_cache=True
+        )
+
+        assert (
+            dao_get_template_by_id_and_service_id(sample_email_template.id, sample_email_template.service_id, use_cache=True)
+            is template
+        )
+        assert template.get_reply_to_text() == sample_email_template.service.get_default_reply_to_email_address()
+        assert len(template_for_service_local_cache) == 1
+
+    def test_reads_in_the_session_when_the_cache_is_off(self, notify_api, sample_api_key, sample_email_template, mocker):
+        detached_reader = mocker.spy(db, "detached_reader")
+
+        with set_config(notify_api, "FF_LOCAL_DAO_CACHE", False):
+            service = dao_fetch_service_by_id_with_api_keys(sample_api_key.service_id, use_cache=True)
+            template = dao_get_template_by_id_and_service_id(
+                sample_email_template.id, sample_email_template.service_id, use_cache=True
+            )
+
+        detached_reader.assert_not_called()
+        assert service in db.session
+        assert template in db.session
+        assert len(service_with_api_keys_local_cache) == len(template_for_service_local_cache) == 0
+
+    def test_service_write_invalidates_local_caches(self, sample_api_key):
+        dao_fetch_service_by_id_with_api_keys(sample_api_key.service_id, use_cache=True)
+        assert len(service_with_api_keys_local_cache) == 1
+
+        service = sample_api_key.service
+        service.rate_limit = 5
+        dao_update_service(service)
+
+        assert len(service_with_api_keys_local_cache) == 0
+        assert dao_fetch_service_by_id_with_api_keys(sample_api_key.service_id, use_cache=True).rate_limit == 5
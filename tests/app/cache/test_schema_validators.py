@@ -0,0 +1,141 @@
+import uuid
+
+import pytest
+
+from app.cache.schema_validators import SchemaValidatorRegistry, compile_fast_check
+from app.schema_validation import format_checker
+from app.v2.notifications.notification_schemas import (
+    post_bulk_request,
+    post_email_request,
+    post_sms_request,
+)
+from tests.conftest import set_config, set_config_values
+
+
+@pytest.fixture
+def registry(notify_api):
+    with set_config_values(notify_api, {"FF_SCHEMA_VALIDATOR_CACHE": True, "FF_SCHEMA_VALIDATION_FAST_PATH": False}):
+        yield SchemaValidatorRegistry()
+
+
+class TestSchemaValidatorRegistry:
+    def test_compiles_each_schema_once(self, registry):
+        first, _ = registry.get(post_email_request, format_checker)
+        second, _ = registry.get(post_email_request, format_checker)
+        other, _ = registry.get(post_sms_request, format_checker)
+
+        assert first is second
+        assert other is not first
+        assert registry.stats() == {"hits": 1, "misses": 2, "size": 2}
+
+    def test_builds_a_validator_for_each_call_when_disabled(self, notify_api, registry):
+        with set_config(notify_api, "FF_SCHEMA_VALIDATOR_CACHE", False):
+            first, fast_check = registry.get(post_email_request, format_checker)
+            second, _ = registry.get(post_email_request, format_checker)
+
+        assert first is not second
+        assert fast_check is None
+        assert len(registry) == 0
+
+    def test_does_not_share_validators_of_schemas_using_the_resolver(self, notify_api, registry):
+        schema = {"definitions": {"id": {"type": "string"}}, "properties": {"id": {"$ref": "#/definitions/id"}}}
+
+        with set_config(notify_api, "FF_SCHEMA_VALIDATION_FAST_PATH", True):
+            first, fast_check = registry.get(schema, format_checker)
+            second, _ = registry.get(schema, format_checker)
+
+        assert first is not second
+        assert fast_check is None
+        assert registry.stats()["hits"] == 1
+
+    def test_equal_schemas_built_separately_are_different_entries(self, registry):
+        schema = {"type": "object"}
+
+        registry.get(schema, format_checker)
+        registry.get(dict(schema), format_checker)
+
+        assert registry.stats()["misses"] == 2
+
+    def test_evicts_the_least_recently_used_schema(self, registry):
+        registry = SchemaValidatorRegistry(max_size=2)
+
+        registry.get(post_email_request, format_checker)
+        registry.get(post_sms_request, format_checker)
+        registry.get(post_email_request, format_checker)
+        registry.get(post_bulk_request(50000), format_checker)
+        registry.get(post_email_request, format_checker)
+
+        assert len(registry) == 2
+        assert registry.stats()["hits"] == 2
+
+    def test_post_bulk_request_returns_the_same_schema_for_the_same_limit(self):
+        assert post_bulk_request(50000) is post_bulk_request(50000)
+        assert post_bulk_request(50000) is not post_bulk_request(100)
+
+    def test_reads_the_feature_flags_on_each_call(self, notify_api, registry):
+        _, fast_check = registry.get(post_email_request, format_checker)
+        assert fast_check is None
+
+        with set_config(notify_api, "FF_SCHEMA_VALIDATION_FAST_PATH", True):
+            _, fast_check = registry.get(post_email_request, format_checker)
+        assert fast_check is not None
+
+        with set_config(notify_api, "FF_SCHEMA_VALIDATOR_CACHE", False):
+            registry.get(post_email_request, format_checker)
+        assert registry.stats()["hits"] == 1
+
+
+class TestCompileFastCheck:
+    @pytest.mark.parametrize(
+        "request_json",
+        [
+            {"email_address": "test@example.gov.uk", "template_id": str(uuid.uuid4())},
+            {
+                "email_address": "test@example.gov.uk",
+                "template_id": str(uuid.uuid4()),
+                "reference": "reference from caller",
+                "personalisation": {"name": "Jo"},
+                "scheduled_for": None,
+            },
+            {
+                "email_address": "test@example.gov.uk",
+                "template_id": str(uuid.uuid4()),
+                "personalisation": {"doc": {"file": "YWJj", "sending_method": "link"}},
+            },
+        ],
+    )
+    def test_accepts_valid_email_requests(self, request_json):
+        assert compile_fast_check(post_email_request, format_checker)(request_json)
+
+    @pytest.mark.parametrize(
+        "request_json",
+        [
+            {"template_id": str(uuid.uuid4())},
+            {"email_address": "example", "template_id": str(uuid.uuid4())},
+            {"email_address": 12345, "template_id": str(uuid.uuid4())},
+            {"email_address": "test@example.gov.uk", "template_id": "bad_uuid"},
+            {"email_address": "test@example.gov.uk", "template_id": str(uuid.uuid4()), "unknown": "value"},
+            {"email_address": "test@example.gov.uk", "template_id": str(uuid.uuid4()), "personalisation": "not a dict"},
+            {"email_address": "test@example.gov.uk", "template_id": str(uuid.uuid4()), "personalisation": {"doc": {"file": "YWJj"}}},
+            ["not", "an", "object"],
+        ],
+    )
+    def test_rejects_invalid_email_requests(self, request_json):
+        assert not compile_fast_check(post_email_request, format_checker)(request_json)
+
+    def test_checks_sms_requests(self):
+        fast_check = compile_fast_check(post_sms_request, format_checker)
+
+        assert fast_check({"phone_number": "6502532222", "template_id": str(uuid.uuid4())})
+        assert not fast_check({"phone_number": "08515111111", "template_id": str(uuid.uuid4())})
+
+    @pytest.mark.parametrize(
+        "schema",
+        [
+            {"type": "array"},
+            {"type": "object", "properties": {}, "anyOf": [{"required": ["a"]}, {"required": ["b"]}]},
+            {"type": "object", "additionalProperties": {"type": "string"}},
+        ],
+    )
+    def test_is_none_for_schemas_that_are_not_flat_objects(self, schema):
+        assert compile_fast_check(schema, format_checker) is None
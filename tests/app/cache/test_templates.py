@@ -0,0 +1,68 @@
+import uuid
+from unittest.mock import Mock
+
+from notifications_utils.template import SMSMessageTemplate
+
+from app.cache.templates import RenderedTemplateCache
+
+
+def _template_dict(version=1, content="Hello ((name))"):
+    return {"id": uuid.uuid4(), "version": version, "content": content, "template_type": "sms", "_sa_instance_state": Mock()}
+
+
+class TestRenderedTemplateCache:
+    def test_builds_the_template_once_and_renders_each_personalisation(self):
+        cache = RenderedTemplateCache()
+        template_dict = _template_dict()
+
+        first = cache.get(SMSMessageTemplate, template_dict, {"name": "Jo"}, prefix="Service", show_prefix=True)
+        second = cache.get(SMSMessageTemplate, template_dict, {"name": "Sam"}, prefix="Service", show_prefix=True)
+
+        assert str(first) == "Service: Hello Jo"
+        assert str(second) == "Service: Hello Sam"
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_template_versions_and_options_are_cached_separately(self):
+        cache = RenderedTemplateCache()
+        template_dict = _template_dict()
+        new_version = dict(template_dict, version=2, content="Bye ((name))")
+
+        cache.get(SMSMessageTemplate, template_dict, {"name": "Jo"}, prefix="Service", show_prefix=True)
+        renamed = cache.get(SMSMessageTemplate, template_dict, {"name": "Jo"}, prefix="Renamed", show_prefix=True)
+        updated = cache.get(SMSMessageTemplate, new_version, {"name": "Jo"}, prefix="Service", show_prefix=True)
+
+        assert str(renamed) == "Renamed: Hello Jo"
+        assert str(updated) == "Service: Bye Jo"
+        assert len(cache) == 3
+
+    def test_does_not_keep_the_sqlalchemy_state_of_the_template(self):
+        cache = RenderedTemplateCache()
+        template_dict = _template_dict()
+
+        cache.get(SMSMessageTemplate, template_dict, None)
+
+        (skeleton,) = cache._cache._entries.values()
+        assert "_sa_instance_state" not in skeleton._template
+
+    def test_evicts_least_recently_used_templates(self):
+        cache = RenderedTemplateCache(max_size=2)
+        a, b, c = _template_dict(), _template_dict(), _template_dict()
+
+        cache.get(SMSMessageTemplate, a, None)
+        cache.get(SMSMessageTemplate, b, None)
+        cache.get(SMSMessageTemplate, a, None)
+        cache.get(SMSMessageTemplate, c, None)
+
+        assert [key[1] for key in cache._cache._entries] == [a["id"], c["id"]]
+
+    def test_counts_hits_and_misses_in_statsd(self, notify_api):
+        statsd_client = Mock()
+        cache = RenderedTemplateCache()
+        cache.init_app(notify_api, statsd_client)
+        template_dict = _template_dict()
+
+        cache.get(SMSMessageTemplate, template_dict, None)
+        cache.get(SMSMessageTemplate, template_dict, None)
+
+        statsd_client.incr.assert_any_call("templates.render-cache.SMSMessageTemplate.miss")
+        statsd_client.incr.assert_any_call("templates.render-cache.SMSMessageTemplate.hit")
@@ -19,6 +19,7 @@ from tests.app.db import (
     create_template,
     save_notification,
 )
+from tests.conftest import set_config, set_config_values
 
 from app.celery import nightly_tasks
 from app.celery.nightly_tasks import (
@@ -293,6 +294,87 @@ def test_timeout_notifications_does_not_log_or_increment_when_no_temporary_failu
         assert not any("temporary-failure (no receipt; billable)" in str(call_args) for call_args in logger_mock.call_args_list)
 
 
+class TestTimeoutNotificationsInChunks:
+    @pytest.fixture(autouse=True)
+    def chunked(self, notify_api):
+        with set_config_values(notify_api, {"FF_CHUNKED_NOTIFICATION_TIMEOUT": True, "TIMEOUT_NOTIFICATIONS_CHUNK_SIZE": 2}):
+            yield
+
+    def _timed_out_at(self):
+        return datetime.utcnow() - timedelta(seconds=current_app.config.get("SENDING_NOTIFICATIONS_TIMEOUT_PERIOD") + 10)
+
+    def test_updates_notifications_and_sends_status_updates_to_service(self, client, sample_template, mocker):
+        callback_api = create_service_callback_api(service=sample_template.service)
+        mocked = mocker.patch("app.celery.service_callback_tasks.send_delivery_status_to_service.apply_async")
+        get_callback_api = mocker.patch(
+            "app.notifications.callbacks.get_service_delivery_status_callback_api_for_service", return_value=callback_api
+        )
+        notifications = [
+            save_notification(create_notification(template=sample_template, status=status, created_at=self._timed_out_at()))
+            for status in ["sending", "pending", "sending"]
+        ]
+
+        timeout_notifications()
+
+        assert [n.status for n in notifications] == ["temporary-failure"] * 3
+        # The callback api of the service is looked up once per chunk
+        assert get_callback_api.call_args_list == [call(service_id=sample_template.service_id, use_cache=True)] * 2
+        assert sorted(mocked.call_args_list, key=lambda c: c.args[0][0]) == [
+            call(
+                [str(n.id), create_delivery_status_callback_data(n, callback_api), n.service_id],
+                queue=QueueNames.CALLBACKS,
+            )
+            for n in sorted(notifications, key=lambda n: str(n.id))
+        ]
+
+    def test_batches_status_updates_per_service(self, notify_api, client, sample_template, mocker):
+        callback_api = create_service_callback_api(service=sample_template.service)
+        mocked = mocker.patch("app.celery.service_callback_tasks.send_delivery_statuses_to_service.apply_async")
+        notifications = [
+            save_notification(create_notification(template=sample_template, status="sending", created_at=self._timed_out_at()))
+            for _ in range(3)
+        ]
+
+        with set_config(notify_api, "FF_BATCH_SERVICE_CALLBACKS", True):
+            timeout_notifications()
+
+        # One task per chunk of timed out notifications
+        assert mocked.call_count == 2
+        assert [len(c.args[0][0]) for c in mocked.call_args_list] == [2, 1]
+        assert {data for c in mocked.call_args_list for data in c.args[0][0]} == {
+            create_delivery_status_callback_data(n, callback_api) for n in notifications
+        }
+
+    def test_raises_for_technical_failures_after_updating_every_chunk(self, client, sample_template, mocker):
+        statsd_mock = mocker.patch("app.celery.nightly_tasks.statsd_client.incr")
+        created = save_notification(
+            create_notification(template=sample_template, status="created", created_at=self._timed_out_at())
+        )
+        sending = [
+            save_notification(create_notification(template=sample_template, status="sending", created_at=self._timed_out_at()))
+            for _ in range(2)
+        ]
+
+        with pytest.raises(NotificationTechnicalFailureException) as e:
+            timeout_notifications()
+
+        assert str(created.id) in str(e.value)
+        assert created.status == "technical-failure"
+        assert [n.status for n in sending] == ["temporary-failure"] * 2
+        statsd_mock.assert_any_call("notifications.timeout.temporary_failure", 2)
+
+    def test_does_not_update_letters_or_recent_notifications(self, client, sample_template, sample_letter_template):
+        letter = save_notification(
+            create_notification(template=sample_letter_template, status="sending", created_at=self._timed_out_at())
+        )
+        recent = save_notification(create_notification(template=sample_template, status="sending"))
+
+        timeout_notifications()
+
+        assert letter.status == "sending"
+        assert recent.status == "sending"
+
+
 def test_send_daily_performance_stats_calls_does_not_send_if_inactive(client, mocker):
     send_mock = mocker.patch("app.celery.nightly_tasks.total_sent_notifications.send_total_notifications_sent_for_day_stats")  # noqa
 
@@ -1,7 +1,10 @@
+from collections import Counter
 from datetime import datetime
 
 import pytest
+from flask import json
 from freezegun import freeze_time
+from notifications_utils.clients.redis.annual_limit import SMS_DELIVERED_TODAY, SMS_FAILED_TODAY
 from tests.app.conftest import create_sample_notification
 from tests.app.db import (
     create_notification,
@@ -19,6 +22,7 @@ from app.aws.mocks import (
     pinpoint_successful_callback,
 )
 from app.celery.process_pinpoint_receipts_tasks import process_pinpoint_results
+from app.dao import notifications_dao
 from app.dao.notifications_dao import get_notification_by_id
 from app.models import (
     NOTIFICATION_DELIVERED,
@@ -27,6 +31,7 @@ from app.models import (
     NOTIFICATION_TECHNICAL_FAILURE,
     NOTIFICATION_TEMPORARY_FAILURE,
 )
+from app.notifications import callbacks
 from app.notifications.callbacks import create_delivery_status_callback_data
 from celery.exceptions import MaxRetriesExceededError
 
@@ -538,3 +543,115 @@ class TestAnnualLimits:
             mock_seed_annual_limit.assert_called_once_with(notification.service_id, expected_data)
             annual_limit_client.increment_sms_delivered.assert_not_called()
             annual_limit_client.increment_sms_failed.assert_not_called()
+
+
+def pinpoint_receipt_batch(*callbacks):
+    return {"Messages": [json.loads(callback["Message"]) for callback in callbacks]}
+
+
+class TestProcessPinpointReceiptBatch:
+    @pytest.fixture(autouse=True)
+    def annual_limits(self, mocker):
+        self.mock_seed = mocker.patch(
+            "app.celery.process_pinpoint_receipts_tasks.get_annual_limit_notifications_v3", return_value=({}, False)
+        )
+        self.mock_increment = mocker.patch("app.celery.process_pinpoint_receipts_tasks.increment_annual_limit_counts")
+
+    def create_sent_notification(self, template, reference, sent_by="pinpoint"):
+        return save_notification(
+            create_notification(
+                template, reference=reference, sent_at=datetime.utcnow(), status=NOTIFICATION_SENT, sent_by=sent_by
+            )
+        )
+
+    def test_updates_notifications_of_batch_with_one_lookup(self, sample_template, mocker):
+        mock_lookup = mocker.spy(notifications_dao, "dao_get_notifications_by_references")
+        mock_callback_tasks = mocker.patch("app.celery.process_pinpoint_receipts_tasks._check_and_queue_callback_tasks")
+        delivered = self.create_sent_notification(sample_template, "ref1")
+        failed = self.create_sent_notification(sample_template, "ref2")
+        accepted = self.create_sent_notification(sample_template, "ref3")
+
+        process_pinpoint_results(
+            pinpoint_receipt_batch(
+                pinpoint_delivered_callback(reference="ref1"),
+                pinpoint_failed_callback(reference="ref2", provider_response="Phone is on a blocked list"),
+                pinpoint_successful_callback(reference="ref3"),
+            )
+        )
+
+        mock_lookup.assert_called_once_with(["ref1", "ref2", "ref3"])
+        assert get_notification_by_id(delivered.id).status == NOTIFICATION_DELIVERED
+        assert get_notification_by_id(delivered.id).sms_carrier_name == "Bell"
+        assert get_notification_by_id(failed.id).status == NOTIFICATION_TEMPORARY_FAILURE
+        assert get_notification_by_id(accepted.id).status == NOTIFICATION_SENT
+        mock_callback_tasks.assert_called_once_with([delivered, failed])
+
+    def test_groups_annual_limit_counts_per_service(self, notify_api, sample_template, mocker):
+        mocker.patch("app.celery.process_pinpoint_receipts_tasks._check_and_queue_callback_tasks")
+        for reference in ["ref1", "ref2", "ref3"]:
+            self.create_sent_notification(sample_template, reference)
+
+        with set_config(notify_api, "FF_USE_BILLABLE_UNITS", False):
+            process_pinpoint_results(
+                pinpoint_receipt_batch(
+                    pinpoint_delivered_callback(reference="ref1"),
+                    pinpoint_delivered_callback(reference="ref2"),
+                    pinpoint_failed_callback(reference="ref3", provider_response="Phone is on a blocked list"),
+                )
+            )
+
+        self.mock_seed.assert_called_once_with(sample_template.service_id)
+        self.mock_increment.assert_called_once_with(
+            {sample_template.service_id: Counter({SMS_DELIVERED_TODAY: 2, SMS_FAILED_TODAY: 1})}
+        )
+
+    def test_does_not_increment_annual_limit_counts_of_seeded_services(self, sample_template, mocker):
+        mocker.patch("app.celery.process_pinpoint_receipts_tasks._check_and_queue_callback_tasks")
+        self.mock_seed.return_value = ({}, True)
+        self.create_sent_notification(sample_template, "ref1")
+
+        process_pinpoint_results(pinpoint_receipt_batch(pinpoint_delivered_callback(reference="ref1")))
+
+        self.mock_increment.assert_not_called()
+
+    def test_skips_duplicate_receipts_and_other_providers(self, sample_template, mocker):
+        mock_callback_tasks = mocker.patch("app.celery.process_pinpoint_receipts_tasks._check_and_queue_callback_tasks")
+        mock_duplicate_warning = mocker.patch("app.dao.notifications_dao._duplicate_update_warning")
+        notification = self.create_sent_notification(sample_template, "ref1")
+        self.create_sent_notification(sample_template, "ref2", sent_by="sns")
+
+        process_pinpoint_results(
+            pinpoint_receipt_batch(
+                pinpoint_delivered_callback(reference="ref1"),
+                pinpoint_failed_callback(reference="ref1", provider_response="Phone is on a blocked list"),
+                pinpoint_delivered_callback(reference="ref2"),
+            )
+        )
+
+        assert get_notification_by_id(notification.id).status == NOTIFICATION_DELIVERED
+        mock_duplicate_warning.assert_called_once_with(notification, NOTIFICATION_TEMPORARY_FAILURE)
+        mock_callback_tasks.assert_called_once_with([notification])
+
+    def test_retries_only_receipts_without_notification(self, sample_template, mocker):
+        mocker.patch("app.celery.process_pinpoint_receipts_tasks._check_and_queue_callback_tasks")
+        mock_retry = mocker.patch("app.celery.process_pinpoint_receipts_tasks.process_pinpoint_results.retry")
+        notification = self.create_sent_notification(sample_template, "ref1")
+        batch = pinpoint_receipt_batch(
+            pinpoint_delivered_callback(reference="ref1"), pinpoint_delivered_callback(reference="missing")
+        )
+
+        process_pinpoint_results(batch)
+
+        assert get_notification_by_id(notification.id).status == NOTIFICATION_DELIVERED
+        mock_retry.assert_called_once_with(queue="retry-tasks", args=[{"Messages": [batch["Messages"][1]]}])
+
+    def test_check_and_queue_callback_tasks_looks_up_callback_api_once_per_service(self, sample_template, mocker):
+        mock_send_status = mocker.patch("app.celery.service_callback_tasks.send_delivery_status_to_service.apply_async")
+        mock_callback_api = mocker.spy(callbacks, "get_service_delivery_status_callback_api_for_service")
+        create_service_callback_api(service=sample_template.service, url="https://example.com")
+        notifications = [self.create_sent_notification(sample_template, reference) for reference in ["ref1", "ref2"]]
+
+        callbacks._check_and_queue_callback_tasks(notifications)
+
+        mock_callback_api.assert_called_once_with(service_id=sample_template.service_id, use_cache=True)
+        assert mock_send_status.call_count == 2
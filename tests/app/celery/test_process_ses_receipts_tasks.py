@@ -1,4 +1,5 @@
 import json
+from collections import Counter
 from datetime import datetime
 from unittest.mock import Mock
 
@@ -8,7 +9,9 @@ from tests.app.conftest import create_sample_notification
 from tests.app.db import (
     create_notification,
     create_notification_history,
+    create_service,
     create_service_callback_api,
+    create_template,
     save_notification,
 )
 from tests.conftest import set_config
@@ -46,6 +49,7 @@ from app.models import (
     NOTIFICATION_SOFT_MESSAGETOOLARGE,
     NOTIFICATION_UNKNOWN_BOUNCE,
     Complaint,
+    Notification,
 )
 from app.notifications.notifications_ses_callback import (
     remove_emails_from_bounce,
@@ -598,6 +602,107 @@ class TestAnnualLimits:
             annual_limit_client.increment_email_failed.assert_not_called()
 
 
+class TestReceiptsByService:
+    @pytest.fixture(autouse=True)
+    def by_service(self, notify_api):
+        with set_config(notify_api, "FF_SES_RECEIPTS_BY_SERVICE", True):
+            yield
+
+    def _receipts(self, references_and_callbacks):
+        return {"Messages": [callback(reference=reference)["Messages"][0] for reference, callback in references_and_callbacks]}
+
+    def test_updates_annual_limits_once_per_service(self, sample_email_template, mocker):
+        other_template = create_template(create_service(service_name="other service"), template_type="email")
+        for reference, template in [("ref1", sample_email_template), ("ref2", sample_email_template), ("ref3", other_template)]:
+            save_notification(
+                create_notification(template=template, reference=reference, sent_at=datetime.utcnow(), status="sending")
+            )
+        get_annual_limits = mocker.patch(
+            "app.celery.process_ses_receipts_tasks.get_annual_limit_notifications_v3", return_value=({}, False)
+        )
+        increment_counts = mocker.patch("app.celery.process_ses_receipts_tasks.increment_annual_limit_counts")
+        mocker.patch("app.annual_limit_client.increment_email_delivered")
+        mocker.patch("app.bounce_rate_client.set_sliding_hard_bounce")
+
+        assert process_ses_results(
+            self._receipts(
+                [("ref1", ses_notification_callback), ("ref2", ses_hard_bounce_callback), ("ref3", ses_notification_callback)]
+            )
+        )
+
+        assert sorted(c.args[0] for c in get_annual_limits.call_args_list) == sorted(
+            [sample_email_template.service_id, other_template.service_id]
+        )
+        increment_counts.assert_called_once_with(
+            {
+                sample_email_template.service_id: Counter({"email_delivered_today": 1, "email_failed_today": 1}),
+                other_template.service_id: Counter({"email_delivered_today": 1}),
+            }
+        )
+        annual_limit_client.increment_email_delivered.assert_not_called()
+        notification = Notification.query.filter_by(reference="ref2").one()
+        bounce_rate_client.set_sliding_hard_bounce.assert_called_once_with(sample_email_template.service_id, str(notification.id))
+
+    def test_does_not_increment_services_seeded_by_the_batch(self, sample_email_template, mocker):
+        for reference in ["ref1", "ref2"]:
+            save_notification(
+                create_notification(
+                    template=sample_email_template, reference=reference, sent_at=datetime.utcnow(), status="sending"
+                )
+            )
+        get_annual_limits = mocker.patch(
+            "app.celery.process_ses_receipts_tasks.get_annual_limit_notifications_v3", return_value=({}, True)
+        )
+        increment_counts = mocker.patch("app.celery.process_ses_receipts_tasks.increment_annual_limit_counts")
+
+        assert process_ses_results(self._receipts([("ref1", ses_notification_callback), ("ref2", ses_notification_callback)]))
+
+        get_annual_limits.assert_called_once_with(sample_email_template.service_id)
+        increment_counts.assert_not_called()
+
+    def test_looks_up_the_callback_api_once_per_service(self, sample_email_template, mocker):
+        callback_api = create_service_callback_api(service=sample_email_template.service, url="https://original_url.com")
+        for reference in ["ref1", "ref2", "ref3"]:
+            save_notification(
+                create_notification(
+                    template=sample_email_template, reference=reference, sent_at=datetime.utcnow(), status="sending"
+                )
+            )
+        mocker.patch("app.celery.process_ses_receipts_tasks.get_annual_limit_notifications_v3", return_value=({}, False))
+        mocker.patch("app.celery.process_ses_receipts_tasks.increment_annual_limit_counts")
+        get_callback_api = mocker.patch(
+            "app.notifications.callbacks.get_service_delivery_status_callback_api_for_service", return_value=callback_api
+        )
+        send_mock = mocker.patch("app.celery.service_callback_tasks.send_delivery_status_to_service.apply_async")
+
+        assert process_ses_results(generate_ses_notification_callbacks(references=["ref1", "ref2", "ref3"]))
+
+        get_callback_api.assert_called_once_with(service_id=sample_email_template.service_id, use_cache=True)
+        assert send_mock.call_count == 3
+
+    def test_counts_the_hard_bounces_of_the_batch_in_the_bounce_rate_buckets(self, notify_api, sample_email_template, mocker):
+        for reference in ["ref1", "ref2", "ref3"]:
+            save_notification(
+                create_notification(
+                    template=sample_email_template, reference=reference, sent_at=datetime.utcnow(), status="sending"
+                )
+            )
+        mocker.patch("app.celery.process_ses_receipts_tasks.get_annual_limit_notifications_v3", return_value=({}, False))
+        mocker.patch("app.celery.process_ses_receipts_tasks.increment_annual_limit_counts")
+        mocker.patch("app.bounce_rate_client.set_sliding_hard_bounce")
+        count_hard_bounces = mocker.patch("app.celery.process_ses_receipts_tasks.count_hard_bounces")
+
+        with set_config(notify_api, "FF_BOUNCE_RATE_BUCKETS", True):
+            assert process_ses_results(
+                self._receipts(
+                    [("ref1", ses_hard_bounce_callback), ("ref2", ses_hard_bounce_callback), ("ref3", ses_notification_callback)]
+                )
+            )
+
+        count_hard_bounces.assert_called_once_with(Counter({sample_email_template.service_id: 2}))
+        bounce_rate_client.set_sliding_hard_bounce.assert_not_called()
+
+
 def test_process_ses_results_processes_complaint_from_notification_history(sample_email_template, mocker):
     """Test that complaints are processed even when the notification is only found in notification_history table."""
     # Create a notification in history but not in main table (simulating old notification that was moved)
@@ -4,10 +4,17 @@ from unittest.mock import MagicMock, call
 import pytest
 from botocore.exceptions import ClientError
 from notifications_utils.recipients import InvalidEmailError
+from tests.app.db import create_notification, save_notification
 
 import app
 from app.celery import provider_tasks
-from app.celery.provider_tasks import deliver_email, deliver_sms, deliver_sms_rate_limited, deliver_throttled_sms
+from app.celery.provider_tasks import (
+    deliver_email,
+    deliver_email_batch,
+    deliver_sms,
+    deliver_sms_rate_limited,
+    deliver_throttled_sms,
+)
 from app.clients.email.aws_ses import AwsSesClientException
 from app.config import QueueNames
 from app.exceptions import (
@@ -297,3 +304,76 @@ class TestDeliverSmsRateLimited:
         deliver_sms_rate_limited(notification_id, 1)
 
         mock_deliver.assert_called_once()
+
+
+class TestDeliverEmailBatch:
+    def test_sends_the_notifications_of_the_batch(self, sample_email_template, mocker):
+        notifications = [save_notification(create_notification(template=sample_email_template)) for _ in range(3)]
+        send_emails = mocker.patch("app.delivery.send_to_providers.send_emails_to_provider", return_value={})
+        deliver_email_mock = mocker.patch("app.celery.provider_tasks.deliver_email.apply_async")
+
+        deliver_email_batch([str(notification.id) for notification in notifications])
+
+        assert sorted(send_emails.call_args[0][0], key=lambda n: n.id) == sorted(notifications, key=lambda n: n.id)
+        deliver_email_mock.assert_not_called()
+
+    def test_hands_missing_notifications_over_to_deliver_email(self, sample_email_template, mocker):
+        notification = save_notification(create_notification(template=sample_email_template))
+        missing_id = str(uuid.uuid4())
+        mocker.patch("app.delivery.send_to_providers.send_emails_to_provider", return_value={})
+        deliver_email_mock = mocker.patch("app.celery.provider_tasks.deliver_email.apply_async")
+
+        deliver_email_batch([str(notification.id), missing_id])
+
+        deliver_email_mock.assert_called_once_with([missing_id], queue=QueueNames.RETRY, countdown=25)
+
+    def test_retries_failed_notifications_with_deliver_email(self, sample_email_template, mocker):
+        sent, failed = [save_notification(create_notification(template=sample_email_template)) for _ in range(2)]
+        mocker.patch(
+            "app.delivery.send_to_providers.send_emails_to_provider",
+            return_value={failed.id: AwsSesClientException("throttled")},
+        )
+        deliver_email_mock = mocker.patch("app.celery.provider_tasks.deliver_email.apply_async")
+
+        deliver_email_batch([str(sent.id), str(failed.id)])
+
+        deliver_email_mock.assert_called_once()
+        assert deliver_email_mock.call_args[0][0] == [str(failed.id)]
+        assert failed.status == "created"
+
+    def test_technical_failure_and_no_retry_for_invalid_email(self, sample_email_template, mocker):
+        notification = save_notification(create_notification(template=sample_email_template))
+        mocker.patch(
+            "app.delivery.send_to_providers.send_emails_to_provider",
+            return_value={notification.id: InvalidEmailError("bad email")},
+        )
+        deliver_email_mock = mocker.patch("app.celery.provider_tasks.deliver_email.apply_async")
+        queued_callback = mocker.patch("app.celery.provider_tasks._check_and_queue_callback_task")
+
+        deliver_email_batch([str(notification.id)])
+
+        deliver_email_mock.assert_not_called()
+        assert notification.status == "technical-failure"
+        queued_callback.assert_called_once_with(notification)
+
+    def test_retries_the_batch_when_it_fails(self, sample_email_template, mocker):
+        notification = save_notification(create_notification(template=sample_email_template))
+        mocker.patch("app.delivery.send_to_providers.send_emails_to_provider", side_effect=Exception("EXPECTED"))
+        mocker.patch("app.celery.provider_tasks.deliver_email_batch.retry")
+
+        deliver_email_batch([str(notification.id)])
+
+        provider_tasks.deliver_email_batch.retry.assert_called_with(queue="retry-tasks", countdown=25)
+
+    def test_hands_the_batch_over_to_deliver_email_after_max_retries(self, sample_email_template, mocker):
+        notification = save_notification(create_notification(template=sample_email_template))
+        mocker.patch("app.delivery.send_to_providers.send_emails_to_provider", side_effect=Exception("EXPECTED"))
+        mocker.patch(
+            "app.celery.provider_tasks.deliver_email_batch.retry",
+            side_effect=MaxRetriesExceededError(),
+        )
+        deliver_email_mock = mocker.patch("app.celery.provider_tasks.deliver_email.apply_async")
+
+        deliver_email_batch([str(notification.id)])
+
+        deliver_email_mock.assert_called_once_with([str(notification.id)], queue=QueueNames.RETRY, countdown=25)
@@ -15,7 +15,7 @@ from tests.app.db import (
     create_user,
     save_notification,
 )
-from tests.conftest import set_config
+from tests.conftest import set_config, set_config_values
 
 from app import annual_limit_client
 from app.celery.reporting_tasks import (
@@ -25,6 +25,7 @@ from app.celery.reporting_tasks import (
     create_nightly_notification_status,
     create_nightly_notification_status_for_day,
     insert_quarter_data_for_annual_limits,
+    seed_annual_limit_counts,
     send_quarter_email,
 )
 from app.dao.fact_billing_dao import get_rate
@@ -96,6 +97,18 @@ def mocker_get_rate(
         return Decimal(0)
 
 
+def mocker_billing_rates_get_rate(
+    billing_rates,
+    notification_type,
+    bst_date,
+    crown=None,
+    letter_page_count=None,
+    post_class="second",
+    sms_sending_vehicle=None,
+):
+    return mocker_get_rate(None, None, notification_type, bst_date, crown, letter_page_count, post_class, sms_sending_vehicle)
+
+
 @freeze_time("2019-08-01T04:30:00")
 @pytest.mark.parametrize(
     "day_start, expected_kwargs",
@@ -145,7 +158,7 @@ def test_create_nightly_billing_for_day_sms_rate_multiplier(
 ):
     yesterday = convert_utc_to_local_timezone((datetime.now() - timedelta(days=1))).replace(hour=12, minute=00)
 
-    mocker.patch("app.dao.fact_billing_dao.get_rate", side_effect=mocker_get_rate)
+    mocker.patch("app.dao.fact_billing_dao.BillingRates.get_rate", autospec=True, side_effect=mocker_billing_rates_get_rate)
 
     # These are sms notifications
     save_notification(
@@ -189,7 +202,7 @@ def test_create_nightly_billing_for_day_sms_rate_multiplier(
 def test_create_nightly_billing_for_day_different_templates(sample_service, sample_template, mocker):
     yesterday = convert_utc_to_local_timezone((datetime.now() - timedelta(days=1))).replace(hour=12, minute=00)
 
-    mocker.patch("app.dao.fact_billing_dao.get_rate", side_effect=mocker_get_rate)
+    mocker.patch("app.dao.fact_billing_dao.BillingRates.get_rate", autospec=True, side_effect=mocker_billing_rates_get_rate)
 
     # two different SMS templates (both SMS — no email/letter test code)
     save_notification(
@@ -238,7 +251,7 @@ def test_create_nightly_billing_for_day_different_templates(sample_service, samp
 def test_create_nightly_billing_for_day_different_sent_by(sample_service, sample_template, mocker):
     yesterday = convert_utc_to_local_timezone((datetime.now() - timedelta(days=1))).replace(hour=12, minute=00)
 
-    mocker.patch("app.dao.fact_billing_dao.get_rate", side_effect=mocker_get_rate)
+    mocker.patch("app.dao.fact_billing_dao.BillingRates.get_rate", autospec=True, side_effect=mocker_billing_rates_get_rate)
 
     # These are sms notifications
     save_notification(
@@ -272,7 +285,7 @@ def test_create_nightly_billing_for_day_different_sent_by(sample_service, sample
 def test_create_nightly_billing_for_day_null_sent_by_sms(sample_service, sample_template, mocker):
     yesterday = convert_utc_to_local_timezone((datetime.now() - timedelta(days=1))).replace(hour=12, minute=00)
 
-    mocker.patch("app.dao.fact_billing_dao.get_rate", side_effect=mocker_get_rate)
+    mocker.patch("app.dao.fact_billing_dao.BillingRates.get_rate", autospec=True, side_effect=mocker_billing_rates_get_rate)
 
     save_notification(
         create_notification(
@@ -315,7 +328,7 @@ def test_get_rate_for_sms_and_email(notify_db_session):
 @freeze_time("2018-03-30T05:00:00")
 # summer time starts on 2018-03-25
 def test_create_nightly_billing_for_day_use_BST(sample_service, sample_template, mocker):
-    mocker.patch("app.dao.fact_billing_dao.get_rate", side_effect=mocker_get_rate)
+    mocker.patch("app.dao.fact_billing_dao.BillingRates.get_rate", autospec=True, side_effect=mocker_billing_rates_get_rate)
 
     # too late
     save_notification(
@@ -363,7 +376,7 @@ def test_create_nightly_billing_for_day_use_BST(sample_service, sample_template,
 @freeze_time("2018-01-15T03:30:00")
 @pytest.mark.skip(reason="Not in use")
 def test_create_nightly_billing_for_day_update_when_record_exists(sample_service, sample_template, mocker):
-    mocker.patch("app.dao.fact_billing_dao.get_rate", side_effect=mocker_get_rate)
+    mocker.patch("app.dao.fact_billing_dao.BillingRates.get_rate", autospec=True, side_effect=mocker_billing_rates_get_rate)
 
     save_notification(
         create_notification(
@@ -407,6 +420,18 @@ def test_create_nightly_billing_for_day_update_when_record_exists(sample_service
     assert records[0].updated_at
 
 
+@pytest.mark.parametrize("ff_live_services_report", [True, False])
+def test_create_nightly_billing_for_day_refreshes_the_live_services_report(notify_api, mocker, ff_live_services_report):
+    mocker.patch("app.celery.reporting_tasks.fetch_billing_data_for_day", return_value=[])
+    mocker.patch("app.celery.reporting_tasks.update_fact_billing_for_day", return_value=0)
+    mock_refresh = mocker.patch("app.celery.reporting_tasks.refresh_live_services_billing_totals")
+
+    with set_config(notify_api, "FF_LIVE_SERVICES_REPORT", ff_live_services_report):
+        create_nightly_billing_for_day("2019-01-05")
+
+    assert mock_refresh.called is ff_live_services_report
+
+
 @freeze_time("2019-01-05")
 @pytest.mark.parametrize("ff_use_billable_units", [True, False])
 def test_create_nightly_notification_status_for_day(notify_db_session, notify_api, ff_use_billable_units):
@@ -462,6 +487,31 @@ def test_create_nightly_notification_status_for_day(notify_db_session, notify_ap
         assert new_data[1].billable_units == 100
 
 
+@freeze_time("2019-01-05")
+def test_create_nightly_notification_status_for_day_set_based(notify_db_session, notify_api, mocker):
+    first_service = create_service(service_name="First Service")
+    first_template = create_template(service=first_service)
+    second_service = create_service(service_name="second Service")
+    second_template = create_template(service=second_service, template_type="email")
+
+    save_notification(create_notification(template=first_template, status="delivered", created_at=datetime(2019, 1, 1, 12, 0)))
+    save_notification(create_notification(template=first_template, status="delivered", created_at=datetime(2019, 1, 1, 13, 0)))
+    create_notification_history(template=second_template, status="temporary-failure", created_at=datetime(2019, 1, 1, 12, 0))
+    fetch_per_service = mocker.patch("app.celery.reporting_tasks.fetch_notification_status_for_day")
+
+    with set_config_values(
+        notify_api, {"FF_SET_BASED_NIGHTLY_NOTIFICATION_STATUS": True, "NIGHTLY_NOTIFICATION_STATUS_CHUNK_SIZE": 1}
+    ):
+        create_nightly_notification_status_for_day("2019-01-01")
+
+    fetch_per_service.assert_not_called()
+    new_data = FactNotificationStatus.query.order_by(FactNotificationStatus.notification_type).all()
+    assert [(d.bst_date, d.notification_type, d.notification_count) for d in new_data] == [
+        (date(2019, 1, 1), EMAIL_TYPE, 1),
+        (date(2019, 1, 1), SMS_TYPE, 2),
+    ]
+
+
 @freeze_time("2019-01-05")
 def test_ensure_create_nightly_notification_status_for_day_copies_billable_units(notify_db_session):
     first_service = create_service(service_name="First Service")
@@ -568,6 +618,57 @@ def test_create_nightly_notification_status_for_day_clears_failed_delivered_noti
         assert all(value == 0 for value in annual_limit_client.get_all_notification_counts(service_id).values())
 
 
+@freeze_time("2019-01-05")
+def test_create_nightly_notification_status_for_day_seeds_the_reset_annual_limit_counts(notify_db_session, notify_api, mocker):
+    first_service = create_service(service_name="First Service")
+    second_service = create_service(service_name="second Service")
+    calls = mocker.Mock()
+    mocker.patch("app.celery.reporting_tasks.annual_limit_client.reset_all_notification_counts", calls.reset)
+    mocker.patch("app.celery.reporting_tasks.seed_annual_limit_counts_for_services", calls.seed)
+
+    with set_config_values(
+        notify_api,
+        {
+            "FF_ANNUAL_LIMIT_BULK_SEED": True,
+            "FF_SET_BASED_NIGHTLY_NOTIFICATION_STATUS": True,
+            "NIGHTLY_NOTIFICATION_STATUS_CHUNK_SIZE": 1,
+        },
+    ):
+        create_nightly_notification_status_for_day("2019-01-01")
+
+    # Each chunk is seeded right after its counts are reset
+    chunks = [(name, args[0]) for name, args, _ in calls.mock_calls]
+    assert [name for name, _ in chunks] == ["reset", "seed", "reset", "seed"]
+    assert chunks[0][1] == chunks[1][1] and chunks[2][1] == chunks[3][1]
+    assert {chunks[0][1][0], chunks[2][1][0]} == {first_service.id, second_service.id}
+
+
+def test_seed_annual_limit_counts_seeds_active_services_in_chunks(notify_db_session, notify_api, mocker):
+    services = [create_service(service_name=f"service {i}") for i in range(3)]
+    create_service(service_name="inactive service", active=False)
+    seed = mocker.patch("app.celery.reporting_tasks.seed_annual_limit_counts_for_services", side_effect=len)
+
+    with set_config(notify_api, "ANNUAL_LIMIT_SEED_CHUNK_SIZE", 2):
+        seed_annual_limit_counts()
+
+    seeded = [service_id for call in seed.call_args_list for service_id in call.args[0]]
+    assert [len(call.args[0]) for call in seed.call_args_list] == [2, 1]
+    assert sorted(seeded) == sorted(service.id for service in services)
+
+
+def test_seed_annual_limit_counts_continues_after_a_failed_chunk(notify_db_session, notify_api, mocker):
+    for i in range(2):
+        create_service(service_name=f"service {i}")
+    seed = mocker.patch(
+        "app.celery.reporting_tasks.seed_annual_limit_counts_for_services", side_effect=[Exception("Redis is down"), 1]
+    )
+
+    with set_config(notify_api, "ANNUAL_LIMIT_SEED_CHUNK_SIZE", 1):
+        seed_annual_limit_counts()
+
+    assert seed.call_count == 2
+
+
 class TestInsertQuarterData:
     def test_insert_quarter_data(self, notify_db_session):
         service_1 = create_service(service_name="service_1")
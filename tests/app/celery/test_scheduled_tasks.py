@@ -12,9 +12,18 @@ from tests.app.db import (
     save_scheduled_notification,
 )
 
-from app import db
+from app import (
+    db,
+    email_bulk,
+    email_normal,
+    email_priority,
+    sms_bulk,
+    sms_normal,
+    sms_priority,
+)
 from app.celery import scheduled_tasks, tasks
 from app.celery.scheduled_tasks import (
+    beat_inbox_drain,
     beat_inbox_email_bulk,
     beat_inbox_email_normal,
     beat_inbox_email_priority,
@@ -579,6 +588,47 @@ class TestHeartbeatQueues:
             queue="-priority-database-tasks.fifo",
         )
 
+    def test_beat_inbox_drain_lanes(self, notify_api, mocker):
+        drainer = mocker.patch("app.celery.scheduled_tasks.InboxDrainer")
+
+        beat_inbox_drain()
+
+        lanes = drainer.call_args.args[0]
+        assert [(lane.queue, lane.weight) for lane in lanes] == [
+            (email_priority, 4),
+            (sms_priority, 4),
+            (email_normal, 2),
+            (sms_normal, 2),
+            (email_bulk, 1),
+            (sms_bulk, 1),
+        ]
+        assert drainer.call_args.kwargs == {
+            "min_batch_size": notify_api.config["BATCH_SAVING_DRAIN_MIN_BATCH_SIZE"],
+            "max_batch_size": notify_api.config["BATCH_SAVING_DRAIN_MAX_BATCH_SIZE"],
+            "max_seconds": notify_api.config["BATCH_SAVING_DRAIN_MAX_SECONDS"],
+        }
+        drainer.return_value.drain.assert_called_once_with()
+
+    @pytest.mark.parametrize(
+        "lane_index, task, queue",
+        [
+            (0, "save_emails", "-priority-database-tasks.fifo"),
+            (1, "save_smss", "-priority-database-tasks.fifo"),
+            (2, "save_emails", "-normal-database-tasks"),
+            (3, "save_smss", "-normal-database-tasks"),
+            (4, "save_emails", "-bulk-database-tasks"),
+            (5, "save_smss", "-bulk-database-tasks"),
+        ],
+    )
+    def test_beat_inbox_drain_dispatch(self, notify_api, mocker, lane_index, task, queue):
+        drainer = mocker.patch("app.celery.scheduled_tasks.InboxDrainer")
+        apply_async = mocker.patch(f"app.celery.tasks.{task}.apply_async")
+
+        beat_inbox_drain()
+        drainer.call_args.args[0][lane_index].dispatch("rec123", ["1", "2", "3", "4"])
+
+        apply_async.assert_called_once_with((None, ["1", "2", "3", "4"], "rec123"), queue=queue)
+
 
 class TestRecoverExpiredNotification:
     def test_recover_expired_notifications(self, mocker, notify_api):
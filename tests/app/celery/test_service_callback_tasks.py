@@ -1,9 +1,13 @@
 import json
 from datetime import datetime
+from http.client import HTTPMessage
+from unittest.mock import Mock
 
 import pytest
 import requests_mock
 from freezegun import freeze_time
+from requests import Request
+from requests.cookies import extract_cookies_to_jar
 from tests.app.db import (
     create_complaint,
     create_notification,
@@ -15,8 +19,10 @@ from tests.app.db import (
 
 from app import DATETIME_FORMAT, signer_complaint, signer_delivery_status
 from app.celery.service_callback_tasks import (
+    get_callback_session,
     send_complaint_to_service,
     send_delivery_status_to_service,
+    send_delivery_statuses_to_service,
 )
 
 
@@ -162,6 +168,83 @@ def test_send_delivery_status_to_service_succeeds_if_sent_at_is_none(notify_db_s
     assert mocked.call_count == 0
 
 
+def test_get_callback_session_is_reused_by_a_worker_process(notify_api):
+    session = get_callback_session()
+
+    assert get_callback_session() is session
+    assert session.get_adapter("https://some.service.gov.uk/")._pool_maxsize == notify_api.config["SERVICE_CALLBACK_POOL_MAXSIZE"]
+
+
+def test_get_callback_session_does_not_keep_cookies(notify_api):
+    session = get_callback_session()
+    headers = HTTPMessage()
+    headers["Set-Cookie"] = "session=first"
+
+    # What the session does with the headers of every response
+    extract_cookies_to_jar(
+        session.cookies, Request("POST", "https://first.service.gov.uk/").prepare(), Mock(_original_response=Mock(msg=headers))
+    )
+
+    assert len(session.cookies) == 0
+
+
+def test_send_delivery_status_to_service_records_request_metrics(notify_db_session, mocker):
+    mock_incr = mocker.patch("app.statsd_client.incr")
+    mock_timing = mocker.patch("app.statsd_client.timing")
+    callback_api, template = _set_up_test_data("email", "delivery_status")
+    notification = save_notification(create_notification(template=template, status="delivered"))
+    signed_data = _set_up_data_for_status_update(callback_api, notification)
+    mocker.patch("app.celery.service_callback_tasks.send_delivery_status_to_service.retry")
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(callback_api.url, json={}, status_code=500)
+        send_delivery_status_to_service(notification.id, signed_status_update=signed_data, service_id=notification.service_id)
+
+    mock_incr.assert_any_call("callback.service.error")
+    assert mock_timing.call_args[0][0] == "callback.service.request-time"
+
+
+def test_send_delivery_statuses_to_service_posts_every_status_update(notify_db_session, mocker):
+    callback_api, template = _set_up_test_data("sms", "delivery_status")
+    notifications = [save_notification(create_notification(template=template, status="delivered")) for _ in range(3)]
+    signed_data = [_set_up_data_for_status_update(callback_api, notification) for notification in notifications]
+    mocked = mocker.patch("app.celery.service_callback_tasks.send_delivery_statuses_to_service.retry")
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(callback_api.url, json={}, status_code=200)
+        send_delivery_statuses_to_service(signed_data, template.service_id)
+
+    assert request_mock.call_count == 3
+    assert {json.loads(request.text)["id"] for request in request_mock.request_history} == {
+        str(notification.id) for notification in notifications
+    }
+    assert all(
+        request.headers["Authorization"] == f"Bearer {callback_api.bearer_token}" for request in request_mock.request_history
+    )
+    mocked.assert_not_called()
+
+
+@pytest.mark.parametrize("status_code, retried", [(500, True), (429, True), (404, False)])
+def test_send_delivery_statuses_to_service_retries_only_failed_status_updates(notify_db_session, mocker, status_code, retried):
+    callback_api, template = _set_up_test_data("sms", "delivery_status")
+    delivered, failed = [save_notification(create_notification(template=template, status="delivered")) for _ in range(2)]
+    signed_data = [_set_up_data_for_status_update(callback_api, notification) for notification in [delivered, failed]]
+    mocked = mocker.patch("app.celery.service_callback_tasks.send_delivery_statuses_to_service.retry")
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(callback_api.url, json={}, status_code=200)
+        # requests_mock tries the matchers registered last first
+        request_mock.post(
+            callback_api.url,
+            additional_matcher=lambda request: json.loads(request.text)["id"] == str(failed.id),
+            status_code=status_code,
+        )
+        send_delivery_statuses_to_service(signed_data, template.service_id)
+
+    assert request_mock.call_count == 2
+    if retried:
+        mocked.assert_called_once_with(queue="service-callbacks-retry", args=[[signed_data[1]], template.service_id])
+    else:
+        mocked.assert_not_called()
+
+
 def _set_up_test_data(notification_type, callback_type):
     service = create_service(restricted=True)
     template = create_template(service=service, template_type=notification_type, subject="Hello")
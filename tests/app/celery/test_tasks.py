@@ -1,3 +1,4 @@
+import io
 import json
 import uuid
 from datetime import datetime, timedelta
@@ -26,7 +27,7 @@ from tests.app.db import (
     create_user,
     save_notification,
 )
-from tests.conftest import set_config_values
+from tests.conftest import set_config, set_config_values
 
 from app import (
     DATETIME_FORMAT,
@@ -46,6 +47,7 @@ from app.celery.tasks import (
     process_incomplete_job,
     process_incomplete_jobs,
     process_job,
+    process_job_shard,
     process_rows,
     s3,
     save_emails,
@@ -53,11 +55,14 @@ from app.celery.tasks import (
     seed_bounce_rate_in_redis,
     send_inbound_sms_to_service,
     send_notify_no_reply,
+    try_to_send_notifications_to_queue,
     update_in_progress_jobs,
 )
 from app.config import QueueNames
 from app.dao import jobs_dao, service_email_reply_to_dao, service_sms_sender_dao
 from app.dao.services_dao import dao_fetch_service_by_id
+from app.job.rows_artifact import encode_job_rows
+from app.job.shards import JobFileShards, JobShard
 from app.models import (
     BULK,
     EMAIL_TYPE,
@@ -74,6 +79,7 @@ from app.models import (
     ServiceSmsSender,
 )
 from app.schemas import service_schema, template_schema
+from app.v2.errors import LiveServiceTooManyRequestsError
 from celery.exceptions import Retry
 
 
@@ -220,6 +226,37 @@ class TestBatchSaving:
         assert Notification.query.one().id == uuid.UUID(notification["id"])
         assert deliver_mock.call_count == 1
 
+    def test_save_emails_queues_batches_when_deliver_email_batch_is_enabled(self, notify_api, notify_db_session, mocker):
+        service = create_service()
+        template = create_template(service=service, template_type="email")
+        signed_notifications = [signer_notification.sign(_notification_json(template, to=f"test{i}@test.com")) for i in range(3)]
+        deliver_email_mock = mocker.patch("app.celery.provider_tasks.deliver_email.apply_async")
+        deliver_email_batch_mock = mocker.patch("app.celery.provider_tasks.deliver_email_batch.apply_async")
+
+        with set_config(notify_api, "FF_DELIVER_EMAIL_BATCH", True):
+            save_emails(str(template.service_id), signed_notifications, None)
+
+        deliver_email_mock.assert_not_called()
+        deliver_email_batch_mock.assert_called_once()
+        assert sorted(deliver_email_batch_mock.call_args[0][0][0]) == sorted(str(n.id) for n in Notification.query.all())
+
+    def test_deliver_email_batch_skips_rate_limited_queues_and_sends_the_others(self, notify_api, sample_email_template, mocker):
+        limited, sent = [save_notification(create_notification(template=sample_email_template)) for _ in range(2)]
+        send_batches = mocker.patch(
+            "app.celery.tasks.send_emails_to_queue_in_batches",
+            side_effect=[LiveServiceTooManyRequestsError(10), None],
+        )
+
+        with set_config(notify_api, "FF_DELIVER_EMAIL_BATCH", True):
+            try_to_send_notifications_to_queue(
+                {limited.id: QueueNames.SEND_EMAIL_HIGH, sent.id: QueueNames.SEND_EMAIL_LOW},
+                sample_email_template.service,
+                [limited, sent],
+                sample_email_template,
+            )
+
+        assert [call.args[0] for call in send_batches.call_args_list] == [[limited], [sent]]
+
     def test_should_save_smss(self, sample_template_with_placeholders, mocker):
         notification1 = _notification_json(
             sample_template_with_placeholders,
@@ -898,6 +935,79 @@ class TestProcessJob:
         s3.get_job_from_s3.assert_not_called()
         tasks.process_rows.assert_not_called()
 
+    def test_process_job_streams_the_rows_stored_when_the_job_was_created(
+        self, notify_api, sample_template_with_placeholders, mocker
+    ):
+        csv_data = "phone number,name\n+16502532221,Jo\n+16502532222,Sam\n"
+        rows_data = encode_job_rows(
+            RecipientCSV(
+                csv_data,
+                template_type="sms",
+                placeholders=["name"],
+                template=SMSMessageTemplate(sample_template_with_placeholders.__dict__),
+            )
+        )
+        parsed_job = create_job(template=sample_template_with_placeholders, notification_count=2)
+        stored_job = create_job(template=sample_template_with_placeholders, notification_count=2)
+        mocker.patch("app.celery.tasks.s3.get_job_from_s3", return_value=csv_data)
+        mocker.patch(
+            "app.job.rows_artifact.s3.get_job_rows_from_s3",
+            side_effect=lambda service_id, job_id: io.BytesIO(rows_data) if job_id == stored_job.id else None,
+        )
+        mocker.patch("app.celery.tasks.save_smss.apply_async")
+        sign = mocker.patch("app.signer_notification.sign", return_value="something_encrypted")
+
+        with set_config(notify_api, "FF_JOB_ROWS_ARTIFACT", True):
+            process_job(parsed_job.id)
+            process_job(stored_job.id)
+
+        s3.get_job_from_s3.assert_called_once_with(str(parsed_job.service_id), str(parsed_job.id))
+        payloads = [{k: v for k, v in c[0][0].items() if k not in ("id", "job")} for c in sign.call_args_list]
+        assert payloads[:2] == payloads[2:]
+        assert [payload["personalisation"] for payload in payloads[2:]] == [{"name": "Jo"}, {"name": "Sam"}]
+
+    def test_process_job_queues_shards_of_large_jobs(self, notify_api, sample_template, mocker):
+        file_data = load_example_csv("multiple_sms").encode("utf-8")
+        job = create_job(template=sample_template, notification_count=10)
+        mocker.patch("app.celery.tasks.s3.stream_job_from_s3", return_value=Mock(iter_chunks=Mock(return_value=[file_data])))
+        get_job_from_s3 = mocker.patch("app.celery.tasks.s3.get_job_from_s3")
+        save_job_shards = mocker.patch("app.celery.tasks.save_job_shards")
+        queue_shard = mocker.patch("app.celery.tasks.process_job_shard.apply_async")
+
+        with set_config_values(notify_api, {"FF_SHARDED_JOBS": True, "JOB_SHARD_SIZE": 4}):
+            process_job(job.id)
+
+        get_job_from_s3.assert_not_called()
+        shards = [c[0][0][2] for c in queue_shard.call_args_list]
+        assert [shard[1:3] for shard in shards] == [[0, 4], [4, 8], [8, 10]]
+        assert all(c[0][0][1] == "PhoneNumber,Name\n" for c in queue_shard.call_args_list)
+        assert all(c[1] == {"queue": QueueNames.JOBS} for c in queue_shard.call_args_list)
+        assert len(save_job_shards.call_args_list[-1][0][3]) == 3
+        assert [c[1] for c in save_job_shards.call_args_list] == [{}, {}, {}, {"complete": True}]
+        assert jobs_dao.dao_get_job_by_id(job.id).job_status == "in progress"
+
+    def test_process_job_shard_processes_the_rows_of_its_byte_range(self, sample_template, mocker):
+        file_data = load_example_csv("multiple_sms").encode("utf-8")
+        job_file = JobFileShards([file_data], shard_size=4)
+        shard = list(job_file)[1]
+        job = create_job(template=sample_template, notification_count=10, job_status="in progress")
+        get_range = mocker.patch(
+            "app.celery.tasks.s3.get_job_range_from_s3", side_effect=lambda service_id, job_id, start, end: file_data[start:end]
+        )
+        mocker.patch("app.celery.tasks.save_smss.apply_async")
+        sign = mocker.patch("app.signer_notification.sign", return_value="something_encrypted")
+
+        process_job_shard(str(job.id), job_file.header, list(shard))
+
+        get_range.assert_called_once_with(str(job.service_id), str(job.id), shard.start_byte, shard.end_byte)
+        assert [c[0][0]["row_number"] for c in sign.call_args_list] == [4, 5, 6, 7]
+        assert [c[0][0]["to"] for c in sign.call_args_list] == [
+            "+441234123125",
+            "+441234123126",
+            "+441234123127",
+            "+441234123128",
+        ]
+
 
 class TestProcessRows:
     @pytest.mark.parametrize(
@@ -2035,6 +2145,47 @@ class TestSendInboundSmsToService:
 
 
 class TestProcessIncompleteJob:
+    def test_process_incomplete_job_resumes_each_unfinished_shard(self, notify_api, mocker, sample_template):
+        job = create_job(template=sample_template, notification_count=10, job_status=JOB_STATUS_ERROR)
+        shards = [JobShard(0, 0, 4, 17, 73), JobShard(1, 4, 8, 73, 129), JobShard(2, 8, 10, 129, 157)]
+        mocker.patch("app.celery.tasks.get_job_shards", return_value=("PhoneNumber,Name\n", 4, shards, True))
+        queue_shard = mocker.patch("app.celery.tasks.process_job_shard.apply_async")
+        for row_number in (0, 1, 2, 3, 4):
+            save_notification(create_notification(sample_template, job, row_number))
+
+        with set_config(notify_api, "FF_SHARDED_JOBS", True):
+            process_incomplete_job(str(job.id))
+
+        assert queue_shard.call_args_list == [
+            call([str(job.id), "PhoneNumber,Name\n", list(shards[1]), 5], queue=QueueNames.JOBS),
+            call([str(job.id), "PhoneNumber,Name\n", list(shards[2]), 8], queue=QueueNames.JOBS),
+        ]
+
+    def test_process_incomplete_job_carries_on_splitting_the_file_after_the_last_saved_shard(
+        self, notify_api, mocker, sample_template
+    ):
+        file_data = load_example_csv("multiple_sms").encode("utf-8")
+        first, *rest = JobFileShards([file_data], shard_size=4)
+        job = create_job(template=sample_template, notification_count=10, job_status=JOB_STATUS_ERROR)
+        mocker.patch("app.celery.tasks.get_job_shards", return_value=("PhoneNumber,Name\n", 4, [first], False))
+        stream_job = mocker.patch(
+            "app.celery.tasks.s3.stream_job_from_s3",
+            return_value=Mock(iter_chunks=Mock(return_value=[file_data[first.end_byte :]])),
+        )
+        save_job_shards = mocker.patch("app.celery.tasks.save_job_shards")
+        queue_shard = mocker.patch("app.celery.tasks.process_job_shard.apply_async")
+        for row_number in (0, 1, 2, 3):
+            save_notification(create_notification(sample_template, job, row_number))
+
+        with set_config(notify_api, "FF_SHARDED_JOBS", True):
+            process_incomplete_job(str(job.id))
+
+        stream_job.assert_called_once_with(str(job.service_id), str(job.id), first.end_byte)
+        assert queue_shard.call_args_list == [
+            call([str(job.id), "PhoneNumber,Name\n", list(shard)], queue=QueueNames.JOBS) for shard in rest
+        ]
+        save_job_shards.assert_called_with(job.id, "PhoneNumber,Name\n", 4, [first, *rest], complete=True)
+
     def test_process_incomplete_job_sms(self, mocker, sample_template):
         mocker.patch(
             "app.celery.tasks.s3.get_job_from_s3",
@@ -2363,6 +2514,26 @@ class TestSeedBounceRateData:
             mocked_set_seeded_total_notifications.assert_not_called()
             mocked_set_seeded_hard_bounces.assert_not_called()
 
+    def test_seed_bounce_rate_buckets(self, mocker, notify_api):
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        mocker.patch(
+            "app.celery.tasks.total_notifications_grouped_by_hour",
+            return_value=[(current_hour - timedelta(hours=1), 3), (current_hour, 5)],
+        )
+        mocker.patch("app.celery.tasks.total_hard_bounces_grouped_by_hour", return_value=[(current_hour, 1)])
+        mocker.patch("app.celery.tasks.bounce_rate_client.get_seeding_started", return_value=False)
+        mocker.patch("app.celery.tasks.bounce_rate_client.clear_bounce_rate_data")
+        mocker.patch("app.celery.tasks.bounce_rate_client.set_seeding_started")
+        mocked_set_seeded_total_notifications = mocker.patch("app.celery.tasks.bounce_rate_client.set_notifications_seeded")
+        mocked_seed = mocker.patch("app.celery.tasks.bounce_rate_buckets.seed")
+        service_id = "6ce466d0-fd6a-11e5-82f5-e0accb9d11a6"
+
+        with notify_api.app_context(), set_config(notify_api, "FF_BOUNCE_RATE_BUCKETS", True):
+            seed_bounce_rate_in_redis(service_id)
+
+        mocked_seed.assert_called_once_with({service_id: [(current_hour - timedelta(hours=1), 3, 0), (current_hour, 5, 1)]})
+        mocked_set_seeded_total_notifications.assert_not_called()
+
 
 class TestGenerateReport:
     @freeze_time("2022-01-01 12:00:00")
@@ -9,11 +9,13 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm.exc import NoResultFound
 
 from app.dao.notifications_dao import (
+    bulk_insert_notification_rows,
     bulk_insert_notifications,
     dao_create_notification,
     dao_created_scheduled_notification,
     dao_delete_notifications_by_id,
     dao_get_last_notification_added_for_job_id,
+    dao_get_last_row_numbers_by_job_shard,
     dao_get_last_template_usage,
     dao_get_notification_by_reference,
     dao_get_notification_history_by_reference,
@@ -21,6 +23,7 @@ from app.dao.notifications_dao import (
     dao_get_notifications_by_to_field,
     dao_get_scheduled_notifications,
     dao_timeout_notifications,
+    dao_timeout_notifications_in_chunks,
     dao_update_notification,
     dao_update_notifications_by_reference,
     delete_notifications_older_than_retention_by_type,
@@ -32,6 +35,7 @@ from app.dao.notifications_dao import (
     get_notifications_for_job,
     get_notifications_for_service,
     is_delivery_slow_for_provider,
+    notification_insert_row,
     notifications_not_yet_sent,
     resign_notifications,
     send_method_stats_by_service,
@@ -810,6 +814,43 @@ def test_dao_timeout_notifications_doesnt_affect_letters(sample_letter_template)
     ) = dao_timeout_notifications(1)
 
 
+def test_dao_timeout_notifications_in_chunks(sample_template, sample_letter_template):
+    with freeze_time(datetime.utcnow() - timedelta(minutes=2)):
+        created = save_notification(create_notification(sample_template, status="created", client_reference="ref"))
+        sending = [save_notification(create_notification(sample_template, status="sending")) for _ in range(3)]
+        pending = save_notification(create_notification(sample_template, status="pending"))
+        delivered = save_notification(create_notification(sample_template, status="delivered"))
+        letter = save_notification(create_notification(sample_letter_template, status="sending"))
+
+    chunks = list(dao_timeout_notifications_in_chunks(1, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [1, 2, 2]
+    assert [n.status for n in chunks[0]] == ["technical-failure"]
+    assert {n.id for chunk in chunks[1:] for n in chunk} == {n.id for n in sending + [pending]}
+    assert {n.status for chunk in chunks[1:] for n in chunk} == {"temporary-failure"}
+
+    technical_failure = chunks[0][0]
+    assert technical_failure.id == created.id
+    assert technical_failure.service_id == sample_template.service_id
+    assert technical_failure.to == created.to
+    assert technical_failure.client_reference == "ref"
+    assert technical_failure.formatted_status == "Tech issue"
+    assert technical_failure.updated_at == Notification.query.get(created.id).updated_at
+
+    assert Notification.query.get(created.id).status == "technical-failure"
+    assert all(Notification.query.get(n.id).status == "temporary-failure" for n in sending + [pending])
+    assert Notification.query.get(delivered.id).status == "delivered"
+    assert Notification.query.get(letter.id).status == "sending"
+
+
+def test_dao_timeout_notifications_in_chunks_only_updates_older_notifications(sample_template):
+    with freeze_time(datetime.utcnow() + timedelta(minutes=10)):
+        save_notification(create_notification(sample_template, status="created"))
+        save_notification(create_notification(sample_template, status="sending"))
+
+    assert list(dao_timeout_notifications_in_chunks(1, chunk_size=2)) == []
+
+
 def test_should_return_notifications_excluding_jobs_by_default(sample_template, sample_job, sample_api_key):
     save_notification(create_notification(sample_template, job=sample_job))
     without_job = save_notification(create_notification(sample_template, api_key=sample_api_key))
@@ -1612,6 +1653,14 @@ def test_dao_get_last_notification_added_for_job_id_no_job(sample_template, fake
     assert dao_get_last_notification_added_for_job_id(fake_uuid) is None
 
 
+def test_dao_get_last_row_numbers_by_job_shard(sample_template):
+    job = create_job(template=sample_template, notification_count=10, job_status=JOB_STATUS_IN_PROGRESS)
+    for row_number in (0, 1, 2, 6, 7, 9):
+        create_notification(sample_template, job, row_number)
+
+    assert dao_get_last_row_numbers_by_job_shard(job.id, 3) == {0: 2, 2: 7, 3: 9}
+
+
 def test_dao_update_notifications_by_reference_updated_notifications(sample_template):
     notification_1 = save_notification(create_notification(template=sample_template, reference="ref1"))
     notification_2 = save_notification(create_notification(template=sample_template, reference="ref2"))
@@ -1886,6 +1935,43 @@ class TestBulkInsertNotifications:
             bulk_insert_notifications([n1, n2, n3])
         assert len(get_notifications_for_service(sample_template.service_id).items) == 0
 
+    def test_bulk_insert_notification_rows(self, sample_template):
+        n1 = Notification(
+            to="+16502532222",
+            service_id=sample_template.service_id,
+            template_id=sample_template.id,
+            template_version=sample_template.version,
+            notification_type=sample_template.template_type,
+            key_type="normal",
+            created_at=datetime.utcnow(),
+            personalisation={"name": "Jo"},
+            rate_multiplier=1.0,
+        )
+        n2 = create_notification(sample_template, client_reference="sad", international=True)
+
+        bulk_insert_notification_rows([notification_insert_row(n1), notification_insert_row(n2)])
+
+        persisted = Notification.query.get(n1.id)
+        assert persisted.status == "created"
+        assert persisted.billable_units == 0
+        assert persisted.international is False
+        assert persisted.personalisation == {"name": "Jo"}
+        assert persisted.rate_multiplier == 1.0
+        assert Notification.query.get(n2.id).client_reference == "sad"
+        assert Notification.query.get(n2.id).international is True
+
+    def test_bulk_insert_notification_rows_duplicate_ids(self, sample_template):
+        row = notification_insert_row(save_notification(create_notification(sample_template)))
+
+        with pytest.raises(IntegrityError):
+            bulk_insert_notification_rows([row])
+        assert Notification.query.count() == 1
+
+    def test_bulk_insert_notification_rows_without_rows(self, notify_db_session):
+        bulk_insert_notification_rows([])
+
+        assert Notification.query.count() == 0
+
 
 class TestResigning:
     @pytest.mark.parametrize("resign,chunk_size", [(True, 2), (False, 2), (True, 10), (False, 10)])
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 
 from app.dao.notifications_dao import (
     dao_create_notification,
+    fetch_email_totals_and_hard_bounces_by_service_and_hour,
     overall_bounce_rate_for_day,
     service_bounce_rate_for_day,
     total_hard_bounces_grouped_by_hour,
@@ -143,3 +144,22 @@ class TestBounceRate:
         assert Notification.query.count() == 2
         result = total_hard_bounces_grouped_by_hour(sample_email_template.service_id, datetime.utcnow() + timedelta(minutes=1))
         assert result == []
+
+    def test_email_totals_and_hard_bounces_by_service_and_hour(self, sample_email_template, sample_job):
+        data_1 = _notification_json(
+            sample_email_template, job_id=sample_job.id, status="permanent-failure", feedback_type=NOTIFICATION_HARD_BOUNCE
+        )
+        data_2 = _notification_json(sample_email_template, job_id=sample_job.id, status="created")
+        data_3 = _notification_json(sample_email_template, job_id=sample_job.id, status="delivered")
+        data_3["created_at"] = datetime.utcnow() - timedelta(days=2)
+        for data in [data_1, data_2, data_3]:
+            dao_create_notification(Notification(**data))
+
+        result = fetch_email_totals_and_hard_bounces_by_service_and_hour(
+            datetime.utcnow() - timedelta(hours=24), datetime.utcnow() + timedelta(minutes=1)
+        )
+
+        assert len(result) == 1
+        assert result[0].service_id == sample_email_template.service_id
+        assert isinstance(result[0].hour, datetime)
+        assert (result[0].total_notifications, result[0].hard_bounces) == (2, 1)
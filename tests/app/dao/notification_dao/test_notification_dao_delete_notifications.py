@@ -15,6 +15,7 @@ from tests.app.db import (
     create_template,
     save_notification,
 )
+from tests.conftest import set_config
 
 
 def create_test_data(notification_type, sample_service, days_of_retention=3):
@@ -368,3 +369,78 @@ def test_insert_update_notification_history_updates_history_with_new_status(
     history = NotificationHistory.query.get(notification_2.id)
     assert history.status == "delivered"
     assert not NotificationHistory.query.get(notification_1.id)
+
+
+class TestSetBasedRetentionPurge:
+    @pytest.fixture(autouse=True)
+    def set_based_purge(self, notify_api):
+        with set_config(notify_api, "FF_SET_BASED_RETENTION_PURGE", True):
+            yield
+
+    @pytest.mark.parametrize("notification_type", ["sms", "email"])
+    def test_deletes_notifications_past_the_retention_of_each_service(self, sample_service, notification_type):
+        create_test_data(notification_type, sample_service)
+        assert Notification.query.count() == 9
+
+        assert delete_notifications_older_than_retention_by_type(notification_type) == 2
+
+        assert Notification.query.count() == 7
+        assert Notification.query.filter_by(notification_type=notification_type).count() == 1
+        assert NotificationHistory.query.count() == 2
+
+    def test_keeps_data_when_the_retention_of_the_service_is_longer(self, sample_service):
+        create_test_data("sms", sample_service, 15)
+
+        delete_notifications_older_than_retention_by_type("sms")
+
+        assert Notification.query.count() == 8
+        assert Notification.query.filter(Notification.notification_type == "sms").count() == 2
+
+    def test_uses_the_default_retention_when_the_service_has_none_for_the_type(self, sample_service):
+        create_service_data_retention(service=sample_service, notification_type="sms", days_of_retention=15)
+        email_template, _, sms_template = _create_templates(sample_service)
+        save_notification(create_notification(template=email_template, created_at=datetime.utcnow() - timedelta(days=14)))
+        save_notification(create_notification(template=sms_template, created_at=datetime.utcnow() - timedelta(days=14)))
+
+        delete_notifications_older_than_retention_by_type("email")
+        delete_notifications_older_than_retention_by_type("sms")
+
+        assert [n.notification_type for n in Notification.query.all()] == ["sms"]
+
+    def test_updates_notification_history(self, sample_email_template):
+        notification = save_notification(
+            create_notification(template=sample_email_template, created_at=datetime.utcnow() - timedelta(days=8))
+        )
+        insert_update_notification_history("email", datetime.utcnow(), sample_email_template.service_id)
+        Notification.query.filter_by(id=notification.id).update({"status": "delivered", "reference": "ses_reference"})
+
+        delete_notifications_older_than_retention_by_type("email")
+
+        history = NotificationHistory.query.all()
+        assert len(history) == 1
+        assert history[0].status == "delivered"
+        assert history[0].reference == "ses_reference"
+
+    def test_deletes_notifications_of_test_keys_without_history(self, sample_template):
+        save_notification(
+            create_notification(template=sample_template, key_type="test", created_at=datetime.utcnow() - timedelta(days=8))
+        )
+
+        assert delete_notifications_older_than_retention_by_type("sms") == 1
+
+        assert Notification.query.count() == 0
+        assert NotificationHistory.query.count() == 0
+
+    def test_purges_every_service_in_batches(self, sample_template, mocker):
+        other_template = create_template(create_service(service_name="s2"), template_type="sms")
+        for template in [sample_template, sample_template, other_template, other_template]:
+            save_notification(create_notification(template=template, created_at=datetime.now() - timedelta(days=8)))
+        logger = mocker.patch("app.dao.notifications_dao.current_app.logger.info")
+
+        assert delete_notifications_older_than_retention_by_type("sms", qry_limit=3) == 4
+
+        assert Notification.query.count() == 0
+        assert NotificationHistory.query.count() == 4
+        progress = [c.args[0] for c in logger.call_args_list if c.args[0].startswith("Purged")]
+        assert len(progress) == 2
+        assert progress[-1].startswith("Purged 4 sms notifications (4 moved to history)")
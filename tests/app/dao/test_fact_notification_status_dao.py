@@ -16,10 +16,12 @@ from app.dao.fact_notification_status_dao import (
     fetch_monthly_template_usage_for_service_paginated,
     fetch_notification_billable_units_for_service_for_today_and_7_previous_days,
     fetch_notification_stats_for_trial_services,
+    fetch_notification_status_by_service_for_day,
     fetch_notification_status_for_day,
     fetch_notification_status_for_service_by_month,
     fetch_notification_status_for_service_for_day,
     fetch_notification_status_for_service_for_today_and_7_previous_days,
+    fetch_notification_status_totals_by_service_for_fiscal_year,
     fetch_notification_status_totals_for_all_services,
     fetch_notification_status_totals_for_service_by_fiscal_year,
     fetch_notification_statuses_for_job,
@@ -30,6 +32,7 @@ from app.dao.fact_notification_status_dao import (
     get_total_notifications_sent_for_api_key,
     get_total_sent_notifications_for_day_and_type,
     update_fact_notification_status,
+    upsert_fact_notification_status_for_day,
 )
 from app.models import (
     EMAIL_TYPE,
@@ -236,6 +239,107 @@ class TestUpdateFactNotificationStatus:
         assert len(updated_fact_data) == 0
 
 
+class TestUpsertFactNotificationStatusForDay:
+    @freeze_time("2019-06-18T12:00:00")
+    def test_upsert_matches_per_service_path(self, notify_db_session):
+        local_now = convert_utc_to_local_timezone(datetime.utcnow())
+        first_service = create_service(service_name="First Service")
+        first_template = create_template(service=first_service)
+        second_service = create_service(service_name="second Service")
+        second_template = create_template(service=second_service, template_type="email")
+        third_service = create_service(service_name="third Service")
+        third_template = create_template(service=third_service, template_type="letter")
+
+        save_notification(create_notification(template=first_template, status="delivered", billable_units=3))
+        save_notification(create_notification(template=first_template, created_at=local_now - timedelta(days=1)))
+        create_notification_history(template=second_template, status="temporary-failure")
+        create_notification_history(template=second_template, created_at=local_now - timedelta(days=1))
+        save_notification(create_notification(template=third_template, status="created"))
+        save_notification(create_notification(template=third_template, key_type=KEY_TYPE_TEST))
+
+        process_day = local_now.date()
+        service_ids = [first_service.id, second_service.id, third_service.id]
+        expected = sorted(
+            (row.service_id, row.notification_type, row.status, row.notification_count, row.billable_units)
+            for row in fetch_notification_status_for_day(process_day=process_day, service_ids=service_ids)
+        )
+
+        assert upsert_fact_notification_status_for_day(process_day, service_ids=service_ids) == 3
+
+        new_fact_data = FactNotificationStatus.query.filter(FactNotificationStatus.bst_date == process_day).all()
+        assert (
+            sorted(
+                (row.service_id, row.notification_type, row.notification_status, row.notification_count, row.billable_units)
+                for row in new_fact_data
+            )
+            == expected
+        )
+        assert all(row.job_id == UUID("00000000-0000-0000-0000-000000000000") for row in new_fact_data)
+
+    @freeze_time("2019-06-18T12:00:00")
+    def test_upsert_only_reads_history_for_service_and_type_without_notifications(self, notify_db_session):
+        service = create_service(service_name="service_1")
+        sms_template = create_template(service=service, template_type=SMS_TYPE)
+        email_template = create_template(service=service, template_type=EMAIL_TYPE)
+
+        # notifications already copied to history must not be counted twice
+        save_notification(create_notification(template=sms_template, status="delivered"))
+        create_notification_history(template=sms_template, status="delivered")
+        create_notification_history(template=email_template, status="delivered")
+        create_notification_history(template=email_template, status="delivered")
+
+        upsert_fact_notification_status_for_day(date(2019, 6, 18))
+
+        new_fact_data = FactNotificationStatus.query.order_by(FactNotificationStatus.notification_type).all()
+        assert len(new_fact_data) == 2
+        assert new_fact_data[0].notification_type == EMAIL_TYPE
+        assert new_fact_data[0].notification_count == 2
+        assert new_fact_data[1].notification_type == SMS_TYPE
+        assert new_fact_data[1].notification_count == 1
+
+    @freeze_time("2018-10-3T18:00:00")
+    def test_upsert_replaces_rows_only_for_given_day_and_services(self, notify_db_session):
+        service_1 = create_service(service_name="service_1")
+        service_2 = create_service(service_name="service_2")
+
+        create_ft_notification_status(date(2018, 1, 1), "sms", service_1, count=4)
+        create_ft_notification_status(date(2018, 1, 1), "email", service_1, count=7)
+        create_ft_notification_status(date(2018, 1, 2), "sms", service_1, count=10)
+        create_ft_notification_status(date(2018, 1, 1), "sms", service_2, count=100)
+
+        first_template = create_template(service=service_1)
+        save_notification(
+            create_notification(template=first_template, status="delivered", created_at=datetime(2018, 1, 1, 12, 0, 0))
+        )
+
+        upsert_fact_notification_status_for_day(date(2018, 1, 1), service_ids=[service_1.id])
+
+        service_1_rows = (
+            FactNotificationStatus.query.filter(FactNotificationStatus.service_id == service_1.id)
+            .order_by(FactNotificationStatus.bst_date)
+            .all()
+        )
+        assert [(row.bst_date, row.notification_count) for row in service_1_rows] == [
+            (date(2018, 1, 1), 1),
+            (date(2018, 1, 2), 10),
+        ]
+        service_2_rows = FactNotificationStatus.query.filter(FactNotificationStatus.service_id == service_2.id).all()
+        assert [row.notification_count for row in service_2_rows] == [100]
+
+    @freeze_time("2018-10-3T18:00:00")
+    def test_upsert_is_idempotent(self, notify_db_session):
+        service = create_service(service_name="service_1")
+        template = create_template(service=service)
+        save_notification(create_notification(template=template, status="delivered", created_at=datetime(2018, 1, 1, 12, 0, 0)))
+
+        upsert_fact_notification_status_for_day(date(2018, 1, 1))
+        upsert_fact_notification_status_for_day(date(2018, 1, 1))
+
+        new_fact_data = FactNotificationStatus.query.all()
+        assert len(new_fact_data) == 1
+        assert new_fact_data[0].notification_count == 1
+
+
 def test_fetch_notification_status_for_service_by_month(notify_db_session):
     service_1 = create_service(service_name="service_1")
     service_2 = create_service(service_name="service_2")
@@ -1585,6 +1689,61 @@ def test_fetch_notification_status_totals_for_service_by_fiscal_year_only_counts
     assert results == expected_count
 
 
+def test_fetch_notification_status_totals_by_service_for_fiscal_year(notify_db_session):
+    service_1 = create_service(service_name="service_1")
+    service_2 = create_service(service_name="service_2")
+    other_service = create_service(service_name="other service")
+
+    create_ft_notification_status(datetime(2024, 3, 31), SMS_TYPE, service_1, count=5)
+    create_ft_notification_status(datetime(2024, 4, 1), SMS_TYPE, service_1, count=50, billable_units=60)
+    create_ft_notification_status(datetime(2024, 6, 1), SMS_TYPE, service_1, count=10, billable_units=20)
+    create_ft_notification_status(datetime(2024, 4, 1), EMAIL_TYPE, service_1, count=7)
+    create_ft_notification_status(datetime(2025, 3, 31), EMAIL_TYPE, service_2, count=3)
+    create_ft_notification_status(datetime(2025, 4, 1), EMAIL_TYPE, service_2, count=30)
+    create_ft_notification_status(datetime(2024, 6, 1), SMS_TYPE, other_service, count=100)
+
+    results = fetch_notification_status_totals_by_service_for_fiscal_year([service_1.id, service_2.id], 2024)
+
+    assert sorted(
+        (str(row.service_id), row.notification_type, row.notification_count, row.billable_units) for row in results
+    ) == sorted(
+        [
+            (str(service_1.id), SMS_TYPE, 60, 80),
+            (str(service_1.id), EMAIL_TYPE, 7, 7),
+            (str(service_2.id), EMAIL_TYPE, 3, 3),
+        ]
+    )
+
+
+@freeze_time("2024-01-15 12:00:00")
+def test_fetch_notification_status_by_service_for_day(notify_db_session):
+    service_1 = create_service(service_name="service_1")
+    service_2 = create_service(service_name="service_2")
+    sms_template = create_template(service=service_1, template_type=SMS_TYPE)
+    email_template = create_template(service=service_2, template_type=EMAIL_TYPE)
+    other_template = create_template(service=create_service(service_name="other service"), template_type=SMS_TYPE)
+
+    save_notification(create_notification(sms_template, status=NOTIFICATION_DELIVERED, billable_units=2))
+    save_notification(create_notification(sms_template, status=NOTIFICATION_DELIVERED, billable_units=3))
+    save_notification(create_notification(sms_template, status=NOTIFICATION_FAILED, billable_units=1))
+    save_notification(create_notification(sms_template, status=NOTIFICATION_DELIVERED, key_type=KEY_TYPE_TEST))
+    save_notification(create_notification(sms_template, created_at=datetime(2024, 1, 14, 23, 59)))
+    save_notification(create_notification(email_template, status=NOTIFICATION_DELIVERED, billable_units=0))
+    save_notification(create_notification(other_template, status=NOTIFICATION_DELIVERED))
+
+    results = fetch_notification_status_by_service_for_day(datetime(2024, 1, 15, 12), [service_1.id, service_2.id])
+
+    assert sorted(
+        (str(row.service_id), row.notification_type, row.notification_status, row.count, row.billable_units) for row in results
+    ) == sorted(
+        [
+            (str(service_1.id), SMS_TYPE, NOTIFICATION_DELIVERED, 2, 5),
+            (str(service_1.id), SMS_TYPE, NOTIFICATION_FAILED, 1, 1),
+            (str(service_2.id), EMAIL_TYPE, NOTIFICATION_DELIVERED, 1, 0),
+        ]
+    )
+
+
 class TestFetchQuarterData:
     def test_fetch_quarter_data(self, notify_db_session):
         service_1 = create_service(service_name="service_1")
@@ -8,7 +8,9 @@ import pytest
 from freezegun import freeze_time
 
 from app import db
+from app.dao import fact_billing_dao
 from app.dao.fact_billing_dao import (
+    BillingRates,
     create_billing_record,
     dao_fetch_sms_cost_for_all_services_in_range,
     dao_fetch_sms_cost_for_service_in_range,
@@ -18,11 +20,13 @@ from app.dao.fact_billing_dao import (
     fetch_letter_costs_for_all_services,
     fetch_letter_line_items_for_all_services,
     fetch_monthly_billing_for_year,
+    fetch_notifications_sent_by_service_for_year,
     fetch_sms_billing_for_all_services,
     fetch_sms_free_allowance_remainder,
     get_rate,
     get_rates_for_billing,
     update_fact_billing,
+    update_fact_billing_for_day,
 )
 from app.dao.organisation_dao import dao_add_service_to_organisation
 from app.models import NOTIFICATION_STATUS_TYPES, FactBilling, Notification
@@ -1122,6 +1126,107 @@ def test_update_fact_billing_international_sms_uses_long_code_rate(notify_db_ses
     assert record.billing_total == Decimal("1") * Decimal("2") * Decimal("0.162")
 
 
+@pytest.mark.parametrize(
+    "day, sms_sending_vehicle, expected_rate",
+    [
+        (date(2017, 5, 30), "long_code", 1.0),
+        (date(2017, 6, 1), "long_code", 1.5),
+        (date(2017, 6, 1), "short_code", 3.0),
+    ],
+)
+def test_billing_rates_get_rate_matches_get_rate(notify_db_session, day, sms_sending_vehicle, expected_rate):
+    create_rate(start_date=datetime(2017, 1, 1), value=1.0, notification_type="sms", sms_sending_vehicle="long_code")
+    create_rate(start_date=datetime(2017, 5, 31, 4, 0), value=1.5, notification_type="sms", sms_sending_vehicle="long_code")
+    create_rate(start_date=datetime(2017, 1, 1), value=3.0, notification_type="sms", sms_sending_vehicle="short_code")
+    non_letter_rates, letter_rates = get_rates_for_billing()
+
+    rate = BillingRates.load().get_rate("sms", day, sms_sending_vehicle=sms_sending_vehicle)
+
+    assert rate == expected_rate
+    assert rate == get_rate(non_letter_rates, letter_rates, "sms", day, sms_sending_vehicle=sms_sending_vehicle)
+
+
+def test_billing_rates_get_rate_raises_when_no_rate_exists_for_vehicle(notify_db_session):
+    create_rate(start_date=datetime(2017, 1, 1), value=1.0, notification_type="sms", sms_sending_vehicle="short_code")
+
+    with pytest.raises(ValueError, match=r"\[error-sms-rates\]"):
+        BillingRates.load().get_rate("sms", date(2017, 6, 1), sms_sending_vehicle="long_code")
+
+
+def test_billing_rates_get_rate_for_non_sms(notify_db_session):
+    rates = BillingRates.load()
+
+    assert rates.get_rate("email", date(2017, 6, 1)) == 0
+    assert rates.get_rate("letter", date(2017, 6, 1), crown=True, letter_page_count=0) == 0
+
+
+def test_update_fact_billing_for_day_upserts_all_rows_in_one_commit(notify_db_session, billing_rates, mocker):
+    service = create_service()
+    first_template = create_template(service=service, template_type="sms", template_name="first")
+    second_template = create_template(service=service, template_type="sms", template_name="second")
+    today = datetime.utcnow().date()
+    for template, billable_units in ((first_template, 2), (second_template, 3)):
+        save_notification(
+            create_notification(
+                template=template,
+                status="delivered",
+                sent_by="sns",
+                rate_multiplier=1,
+                billable_units=billable_units,
+                sms_origination_phone_number="+12025551234",
+            )
+        )
+    rows = fetch_billing_data_for_day(today)
+    get_rates_for_billing_spy = mocker.spy(fact_billing_dao, "get_rates_for_billing")
+    commit_spy = mocker.spy(db.session, "commit")
+
+    assert update_fact_billing_for_day(rows, today) == 2
+
+    get_rates_for_billing_spy.assert_called_once()
+    commit_spy.assert_called_once()
+    records = FactBilling.query.order_by(FactBilling.billable_units).all()
+    assert [(r.template_id, r.billable_units, r.billing_total) for r in records] == [
+        (first_template.id, 2, Decimal("2") * Decimal("0.162")),
+        (second_template.id, 3, Decimal("3") * Decimal("0.162")),
+    ]
+
+    # rerunning the day updates the existing rows instead of adding new ones
+    assert update_fact_billing_for_day(rows, today) == 2
+    assert FactBilling.query.count() == 2
+
+
+def test_update_fact_billing_for_day_adds_rows_with_the_same_primary_key(notify_db_session, billing_rates):
+    service = create_service()
+    template = create_template(service=service, template_type="sms")
+    today = datetime.utcnow().date()
+    # a null rate_multiplier groups separately in fetch_billing_data_for_day but is billed with a multiplier of 1
+    for rate_multiplier in (None, 1):
+        save_notification(
+            create_notification(
+                template=template,
+                status="delivered",
+                sent_by="sns",
+                rate_multiplier=rate_multiplier,
+                billable_units=1,
+                sms_origination_phone_number="+12025551234",
+            )
+        )
+    rows = fetch_billing_data_for_day(today)
+    assert len(rows) == 2
+
+    assert update_fact_billing_for_day(rows, today) == 1
+
+    record = FactBilling.query.one()
+    assert record.billable_units == 2
+    assert record.notifications_sent == 2
+    assert record.billing_total == Decimal("2") * Decimal("0.162")
+
+
+def test_update_fact_billing_for_day_with_no_data(notify_db_session):
+    assert update_fact_billing_for_day([], datetime.utcnow().date(), rates=BillingRates([], [])) == 0
+    assert FactBilling.query.count() == 0
+
+
 # --- dao_fetch_sms_cost_for_service_in_range tests ---
 
 
@@ -1427,3 +1532,19 @@ def test_dao_fetch_sms_cost_for_all_services_empty_range(notify_db_session):
     result = dao_fetch_sms_cost_for_all_services_in_range(date(2026, 4, 1), date(2026, 4, 7))
 
     assert result == {}
+
+
+def test_fetch_notifications_sent_by_service_for_year_pivots_by_type(notify_db_session):
+    service = create_service()
+    service_2 = create_service(service_name="second")
+    create_ft_billing(utc_date="2019-04-20", notification_type="sms", service=service, notifications_sent=2)
+    create_ft_billing(utc_date="2019-04-21", notification_type="sms", service=service, notifications_sent=3)
+    create_ft_billing(utc_date="2019-06-01", notification_type="email", service=service, notifications_sent=4)
+    create_ft_billing(utc_date="2020-03-31", notification_type="letter", service=service_2)
+    # outside of the 2019 financial year
+    create_ft_billing(utc_date="2019-03-31", notification_type="sms", service=service, notifications_sent=10)
+    create_ft_billing(utc_date="2020-04-01", notification_type="email", service=service_2, notifications_sent=10)
+
+    results = {row.service_id: tuple(row)[1:] for row in fetch_notifications_sent_by_service_for_year(2019)}
+
+    assert results == {service.id: (4, 5, 0), service_2.id: (0, 0, 1)}
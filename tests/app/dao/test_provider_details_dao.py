@@ -5,6 +5,7 @@ from freezegun import freeze_time
 from sqlalchemy import asc, desc
 
 from app import clients
+from app.cache.local import local_caches
 from app.dao.provider_details_dao import (
     dao_get_provider_stats,
     dao_get_provider_versions,
@@ -12,13 +13,16 @@ from app.dao.provider_details_dao import (
     dao_switch_sms_provider_to_provider_with_identifier,
     dao_toggle_sms_provider,
     dao_update_provider_details,
+    get_active_provider_identifiers,
     get_alternative_sms_provider,
     get_current_provider,
     get_provider_details_by_identifier,
     get_provider_details_by_notification_type,
+    provider_routing_local_cache,
 )
 from app.models import ProviderDetails, ProviderDetailsHistory
 from tests.app.db import create_ft_billing, create_service, create_template
+from tests.conftest import set_config
 
 
 def test_can_get_sms_non_international_providers(restore_provider_details):
@@ -315,3 +319,34 @@ def test_dao_get_provider_stats(notify_db_session):
     assert result[5].supports_international is True
     assert result[5].active is True
     assert result[5].current_month_billable_sms == 0
+
+
+class TestActiveProviderIdentifiers:
+    @pytest.fixture(autouse=True)
+    def provider_routing_cache(self, notify_api):
+        local_caches.clear()
+        with set_config(notify_api, "FF_PROVIDER_ROUTING_CACHE", True):
+            yield
+        local_caches.clear()
+
+    def test_returns_active_providers_in_order_of_priority(self, restore_provider_details):
+        expected = tuple(provider.identifier for provider in get_provider_details_by_notification_type("sms") if provider.active)
+
+        assert get_active_provider_identifiers("sms") == expected
+        assert "mmg" not in expected
+
+    def test_caches_the_routing_table(self, restore_provider_details):
+        get_active_provider_identifiers("email")
+        hits = provider_routing_local_cache.hits
+
+        assert get_active_provider_identifiers("email") == ("ses",)
+        assert provider_routing_local_cache.hits == hits + 1
+
+    def test_provider_update_invalidates_the_routing_table(self, restore_provider_details):
+        assert get_active_provider_identifiers("email") == ("ses",)
+        ses = get_provider_details_by_identifier("ses")
+        ses.active = False
+
+        dao_update_provider_details(ses)
+
+        assert get_active_provider_identifiers("email") == ()
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from itsdangerous import BadSignature
+
+from app import signer_personalisation
+from app.dao.resign_dao import resign_column
+from app.models import Notification
+from tests.app.db import create_notification, save_notification
+from tests.conftest import set_signer_secret_key
+
+
+def _create_notifications(template, keys, count, start=datetime(2024, 1, 1)):
+    with set_signer_secret_key(signer_personalisation, keys):
+        notifications = [
+            create_notification(template, personalisation={"Name": f"test {i}"}, created_at=start + timedelta(minutes=i))
+            for i in range(count)
+        ]
+        for notification in notifications:
+            save_notification(notification)
+    return [(notification.id, notification.created_at, notification._personalisation) for notification in notifications]
+
+
+def _signatures(ids):
+    return [Notification.query.get(id)._personalisation for id in ids]
+
+
+class TestResignColumn:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_resigns_only_the_changed_signatures_in_keyset_order(self, sample_template_with_placeholders, workers):
+        old = _create_notifications(sample_template_with_placeholders, ["k1", "k2"], 3)
+        current = _create_notifications(sample_template_with_placeholders, ["k2", "k3"], 2, start=datetime(2024, 1, 2))
+        checkpoints = []
+
+        with set_signer_secret_key(signer_personalisation, ["k2", "k3"]):
+            result = resign_column(
+                Notification._personalisation,
+                signer_personalisation,
+                chunk_size=2,
+                resign=True,
+                workers=workers,
+                on_checkpoint=checkpoints.append,
+            )
+
+            assert result.rows == 5
+            assert result.resigned == 3
+            assert [checkpoint[1] for checkpoint in checkpoints] == [old[1][0], current[0][0], current[1][0]]
+            assert result.checkpoint == checkpoints[-1]
+            assert all(signature != _personalisation for signature, (_, _, _personalisation) in zip(_signatures(old), old))
+            assert _signatures(id for id, _, _ in current) == [_personalisation for _, _, _personalisation in current]
+            assert [Notification.query.get(id).personalisation for id, _, _ in old] == [{"Name": f"test {i}"} for i in range(3)]
+
+    def test_previews_without_updating(self, sample_template_with_placeholders):
+        old = _create_notifications(sample_template_with_placeholders, ["k1", "k2"], 3)
+        checkpoints = []
+
+        with set_signer_secret_key(signer_personalisation, ["k2", "k3"]):
+            result = resign_column(
+                Notification._personalisation,
+                signer_personalisation,
+                chunk_size=2,
+                resign=False,
+                on_checkpoint=checkpoints.append,
+            )
+
+        assert result.resigned == 3
+        assert checkpoints == []
+        assert _signatures(id for id, _, _ in old) == [_personalisation for _, _, _personalisation in old]
+
+    def test_resumes_after_the_checkpoint(self, sample_template_with_placeholders):
+        old = _create_notifications(sample_template_with_placeholders, ["k1", "k2"], 4)
+
+        with set_signer_secret_key(signer_personalisation, ["k2", "k3"]):
+            result = resign_column(
+                Notification._personalisation,
+                signer_personalisation,
+                chunk_size=10,
+                resign=True,
+                checkpoint=(old[1][1], old[1][0]),
+            )
+
+        assert result.rows == 2
+        signatures = _signatures(id for id, _, _ in old)
+        assert signatures[:2] == [old[0][2], old[1][2]]
+        assert signatures[2] != old[2][2] and signatures[3] != old[3][2]
+
+    def test_commits_the_chunks_before_a_bad_signature(self, sample_template_with_placeholders):
+        current = _create_notifications(sample_template_with_placeholders, ["k1", "k2"], 2)
+        unknown = _create_notifications(sample_template_with_placeholders, ["k4"], 1, start=datetime(2024, 1, 2))
+
+        with set_signer_secret_key(signer_personalisation, ["k2", "k3"]):
+            with pytest.raises(BadSignature):
+                resign_column(Notification._personalisation, signer_personalisation, chunk_size=2, resign=True)
+
+        signatures = _signatures([current[0][0], current[1][0], unknown[0][0]])
+        assert signatures[0] != current[0][2] and signatures[1] != current[1][2]
+        assert signatures[2] == unknown[0][2]
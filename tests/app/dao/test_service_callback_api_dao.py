@@ -4,8 +4,10 @@ import pytest
 from itsdangerous import BadSignature
 from sqlalchemy.exc import SQLAlchemyError
 
-from app import signer_bearer_token
+from app import db, signer_bearer_token
+from app.cache.local import local_caches
 from app.dao.service_callback_api_dao import (
+    delivery_status_callback_api_local_cache,
     get_service_callback_api,
     get_service_delivery_status_callback_api_for_service,
     reset_service_callback_api,
@@ -15,7 +17,7 @@ from app.dao.service_callback_api_dao import (
 )
 from app.models import ServiceCallbackApi
 from tests.app.db import create_service_callback_api
-from tests.conftest import set_signer_secret_key
+from tests.conftest import set_config, set_signer_secret_key
 
 
 def test_save_service_callback_api(sample_service):
@@ -180,6 +182,51 @@ def test_get_service_delivery_status_callback_api_for_service(sample_service):
     assert result.updated_by_id == service_callback_api.updated_by_id
 
 
+class TestCachedDeliveryStatusCallbackApi:
+    @pytest.fixture(autouse=True)
+    def local_dao_cache(self, notify_api):
+        local_caches.clear()
+        with set_config(notify_api, "FF_LOCAL_DAO_CACHE", True):
+            yield
+        local_caches.clear()
+
+    def test_caches_callback_api_detached(self, sample_service):
+        service_callback_api = create_service_callback_api(service=sample_service)
+        hits = delivery_status_callback_api_local_cache.hits
+
+        result = get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True)
+
+        assert get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True) is result
+        assert result.id == service_callback_api.id
+        assert result.bearer_token == service_callback_api.bearer_token
+        assert delivery_status_callback_api_local_cache.hits == hits + 1
+
+    def test_caches_services_without_callback_api(self, sample_service):
+        assert get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True) is None
+        assert get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True) is None
+
+        assert delivery_status_callback_api_local_cache.get(str(sample_service.id)) is False
+
+    def test_reads_in_the_session_when_the_cache_is_off(self, notify_api, sample_service, mocker):
+        create_service_callback_api(service=sample_service)
+        detached_reader = mocker.spy(db, "detached_reader")
+
+        with set_config(notify_api, "FF_LOCAL_DAO_CACHE", False):
+            result = get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True)
+
+        detached_reader.assert_not_called()
+        assert result in db.session
+        assert len(delivery_status_callback_api_local_cache) == 0
+
+    def test_callback_api_write_invalidates_cache(self, sample_service):
+        service_callback_api = create_service_callback_api(service=sample_service)
+        get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True)
+
+        suspend_unsuspend_service_callback_api(service_callback_api, sample_service.users[0].id, suspend=True)
+
+        assert get_service_delivery_status_callback_api_for_service(sample_service.id, use_cache=True).is_suspended
+
+
 class TestResigning:
     @pytest.mark.parametrize("resign", [True, False])
     def test_resign_callbacks_resigns_or_previews(self, resign, sample_service):
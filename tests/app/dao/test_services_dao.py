@@ -600,6 +600,52 @@ def test_dao_fetch_live_services_data_filter_heartbeats(notify_api, sample_user,
     # ]
 
 
+@freeze_time("2019-04-23T10:00:00")
+def test_dao_fetch_live_services_data_reports_the_current_financial_year(notify_api, sample_user, mocker):
+    service = create_service(go_live_user=sample_user, go_live_at="2014-04-20T10:00:00")
+    service_2 = create_service(service_name="second", go_live_at="2017-04-20T10:00:00")
+    create_service(service_name="restricted", restricted=True)
+    create_ft_billing(utc_date="2019-04-20", notification_type="sms", service=service)
+    create_ft_billing(utc_date="2019-04-21", notification_type="sms", service=service)
+    create_ft_billing(utc_date="2019-04-20", notification_type="email", service=service)
+    # from the previous financial year, not reported
+    create_ft_billing(utc_date="2018-04-20", notification_type="sms", service=service)
+    create_ft_billing(utc_date="2019-04-16", notification_type="letter", service=service_2)
+    create_annual_billing(service.id, 500, 2018)
+    create_annual_billing(service.id, 100, 2019)
+    create_annual_billing(service_2.id, 300, 2018)
+    mocker.patch.object(redis_store, "get", return_value=None)
+    mock_redis_set = mocker.patch.object(redis_store, "set")
+
+    with set_config(notify_api, "FF_LIVE_SERVICES_REPORT", True):
+        results = dao_fetch_live_services_data()
+
+    assert [(row["service_name"], row["sms_totals"], row["email_totals"], row["letter_totals"]) for row in results] == [
+        ("Sample service", 2, 1, 0),
+        ("second", 0, 0, 1),
+    ]
+    assert list(results[0])[-4:] == ["email_totals", "sms_totals", "letter_totals", "free_sms_fragment_limit"]
+    assert [row["free_sms_fragment_limit"] for row in results] == [100, 300]
+    (key, cached), kwargs = mock_redis_set.call_args
+    assert key == "live-services-billing-totals:2019"
+    assert json.loads(cached) == {str(service.id): [1, 2, 0], str(service_2.id): [0, 0, 1]}
+    assert kwargs == {"ex": notify_api.config["LIVE_SERVICES_REPORT_CACHE_SECONDS"]}
+
+
+@freeze_time("2019-04-23T10:00:00")
+def test_dao_fetch_live_services_data_reads_the_cached_totals(notify_api, sample_user, mocker):
+    service = create_service(go_live_user=sample_user, go_live_at="2014-04-20T10:00:00")
+    create_annual_billing(service.id, 100, 2019)
+    mocker.patch.object(redis_store, "get", return_value=json.dumps({str(service.id): [7, 8, 9]}).encode("utf-8"))
+    mock_billing = mocker.patch("app.dao.services_dao.fetch_notifications_sent_by_service_for_year")
+
+    with set_config(notify_api, "FF_LIVE_SERVICES_REPORT", True):
+        results = dao_fetch_live_services_data()
+
+    assert [(row["email_totals"], row["sms_totals"], row["letter_totals"]) for row in results] == [(7, 8, 9)]
+    mock_billing.assert_not_called()
+
+
 def test_get_service_by_id_returns_none_if_no_service(notify_db):
     with pytest.raises(NoResultFound) as e:
         dao_fetch_service_by_id(str(uuid.uuid4()))
@@ -1,11 +1,14 @@
-from unittest.mock import ANY
+from collections import Counter
+from unittest.mock import ANY, call
 
+import pytest
 from flask import current_app
 from pytest_mock import MockFixture
 
 from app.delivery import bounce_rate as bounce_rate_module
+from app.delivery.bounce_rate_buckets import HARD_BOUNCE, SENT
 from app.models import EMAIL_TYPE
-from tests.conftest import set_config_values
+from tests.conftest import set_config, set_config_values
 
 
 class TestCheckServiceOverBounceRate:
@@ -106,3 +109,54 @@ class TestCheckServiceOverBounceRate:
             bounce_rate_module.check_service_over_bounce_rate(fake_uuid)
 
             mock_send_task.assert_not_called()
+
+
+class TestBucketedBounceRate:
+    @pytest.fixture(autouse=True)
+    def bounce_rate_buckets(self, notify_api):
+        with set_config(notify_api, "FF_BOUNCE_RATE_BUCKETS", True):
+            bounce_rate_module.bounce_rate_buckets.clear_checks()
+            yield
+            bounce_rate_module.bounce_rate_buckets.clear_checks()
+
+    def test_critical_bounce_rate_of_the_buckets_suspends(self, mocker: MockFixture, notify_api, fake_uuid):
+        with notify_api.app_context():
+            get_bounce_rate = mocker.patch(
+                "app.delivery.bounce_rate.bounce_rate_buckets.get_bounce_rate", return_value=(0.2, 1500)
+            )
+            old_bounce_rate = mocker.patch("app.bounce_rate_client.get_bounce_rate")
+            mocker.patch("app.bounce_rate_client.set_suspension_email_key", return_value=True)
+            mocker.patch("app.bounce_rate_client.set_warning_email_key", return_value=True)
+            mock_remove_perm = mocker.patch("app.delivery.bounce_rate.dao_remove_service_permission")
+            mock_send_task = mocker.patch("app.delivery.bounce_rate.notify_celery.send_task")
+
+            bounce_rate_module.check_service_over_bounce_rate(fake_uuid)
+
+            get_bounce_rate.assert_called_once_with(fake_uuid)
+            old_bounce_rate.assert_not_called()
+            mock_remove_perm.assert_called_once_with(fake_uuid, EMAIL_TYPE)
+            mock_send_task.assert_called_once_with(
+                "send-bounce-rate-suspension-email", kwargs={"service_id": fake_uuid, "bounce_rate": 0.2}, queue=ANY
+            )
+
+    def test_count_sent_email_checks_the_bounce_rate_once_per_interval(self, mocker: MockFixture, notify_api, fake_uuid):
+        with notify_api.app_context():
+            increment = mocker.patch("app.delivery.bounce_rate.bounce_rate_buckets.increment")
+            check = mocker.patch("app.delivery.bounce_rate.check_service_over_bounce_rate")
+
+            bounce_rate_module.count_sent_email(fake_uuid)
+            bounce_rate_module.count_sent_email(fake_uuid)
+
+            assert increment.call_args_list == [call({fake_uuid: Counter({SENT: 1})})] * 2
+            check.assert_called_once_with(fake_uuid)
+
+    def test_count_hard_bounces_increments_all_services_at_once(self, mocker: MockFixture, notify_api, fake_uuid):
+        other_service_id = "d4e8a7f4-2b8a-4c9a-8b3f-9c2d4e8a7f4b"
+        with notify_api.app_context():
+            increment = mocker.patch("app.delivery.bounce_rate.bounce_rate_buckets.increment")
+            check = mocker.patch("app.delivery.bounce_rate.check_service_over_bounce_rate")
+
+            bounce_rate_module.count_hard_bounces({fake_uuid: 2, other_service_id: 1})
+
+            increment.assert_called_once_with({fake_uuid: Counter({HARD_BOUNCE: 2}), other_service_id: Counter({HARD_BOUNCE: 1})})
+            assert check.call_args_list == [call(fake_uuid), call(other_service_id)]
@@ -0,0 +1,100 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import pytest
+
+from app.delivery.bounce_rate_buckets import HARD_BOUNCE, SENT, BucketedBounceRate, bounce_rate_buckets_key
+
+SERVICE_ID = "6ce466d0-fd6a-11e5-82f5-e0accb9d11a6"
+OTHER_SERVICE_ID = "d4e8a7f4-2b8a-4c9a-8b3f-9c2d4e8a7f4b"
+NOW = 1_699_999_980  # the start of a minute
+
+
+@pytest.fixture
+def buckets():
+    return BucketedBounceRate(redis_client=fakeredis.FakeRedis(), bucket_seconds=60, window_seconds=600)
+
+
+def _fields(buckets, service_id=SERVICE_ID):
+    return {
+        field.decode(): int(value) for field, value in buckets.redis_client.hgetall(bounce_rate_buckets_key(service_id)).items()
+    }
+
+
+class TestBucketedBounceRate:
+    def test_counts_the_buckets_of_the_window(self, buckets):
+        buckets.increment({SERVICE_ID: Counter({SENT: 10, HARD_BOUNCE: 1})}, NOW - 540)
+        buckets.increment({SERVICE_ID: Counter({SENT: 5}), OTHER_SERVICE_ID: Counter({SENT: 3})}, NOW)
+
+        assert buckets.get_counts(SERVICE_ID, NOW) == (15, 1)
+        assert buckets.get_counts(OTHER_SERVICE_ID, NOW) == (3, 0)
+        assert buckets.get_bounce_rate(SERVICE_ID, NOW) == (1 / 15, 15)
+
+    def test_ignores_and_deletes_buckets_older_than_the_window(self, buckets):
+        buckets.increment({SERVICE_ID: Counter({SENT: 10, HARD_BOUNCE: 1})}, NOW - 600)
+        buckets.increment({SERVICE_ID: Counter({SENT: 5})}, NOW - 60)
+
+        assert buckets.get_counts(SERVICE_ID, NOW) == (5, 0)
+        assert _fields(buckets) == {f"{SENT}:{buckets.bucket(NOW - 60)}": 5}
+
+    def test_increment_deletes_the_bucket_leaving_the_window(self, buckets):
+        buckets.increment({SERVICE_ID: Counter({SENT: 10, HARD_BOUNCE: 2})}, NOW - 600)
+        buckets.increment({SERVICE_ID: Counter({SENT: 1})}, NOW)
+
+        assert _fields(buckets) == {f"{SENT}:{buckets.bucket(NOW)}": 1}
+
+    def test_keeps_one_field_per_counter_and_bucket(self, buckets):
+        for second in range(0, 1200, 5):
+            buckets.increment({SERVICE_ID: Counter({SENT: 1, HARD_BOUNCE: 1})}, NOW + second)
+
+        assert len(_fields(buckets)) <= 2 * (buckets.ring_size + 1)
+        assert buckets.get_counts(SERVICE_ID, NOW + 1195) == (120, 120)
+
+    def test_is_zero_for_a_service_without_counters(self, buckets):
+        assert buckets.get_counts(SERVICE_ID) == (0, 0)
+        assert buckets.get_bounce_rate(SERVICE_ID) == (0.0, 0)
+
+    def test_the_key_expires_after_the_window(self, buckets):
+        buckets.increment({SERVICE_ID: Counter({SENT: 1})})
+
+        assert 600 < buckets.redis_client.ttl(bounce_rate_buckets_key(SERVICE_ID)) <= 660
+
+    def test_seed_replaces_the_counters_of_the_service(self):
+        buckets = BucketedBounceRate(redis_client=fakeredis.FakeRedis(), bucket_seconds=300, window_seconds=24 * 60 * 60)
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        buckets.increment({SERVICE_ID: Counter({SENT: 1000})})
+
+        buckets.seed(
+            {
+                SERVICE_ID: [
+                    (current_hour - timedelta(hours=30), 50, 50),
+                    (current_hour - timedelta(hours=2), 2, 1),
+                    (current_hour, 8, 0),
+                ]
+            }
+        )
+
+        assert buckets.get_counts(SERVICE_ID) == (10, 1)
+        assert _fields(buckets) == {
+            f"{SENT}:{buckets.bucket((current_hour - timedelta(hours=2)).replace(tzinfo=timezone.utc).timestamp())}": 2,
+            f"{HARD_BOUNCE}:{buckets.bucket((current_hour - timedelta(hours=2)).replace(tzinfo=timezone.utc).timestamp())}": 1,
+            f"{SENT}:{buckets.bucket(current_hour.replace(tzinfo=timezone.utc).timestamp())}": 8,
+        }
+
+    def test_seed_without_rows_deletes_the_counters(self, buckets):
+        buckets.increment({SERVICE_ID: Counter({SENT: 3})})
+
+        buckets.seed({SERVICE_ID: []})
+
+        assert buckets.redis_client.exists(bounce_rate_buckets_key(SERVICE_ID)) == 0
+
+    def test_should_check_once_per_interval(self, buckets, mocker):
+        monotonic = mocker.patch("app.delivery.bounce_rate_buckets.time.monotonic", return_value=100.0)
+
+        assert buckets.should_check(SERVICE_ID)
+        assert not buckets.should_check(SERVICE_ID)
+        assert buckets.should_check(OTHER_SERVICE_ID)
+
+        monotonic.return_value = 100.0 + buckets.check_interval_seconds
+        assert buckets.should_check(SERVICE_ID)
@@ -10,6 +10,8 @@ from notifications_utils.recipients import validate_and_format_phone_number
 
 import app
 from app import aws_sns_client
+from app.cache.local import local_caches
+from app.cache.templates import rendered_template_cache
 from app.config import Config
 from app.dao import notifications_dao, provider_details_dao
 from app.dao.provider_details_dao import (
@@ -46,7 +48,7 @@ from tests.app.db import (
     create_template,
     save_notification,
 )
-from tests.conftest import set_config_values
+from tests.conftest import set_config, set_config_values
 
 
 class TestProviderToUse:
@@ -154,6 +156,29 @@ class TestProviderToUse:
             provider = send_to_providers.provider_to_use("sms", "1234", "+16135551234")
         assert provider.name == "sns"
 
+    @pytest.mark.parametrize(
+        "to, expected_provider",
+        [("+16135551234", "pinpoint"), ("+16715550123", "sns"), ("8695550123", "sns")],
+    )
+    def test_routing_cache_chooses_the_same_providers(self, restore_provider_details, notify_api, mocker, to, expected_provider):
+        send_to_providers._classify_recipient_country_memoised.cache_clear()
+        local_caches.clear()
+        get_provider_details = mocker.spy(provider_details_dao, "get_provider_details_by_notification_type")
+        with set_config_values(
+            notify_api,
+            {
+                "AWS_PINPOINT_SC_POOL_ID": "sc_pool_id",
+                "AWS_PINPOINT_DEFAULT_POOL_ID": "default_pool_id",
+                "FF_PROVIDER_ROUTING_CACHE": True,
+            },
+        ):
+            providers = [send_to_providers.provider_to_use("sms", "1234", to).name for _ in range(2)]
+        local_caches.clear()
+
+        assert providers == [expected_provider, expected_provider]
+        get_provider_details.assert_called_once_with("sms", False)
+        assert send_to_providers._classify_recipient_country_memoised.cache_info().hits == 1
+
 
 @pytest.mark.skip(reason="Currently using only 1 SMS provider")
 def test_should_return_highest_priority_active_provider(restore_provider_details):
@@ -255,6 +280,29 @@ def test_should_send_personalised_template_to_correct_sms_provider_and_persist(s
     assert call("sms.process_type-normal") in statsd_mock.incr.call_args_list
 
 
+def test_send_sms_to_provider_renders_each_personalisation_with_the_template_render_cache(
+    notify_api, sample_template_with_placeholders, mocker
+):
+    notifications = [
+        save_notification(
+            create_notification(
+                template=sample_template_with_placeholders, to_field="+16502532222", personalisation={"name": name}
+            )
+        )
+        for name in ("Jo", "Sam")
+    ]
+    mocker.patch("app.aws_sns_client.send_sms", return_value="message_id_from_sns")
+    rendered_template_cache.clear()
+
+    with set_config(notify_api, "FF_TEMPLATE_RENDER_CACHE", True):
+        for notification in notifications:
+            send_to_providers.send_sms_to_provider(notification)
+
+    contents = [call_args[1]["content"] for call_args in aws_sns_client.send_sms.call_args_list]
+    assert contents == ["Sample service: Hello Jo\nYour thing is due soon", "Sample service: Hello Sam\nYour thing is due soon"]
+    assert len(rendered_template_cache) == 1
+
+
 def test_should_send_personalised_template_to_correct_email_provider_and_persist(sample_email_template_with_html, mocker):
     db_notification = save_notification(
         create_notification(
@@ -1539,6 +1587,22 @@ class TestBounceRate:
         )
         app.bounce_rate_client.set_sliding_notifications.assert_called_once_with(sample_service.id, str(db_notification.id))
 
+    def test_send_email_counts_the_email_in_the_bounce_rate_buckets(
+        self, sample_service, sample_email_template, mocker, notify_api
+    ):
+        mocker.patch("app.aws_ses_client.send_email", return_value="reference")
+        mocker.patch("app.bounce_rate_client.set_sliding_notifications")
+        count_sent_email = mocker.patch("app.delivery.send_to_providers.count_sent_email")
+        check_bounce_rate = mocker.patch("app.delivery.send_to_providers.check_service_over_bounce_rate")
+        db_notification = save_notification(create_notification(template=sample_email_template))
+
+        with set_config(notify_api, "FF_BOUNCE_RATE_BUCKETS", True):
+            send_to_providers.send_email_to_provider(db_notification)
+
+        count_sent_email.assert_called_once_with(sample_service.id)
+        check_bounce_rate.assert_not_called()
+        app.bounce_rate_client.set_sliding_notifications.assert_not_called()
+
 
 @pytest.mark.parametrize(
     "encoded_text, charset, encoding, expected",
@@ -1592,3 +1656,79 @@ class TestGetFromAddress(TestCase):
         # Assert
         expected_result = '"=?utf-8?B??=" <johndoe@example.com>'
         self.assertEqual(result, expected_result)
+
+
+class TestSendEmailsToProvider:
+    def test_sends_the_emails_and_sets_them_to_sending(self, sample_email_template, mocker):
+        notifications = [
+            save_notification(create_notification(template=sample_email_template, to_field=f"{i}@example.com")) for i in range(3)
+        ]
+        mocker.patch("app.aws_ses_client.send_email", side_effect=["ref-0", "ref-1", "ref-2"])
+        mocker.patch("app.delivery.send_to_providers.bounce_rate_client")
+        check_bounce_rate = mocker.patch("app.delivery.send_to_providers.check_service_over_bounce_rate")
+        get_template = mocker.spy(send_to_providers, "dao_get_template_by_id")
+        update_statuses = mocker.spy(send_to_providers, "update_notification_statuses")
+
+        errors = send_to_providers.send_emails_to_provider(notifications)
+
+        assert errors == {}
+        assert app.aws_ses_client.send_email.call_count == 3
+        get_template.assert_called_once_with(sample_email_template.id, sample_email_template.version)
+        check_bounce_rate.assert_called_once_with(sample_email_template.service_id)
+        update_statuses.assert_called_once()
+        for notification in notifications:
+            persisted = Notification.query.filter_by(id=notification.id).one()
+            assert persisted.status == "sending"
+            assert persisted.sent_by == "ses"
+            assert persisted.reference in {"ref-0", "ref-1", "ref-2"}
+
+    def test_returns_the_errors_and_sends_the_other_emails(self, sample_email_template, mocker):
+        sent = save_notification(create_notification(template=sample_email_template, to_field="sent@example.com"))
+        failed = save_notification(create_notification(template=sample_email_template, to_field="failed@example.com"))
+        error = Exception("ses is down")
+        mocker.patch(
+            "app.aws_ses_client.send_email",
+            side_effect=lambda _from, to, *args, **kwargs: _raise(error) if to == "failed@example.com" else "reference",
+        )
+        mocker.patch("app.delivery.send_to_providers.bounce_rate_client")
+        mocker.patch("app.delivery.send_to_providers.check_service_over_bounce_rate")
+
+        errors = send_to_providers.send_emails_to_provider([sent, failed])
+
+        assert errors == {failed.id: error}
+        assert Notification.query.filter_by(id=sent.id).one().status == "sending"
+        assert Notification.query.filter_by(id=failed.id).one().status == "created"
+
+    def test_sets_sent_emails_to_sending_when_finishing_one_fails(self, sample_email_template, mocker):
+        notifications = [
+            save_notification(create_notification(template=sample_email_template, to_field=f"{i}@example.com")) for i in range(2)
+        ]
+        mocker.patch("app.aws_ses_client.send_email", side_effect=["ref-0", "ref-1"])
+        error = Exception("redis is down")
+        mocker.patch("app.delivery.send_to_providers.bounce_rate_client")
+        mocker.patch("app.delivery.send_to_providers.check_service_over_bounce_rate", side_effect=[error, None])
+
+        errors = send_to_providers.send_emails_to_provider(notifications)
+
+        assert errors == {notifications[0].id: error}
+        for notification in notifications:
+            persisted = Notification.query.filter_by(id=notification.id).one()
+            assert persisted.status == "sending"
+            assert persisted.reference in {"ref-0", "ref-1"}
+
+    def test_research_mode_emails_are_not_sent_to_the_provider(self, sample_service, sample_email_template, mocker):
+        notification = save_notification(create_notification(template=sample_email_template, key_type=KEY_TYPE_TEST))
+        mocker.patch("app.aws_ses_client.send_email")
+        mocker.patch("app.delivery.send_to_providers.send_email_response", return_value="reference")
+
+        errors = send_to_providers.send_emails_to_provider([notification])
+
+        assert errors == {}
+        app.aws_ses_client.send_email.assert_not_called()
+        persisted = Notification.query.filter_by(id=notification.id).one()
+        assert persisted.status == "sending"
+        assert persisted.reference == "reference"
+
+
+def _raise(error):
+    raise error
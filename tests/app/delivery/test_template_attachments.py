@@ -15,6 +15,7 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from app.cache.attachments import template_attachment_cache
 from app.delivery import send_to_providers
 from app.models import FILE_STATUS_UPLOADED, FILE_TYPE_TEMPLATE_ATTACH
 from tests.app.conftest import create_sample_email_template
@@ -22,6 +23,7 @@ from tests.app.db import (
     create_notification,
     save_notification,
 )
+from tests.conftest import set_config
 
 
 @pytest.fixture
@@ -186,7 +188,7 @@ class TestDownloadTemplateFile:
         http_mock.request.return_value.status = 200
         http_mock.request.return_value.data = b"file_content"
 
-        mocker.patch("app.delivery.send_to_providers.PoolManager", return_value=http_mock)
+        mocker.patch("app.delivery.send_to_providers._get_document_download_http", return_value=http_mock)
 
         result = send_to_providers._download_template_file(
             service_id=service_id,
@@ -212,7 +214,7 @@ class TestDownloadTemplateFile:
         http_mock = MagicMock()
         http_mock.request.return_value.status = 404
 
-        mocker.patch("app.delivery.send_to_providers.PoolManager", return_value=http_mock)
+        mocker.patch("app.delivery.send_to_providers._get_document_download_http", return_value=http_mock)
 
         result = send_to_providers._download_template_file(
             service_id=service_id,
@@ -232,7 +234,7 @@ class TestDownloadTemplateFile:
         mocker.patch("app.delivery.send_to_providers.check_for_malware_errors")
 
         # Mock exception
-        mocker.patch("app.delivery.send_to_providers.PoolManager", side_effect=Exception("Connection error"))
+        mocker.patch("app.delivery.send_to_providers._get_document_download_http", side_effect=Exception("Connection error"))
 
         result = send_to_providers._download_template_file(
             service_id=service_id,
@@ -243,6 +245,44 @@ class TestDownloadTemplateFile:
 
         assert result is None
 
+    def test_downloads_file_once_when_attachment_cache_is_on(self, notify_api, mocker):
+        template_attachment_cache.clear()
+        http_mock = MagicMock()
+        http_mock.request.return_value.status = 200
+        http_mock.request.return_value.data = b"file_content"
+        mocker.patch("app.delivery.send_to_providers._get_document_download_http", return_value=http_mock)
+
+        service_id = uuid.uuid4()
+
+        with set_config(notify_api, "FF_TEMPLATE_ATTACHMENT_CACHE", True):
+            results = [
+                send_to_providers._download_template_file(
+                    service_id=service_id, document_id="doc-123", filename="test.pdf", mime_type="application/pdf"
+                )
+                for _ in range(3)
+            ]
+        template_attachment_cache.clear()
+
+        assert [result["data"] for result in results] == [b"file_content"] * 3
+        http_mock.request.assert_called_once()
+
+    def test_does_not_cache_failed_downloads(self, notify_api, mocker):
+        template_attachment_cache.clear()
+        http_mock = MagicMock()
+        http_mock.request.return_value.status = 500
+        mocker.patch("app.delivery.send_to_providers._get_document_download_http", return_value=http_mock)
+
+        with set_config(notify_api, "FF_TEMPLATE_ATTACHMENT_CACHE", True):
+            for _ in range(2):
+                send_to_providers._download_template_file(
+                    service_id=uuid.uuid4(), document_id="doc-123", filename="test.pdf", mime_type="application/pdf"
+                )
+
+        assert http_mock.request.call_count == 2
+
+    def test_document_download_http_is_shared_by_downloads(self, notify_api):
+        assert send_to_providers._get_document_download_http() is send_to_providers._get_document_download_http()
+
 
 class TestGetTemplateAttachments:
     """Test _get_template_attachments helper function."""
@@ -442,7 +482,7 @@ class TestSendEmailToProviderWithTemplateAttachments:
 
         http_mock = MagicMock()
         http_mock.request.return_value.data = b"payload_content"
-        mocker.patch("app.delivery.send_to_providers.PoolManager", return_value=http_mock)
+        mocker.patch("app.delivery.send_to_providers._get_document_download_http", return_value=http_mock)
 
         mocker.patch("app.delivery.send_to_providers._get_template_attachments", return_value=template_attachments)
         mocker.patch("app.delivery.send_to_providers.provider_to_use")
@@ -0,0 +1,64 @@
+import io
+
+from notifications_utils.recipients import RecipientCSV
+from notifications_utils.template import SMSMessageTemplate
+
+from app.job.rows_artifact import decode_job_rows, encode_job_rows, get_job_rows, store_job_rows
+from tests.conftest import set_config
+
+CSV_DATA = "phone number,name,reference\n+16502532221,Jo,ref-1\n6502532222,Sam,\n"
+
+
+def _recipient_csv():
+    template = SMSMessageTemplate({"content": "Hello ((name))", "template_type": "sms"})
+    return RecipientCSV(CSV_DATA, template_type="sms", placeholders=["name"], template=template)
+
+
+class TestJobRows:
+    def test_rows_round_trip_with_the_fields_process_rows_reads(self):
+        recipient_csv = _recipient_csv()
+
+        rows = list(decode_job_rows(io.BytesIO(encode_job_rows(recipient_csv))))
+
+        csv_rows = list(recipient_csv.get_rows())
+        assert len(rows) == len(csv_rows) == 2
+        for row, csv_row in zip(rows, csv_rows):
+            assert row.index == csv_row.index
+            assert row.recipient == csv_row.recipient
+            assert row.personalisation == dict(csv_row.personalisation)
+            assert row.get("reference").data == csv_row.get("reference").data
+        assert rows[0].personalisation == {"name": "Jo"}
+        assert rows[0].get("reference").data == "ref-1"
+
+    def test_store_job_rows_uploads_the_rows_next_to_the_job_file(self, notify_api, mocker):
+        upload = mocker.patch("app.job.rows_artifact.s3.upload_job_rows_to_s3")
+
+        with set_config(notify_api, "FF_JOB_ROWS_ARTIFACT", True):
+            store_job_rows("service-id", "job-id", _recipient_csv())
+
+        service_id, job_id, data = upload.call_args[0]
+        assert (service_id, job_id) == ("service-id", "job-id")
+        assert len(list(decode_job_rows(io.BytesIO(data)))) == 2
+
+    def test_store_job_rows_does_not_fail_the_job_when_the_upload_fails(self, notify_api, mocker):
+        mocker.patch("app.job.rows_artifact.s3.upload_job_rows_to_s3", side_effect=Exception("S3 is down"))
+
+        with set_config(notify_api, "FF_JOB_ROWS_ARTIFACT", True):
+            store_job_rows("service-id", "job-id", _recipient_csv())
+
+    def test_does_nothing_when_the_feature_flag_is_off(self, notify_api, mocker):
+        upload = mocker.patch("app.job.rows_artifact.s3.upload_job_rows_to_s3")
+        download = mocker.patch("app.job.rows_artifact.s3.get_job_rows_from_s3")
+
+        with set_config(notify_api, "FF_JOB_ROWS_ARTIFACT", False):
+            store_job_rows("service-id", "job-id", _recipient_csv())
+            assert get_job_rows("service-id", "job-id") is None
+
+        upload.assert_not_called()
+        download.assert_not_called()
+
+    def test_get_job_rows_returns_none_for_jobs_without_stored_rows(self, notify_api, mocker):
+        mocker.patch("app.job.rows_artifact.s3.get_job_rows_from_s3", return_value=None)
+
+        with set_config(notify_api, "FF_JOB_ROWS_ARTIFACT", True):
+            assert get_job_rows("service-id", "job-id") is None
@@ -0,0 +1,68 @@
+import json
+
+from app.job.shards import JobFileShards, JobShard, get_job_shards, job_shards_cache_key, save_job_shards
+
+FILE_DATA = b'phone number,name\n+16502532221,"Jo\nSmith"\n+16502532222,Sam\n+16502532223,Max\n+16502532224,Eve\n+16502532225,Ann'
+
+
+def _chunks(data, size=7):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJobFileShards:
+    def test_cuts_the_file_in_shards_of_rows_with_their_byte_ranges(self):
+        job_file = JobFileShards(_chunks(FILE_DATA), shard_size=2)
+
+        shards = list(job_file)
+
+        assert job_file.header == "phone number,name\n"
+        assert [(shard.index, shard.start_row, shard.end_row) for shard in shards] == [(0, 0, 2), (1, 2, 4), (2, 4, 5)]
+        assert [FILE_DATA[shard.start_byte : shard.end_byte] for shard in shards] == [
+            b'+16502532221,"Jo\nSmith"\n+16502532222,Sam\n',
+            b"+16502532223,Max\n+16502532224,Eve\n",
+            b"+16502532225,Ann",
+        ]
+
+    def test_yields_a_shard_as_soon_as_its_last_row_is_read(self):
+        chunks_read = []
+
+        def chunks():
+            for chunk in _chunks(FILE_DATA):
+                chunks_read.append(chunk)
+                yield chunk
+
+        next(iter(JobFileShards(chunks(), shard_size=2)))
+
+        assert len(b"".join(chunks_read)) < len(FILE_DATA)
+
+    def test_carries_on_after_a_shard(self):
+        first, *rest = JobFileShards(_chunks(FILE_DATA), shard_size=2)
+
+        job_file = JobFileShards(_chunks(FILE_DATA[first.end_byte :]), shard_size=2, after=first, header="phone number,name\n")
+
+        assert list(job_file) == rest
+        assert job_file.header == "phone number,name\n"
+
+    def test_empty_file_has_no_shards(self):
+        assert list(JobFileShards([], shard_size=2)) == []
+        assert list(JobFileShards([b"phone number\n"], shard_size=2)) == []
+
+
+class TestSavedJobShards:
+    def test_shards_round_trip_through_redis(self, mocker):
+        store = {}
+        mocker.patch("app.job.shards.redis_store.set", side_effect=lambda key, value, ex: store.update({key: value}))
+        mocker.patch("app.job.shards.redis_store.get", side_effect=lambda key: store.get(key))
+        shards = [JobShard(0, 0, 2, 18, 40), JobShard(1, 2, 3, 40, 57)]
+
+        save_job_shards("job-id", "phone number\n", 2, shards)
+        assert json.loads(store[job_shards_cache_key("job-id")])["shard_size"] == 2
+        assert get_job_shards("job-id") == ("phone number\n", 2, shards, False)
+
+        save_job_shards("job-id", "phone number\n", 2, shards, complete=True)
+        assert get_job_shards("job-id") == ("phone number\n", 2, shards, True)
+
+    def test_jobs_that_were_not_sharded_have_no_shards(self, mocker):
+        mocker.patch("app.job.shards.redis_store.get", return_value=None)
+
+        assert get_job_shards("job-id") is None
@@ -1,14 +1,16 @@
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 from app import DATETIME_FORMAT, signer_complaint, signer_delivery_status
 from app.notifications.callbacks import (
     _check_and_queue_callback_task,
+    _check_and_queue_callback_tasks,
     create_complaint_callback_data,
     create_delivery_status_callback_data,
 )
 from tests.app.conftest import create_sample_notification
-from tests.app.db import create_complaint, create_service_callback_api
+from tests.app.db import create_complaint, create_notification, create_service_callback_api, save_notification
+from tests.conftest import set_config, set_config_values
 
 
 def test_create_delivery_status_callback_data(
@@ -117,3 +119,52 @@ def test_check_and_queue_callback_task_does_not_call_delivery_task_when_notifica
     with patch("app.notifications.callbacks.send_delivery_status_to_service.apply_async") as mock_apply_async:
         _check_and_queue_callback_task(None)
         mock_apply_async.assert_not_called()
+
+
+def test_check_and_queue_callback_tasks_queues_one_task_per_notification(notify_api, sample_email_template):
+    notifications = [save_notification(create_notification(template=sample_email_template)) for _ in range(2)]
+    callback_api = create_service_callback_api(service=sample_email_template.service, url="https://original_url.com")
+
+    with (
+        set_config(notify_api, "FF_BATCH_SERVICE_CALLBACKS", False),
+        patch("app.notifications.callbacks.send_delivery_status_to_service.apply_async") as mock_apply_async,
+    ):
+        _check_and_queue_callback_tasks(notifications)
+
+    assert mock_apply_async.call_args_list == [
+        call(
+            [str(notification.id), create_delivery_status_callback_data(notification, callback_api), notification.service_id],
+            queue="service-callbacks",
+        )
+        for notification in notifications
+    ]
+
+
+def test_check_and_queue_callback_tasks_batches_callbacks_per_service(notify_api, sample_email_template):
+    notifications = [save_notification(create_notification(template=sample_email_template)) for _ in range(3)]
+    callback_api = create_service_callback_api(service=sample_email_template.service, url="https://original_url.com")
+    signed_status_updates = [create_delivery_status_callback_data(notification, callback_api) for notification in notifications]
+
+    with (
+        set_config_values(notify_api, {"FF_BATCH_SERVICE_CALLBACKS": True, "SERVICE_CALLBACK_BATCH_SIZE": 2}),
+        patch("app.notifications.callbacks.send_delivery_statuses_to_service.apply_async") as mock_apply_async,
+    ):
+        _check_and_queue_callback_tasks(notifications)
+
+    assert mock_apply_async.call_args_list == [
+        call([signed_status_updates[:2], sample_email_template.service_id], queue="service-callbacks"),
+        call([signed_status_updates[2:], sample_email_template.service_id], queue="service-callbacks"),
+    ]
+
+
+def test_check_and_queue_callback_tasks_skips_suspended_callback_api(notify_api, sample_email_template):
+    notification = save_notification(create_notification(template=sample_email_template))
+    create_service_callback_api(service=sample_email_template.service, url="https://original_url.com", is_suspended=True)
+
+    with (
+        set_config(notify_api, "FF_BATCH_SERVICE_CALLBACKS", True),
+        patch("app.notifications.callbacks.send_delivery_statuses_to_service.apply_async") as mock_apply_async,
+    ):
+        _check_and_queue_callback_tasks([notification])
+
+    mock_apply_async.assert_not_called()
@@ -31,13 +31,14 @@ from app.notifications.process_notifications import (
     persist_notification,
     persist_notifications,
     persist_scheduled_notification,
+    send_emails_to_queue_in_batches,
     send_notification_to_queue,
     simulated_recipient,
     transform_notification,
 )
 from app.v2.errors import BadRequestError
 from tests.app.conftest import create_sample_api_key
-from tests.app.db import create_service_sms_sender
+from tests.app.db import create_api_key, create_notification, create_service_sms_sender, save_notification
 from tests.conftest import set_config, set_config_values
 
 
@@ -509,6 +510,92 @@ class TestPersistNotification:
         assert persisted_notification.reply_to_text == "123456"
 
 
+class TestBulkPersistNotifications:
+    @pytest.fixture(autouse=True)
+    def bulk_notification_insert(self, notify_api):
+        with set_config(notify_api, "FF_BULK_NOTIFICATION_INSERT", True):
+            yield
+
+    def _notification(self, template, api_key, recipient, **kwargs):
+        return dict(
+            template_id=template.id,
+            template_version=template.version,
+            recipient=recipient,
+            service=template.service,
+            personalisation={"name": "Jo"},
+            notification_type=template.template_type,
+            api_key_id=api_key.id,
+            key_type=api_key.key_type,
+            **kwargs,
+        )
+
+    def test_persists_rows_and_returns_notifications(self, sample_email_template, sample_api_key, mocker):
+        mock_increment = mocker.patch("app.notifications.process_notifications._increment_daily_limit_counters")
+
+        notifications = persist_notifications(
+            [
+                self._notification(sample_email_template, sample_api_key, "foo@bar.com", client_reference="a"),
+                self._notification(sample_email_template, sample_api_key, "Foo2@bar.com", client_reference="b"),
+            ]
+        )
+
+        persisted = Notification.query.order_by(Notification.client_reference).all()
+        assert [(n.id, n.to, n.normalised_to) for n in persisted] == [
+            (notifications[0].id, "foo@bar.com", "foo@bar.com"),
+            (notifications[1].id, "Foo2@bar.com", "foo2@bar.com"),
+        ]
+        assert persisted[0].status == "created"
+        assert persisted[0].billable_units == 0
+        assert persisted[0].international is False
+        assert persisted[0].personalisation == {"name": "Jo"}
+        assert persisted[0].queue_name == notifications[0].queue_name
+        assert notifications[0].template.id == sample_email_template.id
+        mock_increment.assert_called_once_with({sample_email_template.service_id: 2})
+
+    def test_fetches_templates_and_services_once_per_batch(self, sample_template, sample_api_key, mocker):
+        mocker.patch("app.notifications.process_notifications._increment_daily_limit_counters")
+        mock_template = mocker.patch(
+            "app.notifications.process_notifications.dao_get_template_by_id", return_value=sample_template
+        )
+        mock_service = mocker.patch(
+            "app.notifications.process_notifications.dao_fetch_service_by_id", return_value=sample_template.service
+        )
+
+        persist_notifications([self._notification(sample_template, sample_api_key, "+16502532222") for _ in range(3)])
+
+        mock_template.assert_called_once_with(sample_template.id, sample_template.version, use_cache=True)
+        mock_service.assert_called_once_with(sample_template.service_id, use_cache=True)
+        assert Notification.query.count() == 3
+
+    def test_does_not_count_test_keys(self, sample_template, sample_api_key, mocker):
+        mock_increment = mocker.patch("app.notifications.process_notifications._increment_daily_limit_counters")
+        test_api_key = create_api_key(sample_template.service, key_type="test")
+
+        persist_notifications(
+            [
+                self._notification(sample_template, sample_api_key, "+16502532222"),
+                self._notification(sample_template, test_api_key, "+16502532222"),
+            ]
+        )
+
+        mock_increment.assert_called_once_with({sample_template.service_id: 1})
+
+    def test_duplicate_ids_insert_nothing(self, sample_template, sample_api_key, mocker):
+        mock_increment = mocker.patch("app.notifications.process_notifications._increment_daily_limit_counters")
+        notification_id = uuid.uuid4()
+
+        with pytest.raises(SQLAlchemyError):
+            persist_notifications(
+                [
+                    self._notification(sample_template, sample_api_key, "+16502532222", notification_id=notification_id),
+                    self._notification(sample_template, sample_api_key, "+16502532222", notification_id=notification_id),
+                ]
+            )
+
+        assert Notification.query.count() == 0
+        mock_increment.assert_not_called()
+
+
 class TestSendNotificationQueue:
     @pytest.mark.parametrize(
         ("research_mode, requested_queue, notification_type, key_type, reply_to_text, expected_queue, expected_task"),
@@ -772,6 +859,47 @@ class TestSendNotificationQueue:
                 MessageGroupId=ANY,
             )
 
+    def test_send_emails_to_queue_in_batches_chunks_per_service(self, notify_api, mocker):
+        service_id, other_service_id = uuid.uuid4(), uuid.uuid4()
+        notifications = [
+            Notification(id=uuid.uuid4(), key_type="normal", notification_type="email", service_id=service_id) for _ in range(3)
+        ]
+        other_notification = Notification(
+            id=uuid.uuid4(), key_type="normal", notification_type="email", service_id=other_service_id
+        )
+        mocked = mocker.patch("app.celery.provider_tasks.deliver_email_batch.apply_async")
+
+        with set_config(notify_api, "EMAIL_BATCH_SIZE", 2):
+            send_emails_to_queue_in_batches(notifications + [other_notification], research_mode=False, queue=None)
+
+        assert mocked.call_args_list == [
+            call([[str(n.id) for n in notifications[:2]]], queue=QueueNames.SEND_EMAIL_MEDIUM, MessageGroupId=str(service_id)),
+            call([[str(notifications[2].id)]], queue=QueueNames.SEND_EMAIL_MEDIUM, MessageGroupId=str(service_id)),
+            call([[str(other_notification.id)]], queue=QueueNames.SEND_EMAIL_MEDIUM, MessageGroupId=str(other_service_id)),
+        ]
+
+    def test_send_emails_to_queue_in_batches_sends_test_emails_to_research_mode_queue(self, notify_api, mocker):
+        service_id = uuid.uuid4()
+        normal = Notification(id=uuid.uuid4(), key_type="normal", notification_type="email", service_id=service_id)
+        test = Notification(id=uuid.uuid4(), key_type="test", notification_type="email", service_id=service_id)
+        mocked = mocker.patch("app.celery.provider_tasks.deliver_email_batch.apply_async")
+
+        send_emails_to_queue_in_batches([normal, test], research_mode=False, queue=QueueNames.SEND_EMAIL_HIGH)
+
+        assert mocked.call_args_list == [
+            call([[str(normal.id)]], queue=QueueNames.SEND_EMAIL_HIGH, MessageGroupId=str(service_id)),
+            call([[str(test.id)]], queue=QueueNames.RESEARCH_MODE, MessageGroupId=str(service_id)),
+        ]
+
+    def test_send_emails_to_queue_in_batches_throws_exception_deletes_notifications(self, sample_email_template, mocker):
+        notifications = [save_notification(create_notification(template=sample_email_template)) for _ in range(2)]
+        mocker.patch("app.celery.provider_tasks.deliver_email_batch.apply_async", side_effect=Boto3Error("EXPECTED"))
+
+        with pytest.raises(Boto3Error):
+            send_emails_to_queue_in_batches(notifications, research_mode=False)
+
+        assert Notification.query.count() == 0
+
 
 class TestSimulatedRecipient:
     @pytest.mark.parametrize(
@@ -1,11 +1,15 @@
+from datetime import datetime, timezone
 from unittest.mock import call
 
 import pytest
 from flask import current_app
 from freezegun import freeze_time
 from notifications_utils import SMS_CHAR_COUNT_LIMIT
+from notifications_utils.clients.redis import email_daily_count_cache_key, over_email_daily_limit_cache_key
+from notifications_utils.clients.redis.annual_limit import NEAR_EMAIL_LIMIT, OVER_EMAIL_LIMIT, annual_limit_status_key
 
 import app
+from app.cache.local import local_caches
 from app.dbsetup import RoutingSQLAlchemy
 from app.models import (
     EMAIL_TYPE,
@@ -16,6 +20,7 @@ from app.models import (
     ApiKeyType,
 )
 from app.notifications.validators import (
+    _run_email_limits_script,
     check_email_annual_limit,
     check_email_daily_limit,
     check_reply_to,
@@ -30,6 +35,7 @@ from app.notifications.validators import (
     check_template_is_for_notification_type,
     increment_email_daily_count_send_warnings_if_needed,
     increment_sms_daily_count_send_warnings_if_needed,
+    reserve_email_limits,
     service_can_send_to_recipient,
     validate_and_format_recipient,
 )
@@ -38,6 +44,7 @@ from app.v2.errors import (
     BadRequestError,
     LiveServiceRequestExceedsEmailAnnualLimitError,
     LiveServiceRequestExceedsSMSAnnualLimitError,
+    LiveServiceTooManyEmailRequestsError,
     RateLimitError,
     TrialServiceRequestExceedsEmailAnnualLimitError,
     TrialServiceRequestExceedsSMSAnnualLimitError,
@@ -997,3 +1004,111 @@ class TestBillableUnitsInValidators:
 
             # Should have sent warning email
             assert mock_send_warning.called
+
+
+class TestReserveEmailLimits:
+    @pytest.fixture(autouse=True)
+    def email_limits_script(self, notify_api):
+        with set_config(notify_api, "FF_EMAIL_LIMITS_SCRIPT", True):
+            yield
+
+    @pytest.fixture
+    def service_and_key(self, notify_db, notify_db_session, mocker):
+        mocker.patch("app.notifications.validators._seed_email_limit_counters")
+        service = create_sample_service(notify_db, notify_db_session, limit=100, restricted=False)
+        api_key = create_sample_api_key(notify_db, notify_db_session, service=service)
+        return service, api_key
+
+    def test_returns_reservation_when_within_limits(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mock_script = mocker.patch(
+            "app.notifications.validators._run_email_limits_script", return_value=[b"ok", 80, 1000, 0, 0, 1, 0]
+        )
+        mock_send = mocker.patch("app.notifications.validators.send_near_email_limit_email")
+
+        reservation = reserve_email_limits(service, api_key, 1)
+        reservation.send_warning_emails()
+
+        mock_script.assert_called_once_with(service, api_key, 1)
+        assert (reservation.sent_today, reservation.near_daily_limit, reservation.daily_limit_reached) == (80, 1, 0)
+        mock_send.assert_called_once_with(service, 80)
+
+    @pytest.mark.parametrize(
+        "result, expected_error",
+        [
+            ([b"rate_limit"], RateLimitError),
+            ([b"annual_limit", 1000], LiveServiceRequestExceedsEmailAnnualLimitError),
+            ([b"daily_limit", 100], LiveServiceTooManyEmailRequestsError),
+        ],
+    )
+    def test_raises_when_a_limit_is_exceeded(self, service_and_key, mocker, result, expected_error):
+        service, api_key = service_and_key
+        mocker.patch("app.notifications.validators._run_email_limits_script", return_value=result)
+
+        with pytest.raises(expected_error):
+            reserve_email_limits(service, api_key, 1)
+
+    def test_seeds_counters_and_retries_once(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mock_script = mocker.patch(
+            "app.notifications.validators._run_email_limits_script",
+            side_effect=[[b"seed"], [b"ok", 1, 1, 0, 0, 0, 0]],
+        )
+
+        assert reserve_email_limits(service, api_key, 1) is not None
+        assert mock_script.call_count == 2
+
+    @freeze_time("2024-05-01T23:00:00")
+    def test_seeds_counters_once_until_the_end_of_the_day(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mocker.patch("app.notifications.validators._run_email_limits_script", return_value=[b"ok", 1, 1, 0, 0, 0, 0])
+        set_local_cache = mocker.spy(local_caches, "set")
+
+        reserve_email_limits(service, api_key, 1)
+        reserve_email_limits(service, api_key, 1)
+
+        app.notifications.validators._seed_email_limit_counters.assert_called_once_with(service)
+        assert set_local_cache.call_args[0][3] == 3600
+
+    @freeze_time("2024-05-01T12:00:00")
+    def test_adds_each_request_to_the_rate_limit_window_in_seconds(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mock_register_script = mocker.patch("app.redis_store.redis_store.register_script")
+
+        _run_email_limits_script(service, api_key, 1)
+        _run_email_limits_script(service, api_key, 1)
+
+        first, second = (kwargs["args"] for _, kwargs in mock_register_script.return_value.call_args_list)
+        assert first[0] == second[0] == datetime(2024, 5, 1, 12, tzinfo=timezone.utc).timestamp()
+        assert first[1] != second[1]
+
+    def test_sets_the_annual_limit_status_fields_read_by_the_annual_limit_client(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mock_register_script = mocker.patch("app.redis_store.redis_store.register_script")
+
+        _run_email_limits_script(service, api_key, 1)
+
+        kwargs = mock_register_script.return_value.call_args[1]
+        assert annual_limit_status_key(service.id) in kwargs["keys"]
+        assert kwargs["args"][-2:] == [OVER_EMAIL_LIMIT, NEAR_EMAIL_LIMIT]
+
+    def test_falls_back_to_separate_checks_when_redis_fails(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mocker.patch("app.notifications.validators._run_email_limits_script", side_effect=ConnectionError())
+        mock_checks = mocker.patch("app.notifications.validators._check_email_limits_separately")
+
+        assert reserve_email_limits(service, api_key, 1) is None
+        mock_checks.assert_called_once_with(service, api_key, 1)
+
+    def test_release_gives_back_emails_and_flags(self, service_and_key, mocker):
+        service, api_key = service_and_key
+        mocker.patch("app.notifications.validators._run_email_limits_script", return_value=[b"ok", 100, 1000, 0, 0, 0, 1])
+        mock_decrby = mocker.patch("app.redis_store.decrby")
+        mock_delete = mocker.patch("app.redis_store.delete")
+        mock_delete_hash_fields = mocker.patch("app.redis_store.delete_hash_fields")
+
+        reserve_email_limits(service, api_key, 1).release()
+
+        mock_decrby.assert_called_once_with(email_daily_count_cache_key(service.id), 1)
+        mock_delete.assert_called_once_with(over_email_daily_limit_cache_key(service.id))
+        mock_delete_hash_fields.assert_not_called()
@@ -7,6 +7,9 @@ from jsonschema import ValidationError
 from app.schema_validation import validate
 from app.service.service_callback_api_schema import update_service_callback_api_schema
 
+# validate reads the schema validator feature flags from the app config
+pytestmark = pytest.mark.usefixtures("notify_api")
+
 
 def test_service_callback_api_schema_validates():
     under_test = {
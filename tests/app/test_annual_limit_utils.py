@@ -1,7 +1,21 @@
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import call
+
 import pytest
+from notifications_utils.clients.redis.annual_limit import (
+    SMS_DELIVERED_TODAY,
+    SMS_FAILED_TODAY,
+    annual_limit_notifications_v2_key,
+)
 
-from app.annual_limit_utils import get_annual_limit_notifications_v2, seed_data_in_redis
-from tests.conftest import set_config
+from app.annual_limit_utils import (
+    get_annual_limit_notifications_v2,
+    increment_annual_limit_counts,
+    seed_annual_limit_counts_for_services,
+    seed_data_in_redis,
+)
+from tests.conftest import set_config, set_config_values
 
 
 class TestAnnualLimitUtils:
@@ -94,3 +108,69 @@ class TestAnnualLimitUtils:
 
         # set_seeded_at should NOT be called by seed_data_in_redis (it's handled inside seed_annual_limit_notifications)
         mock_set_seeded_at.assert_not_called()
+
+    def test_increment_annual_limit_counts_uses_one_pipeline(self, client, mocker, sample_service):
+        mock_pipeline = mocker.patch("app.redis_store.redis_store.pipeline").return_value
+
+        with set_config(client.application, "REDIS_ENABLED", True):
+            increment_annual_limit_counts({sample_service.id: Counter({SMS_DELIVERED_TODAY: 2, SMS_FAILED_TODAY: 0})})
+
+        mock_pipeline.hincrby.assert_has_calls(
+            [call(annual_limit_notifications_v2_key(sample_service.id), SMS_DELIVERED_TODAY, 2)]
+        )
+        assert mock_pipeline.hincrby.call_count == 1
+        mock_pipeline.execute.assert_called_once_with()
+
+    @pytest.mark.parametrize("use_billable_units", [False, True])
+    def test_seed_annual_limit_counts_for_services_uses_one_pipeline(self, client, mocker, use_billable_units):
+        service_id, quiet_service_id = "service-id", "quiet-service-id"
+        mocker.patch(
+            "app.annual_limit_utils.fetch_notification_status_totals_by_service_for_fiscal_year",
+            return_value=[
+                SimpleNamespace(service_id=service_id, notification_type="sms", notification_count=5, billable_units=8),
+                SimpleNamespace(service_id=service_id, notification_type="email", notification_count=7, billable_units=7),
+            ],
+        )
+        mocker.patch(
+            "app.annual_limit_utils.fetch_notification_status_by_service_for_day",
+            return_value=[
+                SimpleNamespace(
+                    service_id=service_id, notification_type="sms", notification_status="delivered", count=2, billable_units=3
+                ),
+                SimpleNamespace(
+                    service_id=service_id, notification_type="email", notification_status="failed", count=1, billable_units=0
+                ),
+            ],
+        )
+        mock_pipeline = mocker.patch("app.redis_store.redis_store.pipeline").return_value
+        mock_client_class = mocker.patch("app.annual_limit_utils.RedisAnnualLimit")
+        mock_client = mock_client_class.return_value
+
+        with set_config_values(client.application, {"REDIS_ENABLED": True, "FF_USE_BILLABLE_UNITS": use_billable_units}):
+            assert seed_annual_limit_counts_for_services([service_id, quiet_service_id]) == 2
+
+        expected = {
+            "sms_delivered_today": 2,
+            "sms_failed_today": 0,
+            "email_delivered_today": 0,
+            "email_failed_today": 1,
+            "total_sms_fiscal_year_to_yesterday": 5,
+            "total_email_fiscal_year_to_yesterday": 7,
+        }
+        expected_quiet = {field: 0 for field in expected}
+        if use_billable_units:
+            expected.update(
+                {
+                    "total_sms_billable_units_fiscal_year_to_yesterday": 8,
+                    "sms_billable_units_delivered_today": 3,
+                    "sms_billable_units_failed_today": 0,
+                }
+            )
+            expected_quiet.update({field: 0 for field in expected})
+        assert mock_client.seed_annual_limit_notifications.call_args_list == [
+            call(service_id, expected),
+            call(quiet_service_id, expected_quiet),
+        ]
+        assert mock_client.set_seeded_at.call_args_list == [call(service_id), call(quiet_service_id)]
+        assert mock_client_class.call_args.args[0].redis_store is mock_pipeline
+        mock_pipeline.execute.assert_called_once_with()
@@ -0,0 +1,22 @@
+from app import db
+from app.models import Service
+from tests.conftest import set_config
+
+
+class TestDetachedReader:
+    def test_binds_every_query_to_the_reader(self, notify_api, notify_db_session, mocker):
+        reader_engine = db.get_engine(notify_api)
+        get_engine = mocker.patch.object(db, "get_engine", return_value=reader_engine)
+
+        with set_config(notify_api, "SQLALCHEMY_BINDS", {"reader": "reader-uri", "writer": "writer-uri"}):
+            with db.detached_reader() as session:
+                session.query(Service).all()
+                session.query(Service).all()
+
+        get_engine.assert_called_once_with(notify_api, bind="reader")
+        assert session.get_bind() is reader_engine
+
+    def test_uses_the_default_engine_without_binds(self, notify_api, notify_db_session):
+        with set_config(notify_api, "SQLALCHEMY_BINDS", None):
+            with db.detached_reader() as session:
+                assert session.get_bind() is db.get_engine(notify_api)
@@ -9,7 +9,7 @@ from pytest_mock_resources import create_redis_fixture
 
 from app import create_app, flask_redis, metrics_logger
 from app.config import Config, Test
-from app.queue import Buffer, MockQueue, RedisQueue, generate_element
+from app.queue import Buffer, InboxDrainer, InboxLane, MockQueue, RedisQueue, generate_element
 
 redis = create_redis_fixture(scope="function")
 REDIS_ELEMENTS_COUNT = 123
@@ -260,7 +260,10 @@ class TestRedisQueue:
             assert len(elements) > 0
             assert redis.llen(Buffer.INBOX.inbox_name(QNAME_SUFFIX)) == 0
             assert redis.llen(Buffer.IN_FLIGHT.inflight_name(receipt, QNAME_SUFFIX)) == 1
-            assert len(redis.keys("*")) == 1
+            assert sorted(redis.keys("*")) == [
+                Buffer.IN_FLIGHT.inflight_name(receipt, QNAME_SUFFIX).encode(),
+                Buffer.IN_FLIGHT_INDEX.inbox_name(QNAME_SUFFIX).encode(),
+            ]
 
     @pytest.mark.serial
     def test_expire_inflights(self, redis, redis_queue):
@@ -288,6 +291,62 @@ class TestRedisQueue:
             assert redis.llen(Buffer.INBOX.inbox_name(QNAME_SUFFIX)) == REDIS_ELEMENTS_COUNT - 10
             assert redis.llen(Buffer.IN_FLIGHT.inflight_name(receipt, QNAME_SUFFIX)) == 10
 
+    @pytest.mark.serial
+    def test_polling_indexes_inflight(self, redis, redis_queue):
+        with self.given_inbox_with_one_element(redis, redis_queue):
+            before = time.time()
+            (receipt, _) = redis_queue.poll(10)
+            redis_queue.poll(10)
+
+            index = redis.zrange(Buffer.IN_FLIGHT_INDEX.inbox_name(QNAME_SUFFIX), 0, -1, withscores=True)
+            assert len(index) == 1
+            assert index[0][0] == Buffer.IN_FLIGHT.inflight_name(receipt, QNAME_SUFFIX).encode()
+            assert before <= index[0][1] <= time.time()
+
+    @pytest.mark.serial
+    def test_acknowledge_removes_inflight_from_index(self, redis, redis_queue):
+        with self.given_inbox_with_many_indexes(redis, redis_queue):
+            (receipt1, _) = redis_queue.poll(10)
+            (receipt2, _) = redis_queue.poll(10)
+            redis_queue.acknowledge(receipt1)
+
+            assert redis.zrange(Buffer.IN_FLIGHT_INDEX.inbox_name(QNAME_SUFFIX), 0, -1) == [
+                Buffer.IN_FLIGHT.inflight_name(receipt2, QNAME_SUFFIX).encode()
+            ]
+
+    @pytest.mark.serial
+    def test_expire_inflights_only_reads_index(self, redis, redis_queue):
+        with self.given_inbox_with_many_indexes(redis, redis_queue):
+            (receipt, _) = redis_queue.poll(10)
+            unindexed = Buffer.IN_FLIGHT.inflight_name(uuid4(), QNAME_SUFFIX)
+            redis.rpush(unindexed, "unindexed")
+            time.sleep(2)
+            redis_queue.expire_inflights()
+
+            assert redis.llen(Buffer.INBOX.inbox_name(QNAME_SUFFIX)) == REDIS_ELEMENTS_COUNT
+            assert redis.llen(Buffer.IN_FLIGHT.inflight_name(receipt, QNAME_SUFFIX)) == 0
+            assert redis.llen(unindexed) == 1
+            assert redis.zcard(Buffer.IN_FLIGHT_INDEX.inbox_name(QNAME_SUFFIX)) == 0
+
+    @pytest.mark.serial
+    def test_index_legacy_inflights(self, redis, redis_queue, redis_queue_with_process):
+        self.delete_all_list(redis)
+        legacy = Buffer.IN_FLIGHT.inflight_name(uuid4(), QNAME_SUFFIX)
+        other_queue = Buffer.IN_FLIGHT.inflight_name(uuid4(), QNAME_SUFFIX, PROCESS_TYPE)
+        redis.rpush(legacy, "1", "2")
+        redis.rpush(other_queue, "3")
+        try:
+            assert redis_queue.index_legacy_inflights() == 1
+            assert redis_queue.index_legacy_inflights() == 0
+            assert redis.zrange(Buffer.IN_FLIGHT_INDEX.inbox_name(QNAME_SUFFIX), 0, -1) == [legacy.encode()]
+
+            time.sleep(2)
+            redis_queue.expire_inflights()
+            assert redis.llen(Buffer.INBOX.inbox_name(QNAME_SUFFIX)) == 2
+            assert redis.llen(other_queue) == 1
+        finally:
+            self.delete_all_list(redis)
+
     @pytest.mark.serial
     def test_messages_serialization_after_poll(self, redis, redis_queue):
         self.delete_all_list(redis)
@@ -305,6 +364,100 @@ class TestRedisQueue:
         self.delete_all_list(redis)
 
 
+class TestInboxDrainer:
+    @pytest.fixture(autouse=True)
+    def app(self):
+        config: Config = Test()  # type: ignore
+        config.REDIS_ENABLED = True
+        app = Flask(config.NOTIFY_ENVIRONMENT)
+        create_app(app, config)
+        ctx = app.app_context()
+        ctx.push()
+        with app.test_request_context():
+            yield app
+        ctx.pop()
+        return app
+
+    @pytest.fixture()
+    def queues(self, app, redis):
+        queues = []
+        for process_type in ["priority", "bulk"]:
+            q = RedisQueue(QNAME_SUFFIX, process_type=process_type)
+            q.init_app(flask_redis, metrics_logger)
+            queues.append(q)
+        yield queues
+        for key in redis.scan_iter(f"{Buffer.INBOX.value}*"):
+            redis.delete(key)
+        for key in redis.scan_iter(f"{Buffer.IN_FLIGHT.value}*"):
+            redis.delete(key)
+
+    def lanes(self, queues, weights, dispatched):
+        return [
+            InboxLane(q, weight, lambda receipt, notifications, q=q: dispatched.append((q, receipt, notifications)))
+            for q, weight in zip(queues, weights)
+        ]
+
+    @pytest.mark.parametrize("depth, expected", [(0, 10), (5, 10), (10, 10), (42, 42), (250, 250), (1000, 250)])
+    def test_batch_size_follows_depth(self, depth, expected):
+        assert InboxDrainer([], min_batch_size=10, max_batch_size=250).batch_size(depth) == expected
+
+    @pytest.mark.serial
+    def test_drain_empties_all_inboxes(self, redis, queues):
+        priority, bulk = queues
+        [priority.publish(str(i)) for i in range(25)]
+        [bulk.publish(str(i)) for i in range(REDIS_ELEMENTS_COUNT)]
+        dispatched = []
+
+        drained = InboxDrainer(self.lanes(queues, [4, 1], dispatched), min_batch_size=5, max_batch_size=20).drain()
+
+        assert drained == {priority: 25, bulk: REDIS_ELEMENTS_COUNT}
+        assert priority.depth() == 0
+        assert bulk.depth() == 0
+        for q, receipt, notifications in dispatched:
+            assert all(isinstance(n, str) for n in notifications)
+            assert len(notifications) <= 20
+            in_flight_key = Buffer.IN_FLIGHT.inflight_name(receipt, QNAME_SUFFIX, q._process_type)
+            assert redis.llen(in_flight_key) == len(notifications)
+
+    @pytest.mark.serial
+    def test_drain_polls_lanes_by_weight(self, redis, queues):
+        priority, bulk = queues
+        [priority.publish(str(i)) for i in range(100)]
+        [bulk.publish(str(i)) for i in range(100)]
+        dispatched = []
+
+        InboxDrainer(self.lanes(queues, [4, 1], dispatched), min_batch_size=10, max_batch_size=10).drain()
+
+        first_round = dispatched[:5]
+        assert [q for q, _, _ in first_round] == [priority] * 4 + [bulk]
+        assert all(len(notifications) == 10 for _, _, notifications in dispatched)
+
+    @pytest.mark.serial
+    def test_drain_stops_when_out_of_time(self, redis, queues):
+        priority, bulk = queues
+        [priority.publish(str(i)) for i in range(10)]
+        dispatched = []
+
+        drained = InboxDrainer(self.lanes(queues, [1, 1], dispatched), max_seconds=0).drain()
+
+        assert drained == {priority: 0, bulk: 0}
+        assert dispatched == []
+        assert priority.depth() == 10
+
+    @pytest.mark.serial
+    def test_drain_puts_metrics_per_lane(self, redis, queues, mocker):
+        put_metric = mocker.patch("app.queue.put_batch_saving_drain_metric")
+        priority, bulk = queues
+        [priority.publish(str(i)) for i in range(15)]
+
+        InboxDrainer(self.lanes(queues, [1, 1], []), min_batch_size=10).drain()
+
+        assert put_metric.call_args_list == [
+            mock.call(mock.ANY, priority, 15, mock.ANY, 0),
+            mock.call(mock.ANY, bulk, 0, mock.ANY, 0),
+        ]
+
+
 @pytest.mark.usefixtures("notify_api")
 class TestMockQueue:
     @pytest.fixture
@@ -11,6 +11,9 @@ from app.v2.inbound_sms.inbound_sms_schemas import (
 from tests import create_authorization_header
 from tests.app.db import create_inbound_sms
 
+# validate reads the schema validator feature flags from the app config
+pytestmark = pytest.mark.usefixtures("notify_api")
+
 valid_inbound_sms = {
     "user_number": "447700900111",
     "created_at": "2017-11-02T15:07:57.197546Z",
@@ -5,6 +5,7 @@ from flask import json
 from freezegun import freeze_time
 from jsonschema import ValidationError
 
+from app.cache.schema_validators import schema_validator_registry
 from app.models import EMAIL_TYPE, NOTIFICATION_CREATED
 from app.schema_validation import validate
 from app.v2.notifications.notification_schemas import get_notifications_request
@@ -14,6 +15,10 @@ from app.v2.notifications.notification_schemas import (
 from app.v2.notifications.notification_schemas import (
     post_sms_request as post_sms_request_schema,
 )
+from tests.conftest import set_config_values
+
+# validate reads the schema validator feature flags from the app config
+pytestmark = pytest.mark.usefixtures("notify_api")
 
 valid_get_json: dict = {}
 
@@ -253,6 +258,34 @@ def test_post_email_schema_bad_uuid_and_missing_email_address():
         validate(j, post_email_request_schema)
 
 
+@pytest.mark.parametrize("enabled, fast_path_enabled", [(True, False), (True, True)])
+@pytest.mark.parametrize(
+    "request_json, err_msg",
+    [
+        ({"phone_number": "6502532222", "template_id": str(uuid.uuid4())}, None),
+        ({"phone_number": "08515111111", "template_id": str(uuid.uuid4())}, "phone_number Not a valid international number"),
+        ({"phone_number": "6502532222", "template_id": "bad_uuid"}, "template_id is not a valid UUID"),
+        (
+            {"phone_number": "6502532222", "template_id": str(uuid.uuid4()), "key": "value"},
+            "Additional properties are not allowed (key was unexpected)",
+        ),
+    ],
+)
+def test_post_sms_request_with_the_schema_validator_registry(notify_api, enabled, fast_path_enabled, request_json, err_msg):
+    schema_validator_registry.clear()
+
+    with set_config_values(
+        notify_api, {"FF_SCHEMA_VALIDATOR_CACHE": enabled, "FF_SCHEMA_VALIDATION_FAST_PATH": fast_path_enabled}
+    ):
+        for _ in range(2):
+            if err_msg is None:
+                assert validate(request_json, post_sms_request_schema) == request_json
+            else:
+                with pytest.raises(ValidationError) as e:
+                    validate(request_json, post_sms_request_schema)
+                assert json.loads(str(e.value))["errors"] == [{"error": "ValidationError", "message": err_msg}]
+
+
 @pytest.mark.parametrize(
     "email_address, err_msg",
     [
@@ -3,7 +3,7 @@ import csv
 import uuid
 from datetime import datetime, timedelta
 from io import StringIO
-from unittest.mock import Mock, call
+from unittest.mock import ANY, Mock, call
 
 import pytest
 from flask import current_app, json
@@ -3411,3 +3411,44 @@ class TestBillableUnitsInV2Notifications:
 
             # Verify increment was called with billable_units=2
             mock_increment.assert_called_once_with(template.service, 2)
+
+
+class TestEmailLimitsScript:
+    @pytest.fixture(autouse=True)
+    def email_limits_script(self, notify_api):
+        with set_config(notify_api, "FF_EMAIL_LIMITS_SCRIPT", True):
+            yield
+
+    def _post_email(self, client, template):
+        return client.post(
+            path="/v2/notifications/email",
+            data=json.dumps({"email_address": "test@example.com", "template_id": str(template.id)}),
+            headers=[("Content-Type", "application/json"), create_authorization_header(service_id=template.service_id)],
+        )
+
+    def test_post_email_reserves_limits_in_one_call(self, client, sample_email_template, mocker):
+        mocker.patch("app.email_normal_publish.publish")
+        mock_reserve = mocker.patch("app.v2.notifications.post_notifications.reserve_email_limits")
+        mock_rate_limit = mocker.patch("app.v2.notifications.post_notifications.check_rate_limiting")
+        mock_increment = mocker.patch(
+            "app.v2.notifications.post_notifications.increment_email_daily_count_send_warnings_if_needed"
+        )
+
+        response = self._post_email(client, sample_email_template)
+
+        assert response.status_code == 201
+        mock_reserve.assert_called_once_with(sample_email_template.service, ANY, 1)
+        mock_reserve.return_value.send_warning_emails.assert_called_once_with()
+        mock_reserve.return_value.release.assert_not_called()
+        mock_rate_limit.assert_not_called()
+        mock_increment.assert_not_called()
+
+    def test_post_email_releases_reservation_when_sending_fails(self, client, sample_email_template, mocker):
+        mocker.patch("app.email_normal_publish.publish", side_effect=Exception("queue down"))
+        mock_reserve = mocker.patch("app.v2.notifications.post_notifications.reserve_email_limits")
+
+        response = self._post_email(client, sample_email_template)
+
+        assert response.status_code == 500
+        mock_reserve.return_value.release.assert_called_once_with()
+        mock_reserve.return_value.send_warning_emails.assert_not_called()
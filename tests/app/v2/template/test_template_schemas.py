@@ -13,6 +13,9 @@ from app.v2.template.template_schemas import (
     post_template_preview_response,
 )
 
+# validate reads the schema validator feature flags from the app config
+pytestmark = pytest.mark.usefixtures("notify_api")
+
 valid_json_get_response = {
     "id": str(uuid.uuid4()),
     "type": SMS_TYPE,
@@ -11,6 +11,9 @@ from app.v2.templates.templates_schemas import (
     get_all_template_response,
 )
 
+# validate reads the schema validator feature flags from the app config
+pytestmark = pytest.mark.usefixtures("notify_api")
+
 valid_json_get_all_response = [
     {
         "templates": [